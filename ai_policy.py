@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - AI启发式策略
+TexasHoldemGame 的AI行动权重计算，不依赖Kivy，便于离线评估与批量模拟
+
+批量接口（*_batch）以 NumPy 数组一次计算成千上万个待决策局面，
+权重与逐个计算的结果逐位相同，抽样与 random.choices 同分布（给定相同的均匀随机数时结果相同）
+"""
+
+import random
+
+AI_ACTIONS = ["fold", "check", "call", "raise", "all_in"]
+
+
+def position_factor(player_index, current_player_idx, total_players):
+    """获取位置优势因子"""
+    # 按钮位置优势：越晚行动优势越大
+    # 计算相对于按钮的位置
+    button_distance = (player_index - current_player_idx) % total_players
+    return 1.0 - (button_distance / total_players)
+
+
+def bet_history_factor(current_bet, big_blind):
+    """获取下注历史因子"""
+    # 计算当前下注轮的激进程度
+    if current_bet == 0:
+        return 0.0  # 无人下注
+
+    # 下注额相对于大盲注的比例
+    bet_aggressiveness = current_bet / big_blind
+
+    return min(1.0, bet_aggressiveness / 5.0)  # 归一化到0-1
+
+
+def heuristic_weights(hand_strength, position_factor, bet_history_factor, chip_ratio,
+                      opponent_looseness=None):
+    """计算归一化的行动权重（与 AI_ACTIONS 同序的字典）
+
+    chip_ratio 为剩余筹码相对于10个大盲的比例；
+    opponent_looseness 为本街最后加注者的松凶程度（0-1，见 opponent_stats），缺省时不考虑。
+    """
+    # 基础决策权重
+    base_weights = {
+        "fold": 0.1,
+        "check": 0.3,
+        "call": 0.4,
+        "raise": 0.15,
+        "all_in": 0.05
+    }
+
+    # 根据手牌强度调整权重
+    if hand_strength > 0.7:  # 强牌
+        base_weights["fold"] = 0.01
+        base_weights["raise"] = 0.4
+        base_weights["all_in"] = 0.1
+    elif hand_strength < 0.3:  # 弱牌
+        base_weights["fold"] = 0.3
+        base_weights["raise"] = 0.05
+
+    # 根据位置调整权重
+    if position_factor > 0.7:  # 有利位置
+        base_weights["raise"] *= 1.5
+        base_weights["check"] *= 1.2
+    else:  # 不利位置
+        base_weights["fold"] *= 1.3
+        base_weights["call"] *= 0.8
+
+    # 根据下注历史调整权重
+    if bet_history_factor > 0.5:  # 激进的下注环境
+        base_weights["fold"] *= 1.5
+        base_weights["call"] *= 0.7
+        # 面对松凶对手的下注少弃牌、多跟注
+        if opponent_looseness is not None and opponent_looseness > 0.5:
+            base_weights["fold"] *= 0.7
+            base_weights["call"] *= 1.3
+
+    # 筹码管理
+    if chip_ratio < 0.5:  # 短筹码
+        base_weights["all_in"] *= 2.0
+        base_weights["fold"] *= 0.5
+    elif chip_ratio > 3.0:  # 深筹码
+        base_weights["raise"] *= 1.3
+
+    # 归一化权重
+    total = sum(base_weights.values())
+    return {k: v / total for k, v in base_weights.items()}
+
+
+def choose_action(weights, rng=random):
+    """按权重随机选择行动"""
+    actions = list(weights.keys())
+    return rng.choices(actions, weights=list(weights.values()))[0]
+
+
+
+# ==============================================
+# 批量评估
+# ==============================================
+
+_BASE_WEIGHTS = (0.1, 0.3, 0.4, 0.15, 0.05)
+_FOLD, _CHECK, _CALL, _RAISE, _ALL_IN = range(len(AI_ACTIONS))
+
+
+def position_factor_batch(player_index, current_player_idx, total_players):
+    """批量位置优势因子"""
+    import numpy as np
+
+    button_distance = (np.asarray(player_index) - np.asarray(current_player_idx)) % total_players
+    return 1.0 - (button_distance / total_players)
+
+
+def bet_history_factor_batch(current_bet, big_blind):
+    """批量下注历史因子"""
+    import numpy as np
+
+    current_bet = np.asarray(current_bet, dtype=np.float64)
+    return np.minimum(1.0, current_bet / big_blind / 5.0)
+
+
+def heuristic_weights_batch(hand_strength, position_factor, bet_history_factor, chip_ratio,
+                            opponent_looseness=None):
+    """批量计算归一化的行动权重，返回 (M, 5) 数组（列顺序同 AI_ACTIONS）
+
+    opponent_looseness 中的 NaN 表示没有可参考的加注者（相当于标量接口的 None）。
+    各项乘法的顺序与 heuristic_weights 相同，结果逐位一致。
+    """
+    import numpy as np
+
+    hand_strength = np.asarray(hand_strength, dtype=np.float64)
+    position_factor = np.asarray(position_factor, dtype=np.float64)
+    bet_history_factor = np.asarray(bet_history_factor, dtype=np.float64)
+    chip_ratio = np.asarray(chip_ratio, dtype=np.float64)
+    weights = np.empty(hand_strength.shape + (len(AI_ACTIONS),))
+    weights[:] = _BASE_WEIGHTS
+    fold, check, call, raise_, all_in = (weights[..., i] for i in range(len(AI_ACTIONS)))
+
+    # 手牌强度
+    strong = hand_strength > 0.7
+    weak = hand_strength < 0.3
+    fold[strong] = 0.01
+    raise_[strong] = 0.4
+    all_in[strong] = 0.1
+    fold[weak] = 0.3
+    raise_[weak] = 0.05
+
+    # 位置
+    good = position_factor > 0.7
+    raise_ *= np.where(good, 1.5, 1.0)
+    check *= np.where(good, 1.2, 1.0)
+    fold *= np.where(good, 1.0, 1.3)
+    call *= np.where(good, 1.0, 0.8)
+
+    # 下注历史与对手松凶程度
+    aggressive = bet_history_factor > 0.5
+    fold *= np.where(aggressive, 1.5, 1.0)
+    call *= np.where(aggressive, 0.7, 1.0)
+    if opponent_looseness is not None:
+        loose = aggressive & (np.asarray(opponent_looseness, dtype=np.float64) > 0.5)
+        fold *= np.where(loose, 0.7, 1.0)
+        call *= np.where(loose, 1.3, 1.0)
+
+    # 筹码管理
+    short = chip_ratio < 0.5
+    deep = ~short & (chip_ratio > 3.0)
+    all_in *= np.where(short, 2.0, 1.0)
+    fold *= np.where(short, 0.5, 1.0)
+    raise_ *= np.where(deep, 1.3, 1.0)
+
+    # 归一化（按与 sum() 相同的顺序逐列相加）
+    total = fold + check + call + raise_ + all_in
+    return weights / total[..., None]
+
+
+def choose_actions_batch(weights, rng=None, uniforms=None):
+    """按权重批量抽样，返回行动编号数组（对应 AI_ACTIONS）
+
+    与 random.choices 的算法相同：累积权重上二分查找 random() * 总权重；
+    可直接传入均匀随机数 uniforms，否则由 NumPy 随机数生成器 rng 产生。
+    """
+    import numpy as np
+
+    weights = np.asarray(weights, dtype=np.float64)
+    if uniforms is None:
+        rng = rng if rng is not None else np.random.default_rng()
+        uniforms = rng.random(weights.shape[:-1])
+    cumulative = np.cumsum(weights, axis=-1)
+    x = np.asarray(uniforms) * cumulative[..., -1]
+    chosen = (cumulative <= x[..., None]).sum(axis=-1)
+    return np.minimum(chosen, weights.shape[-1] - 1)
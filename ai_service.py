@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - AI决策服务
+一个进程托管多张牌桌时，各桌的AI决策交给独立的服务进程（通过管道通信）：
+服务进程把一段截止时间内到达的请求凑成一批，用批量策略（ai_worker.decide_batch）
+一次算完再回传；搜索模式的请求不进批次，由服务进程中的搜索线程逐个在
+各自的预算与截止时间内计算、单独回传，不拖慢同批的其他请求。
+客户端为每个请求设置超时，服务来不及回复或已退出时在本地用启发式即时决策，
+行动不会晚于AI思考延迟；截止时间过后 RESULT_TTL 秒仍未取走的凭据被清理
+
+game_server.py --ai-service 让全部牌桌的内置AI通过本服务决策
+
+用法:
+  client = AIServiceClient()
+  ticket = client.submit(request)
+  ...
+  result = client.poll(ticket)   # 未就绪时返回None；凭据已取走、取消或被清理时抛出 KeyError
+"""
+
+import time
+import heapq
+import queue
+import threading
+import multiprocessing
+from collections import deque
+
+from ai_worker import decide_batch, heuristic_action
+from mcts_ai import MCTSSearch
+
+# 凑批的最长等待时间（秒）与单批最多请求数
+BATCH_DELAY = 0.005
+MAX_BATCH = 1024
+
+# 单个请求的默认超时（秒），不超过最短的AI思考延迟
+REQUEST_TIMEOUT = 0.5
+
+# 截止时间过后多久清理没有取走的凭据（秒）
+RESULT_TTL = 5.0
+
+# 搜索提前于客户端截止时间结束的余量（秒），留给回传
+SEARCH_MARGIN = 0.005
+
+
+def is_search(request):
+    """是否为需要单独计算的搜索模式请求"""
+    return request.mode == "mcts" and request.search_root is not None and request.push_fold_action is None
+
+
+def _search_loop(conn, lock, searches):
+    """服务进程的搜索线程：逐个运行搜索请求，截止时间已过的直接跳过（客户端已在本地回退）"""
+    while True:
+        item = searches.get()
+        if item is None:
+            return
+        ticket, request, deadline = item
+        finish = min(time.perf_counter() + request.budget, deadline - SEARCH_MARGIN)
+        if finish <= time.perf_counter():
+            continue
+        search = MCTSSearch(request.search_root, request.hole, request.board)
+        search.run(finish)
+        try:
+            with lock:
+                conn.send((1, [(ticket, search.best_action())]))
+        except (OSError, EOFError):
+            return
+
+
+def _serve(conn, batch_delay, max_batch):
+    """服务进程主循环：收到第一个请求后等待 batch_delay 凑批，批量计算后回传；搜索请求交给搜索线程"""
+    import numpy as np
+
+    rng = np.random.default_rng()
+    lock = threading.Lock()
+    searches = queue.Queue()
+    threading.Thread(target=_search_loop, args=(conn, lock, searches), name="ai-search", daemon=True).start()
+
+    def split(message, batch):
+        received = time.perf_counter()
+        for ticket, request, timeout in message:
+            if is_search(request):
+                searches.put((ticket, request, received + timeout))
+            else:
+                batch.append((ticket, request))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        batch = []
+        split(message, batch)
+        if not batch:
+            continue
+        deadline = time.perf_counter() + batch_delay
+        while len(batch) < max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not conn.poll(remaining):
+                break
+            message = conn.recv()
+            if message is None:
+                searches.put(None)
+                return
+            split(message, batch)
+
+        actions = decide_batch([request for _, request in batch], rng)
+        with lock:
+            conn.send((len(batch), [(ticket, action) for (ticket, _), action in zip(batch, actions)]))
+    searches.put(None)
+
+
+class ServiceStats:
+    """客户端统计：请求数、批次数、平均批大小、超时回退次数"""
+
+    def __init__(self):
+        self.requests = 0
+        self.served = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.timeouts = 0
+        self.expired = 0
+
+    def mean_batch(self):
+        """平均批大小"""
+        return self.batched_requests / self.batches if self.batches else 0.0
+
+
+class AIServiceClient:
+    """AI决策服务的客户端（同时启动服务进程）；只应在一个线程中使用"""
+
+    def __init__(self, batch_delay=BATCH_DELAY, max_batch=MAX_BATCH, timeout=REQUEST_TIMEOUT, ttl=RESULT_TTL):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.stats = ServiceStats()
+        # spawn 启动：服务进程不继承图形界面与后台线程
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_serve, args=(child_conn, batch_delay, max_batch),
+                                        name="ai-service", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._next_ticket = 0
+        self._pending = {}      # ticket -> (请求, 截止时刻)
+        self._results = {}      # ticket -> 行动
+        self._expiry = []       # (清理时刻, ticket) 的最小堆
+        self._alive = True
+
+        # 回复由读线程收进队列，发送请求时不会因对方回复堆满管道而互相阻塞
+        self._replies = deque()
+        self._reader = threading.Thread(target=self._read_replies, name="ai-service-reader", daemon=True)
+        self._reader.start()
+
+    @property
+    def alive(self):
+        """服务进程是否可用"""
+        return self._alive
+
+    @property
+    def outstanding(self):
+        """尚未取走（也未清理）的凭据数"""
+        return len(self._pending) + len(self._results)
+
+    def submit(self, request, timeout=None):
+        """提交一个请求，返回凭据"""
+        return self.submit_many([request], timeout)[0]
+
+    def submit_many(self, requests, timeout=None):
+        """一次提交多个请求（一条消息），返回凭据列表"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.perf_counter() + timeout
+        tickets = list(range(self._next_ticket, self._next_ticket + len(requests)))
+        self._next_ticket += len(requests)
+        for ticket, request in zip(tickets, requests):
+            self._pending[ticket] = (request, deadline)
+            heapq.heappush(self._expiry, (deadline + self.ttl, ticket))
+        self.stats.requests += len(requests)
+        if self._alive:
+            try:
+                self._conn.send([(ticket, request, timeout) for ticket, request in zip(tickets, requests)])
+            except (OSError, EOFError):
+                self._alive = False
+        return tickets
+
+    def _read_replies(self):
+        """读线程：把服务进程的回复放进队列，管道关闭后标记服务不可用"""
+        while True:
+            try:
+                self._replies.append(self._conn.recv())
+            except (OSError, EOFError):
+                self._alive = False
+                return
+
+    def _drain(self):
+        """取出所有已到达的结果，清理截止时间过后 ttl 秒仍未取走的凭据"""
+        while self._replies:
+            batch_size, results = self._replies.popleft()
+            self.stats.batches += 1
+            self.stats.batched_requests += batch_size
+            for ticket, action in results:
+                # 已超时回退或被取消的请求，迟到的结果直接丢弃
+                if ticket in self._pending:
+                    del self._pending[ticket]
+                    self._results[ticket] = action
+                    self.stats.served += 1
+        now = time.perf_counter()
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            ticket = heapq.heappop(expiry)[1]
+            if self._pending.pop(ticket, None) is not None or self._results.pop(ticket, None) is not None:
+                self.stats.expired += 1
+
+    def poll(self, ticket):
+        """取某个请求的行动；尚未就绪时返回None，超时或服务不可用时在本地用启发式决策。
+        凭据未知（已取走、已取消或截止时间过后 ttl 秒被清理）时抛出 KeyError，调用方应自行回退"""
+        self._drain()
+        action = self._results.pop(ticket, None)
+        if action is not None:
+            return action
+        entry = self._pending.get(ticket)
+        if entry is None:
+            raise KeyError(f"未知或已清理的凭据: {ticket}")
+        request, deadline = entry
+        if not self._alive or time.perf_counter() >= deadline:
+            del self._pending[ticket]
+            self.stats.timeouts += 1
+            return heuristic_action(request)
+        return None
+
+    def cancel(self, ticket):
+        """放弃某个请求"""
+        self._pending.pop(ticket, None)
+        self._results.pop(ticket, None)
+
+    def shutdown(self):
+        """停止服务进程"""
+        if self._alive:
+            try:
+                self._conn.send(None)
+            except (OSError, EOFError):
+                pass
+            self._alive = False
+        self._process.join(timeout=1.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._reader.join(timeout=1.0)
+        self._conn.close()
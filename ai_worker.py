@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - AI后台思考
+轮到AI时主线程只做一次快照（DecisionRequest），决策计算在后台线程进行，
+利用AI的思考延迟作为计算时间；主线程每帧非阻塞地取结果并执行行动
+"""
+
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_policy import heuristic_weights, choose_action, heuristic_weights_batch, choose_actions_batch, AI_ACTIONS
+from cfr_solver import ACTIONS, get_strategy_table, infoset_key, strength_to_bucket
+from hand_buckets import card_strength
+from mcts_ai import MCTSSearch
+
+
+class DecisionRequest:
+    """一次AI决策的全部输入（在主线程构造，之后只读）"""
+
+    def __init__(self, seat, num_players, hole, board, street, history,
+                 hand_strength, position_factor, bet_history_factor, chip_ratio,
+                 mode="standard", search_root=None, budget=0.0, opponent_looseness=None,
+                 push_fold_action=None, legal_mask=None, min_raise_to=0, max_raise_to=0):
+        self.seat = seat
+        self.num_players = num_players
+        self.hole = hole
+        self.board = board
+        self.street = street
+        self.history = history
+        self.hand_strength = hand_strength
+        self.position_factor = position_factor
+        self.bet_history_factor = bet_history_factor
+        self.chip_ratio = chip_ratio
+        self.mode = mode
+        self.search_root = search_root
+        self.budget = budget
+        self.opponent_looseness = opponent_looseness
+        self.push_fold_action = push_fold_action
+        # 合法行动位掩码与加注区间（见 betting.legal_actions），供插件AI使用
+        self.legal_mask = legal_mask
+        self.min_raise_to = min_raise_to
+        self.max_raise_to = max_raise_to
+
+
+def strategy_table_action(seat, num_players, hole, board, street, history):
+    """按离线CFR策略表选择行动；无表或局面未收录时返回None"""
+    strategy_table = get_strategy_table()
+    if strategy_table is None or strategy_table.num_seats != num_players:
+        return None
+
+    # 与训练时相同的分桶方式
+    bucket = strength_to_bucket(card_strength(hole, board), strategy_table.num_buckets)
+    probabilities = strategy_table.lookup(infoset_key(seat, street, bucket, history))
+    if probabilities is None:
+        return None
+
+    return random.choices(ACTIONS, weights=probabilities)[0]
+
+
+def decide(request):
+    """计算AI行动，返回 (行动, 搜索对象或None)；只读取 request，可在后台线程运行"""
+    # 短筹码翻牌前按推/弃图表行动
+    if request.push_fold_action is not None:
+        return request.push_fold_action, None
+
+    # 搜索模式：在预算内运行树搜索
+    if request.mode == "mcts" and request.search_root is not None:
+        search = MCTSSearch(request.search_root, request.hole, request.board)
+        search.run(time.perf_counter() + request.budget)
+        return search.best_action(), search
+
+    # 优先使用离线CFR策略表，未收录的局面退回启发式
+    action = strategy_table_action(request.seat, request.num_players, request.hole,
+                                   request.board, request.street, request.history)
+    if action is None:
+        action = heuristic_action(request)
+    return action, None
+
+
+def heuristic_action(request):
+    """只用启发式权重的即时决策（超时回退用）"""
+    if request.push_fold_action is not None:
+        return request.push_fold_action
+    weights = heuristic_weights(request.hand_strength, request.position_factor,
+                                request.bet_history_factor, request.chip_ratio,
+                                request.opponent_looseness)
+    return choose_action(weights)
+
+
+def decide_batch(requests, rng=None):
+    """批量计算一组请求的行动（与逐个 decide() 同分布）
+
+    推/弃图表与策略表逐个查表，其余请求的启发式权重与抽样一次算完；
+    搜索模式的请求仍逐个在各自的预算内搜索。
+    """
+    import numpy as np
+
+    actions = [None] * len(requests)
+    heuristic = []
+    for i, request in enumerate(requests):
+        if request.push_fold_action is not None or request.mode == "mcts":
+            actions[i] = decide(request)[0]
+            continue
+        actions[i] = strategy_table_action(request.seat, request.num_players, request.hole,
+                                           request.board, request.street, request.history)
+        if actions[i] is None:
+            heuristic.append(i)
+
+    if heuristic:
+        features = np.array([(r.hand_strength, r.position_factor, r.bet_history_factor, r.chip_ratio,
+                              np.nan if r.opponent_looseness is None else r.opponent_looseness)
+                             for r in (requests[i] for i in heuristic)], dtype=np.float64)
+        chosen = choose_actions_batch(heuristic_weights_batch(*features.T), rng)
+        for i, action in zip(heuristic, chosen.tolist()):
+            actions[i] = AI_ACTIONS[action]
+    return actions
+
+
+class AIWorker:
+    """后台AI思考线程：同一时刻只保留最新的请求，过期的结果直接丢弃"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-worker")
+        self._future = None
+        self._request = None
+
+    @property
+    def pending(self):
+        """是否有尚未取走的请求"""
+        return self._future is not None
+
+    def submit(self, request, bot=None):
+        """开始计算新的决策（取代尚未取走的旧请求）；bot 为该座位的插件AI（见 bots.py）"""
+        self.cancel()
+        self._request = request
+        if bot is None:
+            self._future = self._executor.submit(decide, request)
+        else:
+            self._future = self._executor.submit(bot.decision, request)
+
+    def poll(self):
+        """非阻塞地取结果：未完成时返回None，完成时返回 (请求, 行动, 搜索对象)"""
+        if self._future is None or not self._future.done():
+            return None
+        future, request = self._future, self._request
+        self._future = None
+        self._request = None
+        action, search = future.result()
+        return request, action, search
+
+    def cancel(self):
+        """放弃当前请求（已在运行的计算会在预算内结束，结果被忽略）"""
+        if self._future is not None:
+            self._future.cancel()
+        self._future = None
+        self._request = None
+
+    def shutdown(self):
+        """停止后台线程"""
+        self.cancel()
+        self._executor.shutdown(wait=False)
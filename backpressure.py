@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 服务器入站背压
+客户端可能连续狂点行动按钮（游戏里 PokerButton 每次点击都会触发 on_button_press），
+服务器牌桌不能处理过期或重复的行动，也不能让一个刷屏的连接拖慢其他牌桌：
+
+  RateLimiter       每个连接的令牌桶限速，超出的消息直接丢弃
+  ActionInbox       每张牌桌的有界入站行动队列：只接受当前行动序号、行动名已知且加注额为整数的行动，
+                    完全相同的重复行动去重；一个刻度内到达的行动合并成一批，牌桌每刻度最多被唤醒一次
+  LatencyHistogram  对数分桶的延迟直方图（每张牌桌记录行动从收到到执行的延迟）
+"""
+
+import math
+import time
+import asyncio
+from collections import deque
+
+from cfr_solver import ACTIONS
+
+# 每张牌桌最多积压的入站行动
+INBOX_SIZE = 32
+
+# 每个连接的消息速率（条/秒）与突发上限
+MESSAGE_RATE = 20.0
+MESSAGE_BURST = 40
+
+
+class RateLimiter:
+    """令牌桶：平均 rate 条/秒，最多连续 burst 条"""
+
+    def __init__(self, rate=MESSAGE_RATE, burst=MESSAGE_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.rejected = 0
+
+    def allow(self):
+        """消耗一个令牌；没有令牌时返回False"""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.rejected += 1
+        return False
+
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图：每翻一倍分4个桶，范围1微秒到约1小时，分位数误差不超过19%"""
+
+    BUCKETS_PER_DOUBLING = 4
+    MIN_LATENCY = 1e-6
+    NUM_BUCKETS = 4 * 32
+
+    def __init__(self):
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """记录一次延迟（秒）"""
+        if seconds <= self.MIN_LATENCY:
+            index = 0
+        else:
+            index = min(int(math.log2(seconds / self.MIN_LATENCY) * self.BUCKETS_PER_DOUBLING) + 1,
+                        self.NUM_BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        """把另一个直方图累加进来"""
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """第 p 百分位的延迟（所在桶的上界，秒）；没有记录时为0"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                upper = self.MIN_LATENCY * 2 ** (index / self.BUCKETS_PER_DOUBLING)
+                return min(upper, self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class ActionInbox:
+    """一张牌桌的有界入站行动队列
+
+    牌桌轮到真人时 open(序号)，之后只接受带该序号（或不带序号）的行动，
+    行动执行或超时后 close()，迟到的行动按过期丢弃。
+    """
+
+    def __init__(self, timers, maxsize=INBOX_SIZE):
+        self.timers = timers   # timer_wheel.AsyncScheduler，用于按刻度合并唤醒
+        self.maxsize = maxsize
+        self.turn = None
+        self.items = deque()   # (行动者, 行动, 加注到, 收到时刻)
+        self._seen = set()
+        self._waiter = None
+        self._wake = None
+        self.accepted = 0
+        self.duplicates = 0
+        self.stale = 0
+        self.overflow = 0
+        self.invalid = 0
+        self.wakeups = 0
+
+    def open(self, turn):
+        """开始接受行动序号为 turn 的行动（丢弃之前积压的行动）"""
+        self.turn = turn
+        self.items.clear()
+        self._seen.clear()
+
+    def close(self):
+        """本次行动结束，之后到达的行动都视为过期"""
+        self.turn = None
+        self.items.clear()
+        self._seen.clear()
+        if self._wake is not None:
+            self.timers.cancel(self._wake)
+            self._wake = None
+
+    def put(self, actor, action, raise_to, seq=None):
+        """客户端行动入队；格式不对、过期、重复或队列已满时丢弃并返回False
+
+        去重键由客户端给出的值组成，先确认行动是已知的名称、加注额是整数或None（都可哈希）
+        """
+        if (not isinstance(action, str) or action not in ACTIONS
+                or not (raise_to is None or isinstance(raise_to, int))):
+            self.invalid += 1
+            return False
+        if self.turn is None or (seq is not None and seq != self.turn):
+            self.stale += 1
+            return False
+        key = (actor, action, raise_to)
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        if len(self.items) >= self.maxsize:
+            self.overflow += 1
+            return False
+        self._seen.add(key)
+        self.items.append((actor, action, raise_to, time.perf_counter()))
+        self.accepted += 1
+        if self._waiter is not None and self._wake is None:
+            # 同一刻度内的后续行动合并到这次唤醒
+            self._wake = self.timers.call_later(0, self._release)
+        return True
+
+    def put_control(self, actor):
+        """服务器内部事件（超时、离座）：不受序号与容量限制，立即唤醒"""
+        self.items.append((actor, None, None, time.perf_counter()))
+        self._release()
+
+    def _release(self):
+        self._wake = None
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self):
+        """等待并取出当前积压的全部行动（一批）"""
+        while not self.items:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        self.wakeups += 1
+        batch = list(self.items)
+        self.items.clear()
+        return batch
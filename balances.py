@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 筹码余额持久化
+玩家余额（累计输赢）与对局记录保存在 SQLite（WAL 模式）中。
+牌桌只把更新放进内存中的写回队列（同一玩家的更新先合并），由后台线程每隔 flush_interval 秒
+用一个事务批量写入，牌局从不等待磁盘；close() 写完队列中剩余的更新（进程正常退出时自动调用）
+
+表结构:
+  balances(player, chips, hands, updated)                        每个玩家一行，chips 为累计输赢
+  sessions(player, table_id, seat, joined, left, hands, net)     每次入座到离座一行
+"""
+
+import time
+import atexit
+import sqlite3
+import threading
+
+from backpressure import LatencyHistogram
+
+# 写回间隔（秒）
+FLUSH_INTERVAL = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS balances (
+    player  TEXT PRIMARY KEY,
+    chips   INTEGER NOT NULL DEFAULT 0,
+    hands   INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id       INTEGER PRIMARY KEY,
+    player   TEXT NOT NULL,
+    table_id INTEGER NOT NULL,
+    seat     INTEGER NOT NULL,
+    joined   REAL NOT NULL,
+    left     REAL NOT NULL,
+    hands    INTEGER NOT NULL,
+    net      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_player ON sessions(player);
+"""
+
+_UPSERT = ("INSERT INTO balances (player, chips, hands, updated) VALUES (?, ?, ?, ?) "
+           "ON CONFLICT(player) DO UPDATE SET chips = chips + excluded.chips, "
+           "hands = hands + excluded.hands, updated = excluded.updated")
+
+_INSERT_SESSION = ("INSERT INTO sessions (player, table_id, seat, joined, left, hands, net) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+def connect(path):
+    """打开数据库（WAL 模式，提交时不等待 fsync 到检查点）"""
+    conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class BalanceStore:
+    """余额与对局记录的写回队列；add/record_session 可在任意线程调用，不做磁盘操作"""
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.updates = 0          # 收到的余额更新数
+        self.rows_written = 0     # 写入的行数（合并之后）
+        self.commits = 0
+        self.errors = 0
+        self.commit_time = LatencyHistogram()
+        self._pending = {}        # 玩家 -> [输赢, 手数]
+        self._sessions = []
+        self._cond = threading.Condition()
+        self._requested = 0       # flush() 请求的批次号
+        self._done = 0            # 已写完的批次号
+        self._closed = False
+        self._reader = connect(path)
+        self._reader.executescript(_SCHEMA)
+        self._reader_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="balance-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, player, chips, hands=1):
+        """玩家输赢 chips（可为负），打了 hands 手"""
+        with self._cond:
+            entry = self._pending.get(player)
+            if entry is None:
+                self._pending[player] = [chips, hands]
+            else:
+                entry[0] += chips
+                entry[1] += hands
+            self.updates += 1
+
+    def record_session(self, player, table_id, seat, joined, left, hands, net):
+        """记录一次入座到离座（时间为 time.time() 秒）"""
+        with self._cond:
+            self._sessions.append((player, table_id, seat, joined, left, hands, net))
+
+    def balance(self, player):
+        """玩家当前余额（已写入的值加上队列中的更新），返回 (输赢, 手数)"""
+        with self._reader_lock:
+            row = self._reader.execute("SELECT chips, hands FROM balances WHERE player = ?",
+                                       (player,)).fetchone()
+        chips, hands = row or (0, 0)
+        with self._cond:
+            pending = self._pending.get(player)
+            if pending is not None:
+                chips, hands = chips + pending[0], hands + pending[1]
+        return chips, hands
+
+    def sessions(self, player):
+        """玩家已写入的对局记录 [(牌桌, 座位, 入座, 离座, 手数, 输赢)]，按入座时间排序"""
+        with self._reader_lock:
+            return self._reader.execute(
+                "SELECT table_id, seat, joined, left, hands, net FROM sessions WHERE player = ? ORDER BY joined",
+                (player,)).fetchall()
+
+    @property
+    def pending(self):
+        """队列中尚未写入的行数"""
+        with self._cond:
+            return len(self._pending) + len(self._sessions)
+
+    def flush(self):
+        """立即写入队列中的全部更新并等待完成"""
+        with self._cond:
+            if self._closed:
+                return
+            self._requested += 1
+            target = self._requested
+            self._cond.notify()
+            self._cond.wait_for(lambda: self._done >= target or self._closed)
+
+    def close(self):
+        """写完剩余更新并停止后台线程（可重复调用）"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        atexit.unregister(self.close)
+        self._reader.close()
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closed or self._requested > self._done,
+                                        timeout=self.flush_interval)
+                    closed, target = self._closed, self._requested
+                    pending, self._pending = self._pending, {}
+                    sessions, self._sessions = self._sessions, []
+                if pending or sessions:
+                    self._write(conn, pending, sessions)
+                with self._cond:
+                    self._done = target
+                    self._cond.notify_all()
+                if closed:
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn, pending, sessions):
+        """一个事务写入一批；失败时放回队列，下次重试"""
+        start = time.perf_counter()
+        now = time.time()
+        try:
+            with conn:
+                conn.executemany(_UPSERT, [(player, chips, hands, now)
+                                           for player, (chips, hands) in pending.items()])
+                conn.executemany(_INSERT_SESSION, sessions)
+        except sqlite3.Error:
+            self.errors += 1
+            with self._cond:
+                for player, (chips, hands) in pending.items():
+                    entry = self._pending.setdefault(player, [0, 0])
+                    entry[0] += chips
+                    entry[1] += hands
+                self._sessions[:0] = sessions
+            if not self._closed:
+                time.sleep(self.flush_interval)
+            return
+        self.commits += 1
+        self.rows_written += len(pending) + len(sessions)
+        self.commit_time.record(time.perf_counter() - start)
@@ -0,0 +1,755 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 性能基准脚本
+测量AI与离线工具中热点模块的吞吐量和内存占用
+
+用法: python3 benchmark.py [项目名 ...]
+"""
+
+import sys
+import os
+import time
+import random
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rate(count, seconds):
+    """格式化吞吐量"""
+    return f"{count / seconds:,.0f} 次/秒" if seconds > 0 else "N/A"
+
+
+def bench_hand_indexer(samples=200000, batch=1000000):
+    """手牌同构索引器：逐个与批量（NumPy）索引/还原速度、各街表大小"""
+    import numpy as np
+    from hand_indexer import STREET_ROUNDS, get_street_indexer
+
+    print("\n📊 手牌同构索引器")
+    print("-" * 50)
+
+    for street, rounds in STREET_ROUNDS.items():
+        start = time.perf_counter()
+        indexer = get_street_indexer(street)
+        build_time = time.perf_counter() - start
+
+        hands = [random.sample(range(52), indexer.total_cards) for _ in range(samples)]
+        index = indexer.index
+        start = time.perf_counter()
+        indices = [index(cards) for cards in hands]
+        index_time = time.perf_counter() - start
+
+        unindex = indexer.unindex
+        sample_indices = indices[:samples // 10]
+        start = time.perf_counter()
+        for i in sample_indices:
+            unindex(i)
+        unindex_time = time.perf_counter() - start
+
+        # 每个条目1字节（分桶编号）时的表大小
+        table_mb = indexer.size / (1024 * 1024)
+        print(f"  {street:8s} 条目 {indexer.size:>12,}  表大小 {table_mb:8.1f} MB  "
+              f"构建 {build_time * 1000:6.1f} ms")
+        print(f"           索引 {_rate(samples, index_time)}  "
+              f"还原 {_rate(len(sample_indices), unindex_time)}")
+
+        rng = np.random.default_rng(0)
+        cards = np.ascontiguousarray(np.argsort(rng.random((batch, 52)), axis=1)[:, :indexer.total_cards])
+        indexer.index_batch(cards[:1])   # 首次调用构建查找表
+        start = time.perf_counter()
+        batch_indices = indexer.index_batch(cards)
+        index_time = time.perf_counter() - start
+        start = time.perf_counter()
+        indexer.unindex_batch(batch_indices)
+        unindex_time = time.perf_counter() - start
+        print(f"      批量 索引 {_rate(batch, index_time)}  还原 {_rate(batch, unindex_time)}")
+
+
+def bench_hand_evaluator(samples=200000):
+    """牌型评估器与期望牌力特征计算速度"""
+    from hand_evaluator import evaluate
+    from hand_buckets import hand_features
+
+    print("\n📊 牌型评估器")
+    print("-" * 50)
+
+    hands = [random.sample(range(52), 7) for _ in range(samples)]
+    start = time.perf_counter()
+    for cards in hands:
+        evaluate(cards)
+    print(f"  七张牌评估 {_rate(samples, time.perf_counter() - start)}")
+
+    rng = random.Random(0)
+    situations = [random.sample(range(52), 5) for _ in range(200)]
+    start = time.perf_counter()
+    for cards in situations:
+        hand_features(cards[:2], cards[2:], 200, rng)
+    print(f"  翻牌特征(200样本) {_rate(len(situations), time.perf_counter() - start)}")
+
+
+def bench_exploitability():
+    """单挑分桶抽象牌局上最佳应对的计算时间"""
+    from exploitability import HeuristicPolicy, best_response_values, heads_up_config
+
+    print("\n📊 可被利用度评估")
+    print("-" * 50)
+
+    for buckets in (8, 16):
+        config = heads_up_config(num_buckets=buckets)
+        start = time.perf_counter()
+        values = best_response_values(config, HeuristicPolicy())
+        elapsed = time.perf_counter() - start
+        print(f"  启发式AI {buckets:2d} 分桶  {sum(values) / 2 * 1000:9.1f} 毫盲/手  "
+              f"用时 {elapsed:.2f} 秒")
+
+
+def bench_mcts():
+    """树搜索AI：各难度预算下的模拟速度"""
+    from mcts_ai import MCTSSearch, MCTS_BUDGETS, build_root_state
+
+    print("\n📊 蒙特卡洛树搜索")
+    print("-" * 50)
+
+    for difficulty, budget in MCTS_BUDGETS.items():
+        root = build_root_state(
+            "preflop", [5000, 7900, 5800, 7000, 10000], [0, 100, 200, 0, 0],
+            [0, 100, 200, 0, 0], [False] * 5, [False] * 5, 200, 3, [""], 100, 200,
+        )
+        hole = random.sample(range(52), 2)
+        search = MCTSSearch(root, hole, [])
+        start = time.perf_counter()
+        search.run(start + budget)
+        overrun = time.perf_counter() - start - budget
+        print(f"  难度{difficulty} 预算 {budget:.2f} 秒  模拟 {search.playouts:>7,} 次  "
+              f"{search.playouts_per_second():,.0f} 次/秒  超时 {overrun * 1000:.2f} ms")
+
+
+def bench_push_fold(boards=20):
+    """推/弃图表：胜率矩阵计算速度与运行时查表速度"""
+    from push_fold import _equity_worker, get_push_fold_chart, preflop_push_fold
+
+    print("\n📊 推/弃图表")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    _equity_worker((boards, 0))
+    print(f"  胜率矩阵（单进程，按公共牌组计） {_rate(boards, time.perf_counter() - start)}")
+
+    chart = get_push_fold_chart()
+    if chart is None:
+        print("  未找到 assets/tables/push_fold.bin，跳过查表测试")
+        return
+    stacks = [5000, 800, 600, 700, 10000]
+    holes = [random.sample(range(52), 2) for _ in range(20000)]
+    start = time.perf_counter()
+    for hole in holes:
+        preflop_push_fold(chart, stacks, 3, hole, "", 200)
+    print(f"  查表 {_rate(len(holes), time.perf_counter() - start)}")
+
+
+def bench_vector_env(num_envs=1024, steps=200):
+    """向量化环境：批量随机对局的步数与手数吞吐"""
+    from vector_env import VectorPokerEnv
+
+    print("\n📊 向量化环境")
+    print("-" * 50)
+
+    env = VectorPokerEnv(num_envs, seed=0)
+    _, mask = env.reset()
+    hands = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, dones, info = env.step(env.sample_actions(mask))
+        mask = info["legal_mask"]
+        hands += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    print(f"  {num_envs} 桌并行，行动 {_rate(num_envs * steps, elapsed)}")
+    print(f"  完成牌局 {_rate(hands, elapsed)}")
+
+
+def bench_ai_policy(decisions=200000):
+    """启发式AI：逐个决策与批量决策的速度"""
+    import numpy as np
+    from ai_policy import heuristic_weights, choose_action, heuristic_weights_batch, choose_actions_batch
+
+    print("\n📊 启发式AI决策")
+    print("-" * 50)
+
+    rng = np.random.default_rng(0)
+    features = rng.random((4, decisions))
+    features[3] *= 4
+
+    start = time.perf_counter()
+    for strength, position, history, chips in features[:, :decisions // 10].T.tolist():
+        choose_action(heuristic_weights(strength, position, history, chips))
+    print(f"  逐个决策 {_rate(decisions // 10, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    choose_actions_batch(heuristic_weights_batch(*features), rng)
+    print(f"  批量决策 {_rate(decisions, time.perf_counter() - start)}")
+
+
+def bench_ai_service(total=4096, burst_sizes=(1, 16, 256)):
+    """AI决策服务：不同并发请求数下的吞吐与尾延迟"""
+    from ai_service import AIServiceClient
+    from ai_worker import DecisionRequest
+
+    print("\n📊 AI决策服务")
+    print("-" * 50)
+
+    client = AIServiceClient(timeout=5.0)
+    request = DecisionRequest(3, 5, [48, 49], [0, 13, 26], "flop", ["", ""], 0.6, 1.0, 0.2, 3.5)
+    try:
+        for burst in burst_sizes:
+            latencies = []
+            batches = client.stats.batches
+            start = time.perf_counter()
+            for _ in range(total // burst):
+                # 同时有 burst 张牌桌各提交一个请求
+                submitted = time.perf_counter()
+                pending = {client.submit(request) for _ in range(burst)}
+                while pending:
+                    for ticket in list(pending):
+                        if client.poll(ticket) is not None:
+                            pending.discard(ticket)
+                            latencies.append(time.perf_counter() - submitted)
+                    time.sleep(0.0005)
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            mean_batch = total / max(1, client.stats.batches - batches)
+            print(f"  并发 {burst:>4}：{_rate(total, elapsed)}，平均批大小 {mean_batch:.1f}，"
+                  f"p99 延迟 {p99:.1f} 毫秒")
+        print(f"  超时回退 {client.stats.timeouts} 次")
+    finally:
+        client.shutdown()
+
+
+def bench_game_server(tables=5000, seconds=10.0):
+    """多桌服务器：满速AI对局吞吐，以及按真实思考延迟托管大量牌桌时的事件循环延迟"""
+    import asyncio
+    from game_server import GameServer
+
+    print("\n📊 多桌游戏服务器")
+    print("-" * 50)
+
+    async def run(num_tables, think_delay, hand_pause, duration):
+        server = GameServer(num_tables, think_delay=think_delay, hand_pause=hand_pause, seed=0)
+        await server.start()
+        loop = asyncio.get_running_loop()
+        lags = []
+        start = time.perf_counter()
+        decisions, hands = server.decisions(), server.hands_played
+        while time.perf_counter() - start < duration:
+            tick = loop.time()
+            await asyncio.sleep(0.05)
+            lags.append(loop.time() - tick - 0.05)
+        elapsed = time.perf_counter() - start
+        result = ((server.decisions() - decisions) / elapsed, (server.hands_played - hands) / elapsed,
+                  sorted(lags)[int(len(lags) * 0.99)] * 1000)
+        await server.stop()
+        return result
+
+    decisions, hands, _ = asyncio.run(run(200, (0.0, 0.0), 0.0, 3.0))
+    print(f"  满速（无思考延迟）：{decisions:,.0f} 次行动/秒，{hands:,.0f} 手/秒")
+    decisions, hands, lag = asyncio.run(run(tables, (0.5, 1.5), 2.0, seconds))
+    print(f"  {tables} 桌（思考0.5-1.5秒）：{decisions:,.0f} 次行动/秒，{hands:,.0f} 手/秒，"
+          f"事件循环 p99 延迟 {lag:.1f} 毫秒")
+
+
+def bench_timer_wheel(count=200000):
+    """时间轮：定时器新增/取消/触发吞吐，与 asyncio.call_later 对比"""
+    import asyncio
+    import random
+    from timer_wheel import TimerWheel
+
+    print("\n📊 分层时间轮")
+    print("-" * 50)
+
+    rng = random.Random(0)
+    delays = [rng.uniform(0.5, 30.0) for _ in range(count)]
+
+    wheel = TimerWheel(tick=0.01)
+    start = time.perf_counter()
+    timers = [wheel.schedule(delay, 0.0, _noop) for delay in delays]
+    for timer in timers[::2]:
+        wheel.cancel(timer)
+    wheel.advance(31.0)
+    elapsed = time.perf_counter() - start
+    print(f"  时间轮：{_rate(count, elapsed)}（新增 + 一半取消 + 触发）")
+
+    async def run_asyncio():
+        loop = asyncio.get_running_loop()
+        begin = time.perf_counter()
+        handles = [loop.call_later(delay, _noop) for delay in delays]
+        for handle in handles[::2]:
+            handle.cancel()
+        elapsed = time.perf_counter() - begin
+        for handle in handles:
+            handle.cancel()
+        return elapsed
+
+    elapsed = asyncio.run(run_asyncio())
+    print(f"  asyncio.call_later：{_rate(count, elapsed)}（仅新增 + 一半取消，未计触发）")
+
+
+def bench_wire_protocol(hands=2000):
+    """二进制协议：每手牌发给一个客户端的字节数（对比JSON），状态帧编解码耗时"""
+    import json
+    import random
+    from game_server import encode_message
+    from table_engine import TableEngine
+    from wire_protocol import (
+        StateEncoder, StateDecoder, TableState, pack_message, unpack_message, split_frames, RESUME_WINDOW,
+    )
+
+    print("\n📊 紧凑二进制协议")
+    print("-" * 50)
+
+    engine = TableEngine(0, rng=random.Random(0))
+    rng = random.Random(1)
+    seat = 4
+    json_events = json_states = binary = 0
+    states = []
+    for _ in range(hands):
+        events = engine.start_hand()
+        steps = [events]
+        states.append(TableState.from_engine(engine))
+        while engine.hand_active:
+            request = engine.decision_request()
+            action, raise_to = engine.resolve_bot_action(
+                rng.choice(["fold", "call", "call", "raise"]), request.hand_strength)
+            steps.append(engine.apply(action, raise_to))
+            states.append(TableState.from_engine(engine))
+        for step, state in zip(steps, states[-len(steps):]):
+            for event in step:
+                if event.get("to", seat) == seat:
+                    json_events += len(encode_message(event))
+                    if event["type"] == "hole":
+                        binary += len(pack_message(event))
+            full = {slot: getattr(state, slot) for slot in TableState.__slots__}
+            json_states += len(json.dumps(full, separators=(",", ":"))) + 1
+
+    encoder = StateEncoder(0)
+    start = time.perf_counter()
+    frames = [encoder.encode(state) for state in states]
+    encode_time = time.perf_counter() - start
+    binary += encoder.bytes_sent
+
+    messages = [unpack_message(payload) for payload in split_frames(b"".join(frames))[0]]
+    decoder = StateDecoder()
+    start = time.perf_counter()
+    for message in messages:
+        decoder.apply(message)
+    decode_time = time.perf_counter() - start
+
+    print(f"  每手牌字节数：JSON整桌状态 {json_states / hands:,.0f}，JSON事件 {json_events / hands:,.0f}，"
+          f"二进制差量 {binary / hands:,.0f}")
+    print(f"  状态帧：平均 {encoder.bytes_sent / len(frames):.1f} 字节，"
+          f"编码 {encode_time / len(frames) * 1e6:.1f} 微秒/帧，解码 {decode_time / len(frames) * 1e6:.1f} 微秒/帧")
+
+    # 断线重连：补发错过的帧 vs 重新发送关键帧
+    keyframe = len(encoder.current_keyframe())
+    costs = []
+    for missed in (1, 2, 4, RESUME_WINDOW):
+        costs.append(f"错过 {missed} 帧补发 {sum(len(data) for data in encoder.since(encoder.seq - missed))} 字节")
+    print(f"  断线重连：{'，'.join(costs)}；关键帧 {keyframe} 字节")
+
+
+def bench_fanout(updates=200):
+    """广播扇出：每次更新编码一次发给全部观战者，对比逐个连接编码"""
+    import asyncio
+    from fanout import Channel, Subscriber
+    from game_server import encode_message
+
+    print("\n📊 观战广播扇出")
+    print("-" * 50)
+
+    event = {"type": "action", "seat": 3, "action": "raise", "amount": 600, "bet": 600, "stack": 6400}
+
+    class NullWriter:
+        """丢弃数据的写端（不含套接字开销）"""
+
+        @property
+        def transport(self):
+            return self
+
+        def get_write_buffer_size(self):
+            return 0
+
+        def write(self, data):
+            pass
+
+        async def drain(self):
+            pass
+
+        def is_closing(self):
+            return False
+
+    async def run(spectators, encode_once):
+        channel = Channel()
+        subscribers = [Subscriber(NullWriter()) for _ in range(spectators)]
+        for subscriber in subscribers:
+            channel.add(subscriber)
+        start = time.perf_counter()
+        for _ in range(updates):
+            if encode_once:
+                channel.publish(encode_message(event))
+            else:
+                for subscriber in subscribers:
+                    subscriber.push(encode_message(event))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+        for subscriber in subscribers:
+            await subscriber.close()
+        return elapsed / updates
+
+    for spectators in (1, 100, 1000):
+        once = asyncio.run(run(spectators, True))
+        each = asyncio.run(run(spectators, False))
+        print(f"  {spectators:>5} 名观战者：编码一次 {once * 1e6:,.0f} 微秒/更新"
+              f"（{once / spectators * 1e6:.2f} 微秒/人），逐个编码 {each * 1e6:,.0f} 微秒/更新")
+
+
+def bench_backpressure(tables=500, players=20, flooders=5, seconds=5.0):
+    """入站背压：满载牌桌 + 刷屏连接下，真人行动从收到到执行的延迟分布"""
+    import asyncio
+    from game_server import GameServer, encode_message, decode_message
+
+    print("\n📊 服务器入站背压")
+    print("-" * 50)
+
+    async def player(port, table, flood):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_message({"type": "join", "table": table}))
+        try:
+            while True:
+                message = decode_message(await reader.readline())
+                if message["type"] == "turn":
+                    action = "call" if "call" in message["legal"] else message["legal"][0]
+                    click = encode_message({"type": "action", "action": action, "seq": message["seq"]})
+                    writer.write(click * (200 if flood else 1))
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    async def run():
+        server = GameServer(tables, think_delay=(0.05, 0.1), hand_pause=0.1, seed=0)
+        port = await server.start()
+        clients = [asyncio.create_task(player(port, i, i < flooders)) for i in range(players + flooders)]
+        await asyncio.sleep(seconds)
+        for client in clients:
+            client.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+        runners = list(server.tables.values())
+        histogram = server.action_latency()
+        dropped = sum(r.inbox.duplicates + r.inbox.stale + r.inbox.overflow for r in runners)
+        hands, throttled = server.hands_played, server.throttled
+        await server.stop()
+        return histogram, dropped, throttled, hands
+
+    histogram, dropped, throttled, hands = asyncio.run(run())
+    print(f"  {tables} 桌，{players} 名真人 + {flooders} 个刷屏连接（每次点击200下），{seconds:.0f} 秒 {hands:,} 手")
+    print(f"  真人行动延迟（{histogram.count} 次）：p50 {histogram.percentile(50) * 1000:.1f} 毫秒，"
+          f"p99 {histogram.percentile(99) * 1000:.1f} 毫秒，最大 {histogram.max * 1000:.1f} 毫秒；"
+          f"限速丢弃 {throttled:,} 条，丢弃过期/重复行动 {dropped:,} 条")
+
+
+def bench_shard_server(tables=400, seconds=4.0, worker_counts=(1, 2, 4)):
+    """分片服务器：满速AI对局在不同工作进程数下的吞吐（受本机CPU核数限制）"""
+    import asyncio
+    from shard_server import ShardRouter, STATS_INTERVAL
+
+    print("\n📊 多进程分片服务器")
+    print("-" * 50)
+
+    async def run(num_workers):
+        router = ShardRouter(tables, num_workers, think_delay=(0.0, 0.0), hand_pause=0.0, seed=0)
+        await router.start()
+        await asyncio.sleep(STATS_INTERVAL * 2)
+        decisions, hands = router.decisions(), router.hands_played
+        await asyncio.sleep(seconds)
+        result = ((router.decisions() - decisions) / seconds, (router.hands_played - hands) / seconds)
+        await router.stop()
+        return result
+
+    print(f"  本机 {os.cpu_count()} 个CPU，{tables} 桌满速对局")
+    for num_workers in worker_counts:
+        decisions, hands = asyncio.run(run(num_workers))
+        print(f"  {num_workers} 个工作进程：{decisions:,.0f} 次行动/秒，{hands:,.0f} 手/秒")
+
+
+def bench_snapshots(tables=10000, rounds=5):
+    """崩溃安全快照：父进程切换记录段的暂停时间、压缩进程写快照耗时与恢复耗时"""
+    import asyncio
+    import shutil
+    import tempfile
+    from game_server import GameServer
+    from snapshots import recover, snapshot_path
+
+    print("\n📊 牌桌快照（后台压缩进程）")
+    print("-" * 50)
+
+    async def run(directory):
+        server = GameServer(tables, think_delay=(0.5, 1.5), hand_pause=2.0, seed=0,
+                            snapshot_dir=directory, snapshot_interval=3600.0)
+        await server.start()
+        snapshots = server.snapshots
+        writes = []
+        for _ in range(rounds):
+            await asyncio.sleep(1.0)
+            start = time.perf_counter()
+            snapshots.take()
+            while snapshots.pending is not None:
+                await asyncio.sleep(0.01)
+            writes.append(time.perf_counter() - start)
+        size = os.path.getsize(snapshot_path(directory, snapshots.latest))
+        hands = server.hands_played
+        await server.stop()
+        return snapshots.pauses, sorted(writes)[len(writes) // 2], size, hands
+
+    directory = tempfile.mkdtemp()
+    try:
+        pauses, write_time, size, hands = asyncio.run(run(directory))
+        start = time.perf_counter()
+        recover(directory)
+        recover_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"  {tables:,} 桌，期间 {hands:,} 手")
+    print(f"  父进程暂停：p50 {pauses.percentile(50) * 1000:.2f} 毫秒，最大 {pauses.max * 1000:.2f} 毫秒；"
+          f"压缩进程写快照 {write_time:.2f} 秒（{size / 1e6:.1f} MB），恢复 {recover_time:.2f} 秒")
+
+
+def bench_balances(tables=3000, seconds=8.0):
+    """余额持久化：写回队列的持续更新吞吐，以及托管大量牌桌时对事件循环的影响"""
+    import asyncio
+    import shutil
+    import tempfile
+    from balances import BalanceStore, connect, _SCHEMA, _UPSERT
+    from game_server import GameServer
+
+    print("\n📊 余额持久化（SQLite WAL 写回队列）")
+    print("-" * 50)
+
+    directory = tempfile.mkdtemp()
+    players = [f"{table}:{seat}" for table in range(tables) for seat in range(5)]
+    try:
+        # 对比：每次更新同步提交一个事务
+        conn = connect(os.path.join(directory, "sync.db"))
+        conn.executescript(_SCHEMA)
+        count = 2000
+        start = time.perf_counter()
+        for i in range(count):
+            with conn:
+                conn.execute(_UPSERT, (players[i], 1, 1, time.time()))
+        sync_rate = count / (time.perf_counter() - start)
+        conn.close()
+
+        # 写回队列：连续更新 seconds 秒（后台线程按间隔提交）
+        store = BalanceStore(os.path.join(directory, "queue.db"))
+        start = time.perf_counter()
+        i = 0
+        while time.perf_counter() - start < seconds:
+            for player in players[i % len(players):][:1000]:
+                store.add(player, 100)
+            i += 1000
+        store.close()
+        elapsed = time.perf_counter() - start
+
+        async def run(with_store):
+            server = GameServer(tables, think_delay=(0.2, 0.6), hand_pause=1.0, seed=0,
+                                balance_db=os.path.join(directory, "server.db") if with_store else None)
+            await server.start()
+            if with_store:
+                balances = server.balances
+
+                def record(runner):
+                    engine = runner.engine
+                    for seat in range(engine.num_seats):
+                        balances.add(f"{runner.table_id}:{seat}", engine.chips[seat] - engine.hand_start_chips[seat])
+
+                server.hand_listeners.append(record)
+            loop = asyncio.get_running_loop()
+            lags = []
+            started = time.perf_counter()
+            while time.perf_counter() - started < seconds:
+                tick = loop.time()
+                await asyncio.sleep(0.01)
+                lags.append(loop.time() - tick - 0.01)
+            updates = server.balances.updates if with_store else 0
+            updates /= time.perf_counter() - started
+            await server.stop()
+            return updates, sorted(lags)[int(len(lags) * 0.99)] * 1000
+
+        _, base_lag = asyncio.run(run(False))
+        server_rate, lag = asyncio.run(run(True))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"  每次更新同步提交：{sync_rate:,.0f} 次/秒")
+    print(f"  写回队列：{store.updates / elapsed:,.0f} 次更新/秒（{len(players):,} 名玩家），合并后 "
+          f"{store.rows_written:,} 行、{store.commits} 个事务，提交 p99 {store.commit_time.percentile(99) * 1000:.1f} 毫秒")
+    print(f"  {tables} 桌（每手更新全部座位）：{server_rate:,.0f} 次更新/秒，"
+          f"事件循环 p99 延迟 {lag:.1f} 毫秒（不记录余额时 {base_lag:.1f} 毫秒）")
+
+
+def bench_leaderboards(players=2000000, hands=100000):
+    """排行榜：百万级玩家下的增量聚合速度、前N名与名次查询耗时（对比每次全量排序）"""
+    import random
+    import shutil
+    import resource
+    import tempfile
+    from balances import connect
+    from leaderboard import LeaderboardAggregator, BOARDS, _SCHEMA, _UPSERT
+
+    print("\n📊 统计与排行榜（增量聚合 + 有序集合）")
+    print("-" * 50)
+
+    rng = random.Random(0)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "stats.db")
+        conn = connect(path)
+        conn.executescript(_SCHEMA)
+        with conn:
+            conn.executemany(_UPSERT, ((f"p{i}", hands_played, rng.randrange(hands_played + 1),
+                                        rng.randrange(-50000, 50000), rng.randrange(0, 20000))
+                                       for i, hands_played in ((i, rng.randrange(0, 500)) for i in range(players))))
+        conn.close()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        aggregator = LeaderboardAggregator(path)
+        load_time = time.perf_counter() - start
+        memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024
+
+        # 牌局结束时的入队耗时与批量聚合吞吐（每手6名玩家）
+        results = [[(f"p{rng.randrange(players)}", rng.randrange(-2000, 2000), rng.choice((0, 0, 0, 1500)))
+                    for _ in range(6)] for _ in range(hands)]
+        start = time.perf_counter()
+        for result in results:
+            aggregator.submit(result)
+        submit_time = (time.perf_counter() - start) / hands
+        start = time.perf_counter()
+        aggregated = aggregator.drain()
+        drain_rate = aggregated / (time.perf_counter() - start)
+
+        names = [f"p{rng.randrange(players)}" for _ in range(10000)]
+        timings = {}
+        for board in BOARDS:
+            start = time.perf_counter()
+            for _ in range(1000):
+                aggregator.top(board, 10, start=rng.randrange(1000))
+            top_time = (time.perf_counter() - start) / 1000
+            start = time.perf_counter()
+            for name in names:
+                aggregator.rank(board, name)
+            timings[board] = (top_time, (time.perf_counter() - start) / len(names))
+
+        # 对比：每次查询对全部玩家重新排序
+        start = time.perf_counter()
+        sorted(range(players), key=lambda i: aggregator.stats[i][2], reverse=True)[:10]
+        full_sort = time.perf_counter() - start
+        aggregator.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"  {players:,} 名玩家：载入并建立 {len(BOARDS)} 个排行榜 {load_time:.1f} 秒（约 {memory:,.0f} MB）")
+    print(f"  牌局结束入队：{submit_time * 1e6:.2f} 微秒/手；批量聚合：{drain_rate:,.0f} 条结果/秒")
+    for board, (top_time, rank_time) in timings.items():
+        print(f"  {board:<13} 前10名 {top_time * 1e6:.1f} 微秒，玩家名次 {rank_time * 1e6:.1f} 微秒")
+    print(f"  对比：全量排序一次 {full_sort * 1000:.0f} 毫秒")
+
+
+def bench_hand_analytics(tables=200, hands=20000):
+    """牌局记录批量统计：单进程与进程池的处理速度，外推到一千万手"""
+    import random
+    import shutil
+    import tempfile
+    from hand_analytics import analyze
+    from hand_history import HandHistoryWriter
+    from snapshots import history_path
+    from table_engine import TableEngine
+
+    print("\n📊 牌局记录批量统计（分块 map-reduce）")
+    print("-" * 50)
+
+    rng = random.Random(0)
+    directory = tempfile.mkdtemp()
+    try:
+        engines = [TableEngine(t, rng=random.Random(t)) for t in range(tables)]
+        writer = HandHistoryWriter(history_path(directory, 1))
+        played = 0
+        while played < hands:
+            engine = rng.choice(engines)
+            if not engine.hand_active:
+                engine.start_hand()
+                writer.hand(engine)
+                continue
+            events = engine.apply(*engine.resolve_bot_action(rng.choice(["fold", "call", "call", "raise"]),
+                                                             rng.random()))
+            writer.action(engine.table_id, events[0])
+            played += events[-1]["type"] == "hand_end"
+            if writer.records % 10000 == 0:
+                writer.flush()
+        writer.close()
+        size = os.path.getsize(writer.path)
+
+        chunk_size = size // 16 + 1
+        results = []
+        for processes in (1, None):
+            start = time.perf_counter()
+            stats = analyze([directory], processes=processes, chunk_size=chunk_size)
+            results.append(stats.hands / (time.perf_counter() - start))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"  归档 {stats.hands:,} 手，{size / 1e6:.1f} MB（{size / stats.hands:.0f} 字节/手），16 个分块")
+    print(f"  本进程内：{results[0]:,.0f} 手/秒；进程池（{os.cpu_count()} 个进程）：{results[1]:,.0f} 手/秒")
+    print(f"  外推：一千万手在 8 核上约 {10_000_000 / (results[0] * 8) / 60:.1f} 分钟（按单进程速度线性扩展）")
+
+
+def _noop():
+    pass
+
+
+BENCHMARKS = {
+    "hand_indexer": bench_hand_indexer,
+    "hand_evaluator": bench_hand_evaluator,
+    "exploitability": bench_exploitability,
+    "mcts": bench_mcts,
+    "push_fold": bench_push_fold,
+    "vector_env": bench_vector_env,
+    "ai_policy": bench_ai_policy,
+    "ai_service": bench_ai_service,
+    "game_server": bench_game_server,
+    "timer_wheel": bench_timer_wheel,
+    "wire_protocol": bench_wire_protocol,
+    "fanout": bench_fanout,
+    "backpressure": bench_backpressure,
+    "shard_server": bench_shard_server,
+    "snapshots": bench_snapshots,
+    "balances": bench_balances,
+    "leaderboards": bench_leaderboards,
+    "hand_analytics": bench_hand_analytics,
+}
+
+
+def main():
+    """主函数"""
+    print("德州扑克3 - 性能基准")
+    print("=" * 50)
+
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ 未知基准: {name}（可选: {', '.join(BENCHMARKS)}）")
+            return False
+        BENCHMARKS[name]()
+
+    print("\n" + "=" * 50)
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
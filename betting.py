@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 合法行动生成
+由紧凑的下注状态（筹码、本街已下注、当前注、最小加注增量）计算合法行动位掩码
+与无限注加注区间 [最小加注到, 最大加注到]
+
+计算不含分支，参数既可以是整数也可以是同形状的 NumPy 数组，
+游戏、批量AI与模拟循环共用同一套规则，按位与即可校验行动，无需异常处理
+
+无限注规则：
+  最小加注到 = 当前注 + max(上一次加注的增量, 大盲)
+  最大加注到 = 本街已下注 + 剩余筹码（即全下）
+  不足最小加注的全下仍然合法，但不改变最小加注增量
+"""
+
+from cfr_solver import ACTIONS, FOLD, CHECK, CALL, RAISE, ALL_IN
+
+# 行动位（顺序同 cfr_solver.ACTIONS）
+FOLD_BIT = 1 << FOLD
+CHECK_BIT = 1 << CHECK
+CALL_BIT = 1 << CALL
+RAISE_BIT = 1 << RAISE
+ALL_IN_BIT = 1 << ALL_IN
+ACTION_BITS = {name: 1 << i for i, name in enumerate(ACTIONS)}
+
+
+def min_raise_to(current_bet, min_raise, big_blind):
+    """最小加注到的金额（min_raise 为上一次完整加注的增量）"""
+    # max(min_raise, big_blind) 的无分支写法，标量与数组通用
+    short = min_raise < big_blind
+    return current_bet + min_raise + (big_blind - min_raise) * short
+
+
+def action_mask(stack, street_bet, current_bet, raise_floor):
+    """合法行动位掩码；raise_floor 为“加注”至少要加注到的金额
+
+    剩余筹码恰好够到 raise_floor 时只能全下，不再单列加注。
+    """
+    to_call = current_bet - street_bet
+    facing = to_call > 0
+    return (facing * FOLD_BIT
+            | (to_call <= 0) * CHECK_BIT
+            | (facing & (stack > to_call)) * CALL_BIT
+            | (raise_floor - street_bet < stack) * RAISE_BIT
+            | (stack > 0) * ALL_IN_BIT)
+
+
+def legal_actions(stack, street_bet, current_bet, min_raise, big_blind):
+    """返回 (位掩码, 最小加注到, 最大加注到)"""
+    floor = min_raise_to(current_bet, min_raise, big_blind)
+    return action_mask(stack, street_bet, current_bet, floor), floor, street_bet + stack
+
+
+def is_legal(mask, action):
+    """行动名称是否在位掩码中"""
+    return bool(mask & ACTION_BITS[action])
+
+
+def action_names(mask):
+    """位掩码对应的行动名称列表"""
+    return [name for name in ACTIONS if mask & ACTION_BITS[name]]
+
+
+def clamp_raise(raise_to, floor, ceiling):
+    """把目标加注额收进 [floor, ceiling] 并取整；达到上限即为全下"""
+    return int(min(max(int(round(raise_to)), floor), ceiling))
+
+
+def next_min_raise(current_bet, new_bet, min_raise):
+    """下注到 new_bet 之后的最小加注增量（不足一次完整加注的全下不改变增量）"""
+    increment = new_bet - current_bet
+    return increment if increment >= min_raise else min_raise
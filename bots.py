@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 插件AI接口
+任意座位都可以换上实现 Bot 接口的AI：输入决策快照（ai_worker.DecisionRequest），
+输出行动名称（取自 cfr_solver.ACTIONS）。ProcessBot 把AI放进独立的工作进程，
+每次决策有硬性截止时间，超时或崩溃时返回默认行动并重启进程，牌桌不会被拖住
+
+插件用 "模块:类名" 指定，例如:
+  game.set_seat_bot(2, create_bot("my_bots:TightBot"))
+  game.set_seat_bot(3, ProcessBot("my_bots:SlowBot", timeout=0.5))
+"""
+
+import random
+import threading
+import importlib
+import multiprocessing
+
+from ai_worker import decide, decide_batch
+from betting import ACTION_BITS, CHECK_BIT, CALL_BIT, action_names
+from cfr_solver import ACTIONS
+
+# 工作进程每次决策的默认截止时间（秒）
+DEFAULT_TIMEOUT = 1.0
+
+# 等待工作进程启动（导入并创建AI）的最长时间（秒），不计入决策的截止时间
+STARTUP_TIMEOUT = 30.0
+
+
+def default_action(request):
+    """超时或出错时的默认行动：能过牌则过牌，否则弃牌"""
+    if request.legal_mask is None or request.legal_mask & CHECK_BIT:
+        return "check"
+    return "fold"
+
+
+def checked_action(request, action):
+    """插件AI返回非法或未知行动时改为默认行动"""
+    if action not in ACTION_BITS:
+        return default_action(request)
+    if request.legal_mask is not None and not request.legal_mask & ACTION_BITS[action]:
+        return default_action(request)
+    return action
+
+
+class Bot:
+    """插件AI基类"""
+
+    name = "bot"
+
+    def decide(self, request):
+        """单个决策，返回行动名称"""
+        raise NotImplementedError
+
+    def decide_batch(self, requests):
+        """批量决策（默认逐个调用 decide，可覆盖为向量化实现）"""
+        return [self.decide(request) for request in requests]
+
+    def decision(self, request):
+        """供 AIWorker 调用：返回与 ai_worker.decide 相同的 (行动, None)"""
+        return checked_action(request, self.decide(request)), None
+
+    def close(self):
+        """释放资源"""
+
+
+class HeuristicBot(Bot):
+    """游戏内置AI（推/弃图表、策略表、启发式）"""
+
+    name = "heuristic"
+
+    def decide(self, request):
+        return decide(request)[0]
+
+    def decide_batch(self, requests):
+        return decide_batch(requests)
+
+
+class RandomBot(Bot):
+    """在合法行动中均匀随机"""
+
+    name = "random"
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def decide(self, request):
+        legal = action_names(request.legal_mask) if request.legal_mask is not None else ACTIONS
+        return self.rng.choice(legal)
+
+
+class CallingStationBot(Bot):
+    """只跟注或过牌"""
+
+    name = "calling_station"
+
+    def decide(self, request):
+        if request.legal_mask is not None and request.legal_mask & CALL_BIT:
+            return "call"
+        return "check" if request.legal_mask is None or request.legal_mask & CHECK_BIT else "all_in"
+
+
+BOT_TYPES = {cls.name: cls for cls in (HeuristicBot, RandomBot, CallingStationBot)}
+
+
+def create_bot(spec, **kwargs):
+    """按名称（见 BOT_TYPES）或 "模块:类名" 创建AI"""
+    if spec in BOT_TYPES:
+        return BOT_TYPES[spec](**kwargs)
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"未知的AI: {spec}（可选: {', '.join(BOT_TYPES)}，或 模块:类名）")
+    return getattr(importlib.import_module(module_name), class_name)(**kwargs)
+
+
+# ==============================================
+# 工作进程隔离
+# ==============================================
+
+def _bot_worker(conn, spec, kwargs):
+    """工作进程：创建AI后回传就绪，之后按批接收请求并回传行动；AI抛出异常时回传None"""
+    bot = create_bot(spec, **kwargs)
+    conn.send("ready")
+    while True:
+        try:
+            requests = conn.recv()
+        except EOFError:
+            break
+        if requests is None:
+            break
+        try:
+            actions = list(bot.decide_batch(requests))
+        except Exception as e:
+            print(f"AI {spec} 出错: {e}")
+            actions = None
+        conn.send(actions)
+    bot.close()
+
+
+class ProcessBot(Bot):
+    """在独立工作进程中运行的AI，每次调用有截止时间
+
+    spec/kwargs 同 create_bot（必须能在新进程中导入）。工作进程在创建时启动，
+    超时时终止并立即在后台重新启动；本次调用的全部请求返回默认行动。
+    截止时间只计算发出请求到收到回复，进程启动的时间不计入。
+    """
+
+    def __init__(self, spec, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.spec = spec
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.name = f"process:{spec}"
+        self.timeouts = 0
+        self.errors = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        """启动工作进程（不等待就绪）"""
+        self._conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(target=_bot_worker, args=(child_conn, self.spec, self.kwargs),
+                                              name=f"bot-{self.spec}", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._ready = False
+
+    def _wait_ready(self):
+        """等待工作进程完成启动；超时抛出 TimeoutError，进程启动失败抛出 EOFError"""
+        if self._ready:
+            return
+        if not self._conn.poll(STARTUP_TIMEOUT):
+            raise TimeoutError(f"AI {self.spec} 启动超时")
+        self._conn.recv()
+        self._ready = True
+
+    def _restart(self):
+        """终止工作进程并在后台启动新的进程"""
+        self._stop()
+        self._start()
+
+    def _stop(self):
+        """强制终止工作进程"""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def decide(self, request):
+        return self.decide_batch([request])[0]
+
+    def decide_batch(self, requests, timeout=None):
+        """一批请求共用一个截止时间（默认 self.timeout）"""
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._restart()
+            actions = None
+            try:
+                self._wait_ready()
+                self._conn.send(list(requests))
+                if self._conn.poll(self.timeout if timeout is None else timeout):
+                    actions = self._conn.recv()
+                    if actions is None or len(actions) != len(requests):
+                        self.errors += 1
+                        actions = None
+                else:
+                    self.timeouts += 1
+                    self._restart()
+            except (OSError, EOFError):
+                self.errors += 1
+                self._restart()
+
+        if actions is None:
+            return [default_action(request) for request in requests]
+        return [checked_action(request, action) for request, action in zip(requests, actions)]
+
+    def close(self):
+        """结束工作进程"""
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                try:
+                    self._conn.send(None)
+                    self._process.join(timeout=1.0)
+                except (OSError, EOFError):
+                    pass
+            self._stop()
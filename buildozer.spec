@@ -58,7 +58,7 @@ icon.filename = %(source.dir)s/assets/icon.png
 presplash.filename = %(source.dir)s/assets/splash.png
 
 # 资源文件配置
-source.include_exts = py,png,jpg,jpeg,kv,atlas,ttf,otf,json
+source.include_exts = py,png,jpg,jpeg,kv,atlas,ttf,otf,json,bin
 source.include_patterns = assets/*,images/*,data/*
 
 # 应用版本
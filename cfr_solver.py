@@ -0,0 +1,755 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 离线CFR策略求解器
+在抽象化的牌局上（默认与游戏一致：5人桌、100/200盲注、
+弃牌/过牌/跟注/加注/全下）运行外部采样蒙特卡洛CFR，
+支持多进程训练与定期存档，并导出量化的平均策略表，
+游戏内AI通过mmap加载后每次决策只需一次查表
+
+用法:
+  python3 cfr_solver.py train --iterations 100000 --processes 8
+  python3 cfr_solver.py subgame --iterations 20000
+"""
+
+import os
+import sys
+import mmap
+import time
+import pickle
+import random
+import struct
+import hashlib
+import argparse
+import multiprocessing
+
+from hand_indexer import DECK_SIZE
+from hand_evaluator import evaluate
+from hand_buckets import TABLE_DIR, card_strength
+
+# ==============================================
+# 抽象牌局定义
+# ==============================================
+
+ACTIONS = ["fold", "check", "call", "raise", "all_in"]
+ACTION_CODES = "FKCRA"
+FOLD, CHECK, CALL, RAISE, ALL_IN = range(len(ACTIONS))
+NUM_ACTIONS = len(ACTIONS)
+
+STREET_NAMES = ("preflop", "flop", "turn", "river")
+BOARD_CARDS = (0, 3, 4, 5)
+
+# 与 TexasHoldemGame._create_players 的座位和初始筹码一致（第5位是人类玩家）
+DEFAULT_STACKS = (5000, 8000, 6000, 7000, 10000)
+
+
+class AbstractGameConfig:
+    """抽象牌局配置
+
+    chance_model 为 "cards" 时真实发牌、按牌力分桶、用牌型评估器摊牌；
+    为 "buckets" 时每位玩家直接抽取一个贯穿整手牌的分桶，分桶大者胜，
+    用于可以精确计算可被利用度的小型子博弈。
+    """
+
+    def __init__(self, num_seats=5, stacks=None, small_blind=100, big_blind=200,
+                 num_buckets=8, raise_cap=2, streets=STREET_NAMES, chance_model="cards"):
+        if stacks is None:
+            stacks = DEFAULT_STACKS[:num_seats]
+        if len(stacks) != num_seats:
+            raise ValueError(f"筹码数量与座位数不一致: {len(stacks)} != {num_seats}")
+        if chance_model not in ("cards", "buckets"):
+            raise ValueError(f"未知的发牌模型: {chance_model}")
+
+        self.num_seats = num_seats
+        self.stacks = tuple(stacks)
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.num_buckets = num_buckets
+        self.raise_cap = raise_cap
+        self.streets = tuple(streets)
+        self.chance_model = chance_model
+
+    def to_dict(self):
+        """用于存档的字典"""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        """从存档字典还原"""
+        return cls(**data)
+
+
+def subgame_config(num_buckets=5, stack_bb=10, raise_cap=2):
+    """单挑、单街、分桶发牌的小型子博弈，用于精确计算可被利用度"""
+    return AbstractGameConfig(
+        num_seats=2, stacks=(stack_bb * 200, stack_bb * 200), num_buckets=num_buckets,
+        raise_cap=raise_cap, streets=("preflop",), chance_model="buckets",
+    )
+
+
+def strength_to_bucket(strength, num_buckets):
+    """把 0-1 牌力映射为分桶编号"""
+    return min(num_buckets - 1, max(0, int(strength * num_buckets)))
+
+
+def infoset_key(seat, street, bucket, history):
+    """信息集键：座位、街道、分桶与按街道分隔的行动历史
+
+    history 为每条街一个字符串（字符取自 ACTION_CODES），游戏内AI按相同格式构造。
+    """
+    return f"{seat}:{street}:{bucket}:{'/'.join(history)}"
+
+
+class CardDeal:
+    """真实发牌：按需计算并缓存各街分桶与摊牌分值"""
+
+    def __init__(self, config, rng):
+        self.config = config
+        deck = list(range(DECK_SIZE))
+        rng.shuffle(deck)
+        seats = config.num_seats
+        self.holes = [deck[2 * i:2 * i + 2] for i in range(seats)]
+        self.board = deck[2 * seats:2 * seats + 5]
+        self._buckets = {}
+        self._scores = None
+
+    def bucket(self, seat, street):
+        """某位玩家在某条街的分桶"""
+        key = (seat, street)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            board = self.board[:BOARD_CARDS[STREET_NAMES.index(self.config.streets[street])]]
+            strength = card_strength(self.holes[seat], board)
+            bucket = strength_to_bucket(strength, self.config.num_buckets)
+            self._buckets[key] = bucket
+        return bucket
+
+    def showdown_strengths(self):
+        """各位玩家的摊牌分值"""
+        if self._scores is None:
+            self._scores = [evaluate(hole + self.board) for hole in self.holes]
+        return self._scores
+
+
+class BucketDeal:
+    """分桶发牌：每位玩家一个贯穿整手牌的分桶"""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+
+    def bucket(self, seat, street):
+        """分桶与街道无关"""
+        return self.buckets[seat]
+
+    def showdown_strengths(self):
+        """分桶越大牌越大"""
+        return self.buckets
+
+
+def make_deal(config, rng):
+    """按配置的发牌模型发一手牌"""
+    if config.chance_model == "cards":
+        return CardDeal(config, rng)
+    return BucketDeal(rng.randrange(config.num_buckets) for _ in range(config.num_seats))
+
+
+class AbstractState:
+    """抽象牌局状态（通过 child() 复制后推进，原状态不变）
+
+    规则与 TexasHoldemGame 一致：按钮固定在0号位，其后依次为小盲、大盲；
+    翻牌前从大盲下家开始行动，翻牌后从序号最小的未弃牌玩家开始；
+    加注到 max(当前注*2, 大盲*2)。
+    """
+
+    __slots__ = ("config", "deal", "street", "stacks", "contributed", "street_bets",
+                 "folded", "all_in", "acted", "current_bet", "raises", "to_act",
+                 "history", "terminal")
+
+    @classmethod
+    def initial(cls, config, deal):
+        """开始一手牌并下盲注"""
+        state = cls()
+        n = config.num_seats
+        state.config = config
+        state.deal = deal
+        state.street = 0
+        state.stacks = list(config.stacks)
+        state.contributed = [0] * n
+        state.street_bets = [0] * n
+        state.folded = [False] * n
+        state.all_in = [False] * n
+        state.acted = [False] * n
+        state.raises = 0
+        state.history = [""]
+        state.terminal = False
+
+        small_blind_seat = 1 % n
+        big_blind_seat = (small_blind_seat + 1) % n
+        state._put(small_blind_seat, config.small_blind)
+        state._put(big_blind_seat, config.big_blind)
+        state.current_bet = config.big_blind
+
+        state.to_act = big_blind_seat
+        state._advance(big_blind_seat)
+        return state
+
+    def copy(self):
+        """浅层复制（列表逐个复制，发牌对象共享）"""
+        state = AbstractState()
+        state.config = self.config
+        state.deal = self.deal
+        state.street = self.street
+        state.stacks = self.stacks[:]
+        state.contributed = self.contributed[:]
+        state.street_bets = self.street_bets[:]
+        state.folded = self.folded[:]
+        state.all_in = self.all_in[:]
+        state.acted = self.acted[:]
+        state.current_bet = self.current_bet
+        state.raises = self.raises
+        state.to_act = self.to_act
+        state.history = self.history[:]
+        state.terminal = self.terminal
+        return state
+
+    def legal_actions(self):
+        """当前行动玩家的合法行动编号"""
+        p = self.to_act
+        to_call = self.current_bet - self.street_bets[p]
+        stack = self.stacks[p]
+        actions = []
+        if to_call > 0:
+            actions.append(FOLD)
+            if stack > to_call:
+                actions.append(CALL)
+        else:
+            actions.append(CHECK)
+        if self.raises < self.config.raise_cap:
+            raise_to = max(self.current_bet * 2, self.config.big_blind * 2)
+            if raise_to - self.street_bets[p] < stack:
+                actions.append(RAISE)
+        if stack > 0:
+            actions.append(ALL_IN)
+        return actions
+
+    def infoset_key(self, seat=None, bucket=None):
+        """某位玩家（默认当前行动者）的信息集键，可指定分桶"""
+        if seat is None:
+            seat = self.to_act
+        if bucket is None:
+            bucket = self.deal.bucket(seat, self.street)
+        return infoset_key(seat, self.config.streets[self.street], bucket, self.history)
+
+    def child(self, action):
+        """执行行动后的新状态"""
+        state = self.copy()
+        state._apply(action)
+        return state
+
+    def _put(self, seat, amount):
+        """下注（不足时全下）"""
+        amount = min(amount, self.stacks[seat])
+        self.stacks[seat] -= amount
+        self.street_bets[seat] += amount
+        self.contributed[seat] += amount
+        if self.stacks[seat] == 0:
+            self.all_in[seat] = True
+
+    def _apply(self, action):
+        p = self.to_act
+        if action == FOLD:
+            self.folded[p] = True
+        elif action == CALL:
+            self._put(p, self.current_bet - self.street_bets[p])
+        elif action == RAISE or action == ALL_IN:
+            if action == RAISE:
+                raise_to = max(self.current_bet * 2, self.config.big_blind * 2)
+                self._put(p, raise_to - self.street_bets[p])
+            else:
+                self._put(p, self.stacks[p])
+            if self.street_bets[p] > self.current_bet:
+                self.current_bet = self.street_bets[p]
+                self.raises += 1
+                self.acted = [False] * self.config.num_seats
+        self.acted[p] = True
+        self.history[-1] += ACTION_CODES[action]
+        self._advance(p)
+
+    def _advance(self, last):
+        """轮到下一位玩家，或进入下一街/结束"""
+        n = self.config.num_seats
+        live = [i for i in range(n) if not self.folded[i]]
+        if len(live) == 1:
+            self.terminal = True
+            return
+
+        actors = [i for i in live if not self.all_in[i]]
+        for k in range(1, n + 1):
+            i = (last + k) % n
+            if i in actors and (not self.acted[i] or self.street_bets[i] < self.current_bet):
+                self.to_act = i
+                return
+
+        # 下注轮结束；不足两人可行动时直接发完公共牌摊牌
+        if len(actors) <= 1 or self.street == len(self.config.streets) - 1:
+            self.terminal = True
+            return
+
+        self.street += 1
+        self.street_bets = [0] * n
+        self.acted = [False] * n
+        self.current_bet = 0
+        self.raises = 0
+        self.history.append("")
+        self.to_act = actors[0]
+
+    def payoffs(self, strengths=None):
+        """各位玩家的净收益（以大盲为单位），可传入摊牌强度覆盖发牌结果"""
+        n = self.config.num_seats
+        live = [i for i in range(n) if not self.folded[i]]
+        winnings = [0] * n
+
+        if len(live) == 1:
+            winnings[live[0]] = sum(self.contributed)
+        else:
+            if strengths is None:
+                strengths = self.deal.showdown_strengths()
+            # 按投入额分层计算边池
+            previous = 0
+            for level in sorted(set(self.contributed)):
+                pot = sum(min(c, level) - min(c, previous) for c in self.contributed)
+                previous = level
+                if pot == 0:
+                    continue
+                eligible = [i for i in live if self.contributed[i] >= level] or live
+                best = max(strengths[i] for i in eligible)
+                winners = [i for i in eligible if strengths[i] == best]
+                for i in winners:
+                    winnings[i] += pot / len(winners)
+
+        bb = self.config.big_blind
+        return [(winnings[i] - self.contributed[i]) / bb for i in range(n)]
+
+
+# ==============================================
+# 外部采样蒙特卡洛CFR
+# ==============================================
+
+class CFRTrainer:
+    """外部采样MCCFR训练器
+
+    regrets / strategy_sum 为 信息集键 -> 长度为 NUM_ACTIONS 的列表。
+    """
+
+    def __init__(self, config, regrets=None, strategy_sum=None, seed=None):
+        self.config = config
+        self.regrets = regrets if regrets is not None else {}
+        self.strategy_sum = strategy_sum if strategy_sum is not None else {}
+        self.rng = random.Random(seed)
+        self.iterations = 0
+        self._originals = None
+
+    def track_changes(self):
+        """开始记录被修改行的原值，用于并行训练时只回传增量"""
+        self._originals = ({}, {})
+
+    def deltas(self):
+        """自 track_changes() 以来的 (遗憾增量, 策略累计增量)"""
+        result = []
+        for table, originals in zip((self.regrets, self.strategy_sum), self._originals):
+            result.append({
+                key: [now - before for now, before in zip(table[key], original)]
+                for key, original in originals.items()
+            })
+        return tuple(result)
+
+    def revert(self):
+        """撤销自 track_changes() 以来的修改"""
+        if self._originals is None:
+            return
+        for table, originals in zip((self.regrets, self.strategy_sum), self._originals):
+            for key, original in originals.items():
+                table[key] = list(original)
+        self._originals = None
+
+    def _row(self, table, key, which):
+        row = table.get(key)
+        if row is None:
+            row = [0.0] * NUM_ACTIONS
+            table[key] = row
+        if self._originals is not None and key not in self._originals[which]:
+            self._originals[which][key] = tuple(row)
+        return row
+
+    def current_strategy(self, key, legal):
+        """遗憾匹配得到的当前策略（与 legal 对齐）"""
+        regrets = self.regrets.get(key)
+        if regrets is not None:
+            positives = [regrets[a] if regrets[a] > 0 else 0.0 for a in legal]
+            total = sum(positives)
+            if total > 0:
+                return [r / total for r in positives]
+        return [1.0 / len(legal)] * len(legal)
+
+    def average_strategy(self, key, legal):
+        """平均策略（与 legal 对齐），未访问过的信息集为均匀分布"""
+        sums = self.strategy_sum.get(key)
+        if sums is not None:
+            weights = [sums[a] for a in legal]
+            total = sum(weights)
+            if total > 0:
+                return [w / total for w in weights]
+        return [1.0 / len(legal)] * len(legal)
+
+    def iterate(self, count=1):
+        """运行 count 次迭代（每次迭代让每个座位各当一次遍历者）"""
+        for _ in range(count):
+            root = AbstractState.initial(self.config, make_deal(self.config, self.rng))
+            for traverser in range(self.config.num_seats):
+                self._traverse(root, traverser)
+            self.iterations += 1
+
+    def _traverse(self, state, traverser):
+        if state.terminal:
+            return state.payoffs()[traverser]
+
+        legal = state.legal_actions()
+        key = state.infoset_key()
+        strategy = self.current_strategy(key, legal)
+
+        if state.to_act == traverser:
+            values = [self._traverse(state.child(a), traverser) for a in legal]
+            node_value = sum(s * v for s, v in zip(strategy, values))
+            regrets = self._row(self.regrets, key, 0)
+            for a, v in zip(legal, values):
+                regrets[a] += v - node_value
+            return node_value
+
+        sums = self._row(self.strategy_sum, key, 1)
+        for a, s in zip(legal, strategy):
+            sums[a] += s
+        action = self.rng.choices(legal, weights=strategy)[0]
+        return self._traverse(state.child(action), traverser)
+
+
+def _merge(table, deltas):
+    """把增量累加到表中"""
+    for key, delta in deltas.items():
+        row = table.get(key)
+        if row is None:
+            table[key] = list(delta)
+        else:
+            for a in range(NUM_ACTIONS):
+                row[a] += delta[a]
+
+
+def _train_worker(conn, config_dict, regrets, strategy_sum):
+    """训练工作进程：表只在启动时传入一次，之后每批只收发增量
+
+    每批收到 (上一批各进程的增量列表, 迭代数, 种子)：先撤销自己上一批的修改，
+    再按主进程相同的顺序累加全部增量，保证副本与主进程的表逐位相同；
+    训练后只回传本批的增量
+    """
+    trainer = CFRTrainer(AbstractGameConfig.from_dict(config_dict), regrets, strategy_sum)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        updates, iterations, seed = task
+        trainer.revert()
+        for regret_delta, strategy_delta in updates:
+            _merge(trainer.regrets, regret_delta)
+            _merge(trainer.strategy_sum, strategy_delta)
+        trainer.rng.seed(seed)
+        trainer.track_changes()
+        trainer.iterate(iterations)
+        conn.send(trainer.deltas())
+    conn.close()
+
+
+def split_iterations(total, processes):
+    """把 total 次迭代尽量平均地分给各进程（总数恰好为 total）"""
+    share, extra = divmod(total, processes)
+    return [share + (i < extra) for i in range(processes)]
+
+
+# ==============================================
+# 存档
+# ==============================================
+
+def save_checkpoint(path, trainer):
+    """原子写入存档"""
+    data = {
+        "config": trainer.config.to_dict(),
+        "iterations": trainer.iterations,
+        "regrets": trainer.regrets,
+        "strategy_sum": trainer.strategy_sum,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, seed=None):
+    """读取存档，返回训练器"""
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    trainer = CFRTrainer(AbstractGameConfig.from_dict(data["config"]),
+                         data["regrets"], data["strategy_sum"], seed)
+    trainer.iterations = data["iterations"]
+    return trainer
+
+
+def _start_workers(trainer, processes):
+    """启动训练工作进程，当前的表随启动参数各传一次"""
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for _ in range(processes):
+        conn, child_conn = context.Pipe()
+        process = context.Process(target=_train_worker, daemon=True,
+                                  args=(child_conn, trainer.config.to_dict(), trainer.regrets, trainer.strategy_sum))
+        process.start()
+        child_conn.close()
+        workers.append((process, conn))
+    return workers
+
+
+def _stop_workers(workers):
+    for process, conn in workers:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        conn.close()
+    for process, _ in workers:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+
+def train(trainer, iterations, processes=1, batch=1000, checkpoint=None, report=print):
+    """训练到累计 iterations 次迭代，每批结束后汇报速度并存档
+
+    多进程时每个进程每批最多 batch 次迭代，剩余不足时按进程平均分配，总数恰好为 iterations
+    """
+    workers = _start_workers(trainer, processes) if processes > 1 else None
+    updates = []
+    started = time.perf_counter()
+    start_iterations = trainer.iterations
+    try:
+        while trainer.iterations < iterations:
+            remaining = iterations - trainer.iterations
+            batch_start = time.perf_counter()
+
+            if workers is None:
+                done = min(batch, remaining)
+                trainer.iterate(done)
+            else:
+                done = min(batch * processes, remaining)
+                seed = trainer.rng.randrange(1 << 30)
+                for i, ((_, conn), count) in enumerate(zip(workers, split_iterations(done, processes))):
+                    conn.send((updates, count, seed + i))
+                updates = [conn.recv() for _, conn in workers]
+                for regret_delta, strategy_delta in updates:
+                    _merge(trainer.regrets, regret_delta)
+                    _merge(trainer.strategy_sum, strategy_delta)
+                trainer.iterations += done
+
+            elapsed = time.perf_counter() - batch_start
+            total_elapsed = time.perf_counter() - started
+            report(f"  迭代 {trainer.iterations:,}  本批 {done / max(elapsed, 1e-9):,.0f} 次/秒  "
+                   f"平均 {(trainer.iterations - start_iterations) / max(total_elapsed, 1e-9):,.0f} 次/秒  "
+                   f"信息集 {len(trainer.regrets):,}")
+            if checkpoint:
+                save_checkpoint(checkpoint, trainer)
+    finally:
+        if workers is not None:
+            _stop_workers(workers)
+    return trainer
+
+
+# ==============================================
+# 策略表导出与加载
+# ==============================================
+
+STRATEGY_TABLE_MAGIC = b"CFRS"
+STRATEGY_TABLE_VERSION = 1
+
+# 魔数, 版本, 行动数, 座位数, 分桶数, 加注上限, 条目数
+_STRATEGY_HEADER = struct.Struct("<4sBBBBBxI")
+_KEY = struct.Struct("<Q")
+
+
+def strategy_table_path(table_dir=TABLE_DIR):
+    """策略表文件路径"""
+    return os.path.join(table_dir, "strategy.bin")
+
+
+def key_hash(key):
+    """信息集键的64位稳定哈希"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def quantize_probabilities(weights):
+    """把非负权重量化为和为255的字节（最大余数法）"""
+    total = sum(weights)
+    if total <= 0:
+        return bytes(len(weights))
+    scaled = [w * 255 / total for w in weights]
+    quantized = [int(x) for x in scaled]
+    order = sorted(range(len(weights)), key=lambda i: scaled[i] - quantized[i], reverse=True)
+    for i in order[:255 - sum(quantized)]:
+        quantized[i] += 1
+    return bytes(quantized)
+
+
+def export_strategy(path, trainer):
+    """导出量化的平均策略表（键按哈希排序，便于二分查找）"""
+    rows = {}
+    for key, sums in trainer.strategy_sum.items():
+        if sum(sums) > 0:
+            rows[key_hash(key)] = quantize_probabilities(sums)
+
+    config = trainer.config
+    hashes = sorted(rows)
+    with open(path, "wb") as f:
+        f.write(_STRATEGY_HEADER.pack(STRATEGY_TABLE_MAGIC, STRATEGY_TABLE_VERSION, NUM_ACTIONS,
+                                      config.num_seats, config.num_buckets, config.raise_cap,
+                                      len(hashes)))
+        for h in hashes:
+            f.write(_KEY.pack(h))
+        for h in hashes:
+            f.write(rows[h])
+    return len(hashes)
+
+
+class StrategyTable:
+    """只读的内存映射策略表"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise
+
+        (magic, version, num_actions, self.num_seats, self.num_buckets,
+         self.raise_cap, self.entries) = _STRATEGY_HEADER.unpack_from(self._mmap, 0)
+        if magic != STRATEGY_TABLE_MAGIC or version != STRATEGY_TABLE_VERSION or num_actions != NUM_ACTIONS:
+            self.close()
+            raise ValueError(f"无效的策略表文件: {path}")
+
+        self._keys_offset = _STRATEGY_HEADER.size
+        self._probs_offset = self._keys_offset + self.entries * _KEY.size
+
+    def lookup(self, key):
+        """返回长度为 NUM_ACTIONS 的概率列表，未收录的信息集返回None"""
+        target = key_hash(key)
+        lo, hi = 0, self.entries
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = _KEY.unpack_from(self._mmap, self._keys_offset + mid * _KEY.size)[0]
+            if value < target:
+                lo = mid + 1
+            elif value > target:
+                hi = mid
+            else:
+                start = self._probs_offset + mid * NUM_ACTIONS
+                return [b / 255 for b in self._mmap[start:start + NUM_ACTIONS]]
+        return None
+
+    def close(self):
+        """释放映射"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+_loaded_strategy_tables = {}
+
+
+def get_strategy_table(table_dir=TABLE_DIR):
+    """获取策略表；文件不存在时返回None（结果会被缓存）"""
+    if table_dir not in _loaded_strategy_tables:
+        path = strategy_table_path(table_dir)
+        _loaded_strategy_tables[table_dir] = StrategyTable(path) if os.path.exists(path) else None
+    return _loaded_strategy_tables[table_dir]
+
+
+# ==============================================
+# 命令行
+# ==============================================
+
+def _cmd_train(args):
+    """训练完整抽象牌局"""
+    if args.resume and os.path.exists(args.checkpoint):
+        trainer = load_checkpoint(args.checkpoint, args.seed)
+        print(f"从存档继续: {args.checkpoint}（已完成 {trainer.iterations:,} 次迭代）")
+    else:
+        config = AbstractGameConfig(num_seats=args.seats, num_buckets=args.buckets,
+                                    raise_cap=args.raise_cap)
+        trainer = CFRTrainer(config, seed=args.seed)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    train(trainer, args.iterations, args.processes, args.batch, args.checkpoint)
+    entries = export_strategy(args.output, trainer)
+    print(f"✅ 已导出 {args.output}: {entries:,} 个信息集")
+
+
+def _cmd_subgame(args):
+    """在小型子博弈上训练并汇报可被利用度"""
+    from exploitability import exploitability
+
+    config = subgame_config(args.buckets, args.stack_bb, args.raise_cap)
+    trainer = CFRTrainer(config, seed=args.seed)
+    print(f"单挑子博弈: {args.buckets} 个分桶, {args.stack_bb} 大盲筹码, 加注上限 {args.raise_cap}")
+
+    while trainer.iterations < args.iterations:
+        started = time.perf_counter()
+        count = min(args.batch, args.iterations - trainer.iterations)
+        trainer.iterate(count)
+        rate = count / max(time.perf_counter() - started, 1e-9)
+        value = exploitability(config, trainer.average_strategy)
+        print(f"  迭代 {trainer.iterations:,}  {rate:,.0f} 次/秒  "
+              f"可被利用度 {value * 1000:.1f} 毫盲/手")
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="离线CFR策略求解器")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_train = sub.add_parser("train", help="训练完整抽象牌局并导出策略表")
+    p_train.add_argument("--iterations", type=int, default=100000)
+    p_train.add_argument("--processes", type=int, default=1)
+    p_train.add_argument("--batch", type=int, default=1000, help="每个进程每批的迭代数")
+    p_train.add_argument("--seats", type=int, default=5)
+    p_train.add_argument("--buckets", type=int, default=8)
+    p_train.add_argument("--raise-cap", type=int, default=2)
+    p_train.add_argument("--checkpoint", default="cfr_checkpoint.pkl")
+    p_train.add_argument("--resume", action="store_true", help="从存档继续训练")
+    p_train.add_argument("--output", default=strategy_table_path())
+    p_train.add_argument("--seed", type=int, default=0)
+    p_train.set_defaults(func=_cmd_train)
+
+    p_sub = sub.add_parser("subgame", help="小型子博弈训练与可被利用度汇报")
+    p_sub.add_argument("--iterations", type=int, default=20000)
+    p_sub.add_argument("--batch", type=int, default=2000)
+    p_sub.add_argument("--buckets", type=int, default=5)
+    p_sub.add_argument("--stack-bb", type=int, default=10)
+    p_sub.add_argument("--raise-cap", type=int, default=2)
+    p_sub.add_argument("--seed", type=int, default=0)
+    p_sub.set_defaults(func=_cmd_subgame)
+
+    args = parser.parse_args()
+    args.func(args)
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 可被利用度评估
+在单挑分桶抽象牌局上计算最佳应对（best response），
+度量CFR策略表或启发式AI（_make_ai_decision）能被利用的程度，
+作为AI改动的回归指标
+
+遍历的是公共行动树：对手的到达概率和最佳应对方的收益都是按分桶
+排列的NumPy向量，每个公共节点只访问一次，而不是对每个分桶组合各遍历一遍
+
+用法:
+  python3 exploitability.py heuristic --buckets 8 --streets preflop,flop,turn,river
+  python3 exploitability.py table --path assets/tables/strategy.bin
+  python3 exploitability.py uniform --buckets 5
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from ai_policy import AI_ACTIONS, position_factor, bet_history_factor, heuristic_weights_batch
+from cfr_solver import (
+    AbstractGameConfig, AbstractState, BucketDeal, StrategyTable, STREET_NAMES,
+    FOLD, CHECK, CALL, RAISE, ALL_IN, strategy_table_path,
+)
+
+# ==============================================
+# 被评估的策略
+# ==============================================
+
+class Policy:
+    """策略接口：给出某个公共节点上行动者各分桶的行动概率"""
+
+    def matrix(self, state, seat):
+        """返回形状为 (分桶数, len(legal)) 的概率矩阵，行与 state.legal_actions() 对齐"""
+        raise NotImplementedError
+
+
+def _normalize_rows(matrix):
+    """逐行归一化；全零行改为均匀分布"""
+    totals = matrix.sum(axis=1, keepdims=True)
+    uniform = np.full_like(matrix, 1.0 / matrix.shape[1])
+    return np.where(totals > 0, matrix / np.where(totals > 0, totals, 1.0), uniform)
+
+
+class UniformPolicy(Policy):
+    """在合法行动中均匀随机"""
+
+    def matrix(self, state, seat):
+        legal = state.legal_actions()
+        return np.full((state.config.num_buckets, len(legal)), 1.0 / len(legal))
+
+
+class StrategyFnPolicy(Policy):
+    """包装 strategy_fn(key, legal)，例如 CFRTrainer.average_strategy"""
+
+    def __init__(self, strategy_fn):
+        self.strategy_fn = strategy_fn
+
+    def matrix(self, state, seat):
+        legal = state.legal_actions()
+        rows = [self.strategy_fn(state.infoset_key(seat, b), legal)
+                for b in range(state.config.num_buckets)]
+        return _normalize_rows(np.asarray(rows, dtype=np.float64))
+
+
+class TablePolicy(Policy):
+    """查mmap策略表；与游戏内一致，未收录的信息集交给 fallback"""
+
+    def __init__(self, table, fallback=None):
+        self.table = table
+        self.fallback = fallback or HeuristicPolicy()
+        self.misses = 0
+
+    def matrix(self, state, seat):
+        legal = state.legal_actions()
+        buckets = state.config.num_buckets
+        result = np.empty((buckets, len(legal)))
+        fallback = None
+        for b in range(buckets):
+            probabilities = self.table.lookup(state.infoset_key(seat, b))
+            if probabilities is None:
+                self.misses += 1
+                if fallback is None:
+                    fallback = self.fallback.matrix(state, seat)
+                result[b] = fallback[b]
+            else:
+                result[b] = [probabilities[a] for a in legal]
+        return _normalize_rows(result)
+
+
+class HeuristicPolicy(Policy):
+    """游戏内启发式AI（ai_policy.heuristic_weights_batch，各分桶一次算完）
+
+    分桶 b 的手牌强度取区间中点 (b + 0.5) / 分桶数。
+    行动按 TexasHoldemGame._process_ai_action 的执行方式映射到抽象行动：
+    无需跟注时的弃牌按过牌处理；面对下注的过牌即跟注；
+    没有下注时的跟注即过牌；筹码不足的跟注/加注变为全下；
+    达到抽象加注上限的加注改为跟注（或过牌）。
+    """
+
+    def matrix(self, state, seat):
+        config = state.config
+        legal = state.legal_actions()
+        to_call = state.current_bet - state.street_bets[seat]
+        stack = state.stacks[seat]
+
+        passive = CALL if to_call > 0 else CHECK
+        if passive not in legal:
+            passive = ALL_IN
+        raise_action = RAISE if RAISE in legal else ALL_IN
+        if RAISE not in legal and state.raises >= config.raise_cap:
+            raise_action = passive
+        target = {
+            "fold": FOLD if to_call > 0 else CHECK,
+            "check": passive,
+            "call": passive,
+            "raise": raise_action,
+            "all_in": ALL_IN,
+        }
+
+        # 在游戏中行动者总是当前玩家，位置因子恒为1
+        position = position_factor(seat, seat, config.num_seats)
+        history = bet_history_factor(state.current_bet, config.big_blind)
+        chip_ratio = stack / (config.big_blind * 10)
+
+        strengths = (np.arange(config.num_buckets) + 0.5) / config.num_buckets
+        weights = heuristic_weights_batch(strengths, position, history, chip_ratio)
+        result = np.zeros((config.num_buckets, len(legal)))
+        for i, action in enumerate(AI_ACTIONS):
+            result[:, legal.index(target[action])] += weights[:, i]
+        return result
+
+
+# ==============================================
+# 向量化最佳应对
+# ==============================================
+
+def _terminal_values(state, br_player, opp_reach):
+    """终局节点上最佳应对方各分桶的期望收益"""
+    opponent = 1 - br_player
+    if state.folded[0] or state.folded[1]:
+        payoff = state.payoffs([0, 0])[br_player]
+        return np.full(opp_reach.shape, payoff * opp_reach.sum())
+
+    strengths = [0, 0]
+    strengths[br_player] = 1
+    win = state.payoffs(strengths)[br_player]
+    strengths[br_player], strengths[opponent] = 0, 1
+    lose = state.payoffs(strengths)[br_player]
+    tie = state.payoffs([0, 0])[br_player]
+
+    # 对手分桶更小/相同/更大的到达概率之和
+    below = np.cumsum(opp_reach) - opp_reach
+    above = opp_reach.sum() - below - opp_reach
+    return win * below + tie * opp_reach + lose * above
+
+
+def _best_response(state, br_player, opp_reach, policy, cache):
+    """公共节点上最佳应对方各分桶的期望收益向量（已乘对手到达概率）"""
+    if state.terminal:
+        return _terminal_values(state, br_player, opp_reach)
+
+    legal = state.legal_actions()
+    if state.to_act == br_player:
+        values = None
+        for action in legal:
+            child = _best_response(state.child(action), br_player, opp_reach, policy, cache)
+            values = child if values is None else np.maximum(values, child)
+        return values
+
+    # 策略矩阵与最佳应对方无关，两次遍历共用
+    seat = state.to_act
+    key = "/".join(state.history)
+    probabilities = cache.get(key)
+    if probabilities is None:
+        probabilities = policy.matrix(state, seat)
+        cache[key] = probabilities
+
+    values = np.zeros(opp_reach.shape)
+    for i, action in enumerate(legal):
+        reach = opp_reach * probabilities[:, i]
+        if reach.any():
+            values += _best_response(state.child(action), br_player, reach, policy, cache)
+    return values
+
+
+def best_response_values(config, policy):
+    """两个位置上最佳应对方的期望收益（大盲/手）"""
+    if config.num_seats != 2 or config.chance_model != "buckets":
+        raise ValueError("可被利用度只支持单挑的分桶抽象牌局")
+    if not isinstance(policy, Policy):
+        policy = StrategyFnPolicy(policy)
+
+    buckets = config.num_buckets
+    # 分桶只用于策略查询；摊牌比较在终局节点上按向量完成
+    root = AbstractState.initial(config, BucketDeal([0, 0]))
+    cache = {}
+    uniform = np.full(buckets, 1.0 / buckets)
+    return tuple(float(_best_response(root, br_player, uniform, policy, cache).mean())
+                 for br_player in (0, 1))
+
+
+def exploitability(config, policy):
+    """策略的可被利用度（大盲/手），即两个位置最佳应对收益的平均
+
+    policy 可以是 Policy 实例，也可以是 strategy_fn(key, legal)。
+    """
+    return sum(best_response_values(config, policy)) / 2
+
+
+def heads_up_config(num_buckets=8, stack_bb=50, raise_cap=2, streets=STREET_NAMES):
+    """单挑分桶抽象牌局（盲注与游戏一致）"""
+    return AbstractGameConfig(
+        num_seats=2, stacks=(stack_bb * 200, stack_bb * 200), num_buckets=num_buckets,
+        raise_cap=raise_cap, streets=tuple(streets), chance_model="buckets",
+    )
+
+
+# ==============================================
+# 命令行
+# ==============================================
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="AI策略可被利用度评估")
+    parser.add_argument("policy", choices=("heuristic", "table", "uniform"))
+    parser.add_argument("--path", default=strategy_table_path(), help="策略表路径")
+    parser.add_argument("--buckets", type=int, default=8)
+    parser.add_argument("--stack-bb", type=int, default=50)
+    parser.add_argument("--raise-cap", type=int, default=2)
+    parser.add_argument("--streets", default=",".join(STREET_NAMES),
+                        help="逗号分隔的街道，如 preflop,flop")
+    args = parser.parse_args()
+
+    streets = [s for s in args.streets.split(",") if s]
+    table = None
+    if args.policy == "table":
+        if not os.path.exists(args.path):
+            print(f"❌ 策略表不存在: {args.path}")
+            return False
+        table = StrategyTable(args.path)
+        if table.num_seats != 2:
+            print(f"❌ 只能评估单挑策略表（该表为 {table.num_seats} 人桌）")
+            table.close()
+            return False
+        args.buckets, args.raise_cap = table.num_buckets, table.raise_cap
+        policy = TablePolicy(table)
+    elif args.policy == "heuristic":
+        policy = HeuristicPolicy()
+    else:
+        policy = UniformPolicy()
+
+    config = heads_up_config(args.buckets, args.stack_bb, args.raise_cap, streets)
+    print(f"单挑抽象牌局: {args.buckets} 个分桶, {args.stack_bb} 大盲筹码, "
+          f"加注上限 {args.raise_cap}, 街道 {'/'.join(streets)}")
+
+    started = time.perf_counter()
+    values = best_response_values(config, policy)
+    elapsed = time.perf_counter() - started
+    for seat, value in enumerate(values):
+        print(f"  {seat}号位最佳应对收益 {value * 1000:+.1f} 毫盲/手")
+    print(f"✅ {args.policy} 可被利用度 {sum(values) / 2 * 1000:.1f} 毫盲/手（用时 {elapsed:.2f} 秒）")
+    if table is not None:
+        print(f"  未收录信息集 {policy.misses:,} 次（已按启发式处理）")
+        table.close()
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 广播扇出
+热门牌桌可能有成百上千名观战者：每次更新只按可见性分类编码一次
+（公开消息：未亮出的底牌隐藏、摊牌时亮出；私有消息：只发给对应座位的底牌），
+同一个字节串放进每个订阅者的有界发送队列，在本轮事件循环末尾批量写入套接字
+
+发送队列满（客户端读得太慢）的订阅者直接断开，不拖慢牌桌，也不让内存无限增长；
+每次更新的CPU开销与订阅者数量基本无关（每个订阅者只是一次入队）
+"""
+
+import asyncio
+from collections import deque
+
+# 每个订阅者最多积压的消息数（约为几手牌的更新量）
+MAX_QUEUE = 256
+
+
+class Subscriber:
+    """一个连接的有界发送队列
+
+    入队后在本轮事件循环末尾把积压的消息合并成一次写入；只有套接字写不动时
+    才启动一个等待排空的协程，正常情况下不为每个订阅者唤醒协程。
+    """
+
+    def __init__(self, writer, max_queue=MAX_QUEUE, on_drop=None):
+        self.writer = writer
+        self.max_queue = max_queue
+        self.on_drop = on_drop
+        self.queue = deque()
+        self.dropped = False
+        self.bytes_sent = 0
+        self._loop = asyncio.get_running_loop()
+        self._draining = None
+
+    def push(self, data):
+        """放入一条已编码的消息；队列已满时断开订阅者并返回False"""
+        if self.dropped:
+            return False
+        if len(self.queue) >= self.max_queue:
+            self.drop()
+            return False
+        if not self.queue and self._draining is None:
+            self._loop.call_soon(self._flush)
+        self.queue.append(data)
+        return True
+
+    def drop(self):
+        """断开（丢弃积压的消息并中止连接）"""
+        if self.dropped:
+            return
+        self.dropped = True
+        self.queue.clear()
+        if self._draining is not None:
+            self._draining.cancel()
+        transport = getattr(self.writer, "transport", None)
+        if transport is not None:
+            transport.abort()
+        if self.on_drop is not None:
+            # 可能正在频道的发布循环里，稍后再通知
+            self._loop.call_soon(self.on_drop, self)
+
+    async def close(self):
+        """停止发送（不再发送积压的消息）"""
+        self.queue.clear()
+        if self._draining is not None:
+            self._draining.cancel()
+            await asyncio.gather(self._draining, return_exceptions=True)
+
+    def _flush(self):
+        """把积压的消息合并成一次写入；套接字缓冲有积压时等待排空"""
+        if self.dropped or not self.queue or self._draining is not None:
+            return
+        data = b"".join(self.queue)
+        self.queue.clear()
+        writer = self.writer
+        if writer.is_closing():
+            return
+        writer.write(data)
+        self.bytes_sent += len(data)
+        transport = getattr(writer, "transport", None)
+        if transport is None or transport.get_write_buffer_size():
+            self._draining = self._loop.create_task(self._drain())
+
+    async def _drain(self):
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            return
+        finally:
+            self._draining = None
+        self._flush()
+
+
+class Channel:
+    """一类可见性的订阅者集合：消息编码一次，原样发给每个订阅者"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.published = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def add(self, subscriber):
+        self.subscribers.add(subscriber)
+
+    def discard(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, data):
+        """把同一个字节串放进全部订阅者的队列；跟不上的订阅者被移出频道"""
+        self.published += 1
+        slow = [subscriber for subscriber in self.subscribers if not subscriber.push(data)]
+        for subscriber in slow:
+            self.subscribers.discard(subscriber)
+            self.dropped += 1
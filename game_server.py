@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 多桌游戏服务器
+在一个进程里用 asyncio 托管大量无界面牌桌（table_engine.TableEngine）：
+每张牌桌是一个协程，轮到AI时 await 思考延迟，轮到真人时 await 客户端的行动（带超时），
+取代 TexasHoldemGame.update 中 is_waiting/wait_until 的逐帧轮询；
+全部延迟与超时由一个共享的时间轮（timer_wheel.py）管理
+
+客户端通过本地TCP连接，消息为每行一个JSON对象:
+  → {"type": "join", "table": 0, "name": "玩家"}      坐进一个AI座位（优先4号位）
+  → {"type": "watch", "table": 0}                     观战（只收公开消息）
+  → {"type": "action", "action": "raise", "amount": 600, "seq": 17}   seq 为行动提示中的序号（可省略）
+  → {"type": "leave"}
+  → {"type": "leaderboard", "board": "chips_won", "count": 10, "start": 0}   查询排行榜（见 leaderboard.BOARDS）
+  ← {"type": "joined", "table": 0, "seat": 4}
+  ← {"type": "watching", "table": 0}
+  ← 牌局事件（见 table_engine），轮到自己时 {"type": "turn", "seq": 17, "legal": [...], "min_raise": .., "max_raise": ..}
+  ← {"type": "ranking", "board": "chips_won", "start": 0, "top": [[名次, 玩家, 分数], ...], "rank": [名次, 分数]}
+     rank 为本连接入座名字的名次（未上榜时为 null），胜率的分数为百万分之一
+  ← {"type": "error", "message": "..."}
+
+移动端客户端可在连接后先发送 wire_protocol.MAGIC 切换到紧凑二进制协议：
+控制消息字段相同，牌局事件改为整桌状态的差量帧（定期关键帧），见 wire_protocol.py；
+断线重连时在 join/watch 中带上最后应用的状态帧序号 "seq"，服务器只补发之后的差量
+
+公开消息每次更新只编码一次（JSON事件与二进制状态帧各一份），由 fanout.Channel 发给本桌
+全部入座者和观战者；每个连接有有界发送队列，读得太慢的连接被断开
+
+入站方向每个连接限速，每张牌桌的行动进入有界队列（backpressure.ActionInbox）：
+过期与重复的行动被丢弃，一个刻度内的连续点击合并处理，行动延迟按牌桌记录在直方图中
+
+指定 --snapshot-dir 时每一步写入牌局记录，并由后台压缩进程定期写全部牌桌的快照（snapshots.py）；
+进程崩溃后用同一目录重启，从最新快照与记录尾部恢复进行中的牌局；
+加上 --history-archive 时旧记录段移入归档目录而不是删除，供 hand_analytics.py 离线统计
+
+指定 --balance-db 时，带名字入座的玩家每手牌的输赢与每次入座的对局记录写入 SQLite（balances.py），
+由后台线程批量提交，牌局不等待磁盘
+
+带名字入座的玩家每手牌结束时进入排行榜的聚合队列（leaderboard.py），每个刻度批量更新；
+指定 --leaderboard-db 时统计定期写入 SQLite，重启时载入
+
+指定 --ai-service 时内置AI的决策交给独立的服务进程（ai_service.py）凑批计算：
+AI开始思考时提交请求，思考延迟结束时取结果，服务来不及回复时在本地用启发式决策
+
+用法:
+  python3 game_server.py --tables 5000 --port 8765
+  python3 game_server.py --tables 10000 --snapshot-dir snapshots --snapshot-interval 30
+  python3 game_server.py --tables 1000 --balance-db balances.db
+  python3 game_server.py --tables 1000 --leaderboard-db stats.db
+  python3 game_server.py --tables 5000 --ai-service
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from ai_service import AIServiceClient
+from ai_worker import heuristic_action
+from balances import BalanceStore, FLUSH_INTERVAL
+from backpressure import ActionInbox, LatencyHistogram, RateLimiter, MESSAGE_RATE, MESSAGE_BURST
+from betting import action_names, CHECK_BIT
+from bots import HeuristicBot, default_action
+from cfr_solver import ACTIONS, DEFAULT_STACKS
+from fanout import Channel, Subscriber, MAX_QUEUE
+from leaderboard import LeaderboardAggregator, BOARDS, PERSIST_INTERVAL
+from snapshots import Snapshotter, SNAPSHOT_INTERVAL
+from table_engine import TableEngine
+from timer_wheel import AsyncScheduler
+from wire_protocol import MAGIC, StateEncoder, TableState, pack_message, unpack_message, read_frame
+
+# AI思考延迟（秒，均匀分布，与游戏一致）与两手牌之间的停顿
+THINK_DELAY = (0.5, 1.5)
+HAND_PAUSE = 2.0
+
+# 真人行动超时（秒），超时按默认行动（能过牌则过牌，否则弃牌）处理
+ACTION_TIMEOUT = 30.0
+
+# 真人优先坐的座位（与游戏中人类玩家的位置一致）
+PREFERRED_SEAT = 4
+
+# 一次排行榜查询至多返回的名次数
+LEADERBOARD_PAGE = 100
+
+# 行动队列中的特殊行动者：真人离座、行动超时
+_LEFT = None
+_TIMED_OUT = -1
+
+
+def _discard_result(future):
+    """丢弃没赶上截止时间的插件AI结果（取出异常，避免未处理异常的警告）"""
+    if not future.cancelled():
+        future.exception()
+
+
+def encode_message(message):
+    """消息 -> 一行JSON字节串"""
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode_message(line):
+    """一行JSON字节串 -> 消息"""
+    return json.loads(line)
+
+
+# ==============================================
+# 牌桌协程
+# ==============================================
+
+class TableRunner:
+    """一张牌桌：牌局状态机 + 座位上的AI与真人客户端"""
+
+    def __init__(self, server, table_id, rng, engine=None):
+        self.server = server
+        self.engine = engine or TableEngine(table_id, DEFAULT_STACKS, rng=rng)
+        self.table_id = table_id
+        self.rng = self.engine.rng
+        self.bots = [server.bot] * self.engine.num_seats
+        self.clients = {}               # 座位 -> ClientSession
+        self.spectators = set()         # 观战的 ClientSession
+        self.channels = {False: Channel(), True: Channel()}  # 公开消息频道：JSON事件 / 二进制状态帧
+        self.inbox = ActionInbox(server.timers)  # 真人行动 (座位, 行动, 加注到, 收到时刻)
+        self.latency = LatencyHistogram()        # 真人行动从收到到执行的延迟
+        self.sync = StateEncoder(table_id)  # 二进制客户端的状态帧
+        self.hands_played = 0
+        self.decisions = 0
+        self.handoff = None   # 设置后在本手牌结束时调用 handoff(runner) 并退出主循环（迁移牌桌）
+
+    def export(self, include_hand=False):
+        """牌桌状态（可 pickle），供 TableRunner.restore 在其他进程中继续；
+        默认只能在两手牌之间导出，include_hand 为 True 时含进行中的牌局（崩溃恢复快照）"""
+        return {"engine": self.engine.snapshot(include_hand), "hands_played": self.hands_played,
+                "decisions": self.decisions, "sync_seq": self.sync.seq}
+
+    @classmethod
+    def restore(cls, server, state):
+        """由 export() 的结果恢复牌桌（不含客户端；停在一手牌中间时从当前行动位置继续）"""
+        engine = TableEngine.restore(state["engine"])
+        runner = cls(server, engine.table_id, engine.rng, engine)
+        runner.hands_played = state["hands_played"]
+        runner.decisions = state["decisions"]
+        # 状态帧序号在迁移后继续递增，重连的客户端不会误用旧序号（缓冲为空，改发关键帧）
+        runner.sync.seq = state.get("sync_seq", 0)
+        return runner
+
+    def free_seat(self):
+        """可供真人坐下的AI座位；没有时返回None"""
+        seats = [PREFERRED_SEAT] + list(range(self.engine.num_seats))
+        for seat in seats:
+            if seat < self.engine.num_seats and seat not in self.clients:
+                return seat
+        return None
+
+    def broadcast(self, events):
+        """把事件发给本桌客户端：公开事件每条只编码一次发给整个频道，私有事件只发给对应座位；
+        二进制客户端改收一帧状态差量"""
+        text = self.channels[False]
+        if not text and not self.channels[True]:
+            return
+        self.send_state()
+        for event in events:
+            to = event.get("to")
+            if to is None:
+                if text:
+                    text.publish(encode_message(event))
+            elif to in self.clients:
+                self.clients[to].send(event)
+
+    def send_state(self, keyframe=False):
+        """把当前状态编码一次（差量或关键帧）发给本桌全部二进制客户端"""
+        channel = self.channels[True]
+        if channel:
+            channel.publish(self.sync.encode(TableState.from_engine(self.engine), keyframe))
+
+    def sync_client(self, session, acked=None):
+        """让加入的二进制客户端跟上状态帧：重连的客户端（acked 为它最后应用的序号）只补发缓冲中之后的帧，
+        否则（或补发比关键帧还大时）复用当前序号的关键帧；状态帧落后于牌桌时再全频道发一帧差量"""
+        keyframe = self.sync.current_keyframe()
+        if keyframe is None:
+            self.send_state(keyframe=True)
+            return
+        frames = self.sync.since(acked)
+        if frames is None or sum(len(data) for data in frames) >= len(keyframe):
+            frames = [keyframe]
+        for data in frames:
+            session.outbox.push(data)
+        if self.sync.previous != TableState.from_engine(self.engine):
+            self.send_state()
+
+    def subscribe(self, session):
+        """连接开始接收本桌的公开消息"""
+        self.channels[session.binary].add(session.outbox)
+
+    def unsubscribe(self, session):
+        self.channels[session.binary].discard(session.outbox)
+
+    async def run(self):
+        """牌桌主循环：一手接一手，直到服务器停止"""
+        engine = self.engine
+        while self.server.running:
+            if not engine.hand_active:
+                events = engine.start_hand()
+                if self.server.history is not None:
+                    self.server.history.hand(engine)
+                self.broadcast(events)
+            while engine.hand_active:
+                seat = engine.to_act
+                session = self.clients.get(seat)
+                if session is None:
+                    events = await self._bot_turn(seat)
+                else:
+                    events = await self._human_turn(seat, session)
+                self.decisions += 1
+                if self.server.history is not None:
+                    self.server.history.action(self.table_id, events[0])
+                self.broadcast(events)
+            self.hands_played += 1
+            self.server.hand_finished(self)
+            if self.handoff is not None:
+                self.handoff(self)
+                return
+            await self.server.timers.sleep(self.server.hand_pause)
+
+    async def _bot_turn(self, seat):
+        """AI行动：等待思考延迟后决策；内置AI使用决策服务时在思考延迟内由服务进程计算"""
+        timers = self.server.timers
+        delay = self.server.think_delay(self.rng)
+        request = self.engine.decision_request()
+        service = self.server.ai_service
+        if service is not None and self.bots[seat] is self.server.bot:
+            ticket = service.submit(request, timeout=delay)
+            deadline = time.perf_counter() + delay
+            await timers.sleep(delay)
+            try:
+                action = service.poll(ticket)
+                while action is None and time.perf_counter() < deadline:   # 截止时刻前被唤醒：等下一个刻度
+                    await timers.sleep(timers.tick)
+                    action = service.poll(ticket)
+            except KeyError:
+                action = None   # 事件循环卡住太久，凭据已被清理
+            if action is None:
+                service.cancel(ticket)
+                action = heuristic_action(request)
+        elif isinstance(self.bots[seat], HeuristicBot):
+            await timers.sleep(delay)
+            action = self.bots[seat].decide(request)
+        else:
+            # 插件AI（ProcessBot 等）可能阻塞：放进线程池，思考延迟就是它的截止时间，来不及时用默认行动
+            future = asyncio.get_running_loop().run_in_executor(None, self.bots[seat].decide, request)
+            await timers.sleep(delay)
+            if future.done() and future.exception() is None:
+                action = future.result()
+            else:
+                future.add_done_callback(_discard_result)
+                self.server.bot_timeouts += 1
+                action = default_action(request)
+        action, raise_to = self.engine.resolve_bot_action(action, request.hand_strength)
+        return self.engine.apply(action, raise_to)
+
+    async def _human_turn(self, seat, session):
+        """真人行动：发出行动提示并等待，非法行动要求重试，超时按默认行动处理"""
+        engine = self.engine
+        inbox = self.inbox
+        # 本次行动的序号；之前积压的和之后迟到的行动都会被丢弃
+        turn = self.decisions
+        inbox.open(turn)
+        mask, floor, ceiling = engine.legal_actions()
+        session.send({"type": "turn", "seq": turn, "seat": seat, "legal": action_names(mask), "min_raise": floor,
+                      "max_raise": ceiling, "to_call": engine.current_bet - engine.street_bets[seat]})
+        timers = self.server.timers
+        timeout = timers.call_later(self.server.action_timeout, inbox.put_control, _TIMED_OUT)
+        try:
+            while True:
+                for actor, action, raise_to, received in await inbox.get():
+                    if actor == _TIMED_OUT:
+                        return engine.apply("check" if mask & CHECK_BIT else "fold")
+                    if actor is _LEFT:
+                        # 真人离座：由AI接手这一步
+                        inbox.close()
+                        return await self._bot_turn(seat)
+                    if actor != seat:
+                        continue
+                    try:
+                        events = engine.apply(action, raise_to)
+                    except ValueError as e:
+                        session.send({"type": "error", "message": str(e)})
+                        continue
+                    self.latency.record(time.perf_counter() - received)
+                    return events
+        finally:
+            timers.cancel(timeout)
+            inbox.close()
+
+    def seat_client(self, session):
+        """真人坐下，返回座位号；满员时返回None"""
+        seat = self.free_seat()
+        if seat is not None:
+            self.clients[seat] = session
+            self.subscribe(session)
+        return seat
+
+    def unseat_client(self, seat):
+        """真人离座，座位交还AI"""
+        session = self.clients.pop(seat, None)
+        if session is None:
+            return
+        self.unsubscribe(session)
+        if self.engine.to_act == seat:
+            self.inbox.put_control(_LEFT)
+
+    def add_spectator(self, session):
+        """观战者加入"""
+        self.spectators.add(session)
+        self.subscribe(session)
+
+    def remove_spectator(self, session):
+        self.spectators.discard(session)
+        self.unsubscribe(session)
+
+
+# ==============================================
+# 客户端连接
+# ==============================================
+
+def _table_id(message):
+    """消息中的牌桌编号；不是整数时返回None"""
+    table_id = message.get("table")
+    return table_id if isinstance(table_id, int) else None
+
+
+def _resume_seq(message):
+    """join/watch 消息中客户端最后应用的状态帧序号；没有或非法时返回None"""
+    seq = message.get("seq")
+    return seq if isinstance(seq, int) and seq >= 0 else None
+
+
+class ClientSession:
+    """一个TCP客户端连接"""
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.table = None
+        self.seat = None
+        self.name = None
+        self.joined = 0.0   # 本次入座的时刻与之后的手数、输赢（写入对局记录）
+        self.hands = 0
+        self.net = 0
+        self.first_hand = 0  # 计入输赢的第一手牌（中途入座时从下一手开始）
+        self.binary = False
+        self.outbox = None
+        self.limiter = RateLimiter(server.message_rate, server.message_burst)
+        self._throttled = False
+
+    def send(self, message):
+        """发送一条消息（放入发送队列，不等待）"""
+        self.outbox.push(pack_message(message) if self.binary else encode_message(message))
+
+    def _dropped(self, outbox):
+        """发送队列积压过多，连接已被断开"""
+        self.leave()
+
+    async def serve(self):
+        """读取并处理客户端消息，直到连接关闭；首字节为 MAGIC 时使用二进制协议"""
+        self.outbox = Subscriber(self.writer, self.server.max_queue, on_drop=self._dropped)
+        try:
+            first = await self.reader.read(1)
+            self.binary = first == MAGIC
+            pending = b"" if self.binary else first
+            while True:
+                if self.binary:
+                    parse, data = unpack_message, await read_frame(self.reader)
+                else:
+                    # 首字节已读出，补进第一行
+                    line = pending if pending == b"\n" else pending + await self.reader.readline()
+                    parse, data, pending = decode_message, line, b""
+                if not data:
+                    break
+                if not self.limiter.allow():
+                    # 超速的消息直接丢弃，只提示一次
+                    self.server.throttled += 1
+                    if not self._throttled:
+                        self._throttled = True
+                        self.send({"type": "error", "message": "操作过于频繁"})
+                    continue
+                self._throttled = False
+                try:
+                    message = parse(data)
+                except ValueError:
+                    self.send({"type": "error", "message": "无法解析的消息"})
+                    continue
+                self.handle(message)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.leave()
+            await self.outbox.close()
+            self.writer.close()
+
+    def handle(self, message):
+        """处理一条客户端消息（先检查消息与字段的类型，客户端发来的值不会被直接用作字典键）"""
+        if not isinstance(message, dict):
+            self.send({"type": "error", "message": "无法解析的消息"})
+            return
+        kind = message.get("type")
+        if kind == "join":
+            self.leave()
+            table = self.server.tables.get(_table_id(message))
+            seat = table.seat_client(self) if table is not None else None
+            if seat is None:
+                self.send({"type": "error", "message": "牌桌不存在或已满"})
+                return
+            self.table, self.seat = table, seat
+            name = message.get("name")
+            self.name = name if isinstance(name, str) and name else None
+            self.joined, self.hands, self.net = time.time(), 0, 0
+            self.first_hand = table.engine.hand_id + 1
+            self.send({"type": "joined", "table": table.table_id, "seat": seat})
+            if self.binary:
+                table.sync_client(self, _resume_seq(message))
+            # 中途入座时补发本手牌的底牌
+            if table.engine.hand_active:
+                self.send({"type": "hole", "to": seat, "seat": seat, "cards": table.engine.holes[seat]})
+        elif kind == "watch":
+            self.leave()
+            table = self.server.tables.get(_table_id(message))
+            if table is None:
+                self.send({"type": "error", "message": "牌桌不存在"})
+                return
+            self.table = table
+            table.add_spectator(self)
+            self.send({"type": "watching", "table": table.table_id})
+            if self.binary:
+                table.sync_client(self, _resume_seq(message))
+        elif kind == "action":
+            if self.seat is None:
+                self.send({"type": "error", "message": "尚未入座"})
+                return
+            action, amount, seq = message.get("action"), message.get("amount"), message.get("seq")
+            if not isinstance(action, str) or action not in ACTIONS:
+                self.send({"type": "error", "message": "未知的行动"})
+                return
+            if amount is not None and not isinstance(amount, int):
+                self.send({"type": "error", "message": "加注额必须是整数"})
+                return
+            self.table.inbox.put(self.seat, action, amount, seq if isinstance(seq, int) else None)
+        elif kind == "leave":
+            self.leave()
+        elif kind == "leaderboard":
+            self.send_ranking(message)
+        else:
+            self.send({"type": "error", "message": f"未知的消息类型: {kind}"})
+
+    def send_ranking(self, message):
+        """回复排行榜查询（一次至多 LEADERBOARD_PAGE 名）"""
+        board, count, start = message.get("board"), message.get("count", 10), message.get("start", 0)
+        leaderboards = self.server.leaderboards
+        if (leaderboards is None or not isinstance(board, str) or board not in BOARDS
+                or not isinstance(count, int) or not isinstance(start, int)):
+            self.send({"type": "error", "message": "无法查询排行榜"})
+            return
+        top = leaderboards.top(board, max(0, min(count, LEADERBOARD_PAGE)), max(0, start))
+        rank = leaderboards.rank(board, self.name) if self.name is not None else None
+        self.send({"type": "ranking", "board": board, "start": max(0, start), "top": [list(entry) for entry in top],
+                   "rank": list(rank) if rank is not None else None})
+
+    def leave(self):
+        """离开当前牌桌"""
+        if self.table is not None:
+            if self.seat is None:
+                self.table.remove_spectator(self)
+            else:
+                balances = self.server.balances
+                if balances is not None:
+                    self.server.record_departure(self.table, self)
+                self.table.unseat_client(self.seat)
+                if balances is not None and self.name is not None:
+                    balances.record_session(self.name, self.table.table_id, self.seat, self.joined, time.time(),
+                                            self.hands, self.net)
+            self.table = None
+            self.seat = None
+
+
+# ==============================================
+# 服务器
+# ==============================================
+
+class GameServer:
+    """多桌服务器：牌桌协程 + TCP监听"""
+
+    def __init__(self, num_tables, think_delay=THINK_DELAY, hand_pause=HAND_PAUSE,
+                 action_timeout=ACTION_TIMEOUT, bot=None, seed=None, max_queue=MAX_QUEUE,
+                 message_rate=MESSAGE_RATE, message_burst=MESSAGE_BURST, snapshot_dir=None,
+                 snapshot_interval=SNAPSHOT_INTERVAL, balance_db=None, balance_flush_interval=FLUSH_INTERVAL,
+                 leaderboard_db=None, leaderboard_interval=PERSIST_INTERVAL, history_archive=None,
+                 ai_service=False):
+        self.num_tables = num_tables
+        self.think_range = think_delay
+        self.hand_pause = hand_pause
+        self.action_timeout = action_timeout
+        self.bot = bot or HeuristicBot()
+        self.seed = seed
+        self.max_queue = max_queue
+        self.message_rate = message_rate
+        self.message_burst = message_burst
+        self.running = False
+        self.tables = {}
+        self.hands_played = 0
+        self.throttled = 0         # 因限速丢弃的客户端消息数
+        self.bot_timeouts = 0      # 插件AI没赶上思考延迟、改用默认行动的次数
+        self.hand_listeners = []   # 每手牌结束时调用 listener(runner)
+        self.history = None        # hand_history.HandHistoryWriter（开启快照时记录每一步）
+        self.snapshots = (Snapshotter(self, snapshot_dir, snapshot_interval, history_archive)
+                          if snapshot_dir else None)
+        self.balance_db = balance_db
+        self.balance_flush_interval = balance_flush_interval
+        self.balances = None       # balances.BalanceStore（start() 时打开）
+        self.leaderboard_db = leaderboard_db
+        self.leaderboard_interval = leaderboard_interval
+        self.leaderboards = None   # leaderboard.LeaderboardAggregator（start() 时创建）
+        self.use_ai_service = ai_service
+        self.ai_service = None     # ai_service.AIServiceClient（start() 时启动）
+        self.timers = AsyncScheduler()
+        self._tasks = []
+        self._server = None
+
+    def think_delay(self, rng):
+        """一次AI思考的延迟"""
+        low, high = self.think_range
+        return low if high <= low else rng.uniform(low, high)
+
+    def hand_finished(self, runner):
+        """某张牌桌打完一手牌"""
+        self.hands_played += 1
+        for listener in self.hand_listeners:
+            listener(runner)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """创建牌桌（开启快照时先从快照与记录尾部恢复）、开始监听；返回实际端口"""
+        self.running = True
+        self.timers.start()
+        self.start_ai_service()
+        if self.balance_db is not None:
+            self.balances = BalanceStore(self.balance_db, self.balance_flush_interval)
+            self.hand_listeners.append(self._record_results)
+        self.leaderboards = LeaderboardAggregator(self.leaderboard_db, self.leaderboard_interval)
+        self.leaderboards.start(self.timers)
+        self.hand_listeners.append(self._record_leaderboards)
+        states = self.snapshots.recover() if self.snapshots is not None else {}
+        master = random.Random(self.seed)
+        for table_id in range(self.num_tables):
+            rng = random.Random(master.getrandbits(64))
+            if table_id in states:
+                self.add_table(TableRunner.restore(self, states[table_id]))
+            else:
+                self.add_table(TableRunner(self, table_id, rng))
+        if self.snapshots is not None:
+            self.snapshots.start()
+        self._server = await asyncio.start_server(self._on_connect, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    def start_ai_service(self):
+        """需要时启动AI决策服务进程"""
+        if self.use_ai_service and self.ai_service is None:
+            self.ai_service = AIServiceClient()
+
+    def _record_results(self, runner):
+        """一手牌结束：把入座真人的输赢放进余额写回队列（这手牌开始后才入座的不计）"""
+        engine = runner.engine
+        for seat, session in runner.clients.items():
+            if engine.hand_id >= session.first_hand:
+                self._settle(session, engine.chips[seat] - engine.hand_start_chips[seat])
+
+    def record_departure(self, runner, session):
+        """真人在一手牌中途离座：已投入底池的筹码记为输掉，座位连同筹码交还AI后的结果与玩家无关"""
+        engine = runner.engine
+        if engine.hand_active and engine.hand_id >= session.first_hand:
+            self._settle(session, engine.chips[session.seat] - engine.hand_start_chips[session.seat])
+
+    def _settle(self, session, net):
+        session.hands += 1
+        session.net += net
+        if session.name is not None:
+            self.balances.add(session.name, net)
+
+    def _record_leaderboards(self, runner):
+        """一手牌结束：入座真人的结果放进排行榜的聚合队列（这手牌开始后才入座的不计）"""
+        hand_id = runner.engine.hand_id
+        players = {seat: session.name for seat, session in runner.clients.items()
+                   if session.name is not None and hand_id >= session.first_hand}
+        if players:
+            self.leaderboards.record_hand(runner.engine, players)
+
+    def add_table(self, runner):
+        """登记牌桌并启动它的协程"""
+        self.tables[runner.table_id] = runner
+        self._tasks.append(asyncio.create_task(runner.run()))
+        return runner
+
+    async def _on_connect(self, reader, writer):
+        await ClientSession(self, reader, writer).serve()
+
+    async def stop(self):
+        """停止监听并结束全部牌桌"""
+        self.running = False
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.snapshots is not None:
+            self.snapshots.stop()
+        if self.balances is not None:
+            # 仍在座的玩家也写入对局记录，然后写完队列
+            for runner in self.tables.values():
+                for session in list(runner.clients.values()):
+                    session.leave()
+            self.hand_listeners.remove(self._record_results)
+            self.balances.close()
+            self.balances = None
+        if self.leaderboards is not None:
+            self.hand_listeners.remove(self._record_leaderboards)
+            self.leaderboards.close()
+        if self.ai_service is not None:
+            self.ai_service.shutdown()
+            self.ai_service = None
+        await self.timers.stop()
+
+    def decisions(self):
+        """全部牌桌已完成的行动数"""
+        return sum(runner.decisions for runner in self.tables.values())
+
+    def action_latency(self):
+        """全部牌桌的真人行动延迟直方图（合并）"""
+        histogram = LatencyHistogram()
+        for runner in self.tables.values():
+            histogram.merge(runner.latency)
+        return histogram
+
+
+async def _serve_forever(args):
+    server = GameServer(args.tables, think_delay=(args.min_delay, args.max_delay), hand_pause=args.pause,
+                        seed=args.seed, snapshot_dir=args.snapshot_dir, snapshot_interval=args.snapshot_interval,
+                        balance_db=args.balance_db, leaderboard_db=args.leaderboard_db,
+                        history_archive=args.history_archive, ai_service=args.ai_service)
+    port = await server.start(args.host, args.port)
+    print(f"🃏 {args.tables} 张牌桌已开局，监听 {args.host}:{port}")
+    try:
+        while True:
+            started, hands = time.perf_counter(), server.hands_played
+            await asyncio.sleep(10)
+            rate = (server.hands_played - hands) / (time.perf_counter() - started)
+            latency = server.action_latency()
+            print(f"  {rate:,.0f} 手/秒，累计 {server.hands_played:,} 手，"
+                  f"真人行动延迟 p50 {latency.percentile(50) * 1000:.1f} / p99 {latency.percentile(99) * 1000:.1f} 毫秒")
+    finally:
+        await server.stop()
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="德州扑克多桌游戏服务器")
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--min-delay", type=float, default=THINK_DELAY[0])
+    parser.add_argument("--max-delay", type=float, default=THINK_DELAY[1])
+    parser.add_argument("--pause", type=float, default=HAND_PAUSE)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--snapshot-dir", default=None, help="快照与牌局记录目录（崩溃后用同一目录重启恢复）")
+    parser.add_argument("--snapshot-interval", type=float, default=SNAPSHOT_INTERVAL)
+    parser.add_argument("--history-archive", default=None,
+                        help="旧牌局记录段的归档目录（默认删除；用 hand_analytics.py 离线统计）")
+    parser.add_argument("--balance-db", default=None, help="玩家余额与对局记录的 SQLite 数据库")
+    parser.add_argument("--leaderboard-db", default=None, help="玩家统计（排行榜）的 SQLite 数据库")
+    parser.add_argument("--ai-service", action="store_true", help="内置AI的决策交给独立的服务进程凑批计算")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
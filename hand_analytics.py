@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 牌局记录批量统计
+对归档的牌局记录（hand_history.py，game_server.py --history-archive）做离线统计:
+  按位置与按玩家的 VPIP / PFR / 摊牌率（WTSD）/ 摊牌胜率（W$SD）/ 每百手赢的大盲数，
+  摊牌频率、底池大小分布，以及各街每种行动的次数与行动者这手牌的平均输赢
+
+归档按字节切成分块，由进程池并行处理（map），每块得到一份可合并的部分统计，
+主进程按完成顺序合并（reduce）。每个分块流式解码，内存只与牌桌数有关，与归档大小无关
+
+分块边界: 除文件开头外，分块从范围内第一条 SYNC 记录开始（hand_history.SYNC_MARKER）；
+一手牌归开局记录所在的分块，分块读到结束位置后只继续重放尚未结束的牌局（必要时读入后面的记录段），
+因此每手牌恰好被统计一次，结果与分块大小无关。记录中没有玩家名字，玩家按 (牌桌, 座位) 区分；
+按钮固定在0号位，座位即位置
+
+用法:
+  python3 hand_analytics.py archive/ --processes 8
+  python3 hand_analytics.py archive/history-00000003.log --csv players.csv
+"""
+
+import os
+import csv
+import sys
+import time
+import argparse
+from multiprocessing import Pool
+
+from cfr_solver import ACTIONS, STREET_NAMES
+from hand_history import HAND, SYNC, SYNC_FRAME, decode_record, replay
+from table_engine import TableEngine
+from wire_protocol import split_frames
+
+# 每个分块的大小（字节）与读取缓冲大小
+CHUNK_SIZE = 32 << 20
+READ_SIZE = 1 << 16
+
+# 底池分布的分档（大盲数的上界，最后一档不设上界）
+POT_BUCKETS = (2, 4, 8, 16, 32, 64, 128, 256)
+
+# 玩家表至少多少手才参与排名
+MIN_HANDS = 100
+
+# 计数器编号（每个玩家 / 位置一组）
+HANDS = 0
+VPIP = 1           # 翻牌前主动入池
+PFR = 2            # 翻牌前加注
+SAW_FLOP = 3
+SHOWDOWNS = 4      # 进入摊牌
+SHOWDOWN_WINS = 5  # 摊牌并赢得筹码
+NET = 6            # 累计输赢（大盲数）
+NUM_COUNTERS = 7
+
+_VOLUNTARY_ACTIONS = ("call", "raise", "all_in")
+_AGGRESSIVE_ACTIONS = ("raise", "all_in")
+
+
+def position_name(seat, num_seats):
+    """座位对应的位置名（按钮固定在0号位，单挑时按钮下大盲）"""
+    if num_seats == 2:
+        return ("BB", "SB")[seat]
+    if seat < 3:
+        return ("BTN", "SB", "BB")[seat]
+    if seat == num_seats - 1 and num_seats >= 5:
+        return "CO"
+    return "UTG" if seat == 3 else f"UTG+{seat - 3}"
+
+
+# ==============================================
+# 可合并的统计
+# ==============================================
+
+class HandStats:
+    """一批牌局的统计；各字段都是计数或总和，merge 后与一次统计全部牌局的结果相同"""
+
+    def __init__(self):
+        self.hands = 0
+        self.incomplete = 0        # 记录中没有结束的牌局（分块或归档末尾），不计入统计
+        self.showdowns = 0
+        self.players = {}          # (牌桌, 座位) -> 计数器
+        self.positions = {}        # 位置名 -> 计数器
+        self.pots = [0] * (len(POT_BUCKETS) + 1)
+        self.pot_total = 0.0       # 底池总和（大盲数）
+        self.actions = {}          # (街, 行动) -> [次数, 行动者这手牌输赢之和（大盲数）]
+
+    def add_hand(self, table_id, engine, actions, saw_flop, hand_end):
+        """统计一手结束的牌；actions 为本手的 [(座位, 街, 行动)]，saw_flop 为看到翻牌的座位"""
+        n = engine.num_seats
+        big_blind = engine.big_blind
+        net = [chips / big_blind for chips in hand_end["net"]]
+        shown = {int(seat) for seat in hand_end["shown"]}
+        flags = [[0] * NUM_COUNTERS for _ in range(n)]
+        for seat, street, action in actions:
+            if street == 0:
+                if action in _VOLUNTARY_ACTIONS:
+                    flags[seat][VPIP] = 1
+                if action in _AGGRESSIVE_ACTIONS:
+                    flags[seat][PFR] = 1
+            entry = self.actions.get((street, action))
+            if entry is None:
+                entry = self.actions[(street, action)] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += net[seat]
+        for seat in saw_flop:
+            flags[seat][SAW_FLOP] = 1
+        for seat in shown:
+            flags[seat][SHOWDOWNS] = 1
+            flags[seat][SHOWDOWN_WINS] = int(hand_end["net"][seat] > 0)
+
+        for seat in range(n):
+            seat_flags = flags[seat]
+            seat_flags[HANDS] = 1
+            seat_flags[NET] = net[seat]
+            for key, table in (((table_id, seat), self.players), (position_name(seat, n), self.positions)):
+                counters = table.get(key)
+                if counters is None:
+                    table[key] = list(seat_flags)
+                else:
+                    for i in range(NUM_COUNTERS):
+                        counters[i] += seat_flags[i]
+
+        self.hands += 1
+        self.showdowns += bool(shown)
+        pot = engine.pot / big_blind
+        self.pot_total += pot
+        bucket = 0
+        while bucket < len(POT_BUCKETS) and pot >= POT_BUCKETS[bucket]:
+            bucket += 1
+        self.pots[bucket] += 1
+
+    def merge(self, other):
+        """把另一份统计加进来（reduce）"""
+        self.hands += other.hands
+        self.incomplete += other.incomplete
+        self.showdowns += other.showdowns
+        for mine, theirs in ((self.players, other.players), (self.positions, other.positions),
+                             (self.actions, other.actions)):
+            for key, values in theirs.items():
+                counters = mine.get(key)
+                if counters is None:
+                    mine[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        counters[i] += value
+        for i, count in enumerate(other.pots):
+            self.pots[i] += count
+        self.pot_total += other.pot_total
+        return self
+
+
+def ratios(counters):
+    """计数器 -> 比例字典（VPIP/PFR 按手数，WTSD 按看到翻牌的手数，W$SD 按摊牌次数）"""
+    hands = counters[HANDS]
+    return {
+        "hands": hands,
+        "vpip": counters[VPIP] / hands if hands else 0.0,
+        "pfr": counters[PFR] / hands if hands else 0.0,
+        "wtsd": counters[SHOWDOWNS] / counters[SAW_FLOP] if counters[SAW_FLOP] else 0.0,
+        "wsd": counters[SHOWDOWN_WINS] / counters[SHOWDOWNS] if counters[SHOWDOWNS] else 0.0,
+        "bb_per_100": counters[NET] * 100 / hands if hands else 0.0,
+    }
+
+
+# ==============================================
+# 分块（map）
+# ==============================================
+
+def archive_files(paths):
+    """命令行给出的文件与目录 -> 按顺序排列的记录段（目录中取 history-*.log，编号补零，按名字排序即按编号）"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.startswith("history-") and name.endswith(".log"))
+        else:
+            files.append(path)
+    return files
+
+
+def plan_chunks(files, chunk_size=CHUNK_SIZE):
+    """把每个记录段按字节切成 (文件序号, 开始, 结束) 的分块"""
+    chunks = []
+    for index, path in enumerate(files):
+        size = os.path.getsize(path)
+        for start in range(0, size, chunk_size):
+            chunks.append((index, start, min(start + chunk_size, size)))
+    return chunks
+
+
+def _find_sync(f, offset):
+    """文件中 offset 之后第一条 SYNC 记录的位置；没有时返回文件大小"""
+    f.seek(offset)
+    window = b""
+    while True:
+        data = f.read(READ_SIZE)
+        if not data:
+            return offset + len(window)
+        window += data
+        found = window.find(SYNC_FRAME)
+        if found >= 0:
+            return offset + found
+        drop = max(0, len(window) - len(SYNC_FRAME) + 1)   # 保留可能是标记前半段的尾部
+        offset += drop
+        window = window[drop:]
+
+
+def _frames(files, index, offset):
+    """从 (文件序号, 位置) 开始依次读取记录段，产出 (文件序号, 位置, 记录内容)"""
+    for index in range(index, len(files)):
+        with open(files[index], "rb") as f:
+            f.seek(offset)
+            position = offset
+            buffer = b""
+            while True:
+                data = f.read(READ_SIZE)
+                if not data:
+                    break
+                payloads, buffer = split_frames(buffer + data)
+                for payload in payloads:
+                    yield index, position, payload
+                    size = len(payload)
+                    position += size + 1 + (size >= 0x80) + (size >= 0x4000)
+        offset = 0
+
+
+def analyze_chunk(task):
+    """统计一个分块中开局的全部牌局（进程池的工作函数），返回 HandStats"""
+    files, index, start, end = task
+    stats = HandStats()
+    if start:
+        with open(files[index], "rb") as f:
+            start = _find_sync(f, start)
+        if start >= end:
+            return stats
+
+    engines = {}    # 牌桌 -> TableEngine（同一牌桌的牌局复用）
+    open_hands = {}  # 牌桌 -> (本手行动, 看到翻牌的座位)
+    finished = False  # 已读到分块结束位置：不再开始新的牌局
+    for file_index, position, payload in _frames(files, index, start):
+        kind = payload[0]
+        if file_index != index or (kind == SYNC and position >= end):
+            finished = True
+        if finished and not open_hands:
+            break
+        if kind == SYNC:
+            continue
+        try:
+            record = decode_record(payload)
+        except ValueError:
+            stats.incomplete += 1   # 损坏的记录：无法得知所属牌桌，跳过
+            continue
+        table_id = record[1]
+        if kind == HAND:
+            if finished:
+                continue
+            if table_id in open_hands:
+                stats.incomplete += 1
+            _, _, _, small_blind, big_blind, stacks, _ = record
+            engine = engines.get(table_id)
+            if (engine is None or engine.num_seats != len(stacks) or engine.small_blind != small_blind
+                    or engine.big_blind != big_blind):
+                engine = engines[table_id] = TableEngine(table_id, stacks, small_blind, big_blind)
+            hand = open_hands[table_id] = ([], [])
+            street = 0
+        else:
+            hand = open_hands.get(table_id)
+            if hand is None:
+                continue     # 上一个分块开局的牌局
+            engine = engines[table_id]
+            street = engine.street
+        try:
+            events = replay(engine, record)
+        except ValueError:
+            del open_hands[table_id]
+            stats.incomplete += 1
+            continue
+        actions, saw_flop = hand
+        for event in events:
+            event_type = event["type"]
+            if event_type == "action":
+                actions.append((event["seat"], street, event["action"]))
+            elif event_type == "street":
+                street += 1
+                if street == 1:
+                    saw_flop.extend(seat for seat in range(engine.num_seats) if not engine.folded[seat])
+            elif event_type == "hand_end":
+                stats.add_hand(table_id, engine, actions, saw_flop, event)
+                del open_hands[table_id]
+    stats.incomplete += len(open_hands)
+    return stats
+
+
+# ==============================================
+# 合并（reduce）与报告
+# ==============================================
+
+def analyze(paths, processes=None, chunk_size=CHUNK_SIZE, progress=False):
+    """统计归档中的全部牌局；processes 为1时在本进程内处理"""
+    files = archive_files(paths)
+    tasks = [(files, index, start, end) for index, start, end in plan_chunks(files, chunk_size)]
+    stats = HandStats()
+    started = time.perf_counter()
+    if processes == 1:
+        results = map(analyze_chunk, tasks)
+        pool = None
+    else:
+        pool = Pool(processes)
+        results = pool.imap_unordered(analyze_chunk, tasks)
+    try:
+        for done, partial in enumerate(results, 1):
+            stats.merge(partial)
+            if progress:
+                elapsed = time.perf_counter() - started
+                print(f"  {done}/{len(tasks)} 块  {stats.hands:,} 手  {stats.hands / max(elapsed, 1e-9):,.0f} 手/秒",
+                      file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return stats
+
+
+def format_report(stats, top=10, min_hands=MIN_HANDS):
+    """统计结果 -> 文本报告"""
+    lines = [f"共 {stats.hands:,} 手（未结束 {stats.incomplete:,} 手），"
+             f"摊牌 {stats.showdowns / max(stats.hands, 1):.1%}，平均底池 {stats.pot_total / max(stats.hands, 1):.1f} 大盲"]
+
+    lines.append("\n按位置:")
+    lines.append(f"  {'位置':<6}{'手数':>10}{'VPIP':>8}{'PFR':>8}{'WTSD':>8}{'W$SD':>8}{'bb/100':>9}")
+    order = ["BTN", "SB", "BB", "UTG"] + [f"UTG+{i}" for i in range(1, 8)] + ["CO"]
+    for name in sorted(stats.positions, key=lambda name: order.index(name) if name in order else len(order)):
+        r = ratios(stats.positions[name])
+        lines.append(f"  {name:<6}{r['hands']:>10,}{r['vpip']:>8.1%}{r['pfr']:>8.1%}{r['wtsd']:>8.1%}"
+                     f"{r['wsd']:>8.1%}{r['bb_per_100']:>9.1f}")
+
+    lines.append("\n底池大小（大盲）:")
+    bounds = (0,) + POT_BUCKETS
+    for i, count in enumerate(stats.pots):
+        label = f"{bounds[i]}-{POT_BUCKETS[i]}" if i < len(POT_BUCKETS) else f">={bounds[i]}"
+        share = count / max(stats.hands, 1)
+        lines.append(f"  {label:>8} {count:>10,} {share:>6.1%} {'█' * round(share * 40)}")
+
+    lines.append("\n行动结果（行动者这手牌的平均输赢，大盲）:")
+    for street, street_name in enumerate(STREET_NAMES):
+        cells = []
+        for action in ACTIONS:
+            entry = stats.actions.get((street, action))
+            if entry:
+                cells.append(f"{action} {entry[0]:,} 次 {entry[1] / entry[0]:+.2f}")
+        if cells:
+            lines.append(f"  {street_name:<8}" + "，".join(cells))
+
+    ranked = [(ratios(counters)["bb_per_100"], key) for key, counters in stats.players.items()
+              if counters[HANDS] >= min_hands]
+    ranked.sort(reverse=True)
+    if ranked:
+        lines.append(f"\n玩家（至少 {min_hands} 手，共 {len(ranked):,} 名）按 bb/100:")
+        shown = ranked[:top] + ([None] if len(ranked) > 2 * top else []) + ranked[max(top, len(ranked) - top):]
+        for entry in shown:
+            if entry is None:
+                lines.append("  ...")
+                continue
+            rate, (table_id, seat) = entry
+            r = ratios(stats.players[(table_id, seat)])
+            lines.append(f"  牌桌{table_id}:{seat}  {r['hands']:>8,} 手  VPIP {r['vpip']:.1%}  PFR {r['pfr']:.1%}  "
+                         f"{rate:+.1f} bb/100")
+    return "\n".join(lines)
+
+
+def write_csv(stats, path):
+    """每个玩家一行写入 CSV"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["table", "seat", "hands", "vpip", "pfr", "wtsd", "wsd", "bb_per_100"])
+        for (table_id, seat), counters in sorted(stats.players.items()):
+            r = ratios(counters)
+            writer.writerow([table_id, seat, r["hands"], f"{r['vpip']:.4f}", f"{r['pfr']:.4f}", f"{r['wtsd']:.4f}",
+                             f"{r['wsd']:.4f}", f"{r['bb_per_100']:.2f}"])
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="牌局记录批量统计")
+    parser.add_argument("paths", nargs="+", help="记录段文件或归档目录")
+    parser.add_argument("--processes", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="分块大小（字节）")
+    parser.add_argument("--top", type=int, default=10, help="玩家表显示前后各多少名")
+    parser.add_argument("--min-hands", type=int, default=MIN_HANDS, help="玩家表的最少手数")
+    parser.add_argument("--csv", default=None, help="把每个玩家的统计写入 CSV 文件")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stats = analyze(args.paths, args.processes, args.chunk_size, progress=True)
+    elapsed = time.perf_counter() - started
+    print(format_report(stats, args.top, args.min_hands))
+    print(f"\n用时 {elapsed:.1f} 秒（{stats.hands / max(elapsed, 1e-9):,.0f} 手/秒）")
+    if args.csv:
+        write_csv(stats, args.csv)
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 翻牌后期望牌力分桶
+离线：为每个同构的 翻牌/转牌/河牌 局面计算期望牌力(EHS)与听牌潜力，
+聚类为若干分桶，写成紧凑的内存映射表
+运行时：AI每次决策只需一次索引查表
+
+用法: python3 hand_buckets.py --street flop --buckets 50 --samples 200
+
+离线计算量（单核参考值，按 --processes 近似线性缩短）：
+  flop   1,286,792 个局面，蒙特卡洛约 380 局面/秒（200 样本）≈ 1 小时
+  turn  13,960,050 个局面，蒙特卡洛约 400 局面/秒（200 样本）≈ 10 小时
+  river 123,156,254 个局面，不抽样：按 134,459 种同构公共牌整块精确计算
+        （NumPy 批量评估），约 7 分钟；--samples 对河牌无效
+样本数每减半，翻牌/转牌用时减半；需要快速出表时可用 --samples 50。
+内存：河牌特征文件 246 MB（每个局面2字节），以内存映射方式写入，
+各进程另需约 100 MB；聚类只流式读一遍特征文件统计直方图。
+"""
+
+import os
+import sys
+import mmap
+import time
+import random
+import struct
+import argparse
+from multiprocessing import Pool
+from itertools import combinations
+
+from hand_indexer import DECK_SIZE, HandIndexer, cards_to_ints, get_street_indexer, BOARD_SIZE_TO_STREET
+from hand_evaluator import evaluate, evaluate_batch, CATEGORY_SHIFT
+
+# ==============================================
+# 表文件格式
+# ==============================================
+
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "tables")
+TABLE_MAGIC = b"HBKT"
+TABLE_VERSION = 1
+STREETS = ["preflop", "flop", "turn", "river"]
+
+# 魔数, 版本, 街道编号, 分桶数, 条目数
+_HEADER = struct.Struct("<4sBBHI")
+# 每个分桶的中心：期望牌力, 潜力
+_CENTROID = struct.Struct("<ff")
+
+# 特征量化为 256 级，一个局面占两个字节
+QUANT_LEVELS = 256
+MAX_BUCKETS = 256
+
+
+def table_path(street, table_dir=TABLE_DIR):
+    """分桶表文件路径"""
+    return os.path.join(table_dir, f"buckets_{street}.bin")
+
+
+def features_path(street, table_dir=TABLE_DIR, samples=200, seed=0, limit=None):
+    """中间特征文件路径（保留以便换分桶数时重新聚类）；文件名带上计算参数，参数不同时不会误用旧特征"""
+    suffix = "" if limit is None else f"_n{limit}"
+    return os.path.join(table_dir, f"features_{street}_s{samples}_r{seed}{suffix}.u8")
+
+
+def quantize_features(ehs, potential):
+    """把 (期望牌力 0-1, 潜力 -1-1) 量化为两个字节"""
+    q_ehs = min(QUANT_LEVELS - 1, max(0, int(ehs * QUANT_LEVELS)))
+    q_pot = min(QUANT_LEVELS - 1, max(0, int((potential + 1.0) * QUANT_LEVELS / 2)))
+    return q_ehs, q_pot
+
+
+def dequantize_features(q_ehs, q_pot):
+    """量化格子的中心值"""
+    return (q_ehs + 0.5) / QUANT_LEVELS, (q_pot + 0.5) * 2 / QUANT_LEVELS - 1.0
+
+
+# ==============================================
+# 运行时查表
+# ==============================================
+
+class HandBucketTable:
+    """只读的内存映射分桶表"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise
+
+        magic, version, street_code, num_buckets, entries = _HEADER.unpack_from(self._mmap, 0)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            self.close()
+            raise ValueError(f"无效的分桶表文件: {path}")
+
+        self.street = STREETS[street_code]
+        self.num_buckets = num_buckets
+        self.entries = entries
+        self.centroids = [
+            _CENTROID.unpack_from(self._mmap, _HEADER.size + i * _CENTROID.size)
+            for i in range(num_buckets)
+        ]
+        self._data_offset = _HEADER.size + num_buckets * _CENTROID.size
+        self.indexer = get_street_indexer(self.street)
+
+    def bucket(self, index):
+        """按同构索引取分桶编号，超出表范围返回None"""
+        if index >= self.entries:
+            return None
+        return self._mmap[self._data_offset + index]
+
+    def lookup(self, cards):
+        """按整数牌（底牌在前）取分桶编号"""
+        return self.bucket(self.indexer.index(cards))
+
+    def strength(self, bucket):
+        """分桶中心的期望牌力（0-1）"""
+        return self.centroids[bucket][0]
+
+    def close(self):
+        """释放映射"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+_loaded_tables = {}
+
+
+def get_bucket_table(street, table_dir=TABLE_DIR):
+    """获取某条街的分桶表；文件不存在时返回None（结果会被缓存）"""
+    key = (street, table_dir)
+    if key not in _loaded_tables:
+        path = table_path(street, table_dir)
+        _loaded_tables[key] = HandBucketTable(path) if os.path.exists(path) else None
+    return _loaded_tables[key]
+
+
+def table_strength(hole, board, table_dir=TABLE_DIR):
+    """整数牌 -> 分桶表中的期望牌力；翻牌前或无表时返回None"""
+    street = BOARD_SIZE_TO_STREET.get(len(board))
+    if street is None or street == "preflop":
+        return None
+
+    table = get_bucket_table(street, table_dir)
+    if table is None:
+        return None
+
+    bucket = table.lookup(list(hole) + list(board))
+    if bucket is None:
+        return None
+    return table.strength(bucket)
+
+
+def postflop_strength(hand, community_cards, table_dir=TABLE_DIR):
+    """Card对象手牌+公共牌 -> 期望牌力；翻牌前或无表时返回None"""
+    if not community_cards:
+        return None
+    return table_strength(cards_to_ints(hand), cards_to_ints(community_cards), table_dir)
+
+
+# ==============================================
+# 启发式牌力（无表时的退路）
+# ==============================================
+
+# 各成牌类别对随机手牌的大致胜率
+_CATEGORY_EQUITY = [0.35, 0.6, 0.8, 0.88, 0.92, 0.94, 0.97, 0.99, 1.0]
+
+
+def hole_card_strength(hole):
+    """两张底牌的启发式强度（0-1）"""
+    ranks = [(card >> 2) + 2 for card in hole]
+
+    # 高牌
+    max_rank = max(ranks)
+    high_card_strength = (max_rank - 2) / 12.0  # 2-14映射到0-1
+
+    # 对子
+    pair_strength = 0
+    if ranks[0] == ranks[1]:
+        pair_strength = 0.3 + (max_rank - 2) / 12.0 * 0.3
+
+    # 同花潜力
+    flush_potential = 0
+    if hole[0] & 3 == hole[1] & 3:
+        flush_potential = 0.2
+
+    # 连牌潜力
+    straight_potential = 0
+    rank_diff = abs(ranks[0] - ranks[1])
+    if rank_diff <= 4:
+        straight_potential = 0.2 - (rank_diff * 0.05)
+
+    return min(1.0, high_card_strength + pair_strength + flush_potential + straight_potential)
+
+
+def card_strength(hole, board, table_dir=TABLE_DIR):
+    """整数牌的强度（0-1）：翻牌前用底牌启发式，翻牌后查表，缺表时按成牌类别粗估"""
+    if not board:
+        return hole_card_strength(hole)
+
+    strength = table_strength(hole, board, table_dir)
+    if strength is not None:
+        return strength
+
+    category = evaluate(list(hole) + list(board)) >> CATEGORY_SHIFT
+    return min(1.0, _CATEGORY_EQUITY[category] + (hole_card_strength(hole) - 0.5) * 0.1)
+
+
+# ==============================================
+# 离线特征计算
+# ==============================================
+
+def hand_features(hole, board, samples, rng):
+    """蒙特卡洛估计 (期望牌力, 潜力)
+
+    期望牌力：随机补全公共牌后对一个随机对手的胜率（平局算半）
+    潜力：期望牌力减去按当前公共牌比较的即时牌力，听牌为正、易被反超为负
+    """
+    dead = set(hole)
+    dead.update(board)
+    deck = [card for card in range(DECK_SIZE) if card not in dead]
+    missing = 5 - len(board)
+    mine_now = evaluate(hole + board)
+
+    now_total = 0.0
+    final_total = 0.0
+    for _ in range(samples):
+        drawn = rng.sample(deck, 2 + missing)
+        opponent = drawn[:2]
+
+        opp_now = evaluate(opponent + board)
+        now_total += 1.0 if mine_now > opp_now else 0.5 if mine_now == opp_now else 0.0
+
+        if missing:
+            runout = board + drawn[2:]
+            mine = evaluate(hole + runout)
+            opp = evaluate(opponent + runout)
+            final_total += 1.0 if mine > opp else 0.5 if mine == opp else 0.0
+        else:
+            final_total += 1.0 if mine_now > opp_now else 0.5 if mine_now == opp_now else 0.0
+
+    ehs = final_total / samples
+    return ehs, ehs - now_total / samples
+
+
+def _features_worker(task):
+    """进程池任务：计算一段索引的量化特征"""
+    street, start, stop, samples, seed = task
+    indexer = get_street_indexer(street)
+    rng = random.Random(seed)
+    out = bytearray(2 * (stop - start))
+    pos = 0
+    for index in range(start, stop):
+        cards = indexer.unindex(index)
+        ehs, potential = hand_features(cards[:2], cards[2:], samples, rng)
+        out[pos], out[pos + 1] = quantize_features(ehs, potential)
+        pos += 2
+    return bytes(out)
+
+
+# 河牌：全部 C(52,2) 种底牌，以及每张牌所在的 51 种底牌（按底牌序号排列）
+_HOLES = list(combinations(range(DECK_SIZE), 2))
+_HOLES_WITH = [[h for h, hole in enumerate(_HOLES) if card in hole] for card in range(DECK_SIZE)]
+# 底牌 (a, b) 在 _HOLES_WITH[a] / _HOLES_WITH[b] 中的位置
+_HOLE_SLOTS = [(_HOLES_WITH[a].index(h), _HOLES_WITH[b].index(h)) for h, (a, b) in enumerate(_HOLES)]
+# 一副牌去掉5张公共牌后：与公共牌重叠的底牌数、含某张活牌且与公共牌重叠的底牌数、对手底牌数
+_BLOCKED = len(_HOLES) - (DECK_SIZE - 5) * (DECK_SIZE - 6) // 2
+_BLOCKED_WITH = 5
+_OPPONENTS = (DECK_SIZE - 7) * (DECK_SIZE - 8) // 2
+_SCORE_SPAN = 1 << (CATEGORY_SHIFT + 4)   # 大于任何牌型分值
+
+
+def _rank_in_rows(np, scores):
+    """每行内：严格小于本元素的个数、与本元素相等的个数（含自身）"""
+    rows, width = scores.shape
+    offset = np.arange(rows, dtype=np.int64)[:, None] * _SCORE_SPAN
+    ordered = (np.sort(scores, axis=1) + offset).ravel()
+    keys = (scores + offset).ravel()
+    start = np.repeat(np.arange(rows, dtype=np.int64) * width, width)
+    less = np.searchsorted(ordered, keys, side="left")
+    equal = np.searchsorted(ordered, keys, side="right") - less
+    return (less - start).reshape(rows, width), equal.reshape(rows, width)
+
+
+def river_features_batch(boards):
+    """河牌精确特征：boards 为 (B, 5) 的公共牌数组
+
+    对每块公共牌评估全部底牌，按牌力排序后用容斥扣除与本手底牌共用一张牌的对手，
+    得到对全部 990 种对手底牌的胜率（平局算半）；河牌潜力为0。
+    返回 (底牌+公共牌 的 (N, 7) 数组, 期望牌力 (N,))，只含与公共牌不重叠的底牌
+    """
+    import numpy as np
+
+    boards = np.asarray(boards, dtype=np.int64)
+    holes = np.array(_HOLES, dtype=np.int64)
+    count = len(boards)
+    dead = np.zeros((count, DECK_SIZE), dtype=bool)
+    dead[np.arange(count)[:, None], boards] = True
+    live = ~(dead[:, holes[:, 0]] | dead[:, holes[:, 1]])
+
+    rows, cols = np.nonzero(live)
+    cards = np.concatenate([holes[cols], boards[rows]], axis=1)
+    scores = np.full((count, len(holes)), -1, dtype=np.int64)   # 与公共牌重叠的底牌排在最前
+    scores[rows, cols] = evaluate_batch(cards)
+
+    less, equal = _rank_in_rows(np, scores)
+    with_card = np.array(_HOLES_WITH, dtype=np.int64)
+    less_with, equal_with = (a.reshape(count, DECK_SIZE, -1)
+                             for a in _rank_in_rows(np, scores[:, with_card].reshape(count * DECK_SIZE, -1)))
+    first, second = holes[cols, 0], holes[cols, 1]
+    at_first, at_second = np.array(_HOLE_SLOTS, dtype=np.int64)[cols].T
+
+    wins = (less[rows, cols] - _BLOCKED
+            - (less_with[rows, first, at_first] - _BLOCKED_WITH)
+            - (less_with[rows, second, at_second] - _BLOCKED_WITH))
+    ties = equal[rows, cols] - equal_with[rows, first, at_first] - equal_with[rows, second, at_second] + 1
+    return cards, (wins + 0.5 * ties) / _OPPONENTS
+
+
+def _river_worker(task):
+    """进程池任务：计算若干同构公共牌上的全部河牌局面，写入内存映射的特征文件"""
+    import numpy as np
+
+    path, boards, entries = task
+    board_indexer = HandIndexer((5,))
+    cards, ehs = river_features_batch(board_indexer.unindex_batch(boards))
+    indices = get_street_indexer("river").index_batch(cards)
+    keep = indices < entries
+    features = np.memmap(path, dtype=np.uint8, mode="r+", shape=(entries, 2))
+    # 同构的局面会从不同公共牌各算一次，结果相同，重复写入无妨
+    features[indices[keep], 0] = np.minimum(QUANT_LEVELS - 1, (ehs[keep] * QUANT_LEVELS).astype(np.int64))
+    features[indices[keep], 1] = quantize_features(0.0, 0.0)[1]
+    features.flush()
+    return len(boards)
+
+
+def build_river_features(path, processes=None, chunk_size=64, limit=None):
+    """河牌特征：按同构公共牌分块精确计算；limit 时只算覆盖前 limit 个局面所需的公共牌，
+    processes 为1时在本进程内计算"""
+    import numpy as np
+
+    indexer = get_street_indexer("river")
+    board_indexer = HandIndexer((5,))
+    total = indexer.size if limit is None else min(limit, indexer.size)
+    if limit is None:
+        boards = np.arange(board_indexer.size)
+    else:
+        boards = np.unique(board_indexer.index_batch(indexer.unindex_batch(np.arange(total))[:, 2:]))
+    with open(path, "wb") as out:
+        out.truncate(2 * total)
+    tasks = [(path, boards[start:start + chunk_size], total) for start in range(0, len(boards), chunk_size)]
+
+    started = time.perf_counter()
+    done = 0
+    pool = None if processes == 1 else Pool(processes)
+    try:
+        for count in map(_river_worker, tasks) if pool is None else pool.imap_unordered(_river_worker, tasks):
+            done += count
+            if done % (chunk_size * 256) < chunk_size or done == len(boards):
+                elapsed = time.perf_counter() - started
+                print(f"  river: {done:,}/{len(boards):,} 种公共牌  {done / max(elapsed, 1e-9):,.0f} 种/秒")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return total
+
+
+def build_features(street, path, samples=200, processes=None, chunk_size=4096, seed=0, limit=None):
+    """多进程计算整条街的特征并按索引顺序写入文件（河牌不抽样，见 build_river_features）"""
+    if street == "river":
+        return build_river_features(path, processes, limit=limit)
+    indexer = get_street_indexer(street)
+    total = indexer.size if limit is None else min(limit, indexer.size)
+    tasks = [
+        (street, start, min(start + chunk_size, total), samples, seed + start)
+        for start in range(0, total, chunk_size)
+    ]
+
+    started = time.perf_counter()
+    done = 0
+    with Pool(processes) as pool, open(path, "wb") as out:
+        for data in pool.imap(_features_worker, tasks):
+            out.write(data)
+            done += len(data) // 2
+            if done % (chunk_size * 64) < chunk_size or done == total:
+                elapsed = time.perf_counter() - started
+                print(f"  {street}: {done:,}/{total:,} 局面  {done / max(elapsed, 1e-9):,.0f} 局面/秒")
+    return total
+
+
+# ==============================================
+# 聚类与写表
+# ==============================================
+
+def _feature_histogram(path, chunk_size=1 << 20):
+    """流式统计量化特征的二维直方图"""
+    histogram = [0] * (QUANT_LEVELS * QUANT_LEVELS)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size * 2)
+            if not data:
+                break
+            for i in range(0, len(data), 2):
+                histogram[data[i] * QUANT_LEVELS + data[i + 1]] += 1
+    return histogram
+
+
+def _nearest(point, centroids):
+    """最近的中心编号"""
+    x, y = point
+    best = 0
+    best_dist = float("inf")
+    for i, (cx, cy) in enumerate(centroids):
+        dist = (x - cx) ** 2 + (y - cy) ** 2
+        if dist < best_dist:
+            best = i
+            best_dist = dist
+    return best
+
+
+def weighted_kmeans(points, weights, k, iterations=30, seed=0):
+    """加权k-means（k-means++初始化），返回按期望牌力升序的中心"""
+    rng = random.Random(seed)
+    k = min(k, len(points))
+
+    centroids = [points[rng.choices(range(len(points)), weights=weights)[0]]]
+    min_dists = [float("inf")] * len(points)
+    while len(centroids) < k:
+        cx, cy = centroids[-1]
+        for i, (x, y) in enumerate(points):
+            dist = (x - cx) ** 2 + (y - cy) ** 2
+            if dist < min_dists[i]:
+                min_dists[i] = dist
+        scores = [d * w for d, w in zip(min_dists, weights)]
+        if sum(scores) <= 0:
+            break
+        centroids.append(points[rng.choices(range(len(points)), weights=scores)[0]])
+
+    for _ in range(iterations):
+        sums = [[0.0, 0.0, 0.0] for _ in centroids]
+        for point, w in zip(points, weights):
+            acc = sums[_nearest(point, centroids)]
+            acc[0] += point[0] * w
+            acc[1] += point[1] * w
+            acc[2] += w
+        updated = [(sx / sw, sy / sw) if sw > 0 else c for (sx, sy, sw), c in zip(sums, centroids)]
+        if updated == centroids:
+            break
+        centroids = updated
+
+    return sorted(centroids)
+
+
+def fit_buckets(path, num_buckets, iterations=30, seed=0):
+    """对特征文件聚类，返回 (中心列表, 量化格子 -> 分桶编号 映射)"""
+    if not 1 <= num_buckets <= MAX_BUCKETS:
+        raise ValueError(f"分桶数需在 1-{MAX_BUCKETS} 之间: {num_buckets}")
+
+    histogram = _feature_histogram(path)
+    cells = [cell for cell, count in enumerate(histogram) if count]
+    points = [dequantize_features(cell // QUANT_LEVELS, cell % QUANT_LEVELS) for cell in cells]
+    weights = [histogram[cell] for cell in cells]
+
+    centroids = weighted_kmeans(points, weights, num_buckets, iterations, seed)
+
+    cell_map = bytearray(QUANT_LEVELS * QUANT_LEVELS)
+    for cell, point in zip(cells, points):
+        cell_map[cell] = _nearest(point, centroids)
+    return centroids, cell_map
+
+
+def write_bucket_table(path, street, centroids, cell_map, features_file, chunk_size=1 << 20):
+    """按聚类结果把特征文件转换为分桶表"""
+    entries = os.path.getsize(features_file) // 2
+    with open(path, "wb") as out, open(features_file, "rb") as f:
+        out.write(_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, STREETS.index(street), len(centroids), entries))
+        for ehs, potential in centroids:
+            out.write(_CENTROID.pack(ehs, potential))
+        while True:
+            data = f.read(chunk_size * 2)
+            if not data:
+                break
+            out.write(bytes(cell_map[data[i] * QUANT_LEVELS + data[i + 1]] for i in range(0, len(data), 2)))
+    return entries
+
+
+def build_street(street, num_buckets=50, samples=200, processes=None, table_dir=TABLE_DIR,
+                 limit=None, recompute=False, seed=0):
+    """完整流水线：特征 -> 聚类 -> 写表"""
+    os.makedirs(table_dir, exist_ok=True)
+    feature_file = features_path(street, table_dir, samples, seed, limit)
+
+    if recompute or not os.path.exists(feature_file):
+        print(f"计算 {street} 特征...")
+        build_features(street, feature_file, samples, processes, seed=seed, limit=limit)
+    else:
+        print(f"复用已有特征文件: {feature_file}")
+
+    print(f"聚类为 {num_buckets} 个分桶...")
+    centroids, cell_map = fit_buckets(feature_file, num_buckets, seed=seed)
+
+    output = table_path(street, table_dir)
+    entries = write_bucket_table(output, street, centroids, cell_map, feature_file)
+    size_mb = os.path.getsize(output) / (1024 * 1024)
+    print(f"✅ 已写入 {output}: {entries:,} 条目, {size_mb:.1f} MB")
+    return output
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="生成翻牌后期望牌力分桶表")
+    parser.add_argument("--street", choices=STREETS[1:], action="append",
+                        help="要生成的街道（可重复，默认全部）")
+    parser.add_argument("--buckets", type=int, default=50, help="分桶数 (1-256)")
+    parser.add_argument("--samples", type=int, default=200, help="每个局面的蒙特卡洛样本数（翻牌/转牌）")
+    parser.add_argument("--processes", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--output", default=TABLE_DIR, help="输出目录")
+    parser.add_argument("--limit", type=int, default=None, help="只计算前N个局面（调试用）")
+    parser.add_argument("--recompute", action="store_true", help="忽略已有特征文件重新计算")
+    args = parser.parse_args()
+
+    for street in args.street or STREETS[1:]:
+        build_street(street, args.buckets, args.samples, args.processes,
+                     args.output, args.limit, args.recompute)
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
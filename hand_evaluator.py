@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 牌型评估器
+对 5-7 张整数牌（见 hand_indexer 的编码）求最佳五张牌型，
+返回可直接比较大小的整数分值
+"""
+
+from hand_indexer import RANK_COUNT, card_to_int
+
+# ==============================================
+# 牌型类别（与 main.HandType 的取值相差1）
+# ==============================================
+
+HIGH_CARD = 0
+ONE_PAIR = 1
+TWO_PAIR = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+
+CATEGORY_SHIFT = 26
+
+_POPCOUNT = [bin(mask).count("1") for mask in range(1 << RANK_COUNT)]
+
+
+def _build_straight_table():
+    """点数掩码 -> 最大顺子的顶张点数+1（无顺子为0）"""
+    table = [0] * (1 << RANK_COUNT)
+    straights = [(0b11111 << low, low + 5) for low in range(RANK_COUNT - 4)]
+    wheel = (1 << 12) | 0b1111  # A2345
+    for mask in range(1 << RANK_COUNT):
+        best = 4 if mask & wheel == wheel else 0
+        for pattern, top in straights:
+            if mask & pattern == pattern:
+                best = top
+        table[mask] = best
+    return table
+
+
+_STRAIGHT_TOP = _build_straight_table()
+
+
+def _keep_top(mask, count):
+    """保留掩码中最高的 count 位"""
+    while _POPCOUNT[mask] > count:
+        mask &= mask - 1
+    return mask
+
+
+def evaluate(cards):
+    """评估整数牌，分值越大牌越好"""
+    suit_masks = [0, 0, 0, 0]
+    counts = [0] * RANK_COUNT
+    for code in cards:
+        rank = code >> 2
+        suit_masks[code & 3] |= 1 << rank
+        counts[rank] += 1
+
+    # 不超过7张牌时，同花与四条/葫芦不可能同时出现
+    for mask in suit_masks:
+        if _POPCOUNT[mask] >= 5:
+            top = _STRAIGHT_TOP[mask]
+            if top:
+                return (STRAIGHT_FLUSH << CATEGORY_SHIFT) | top
+            return (FLUSH << CATEGORY_SHIFT) | _keep_top(mask, 5)
+
+    rank_mask = suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3]
+    quad = -1
+    trips = []
+    pairs = []
+    for rank in range(RANK_COUNT - 1, -1, -1):
+        n = counts[rank]
+        if n == 4:
+            quad = rank
+        elif n == 3:
+            trips.append(rank)
+        elif n == 2:
+            pairs.append(rank)
+
+    if quad >= 0:
+        kicker = _keep_top(rank_mask & ~(1 << quad), 1)
+        return (FOUR_OF_A_KIND << CATEGORY_SHIFT) | (quad << 13) | kicker
+
+    if trips and (len(trips) > 1 or pairs):
+        pair = trips[1] if len(trips) > 1 else -1
+        if pairs and pairs[0] > pair:
+            pair = pairs[0]
+        return (FULL_HOUSE << CATEGORY_SHIFT) | (trips[0] << 4) | pair
+
+    top = _STRAIGHT_TOP[rank_mask]
+    if top:
+        return (STRAIGHT << CATEGORY_SHIFT) | top
+
+    if trips:
+        kickers = _keep_top(rank_mask & ~(1 << trips[0]), 2)
+        return (THREE_OF_A_KIND << CATEGORY_SHIFT) | (trips[0] << 13) | kickers
+
+    if len(pairs) >= 2:
+        kickers = _keep_top(rank_mask & ~(1 << pairs[0]) & ~(1 << pairs[1]), 1)
+        return (TWO_PAIR << CATEGORY_SHIFT) | (pairs[0] << 17) | (pairs[1] << 13) | kickers
+
+    if pairs:
+        kickers = _keep_top(rank_mask & ~(1 << pairs[0]), 3)
+        return (ONE_PAIR << CATEGORY_SHIFT) | (pairs[0] << 13) | kickers
+
+    return (HIGH_CARD << CATEGORY_SHIFT) | _keep_top(rank_mask, 5)
+
+
+def evaluate_cards(cards):
+    """评估Card对象列表"""
+    return evaluate([card_to_int(card) for card in cards])
+
+
+def hand_category(score):
+    """分值对应的牌型类别（HIGH_CARD ... STRAIGHT_FLUSH）"""
+    return score >> CATEGORY_SHIFT
+
+
+def hand_type_value(score):
+    """分值对应的 main.HandType 取值（1-10，皇家同花顺为10）"""
+    category = hand_category(score)
+    if category == STRAIGHT_FLUSH and score & 0xF == RANK_COUNT:
+        return 10
+    return category + 1
+
+
+# ==============================================
+# 批量评估（NumPy，供离线工具使用）
+# ==============================================
+
+_batch_tables = None
+
+
+def _get_batch_tables(np):
+    """批量评估用的查找表：顺子顶张、位数、保留最高k位"""
+    global _batch_tables
+    if _batch_tables is None:
+        size = 1 << RANK_COUNT
+        keep = {k: np.array([_keep_top(mask, k) for mask in range(size)], dtype=np.int64)
+                for k in (1, 2, 3, 5)}
+        _batch_tables = (
+            np.array(_STRAIGHT_TOP, dtype=np.int64),
+            np.array(_POPCOUNT, dtype=np.int64),
+            keep,
+        )
+    return _batch_tables
+
+
+def _top_rank(np, counts, n, exclude=None):
+    """各行中张数为 n 的最大点数（可排除一个点数），没有时为-1"""
+    ranks = np.arange(RANK_COUNT)
+    hit = counts == n
+    if exclude is not None:
+        hit &= ranks[None, :] != exclude[:, None]
+    return np.where(hit, ranks[None, :], -1).max(axis=1)
+
+
+def _bit(rank):
+    """点数对应的掩码位（-1 时为0）"""
+    return (1 << (rank + 1)) >> 1
+
+
+def evaluate_batch(cards):
+    """批量评估：cards 为 (M, 7) 的整数牌数组，返回与 evaluate 相同的分值数组"""
+    import numpy as np
+
+    straight_top, popcount, keep = _get_batch_tables(np)
+    cards = np.asarray(cards, dtype=np.int64)
+    ranks = cards >> 2
+    suits = cards & 3
+    bits = 1 << ranks
+
+    counts = np.zeros((len(cards), RANK_COUNT), dtype=np.int64)
+    rows = np.repeat(np.arange(len(cards)), cards.shape[1])
+    np.add.at(counts, (rows, ranks.ravel()), 1)
+    suit_masks = np.stack([np.where(suits == s, bits, 0).sum(axis=1) for s in range(4)], axis=1)
+    rank_mask = np.bitwise_or.reduce(suit_masks, axis=1)
+
+    # 同花（7张牌内最多一种花色够5张）
+    flush_suit = popcount[suit_masks] >= 5
+    has_flush = flush_suit.any(axis=1)
+    flush_mask = np.where(flush_suit, suit_masks, 0).max(axis=1)
+    flush_top = straight_top[flush_mask]
+
+    quad = _top_rank(np, counts, 4)
+    trips = _top_rank(np, counts, 3)
+    trips2 = _top_rank(np, counts, 3, exclude=trips)
+    pair = _top_rank(np, counts, 2)
+    pair2 = _top_rank(np, counts, 2, exclude=pair)
+    top = straight_top[rank_mask]
+
+    full_pair = np.maximum(trips2, pair)
+    score = (HIGH_CARD << CATEGORY_SHIFT) | keep[5][rank_mask]
+    score = np.where(pair >= 0, (ONE_PAIR << CATEGORY_SHIFT) | (pair << 13)
+                     | keep[3][rank_mask & ~_bit(pair)], score)
+    score = np.where(pair2 >= 0, (TWO_PAIR << CATEGORY_SHIFT) | (pair << 17) | (pair2 << 13)
+                     | keep[1][rank_mask & ~_bit(pair) & ~_bit(pair2)], score)
+    score = np.where(trips >= 0, (THREE_OF_A_KIND << CATEGORY_SHIFT) | (trips << 13)
+                     | keep[2][rank_mask & ~_bit(trips)], score)
+    score = np.where(top > 0, (STRAIGHT << CATEGORY_SHIFT) | top, score)
+    score = np.where((trips >= 0) & (full_pair >= 0),
+                     (FULL_HOUSE << CATEGORY_SHIFT) | (trips << 4) | full_pair, score)
+    score = np.where(quad >= 0, (FOUR_OF_A_KIND << CATEGORY_SHIFT) | (quad << 13)
+                     | keep[1][rank_mask & ~_bit(quad)], score)
+    score = np.where(has_flush, (FLUSH << CATEGORY_SHIFT) | keep[5][flush_mask], score)
+    score = np.where(has_flush & (flush_top > 0), (STRAIGHT_FLUSH << CATEGORY_SHIFT) | flush_top, score)
+    return score
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 牌局记录
+服务器把每张牌桌的每手牌追加写入记录文件：开局一条（盲注、起始筹码、发牌顺序），
+之后每次行动一条。记录足以在 TableEngine 上逐步重放整手牌，
+用于崩溃恢复（快照之后的记录尾部）与离线统计
+
+记录（与 wire_protocol 相同的帧格式：varint 长度 + 1字节类型 + 内容）:
+  HAND    牌桌 | 手数 | 小盲 | 大盲 | 座位数 | 各座位起始筹码 | 发牌顺序（6位牌）
+  ACTION  牌桌 | 行动编号 | 加注到+1（0 表示无）
+  SYNC    固定的8字节同步标记，约每 SYNC_INTERVAL 字节写一条；离线统计（hand_analytics.py）
+          从文件中间开始读时先找到同步标记，据此把大文件切成可并行处理的分块（read_records 跳过它）
+
+写入按事件循环合并：同一轮产生的记录一次 os.write 写出，进程崩溃时已写出的记录都在内核缓冲中
+（不 fsync，机器掉电时可能丢失最后几秒的记录）
+"""
+
+import os
+import asyncio
+
+from cfr_solver import ACTIONS
+from wire_protocol import Reader, frame, write_varint, pack_cards, split_frames
+
+# 记录类型
+HAND = 1
+ACTION = 2
+SYNC = 3
+
+# 同步记录的间隔（字节）与内容
+SYNC_INTERVAL = 1 << 16
+SYNC_MARKER = b"\xd3\x7a\x15\xc4SYNC"
+SYNC_FRAME = frame(SYNC, SYNC_MARKER)     # 完整的一条 SYNC 记录，在文件中按字节查找
+
+_ACTION_INDEX = {name: index for index, name in enumerate(ACTIONS)}
+
+
+def encode_hand(engine):
+    """刚开始的一手牌 -> 一条 HAND 记录"""
+    out = bytearray()
+    for value in (engine.table_id, engine.hand_id, engine.small_blind, engine.big_blind, engine.num_seats):
+        write_varint(out, value)
+    for chips in engine.hand_start_chips:
+        write_varint(out, chips)
+    pack_cards(out, engine.dealt)
+    return frame(HAND, out)
+
+
+def encode_action(table_id, event):
+    """一条 action 事件 -> 一条 ACTION 记录（加注记录本街下注总额，重放时得到相同的结果）"""
+    out = bytearray()
+    write_varint(out, table_id)
+    out.append(_ACTION_INDEX[event["action"]])
+    write_varint(out, event["bet"] + 1 if event["action"] == "raise" else 0)
+    return frame(ACTION, out)
+
+
+def decode_record(payload):
+    """一条记录的内容 -> 元组
+    (HAND, 牌桌, 手数, 小盲, 大盲, 起始筹码, 发牌顺序) 或 (ACTION, 牌桌, 行动, 加注到)；
+    非法内容抛出 ValueError"""
+    if not payload:
+        raise ValueError("空记录")
+    kind = payload[0]
+    reader = Reader(payload, 1)
+    if kind == HAND:
+        table_id, hand_id, small_blind, big_blind, seats = (reader.varint() for _ in range(5))
+        stacks = [reader.varint() for _ in range(seats)]
+        return HAND, table_id, hand_id, small_blind, big_blind, stacks, reader.cards()
+    if kind == SYNC:
+        return (SYNC,)
+    if kind == ACTION:
+        table_id, index = reader.varint(), reader.byte()
+        if index >= len(ACTIONS):
+            raise ValueError(f"非法行动编号: {index}")
+        raise_to = reader.varint()
+        return ACTION, table_id, ACTIONS[index], raise_to - 1 if raise_to else None
+    raise ValueError(f"未知的记录类型: {kind}")
+
+
+def read_records(path, chunk_size=1 << 16):
+    """流式读取记录文件，逐条产出 decode_record 的结果（跳过 SYNC）；末尾不完整的记录（写到一半时崩溃）被忽略"""
+    buffer = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            payloads, buffer = split_frames(buffer + chunk)
+            for payload in payloads:
+                if payload[0] != SYNC:
+                    yield decode_record(payload)
+
+
+def replay(engine, record):
+    """把一条记录应用到牌桌引擎上（HAND 按记录的筹码与发牌顺序开局）；返回事件列表"""
+    if record[0] == HAND:
+        _, _, hand_id, _, _, stacks, cards = record
+        engine.chips = list(stacks)
+        engine.hand_id = hand_id - 1
+        return engine.start_hand(cards)
+    _, _, action, raise_to = record
+    return engine.apply(action, raise_to)
+
+
+class HandHistoryWriter:
+    """追加写入记录文件；在事件循环中使用时每轮合并成一次写入，否则需要调用 flush()"""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self.bytes_written = 0
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._buffer = bytearray()
+        self._unsynced = 0        # 上一条 SYNC 之后写入的字节数
+
+    def hand(self, engine):
+        """记录刚开始的一手牌"""
+        self._append(encode_hand(engine))
+
+    def action(self, table_id, event):
+        """记录一次行动（engine.apply 返回的第一条事件）"""
+        self._append(encode_action(table_id, event))
+
+    def _append(self, data):
+        if not self._buffer:
+            try:
+                asyncio.get_running_loop().call_soon(self.flush)
+            except RuntimeError:
+                pass
+        if self._unsynced >= SYNC_INTERVAL:
+            self._buffer.extend(SYNC_FRAME)
+            self._unsynced = 0
+        self._buffer.extend(data)
+        self._unsynced += len(data)
+        self.records += 1
+
+    def flush(self):
+        """把缓冲的记录写入文件"""
+        size = len(self._buffer)
+        written = os.write(self._fd, self._buffer) if size else 0
+        while written < size:
+            written += os.write(self._fd, self._buffer[written:])
+        self.bytes_written += size
+        self._buffer.clear()
+
+    def rotate(self, path):
+        """写完当前文件，之后的记录写入新文件"""
+        self.close()
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._unsynced = 0
+
+    def close(self):
+        if self._fd is not None:
+            self.flush()
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,582 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 手牌同构索引器
+把 (底牌, 公共牌) 按花色同构归并后映射为稠密整数索引，并支持反向还原，
+供翻牌/转牌/河牌的抽象表（分桶表、策略表）使用
+index_batch / unindex_batch 用 NumPy 整块计算，供离线管线批量处理（需要 numpy）
+"""
+
+from bisect import bisect_right
+from math import comb
+
+# ==============================================
+# 牌的整数编码
+# ==============================================
+
+RANK_COUNT = 13
+SUIT_COUNT = 4
+DECK_SIZE = RANK_COUNT * SUIT_COUNT
+
+# 与 main.Suit / main.Rank 的定义顺序一致
+SUIT_SYMBOLS = ["♥", "♦", "♣", "♠"]
+RANK_SYMBOLS = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
+SUIT_INDEX = {symbol: i for i, symbol in enumerate(SUIT_SYMBOLS)}
+
+# 每条街的发牌结构：两张底牌为一轮，公共牌整体为一轮
+# （公共牌的发出顺序不影响牌力，合并后表更小）
+STREET_ROUNDS = {
+    "preflop": (2,),
+    "flop": (2, 3),
+    "turn": (2, 4),
+    "river": (2, 5),
+}
+
+# 公共牌数量 -> 街道
+BOARD_SIZE_TO_STREET = {0: "preflop", 3: "flop", 4: "turn", 5: "river"}
+
+
+def card_to_int(card):
+    """把Card对象编码为 0-51 的整数（点数*4 + 花色）"""
+    return (card.rank.value_num - 2) * SUIT_COUNT + SUIT_INDEX[card.suit.value]
+
+
+def cards_to_ints(cards):
+    """批量编码Card对象"""
+    return [card_to_int(card) for card in cards]
+
+
+def int_to_str(code):
+    """整数牌的显示文本，与Card.__str__一致"""
+    return f"{RANK_SYMBOLS[code >> 2]}{SUIT_SYMBOLS[code & 3]}"
+
+
+# ==============================================
+# 组合数系统工具
+# ==============================================
+
+_POPCOUNT = [bin(mask).count("1") for mask in range(1 << RANK_COUNT)]
+_NCR = [[comb(n, k) for k in range(RANK_COUNT + 2)] for n in range(RANK_COUNT + 1)]
+
+
+def _rank_set_index(mask, used):
+    """点数集合在剩余点数中的colex排名（跳过同花色已用的点数）"""
+    if not used:
+        return _COLEX[mask]
+    index = 0
+    i = 1
+    while mask:
+        low = mask & -mask
+        position = low.bit_length() - 1 - _POPCOUNT[used & (low - 1)]
+        index += _NCR[position][i]
+        i += 1
+        mask ^= low
+    return index
+
+
+def _rank_set_from_index(index, count, used):
+    """_rank_set_index 的逆运算"""
+    # 先在压缩空间（只含未用点数）中还原各位置
+    positions = []
+    for i in range(count, 0, -1):
+        p = i - 1
+        while _NCR[p + 1][i] <= index:
+            p += 1
+        index -= _NCR[p][i]
+        positions.append(p)
+
+    # 再把压缩位置映射回真实点数
+    free_ranks = [r for r in range(RANK_COUNT) if not used & (1 << r)]
+    mask = 0
+    for p in positions:
+        mask |= 1 << free_ranks[p]
+    return mask
+
+
+def _multiset_from_index(index, mult, n):
+    """从 n 个元素中可重复选 mult 个的colex逆排名，返回升序列表"""
+    values = []
+    upper = n + mult - 1
+    for i in range(mult, 0, -1):
+        # 二分查找满足 C(p, i) <= index 的最大 p
+        lo, hi = i - 1, upper - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if comb(mid, i) <= index:
+                lo = mid
+            else:
+                hi = mid - 1
+        index -= comb(lo, i)
+        values.append(lo - (i - 1))
+        upper = lo
+    values.reverse()
+    return values
+
+
+# 无已用点数时的colex排名查表（最常见的情况）
+_COLEX = [0] * (1 << RANK_COUNT)
+for _mask in range(1 << RANK_COUNT):
+    _COLEX[_mask] = _rank_set_index(_mask, 1 << RANK_COUNT)
+del _mask
+
+
+# ==============================================
+# 批量（NumPy）工具
+# ==============================================
+
+_batch_tables = None
+
+# 点数掩码按低7位/高6位拆开，压紧与展开各查两张小表
+_LOW_BITS = 7
+_LOW_MASK = (1 << _LOW_BITS) - 1
+
+
+def _pext(mask, keep):
+    """按 keep 的置位依次取出 mask 的位并压紧"""
+    out = 0
+    shift = 0
+    while keep:
+        low = keep & -keep
+        if mask & low:
+            out |= 1 << shift
+        shift += 1
+        keep ^= low
+    return out
+
+
+def _pdep(compressed, keep):
+    """_pext 的逆运算：把压紧的低位依次放到 keep 的置位上"""
+    out = 0
+    while keep:
+        low = keep & -keep
+        if compressed & 1:
+            out |= low
+        compressed >>= 1
+        keep ^= low
+    return out
+
+
+def _get_batch_tables(np):
+    """批量索引用的查找表：位数、colex排名及其逆、各掩码的升序点数、压紧/展开表、每张牌的花色位"""
+    global _batch_tables
+    if _batch_tables is None:
+        masks = range(1 << RANK_COUNT)
+        # colex排名与点数全集大小无关：压缩空间中的排名可直接查 13 位的表
+        uncolex = [sorted((m for m in masks if _POPCOUNT[m] == k), key=_COLEX.__getitem__)
+                   for k in range(RANK_COUNT + 1)]
+        set_ranks = [[r for r in range(RANK_COUNT) if m >> r & 1] for m in masks]
+        pext = [np.array([_pext(m, k) for m in range(1 << bits) for k in range(1 << bits)], dtype=np.int64)
+                for bits in (_LOW_BITS, RANK_COUNT - _LOW_BITS)]
+        pdep = [np.array([_pdep(m, k) for m in range(1 << bits) for k in range(1 << bits)], dtype=np.int64)
+                for bits in (_LOW_BITS, RANK_COUNT - _LOW_BITS)]
+        _batch_tables = (
+            np.array(_POPCOUNT, dtype=np.int64),
+            np.array(_COLEX, dtype=np.int64),
+            [np.array(group, dtype=np.int64) for group in uncolex],
+            np.array([ranks + [0] * (RANK_COUNT - len(ranks)) for ranks in set_ranks], dtype=np.int64),
+            pext,
+            pdep,
+            # 牌 -> 花色 s 的点数位放在第 16*s 位起（一轮内按花色一次求和）
+            np.array([1 << (16 * (card & 3) + (card >> 2)) for card in range(DECK_SIZE)], dtype=np.int64),
+        )
+    return _batch_tables
+
+
+def _comb_batch(np, n, k):
+    """逐元素计算 C(n, k)（k 为标量；n < k 时为0）"""
+    result = np.ones_like(n)
+    for i in range(k):
+        result = result * (n - i) // (i + 1)
+    return np.where(n >= k, result, 0)
+
+
+def _pext_batch(np, mask, used):
+    """去掉 used 中的点数位后把 mask 压紧（与 _rank_set_index 的位置映射相同）"""
+    popcount, _, _, _, (low_table, high_table), _, _ = _get_batch_tables(np)
+    free = ~used & ((1 << RANK_COUNT) - 1)
+    high_bits = RANK_COUNT - _LOW_BITS
+    low = low_table[((mask & _LOW_MASK) << _LOW_BITS) | (free & _LOW_MASK)]
+    high = high_table[((mask >> _LOW_BITS) << high_bits) | (free >> _LOW_BITS)]
+    return low | (high << popcount[free & _LOW_MASK])
+
+
+def _pdep_batch(np, compressed, used):
+    """_pext_batch 的逆运算：把压紧的位依次放回未用的点数上"""
+    popcount, _, _, _, _, (low_table, high_table), _ = _get_batch_tables(np)
+    free = ~used & ((1 << RANK_COUNT) - 1)
+    high_bits = RANK_COUNT - _LOW_BITS
+    low = low_table[((compressed & _LOW_MASK) << _LOW_BITS) | (free & _LOW_MASK)]
+    rest = (compressed >> popcount[free & _LOW_MASK]) & ((1 << high_bits) - 1)
+    high = high_table[(rest << high_bits) | (free >> _LOW_BITS)]
+    return low | (high << _LOW_BITS)
+
+
+# ==============================================
+# 手牌同构索引器
+# ==============================================
+
+class HandIndexer:
+    """手牌同构索引器
+
+    cards_per_round 给出每一轮的发牌张数，例如翻牌为 (2, 3)。
+    同一轮内的牌无序，不同轮之间有序；花色互换得到的手牌共享同一索引。
+    索引范围为 [0, size)，且稠密无空洞。
+    """
+
+    def __init__(self, cards_per_round):
+        self.cards_per_round = tuple(cards_per_round)
+        self.rounds = len(self.cards_per_round)
+        self.total_cards = sum(self.cards_per_round)
+
+        if self.total_cards > DECK_SIZE or any(n <= 0 for n in self.cards_per_round):
+            raise ValueError(f"无效的发牌结构: {cards_per_round}")
+
+        # 每种花色形状（各轮张数）下的点数组合数与各轮基数
+        self._shape_radices = {}
+        self._configs = {}
+        self._offsets = []
+        self._config_list = []
+        self._build_configurations()
+        self.size = self._offsets[-1] if self._offsets else 0
+        self._offsets.pop()
+
+    def _shape_info(self, shape):
+        """返回某花色形状的各轮基数和总组合数"""
+        info = self._shape_radices.get(shape)
+        if info is None:
+            radices = []
+            used = 0
+            total = 1
+            for count in shape:
+                radix = _NCR[RANK_COUNT - used][count] if count <= RANK_COUNT - used else 0
+                radices.append(radix)
+                total *= radix
+                used += count
+            info = (tuple(radices), total)
+            self._shape_radices[shape] = info
+        return info
+
+    def _build_configurations(self):
+        """枚举四种花色的形状组合，并为每种组合分配连续的索引区间"""
+        shapes_by_suit = []
+
+        def assign(round_idx, suit_counts):
+            if round_idx == self.rounds:
+                shapes_by_suit.append(tuple(tuple(c) for c in suit_counts))
+                return
+            needed = self.cards_per_round[round_idx]
+
+            def split(suit, remaining):
+                if suit == SUIT_COUNT - 1:
+                    if sum(suit_counts[suit]) + remaining <= RANK_COUNT:
+                        suit_counts[suit].append(remaining)
+                        assign(round_idx + 1, suit_counts)
+                        suit_counts[suit].pop()
+                    return
+                for k in range(remaining + 1):
+                    if sum(suit_counts[suit]) + k > RANK_COUNT:
+                        break
+                    suit_counts[suit].append(k)
+                    split(suit + 1, remaining - k)
+                    suit_counts[suit].pop()
+
+            split(0, needed)
+
+        assign(0, [[] for _ in range(SUIT_COUNT)])
+
+        configs = sorted({tuple(sorted(shapes, reverse=True)) for shapes in shapes_by_suit})
+
+        offset = 0
+        for config in configs:
+            groups = []
+            start = 0
+            size = 1
+            while start < SUIT_COUNT:
+                end = start
+                while end < SUIT_COUNT and config[end] == config[start]:
+                    end += 1
+                mult = end - start
+                _, n_shape = self._shape_info(config[start])
+                group_size = comb(n_shape + mult - 1, mult)
+                groups.append((start, mult, n_shape, group_size))
+                size *= group_size
+                start = end
+
+            self._configs[config] = (offset, tuple(groups))
+            self._config_list.append((config, tuple(groups)))
+            self._offsets.append(offset)
+            offset += size
+        self._offsets.append(offset)
+
+    def _suit_keys(self, cards):
+        """计算每个花色的 (形状, 组内索引)"""
+        if len(cards) != self.total_cards:
+            raise ValueError(f"需要 {self.total_cards} 张牌，实际 {len(cards)} 张")
+
+        round_masks = []
+        pos = 0
+        for count in self.cards_per_round:
+            masks = [0, 0, 0, 0]
+            for code in cards[pos:pos + count]:
+                masks[code & 3] |= 1 << (code >> 2)
+            round_masks.append(masks)
+            pos += count
+
+        keys = []
+        seen = 0
+        for suit in range(SUIT_COUNT):
+            shape = []
+            local = 0
+            used = 0
+            for masks in round_masks:
+                mask = masks[suit]
+                count = _POPCOUNT[mask]
+                shape.append(count)
+                local = local * _NCR[RANK_COUNT - _POPCOUNT[used]][count] + _rank_set_index(mask, used)
+                used |= mask
+            seen += _POPCOUNT[used]
+            keys.append((tuple(shape), local))
+
+        if seen != self.total_cards:
+            raise ValueError("手牌中存在重复的牌")
+
+        keys.sort(reverse=True)
+        return keys
+
+    def index(self, cards):
+        """把按轮次排列的整数牌映射为同构索引"""
+        keys = self._suit_keys(cards)
+        offset, groups = self._configs[tuple(key[0] for key in keys)]
+
+        index = 0
+        for start, mult, _, group_size in groups:
+            # 组内按升序排列后做可重复组合的colex排名
+            group_index = 0
+            for j in range(mult):
+                group_index += comb(keys[start + mult - 1 - j][1] + j, j + 1)
+            index = index * group_size + group_index
+        return offset + index
+
+    def unindex(self, index):
+        """把同构索引还原为一手代表性（规范花色）的整数牌"""
+        if not 0 <= index < self.size:
+            raise IndexError(f"索引越界: {index}")
+
+        config_idx = bisect_right(self._offsets, index) - 1
+        config, groups = self._config_list[config_idx]
+        remainder = index - self._offsets[config_idx]
+
+        group_indices = []
+        for _, _, _, group_size in reversed(groups):
+            group_indices.append(remainder % group_size)
+            remainder //= group_size
+        group_indices.reverse()
+
+        locals_by_suit = [0] * SUIT_COUNT
+        for (start, mult, n_shape, _), group_index in zip(groups, group_indices):
+            values = _multiset_from_index(group_index, mult, n_shape)
+            # 规范顺序为降序
+            for j, value in enumerate(reversed(values)):
+                locals_by_suit[start + j] = value
+
+        rounds_cards = [[] for _ in range(self.rounds)]
+        for suit in range(SUIT_COUNT):
+            shape = config[suit]
+            radices, _ = self._shape_info(shape)
+
+            # 按混合进制拆出各轮的点数集合索引
+            local = locals_by_suit[suit]
+            round_indices = [0] * self.rounds
+            for r in range(self.rounds - 1, -1, -1):
+                round_indices[r] = local % radices[r]
+                local //= radices[r]
+
+            used = 0
+            for r in range(self.rounds):
+                mask = _rank_set_from_index(round_indices[r], shape[r], used)
+                used |= mask
+                while mask:
+                    low = mask & -mask
+                    rounds_cards[r].append((low.bit_length() - 1) * SUIT_COUNT + suit)
+                    mask ^= low
+
+        cards = []
+        for round_cards in rounds_cards:
+            cards.extend(sorted(round_cards))
+        return cards
+
+    def index_batch(self, cards):
+        """批量索引：cards 为 (M, total_cards) 的整数牌数组，返回与 index 相同的 int64 索引数组"""
+        import numpy as np
+
+        popcount, colex, _, _, _, _, card_bits = _get_batch_tables(np)
+        cards = np.asarray(cards, dtype=np.int64)
+        if cards.ndim != 2 or cards.shape[1] != self.total_cards:
+            raise ValueError(f"需要 (M, {self.total_cards}) 的牌数组，实际 {cards.shape}")
+        if cards.size and (cards.min() < 0 or cards.max() >= DECK_SIZE):
+            raise ValueError("牌值越界")
+
+        # 每个花色：形状（各轮张数，按14进制编码以保持字典序）与组内索引
+        shapes = np.zeros((len(cards), SUIT_COUNT), dtype=np.int64)
+        locals_ = np.zeros((len(cards), SUIT_COUNT), dtype=np.int64)
+        used = np.zeros((len(cards), SUIT_COUNT), dtype=np.int64)
+        radix = np.array(self._radix_table(), dtype=np.int64)
+        pos = 0
+        for count in self.cards_per_round:
+            packed = card_bits[cards[:, pos:pos + count]].sum(axis=1)
+            masks = (packed[:, None] >> (16 * np.arange(SUIT_COUNT))) & ((1 << RANK_COUNT) - 1)
+            counts = popcount[masks]
+            ranked = colex[_pext_batch(np, masks, used) if pos else masks]
+            locals_ = locals_ * radix[popcount[used], counts] + ranked
+            shapes = shapes * 14 + counts
+            used |= masks
+            pos += count
+        # 同一轮内重复的牌在求和时进位、跨轮重复的牌在按位或时重叠，都会少掉置位
+        if np.any(popcount[used].sum(axis=1) != self.total_cards):
+            raise ValueError("手牌中存在重复的牌")
+
+        # 花色按 (形状, 组内索引) 降序排列（4个元素的排序网络）
+        width = max(info[1] for info in self._shape_radices.values()) + 1
+        keys = list((shapes * width + locals_).T)
+        for a, b in ((0, 1), (2, 3), (0, 2), (1, 3), (1, 2)):
+            keys[a], keys[b] = np.maximum(keys[a], keys[b]), np.minimum(keys[a], keys[b])
+        sorted_shapes, sorted_locals = np.divmod(np.stack(keys, axis=1), width)
+
+        config_codes = np.zeros(len(cards), dtype=np.int64)
+        for suit in range(SUIT_COUNT):
+            config_codes = config_codes * 14 ** self.rounds + sorted_shapes[:, suit]
+        known = np.array([self._config_code(config) for config, _ in self._config_list], dtype=np.int64)
+        order = np.argsort(known)
+        config_ids = order[np.searchsorted(known, config_codes, sorter=order)]
+
+        result = np.empty(len(cards), dtype=np.int64)
+        for config_idx, rows in self._rows_by_config(np, config_ids):
+            _, groups = self._config_list[config_idx]
+            group_locals = sorted_locals[rows]
+            index = np.zeros(len(rows), dtype=np.int64)
+            for start, mult, _, group_size in groups:
+                # 组内按升序排列后做可重复组合的colex排名
+                group_index = np.zeros(len(rows), dtype=np.int64)
+                for j in range(mult):
+                    group_index += _comb_batch(np, group_locals[:, start + mult - 1 - j] + j, j + 1)
+                index = index * group_size + group_index
+            result[rows] = self._offsets[config_idx] + index
+        return result
+
+    def unindex_batch(self, indices):
+        """批量还原：返回 (M, total_cards) 的整数牌数组，每行与 unindex 的结果相同"""
+        import numpy as np
+
+        _, _, uncolex, set_ranks, _, _, _ = _get_batch_tables(np)
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size and (indices.min() < 0 or indices.max() >= self.size):
+            raise IndexError("索引越界")
+
+        cards = np.empty((len(indices), self.total_cards), dtype=np.int64)
+        config_ids = np.searchsorted(np.array(self._offsets, dtype=np.int64), indices, side="right") - 1
+        for config_idx, rows in self._rows_by_config(np, config_ids):
+            config, groups = self._config_list[config_idx]
+            remainder = indices[rows] - self._offsets[config_idx]
+
+            group_indices = []
+            for _, _, _, group_size in reversed(groups):
+                remainder, group_index = np.divmod(remainder, group_size)
+                group_indices.append(group_index)
+            group_indices.reverse()
+
+            locals_by_suit = [None] * SUIT_COUNT
+            for (start, mult, n_shape, _), group_index in zip(groups, group_indices):
+                # 可重复组合的colex逆排名：二分查找满足 C(p, i) <= index 的最大 p（i=1 时 p 即余数）
+                upper = np.full(len(rows), n_shape + mult - 1, dtype=np.int64)
+                for i in range(mult, 0, -1):
+                    if i == 1:
+                        lo = group_index
+                    else:
+                        lo, hi = np.full_like(upper, i - 1), upper - 1
+                        while np.any(lo < hi):
+                            mid = (lo + hi + 1) // 2
+                            fits = _comb_batch(np, mid, i) <= group_index
+                            lo, hi = np.where(fits, mid, lo), np.where(fits, hi, mid - 1)
+                        group_index = group_index - _comb_batch(np, lo, i)
+                    locals_by_suit[start + mult - i] = lo - (i - 1)
+                    upper = lo
+
+            round_cards = [[] for _ in range(self.rounds)]
+            for suit in range(SUIT_COUNT):
+                shape = config[suit]
+                radices, _ = self._shape_info(shape)
+                local = locals_by_suit[suit]
+                round_indices = [None] * self.rounds
+                for r in range(self.rounds - 1, -1, -1):
+                    local, round_indices[r] = np.divmod(local, radices[r])
+
+                used = None
+                for r in range(self.rounds):
+                    if not shape[r]:
+                        continue
+                    mask = uncolex[shape[r]][round_indices[r]]
+                    if used is None:
+                        used = mask
+                    else:
+                        mask = _pdep_batch(np, mask, used)
+                        used = used | mask
+                    round_cards[r].append(set_ranks[mask, :shape[r]] * SUIT_COUNT + suit)
+
+            pos = 0
+            for count, parts in zip(self.cards_per_round, round_cards):
+                cards[rows, pos:pos + count] = np.sort(np.concatenate(parts, axis=1), axis=1)
+                pos += count
+        return cards
+
+    def _radix_table(self):
+        """[已用点数][本轮张数] -> 本轮点数集合的组合数"""
+        most = max(self.cards_per_round)
+        return [[_NCR[RANK_COUNT - u][c] if c <= RANK_COUNT - u else 0 for c in range(most + 1)]
+                for u in range(RANK_COUNT + 1)]
+
+    def _config_code(self, config):
+        """花色形状组合的整数编码（与 index_batch 中的编码一致）"""
+        code = 0
+        for shape in config:
+            shape_code = 0
+            for n in shape:
+                shape_code = shape_code * 14 + n
+            code = code * 14 ** self.rounds + shape_code
+        return code
+
+    @staticmethod
+    def _rows_by_config(np, config_ids):
+        """按形状组合分组，产出 (组合序号, 行号数组)"""
+        order = np.argsort(config_ids, kind="stable")
+        ids, starts = np.unique(config_ids[order], return_index=True)
+        for config_idx, start, end in zip(ids.tolist(), starts.tolist(), starts[1:].tolist() + [len(order)]):
+            yield config_idx, order[start:end]
+
+    def canonicalize(self, cards):
+        """返回同构等价类的代表手牌"""
+        return self.unindex(self.index(cards))
+
+
+# ==============================================
+# 按街道共享的索引器
+# ==============================================
+
+_street_indexers = {}
+
+
+def get_street_indexer(street):
+    """获取某条街（preflop/flop/turn/river）的索引器，首次使用时构建"""
+    indexer = _street_indexers.get(street)
+    if indexer is None:
+        if street not in STREET_ROUNDS:
+            raise ValueError(f"未知街道: {street}")
+        indexer = HandIndexer(STREET_ROUNDS[street])
+        _street_indexers[street] = indexer
+    return indexer
+
+
+def index_hand(hole, board):
+    """根据公共牌张数自动选择街道，返回 (街道, 索引)"""
+    street = BOARD_SIZE_TO_STREET.get(len(board))
+    if street is None:
+        raise ValueError(f"无效的公共牌数量: {len(board)}")
+    return street, get_street_indexer(street).index(list(hole) + list(board))
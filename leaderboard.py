@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 统计与排行榜
+每手牌结束时牌桌只把入座玩家的结果（输赢、赢得的底池）放进队列，
+聚合器按刻度批量取出，增量更新每个玩家的统计与各个排行榜，从不重新扫描历史；
+统计定期把有变化的玩家写入 SQLite（后台线程），重启时载入后一次性建立排行榜
+
+排行榜: chips_won（累计输赢）、hands_played（手数）、biggest_pot（赢得的最大底池）、
+win_rate（赢下底池的手数比例，至少 MIN_HANDS 手才上榜）
+
+每个排行榜是一个有序整数集合（RankedList）：键 = -分数 * ID_SPACE + 玩家编号，
+前 N 名与某个玩家的名次都是 O(log n)（并列分数名次相同）
+"""
+
+import sqlite3
+from bisect import bisect_left, insort
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from balances import connect
+
+BOARDS = ("chips_won", "hands_played", "biggest_pot", "win_rate")
+
+# 胜率榜的最少手数
+MIN_HANDS = 20
+
+# 胜率按百万分之一取整后排名
+WIN_RATE_SCALE = 1000000
+
+# 批量聚合与写入数据库的间隔（秒）
+AGGREGATE_INTERVAL = 0.1
+PERSIST_INTERVAL = 10.0
+
+# 每个刻度至多聚合的结果数（约几毫秒）；积压时下一个刻度继续，不长时间占用事件循环
+AGGREGATE_BATCH = 256
+
+# 键中玩家编号占用的范围
+ID_SPACE = 1 << 32
+
+# 统计字段下标
+HANDS, WINS, CHIPS_WON, BIGGEST_POT = range(4)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS player_stats (
+    player      TEXT PRIMARY KEY,
+    hands       INTEGER NOT NULL,
+    wins        INTEGER NOT NULL,
+    chips_won   INTEGER NOT NULL,
+    biggest_pot INTEGER NOT NULL
+);
+"""
+
+_UPSERT = ("INSERT INTO player_stats (player, hands, wins, chips_won, biggest_pot) VALUES (?, ?, ?, ?, ?) "
+           "ON CONFLICT(player) DO UPDATE SET hands = excluded.hands, wins = excluded.wins, "
+           "chips_won = excluded.chips_won, biggest_pot = excluded.biggest_pot")
+
+
+# ==============================================
+# 有序整数集合
+# ==============================================
+
+class RankedList:
+    """可按名次访问的有序整数多重集合：分块有序列表 + 块大小的树状数组
+
+    插入、删除、排名（比某值小的元素个数）与按名次取值都是 O(log n)，块内移动至多 2*LOAD 个元素。
+    """
+
+    LOAD = 512
+
+    def __init__(self, values=()):
+        values = sorted(values)
+        self._lists = [values[i:i + self.LOAD] for i in range(0, len(values), self.LOAD)]
+        self._maxes = [chunk[-1] for chunk in self._lists]
+        self._len = len(values)
+        self._rebuild()
+
+    def __len__(self):
+        return self._len
+
+    def _rebuild(self):
+        """重建块大小的树状数组"""
+        tree = [0] + [len(chunk) for chunk in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _grow(self, index, delta):
+        tree = self._tree
+        size = len(tree)
+        index += 1
+        while index < size:
+            tree[index] += delta
+            index += index & -index
+
+    def _prefix(self, index):
+        """前 index 个块的元素总数"""
+        tree = self._tree
+        total = 0
+        while index:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+    def add(self, value):
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            self._len = 1
+            self._rebuild()
+            return
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(value)
+            self._maxes[i] = value
+        else:
+            insort(self._lists[i], value)
+        self._len += 1
+        chunk = self._lists[i]
+        if len(chunk) > 2 * self.LOAD:
+            # 块太大时一分为二（均摊代价很小）
+            self._lists.insert(i + 1, chunk[self.LOAD:])
+            del chunk[self.LOAD:]
+            self._maxes.insert(i, chunk[-1])
+            self._rebuild()
+        else:
+            self._grow(i, 1)
+
+    def remove(self, value):
+        """删除一个等于 value 的元素；不存在时抛出 ValueError"""
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            raise ValueError(f"{value} 不在集合中")
+        chunk = self._lists[i]
+        j = bisect_left(chunk, value)
+        if chunk[j] != value:
+            raise ValueError(f"{value} 不在集合中")
+        del chunk[j]
+        self._len -= 1
+        if not chunk:
+            del self._lists[i]
+            del self._maxes[i]
+            self._rebuild()
+            return
+        self._maxes[i] = chunk[-1]
+        if len(chunk) < self.LOAD // 4 and i + 1 < len(self._lists):
+            # 块太小时并入后一块
+            chunk.extend(self._lists.pop(i + 1))
+            del self._maxes[i + 1]
+            self._maxes[i] = chunk[-1]
+            self._rebuild()
+        else:
+            self._grow(i, -1)
+
+    def replace(self, old, new):
+        """把一个等于 old 的元素换成 new；两者落在同一块内时不改动树状数组（分数小幅变化的常见情形）"""
+        maxes = self._maxes
+        i = bisect_left(maxes, old)
+        if i < len(maxes) and bisect_left(maxes, new) == i and (i + 1 < len(maxes) or new <= maxes[i]):
+            chunk = self._lists[i]
+            j = bisect_left(chunk, old)
+            if chunk[j] != old:
+                raise ValueError(f"{old} 不在集合中")
+            del chunk[j]
+            insort(chunk, new)
+            maxes[i] = chunk[-1]
+            return
+        self.remove(old)
+        self.add(new)
+
+    def bisect_left(self, value):
+        """小于 value 的元素个数"""
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return self._len
+        return self._prefix(i) + bisect_left(self._lists[i], value)
+
+    def _locate(self, position):
+        """名次 position（从0开始）所在的 (块, 块内下标)：在树状数组上二分"""
+        tree = self._tree
+        block = 0
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            nxt = block + step
+            if nxt < len(tree) and tree[nxt] <= position:
+                block = nxt
+                position -= tree[nxt]
+            step >>= 1
+        return block, position
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._len
+        if not 0 <= position < self._len:
+            raise IndexError("名次越界")
+        block, offset = self._locate(position)
+        return self._lists[block][offset]
+
+    def islice(self, start, stop):
+        """按名次 [start, stop) 依次产出元素"""
+        stop = min(stop, self._len)
+        if start >= stop:
+            return
+        block, offset = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._lists[block][offset:offset + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            block, offset = block + 1, 0
+
+
+# ==============================================
+# 排行榜
+# ==============================================
+
+def board_score(board, stats):
+    """玩家在某个排行榜上的分数（整数）；不满足上榜条件时为None"""
+    if board == "chips_won":
+        return stats[CHIPS_WON]
+    if board == "hands_played":
+        return stats[HANDS]
+    if board == "biggest_pot":
+        return stats[BIGGEST_POT] if stats[BIGGEST_POT] > 0 else None
+    if stats[HANDS] < MIN_HANDS:
+        return None
+    return stats[WINS] * WIN_RATE_SCALE // stats[HANDS]
+
+
+def _key(score, player_id):
+    """分数高的在前，同分时先登记的玩家在前"""
+    return -score * ID_SPACE + player_id
+
+
+class LeaderboardAggregator:
+    """玩家统计与排行榜；submit 可在牌局结束时直接调用（只入队），drain 批量聚合"""
+
+    def __init__(self, path=None, persist_interval=PERSIST_INTERVAL):
+        self.path = path
+        self.persist_interval = persist_interval
+        self.ids = {}             # 玩家名 -> 编号
+        self.names = []
+        self.stats = []           # 编号 -> [手数, 赢下底池的手数, 累计输赢, 最大底池]
+        self.boards = {board: RankedList() for board in BOARDS}
+        self.queue = deque()      # 待聚合的 (玩家, 输赢, 赢得的底池)
+        self.aggregated = 0
+        self.persisted = 0        # 写入的行数
+        self.errors = 0
+        self._dirty = set()       # 上次写入后有变化的玩家编号
+        self._timers = None
+        self._drain_timer = None
+        self._persist_timer = None
+        self._executor = None
+        self._saving = None       # (写入中的 Future, 玩家编号)
+        self._conn = None
+        if path is not None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="leaderboard")
+            self._load(self._executor.submit(self._open).result())
+
+    # ----------------------------------------------
+    # 输入
+    # ----------------------------------------------
+
+    def submit(self, results):
+        """一手牌的结果 [(玩家, 输赢, 赢得的底池)]；只入队，不做聚合"""
+        self.queue.extend(results)
+
+    def record_hand(self, engine, players):
+        """一手牌结束后从牌桌引擎取结果入队；players 为 {座位: 玩家名}
+        赢了的座位记入它实际收回的筹码（输赢 + 本手投入），平分底池或只赢边池时不是整个底池"""
+        chips, start, contributed = engine.chips, engine.hand_start_chips, engine.contributed
+        for seat, name in players.items():
+            net = chips[seat] - start[seat]
+            self.queue.append((name, net, net + contributed[seat] if net > 0 else 0))
+
+    def drain(self, limit=None):
+        """聚合队列中的结果（至多 limit 条，默认全部），返回处理的条数"""
+        queue, apply = self.queue, self._apply
+        count = len(queue) if limit is None else min(limit, len(queue))
+        for _ in range(count):
+            apply(*queue.popleft())
+        self.aggregated += count
+        return count
+
+    def _apply(self, name, net, pot):
+        player_id = self.ids.get(name)
+        if player_id is None:
+            # 新玩家还不在任何排行榜上
+            player_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            stats = [0, 0, 0, 0]
+            self.stats.append(stats)
+            old = [None] * len(BOARDS)
+        else:
+            stats = self.stats[player_id]
+            old = [board_score(board, stats) for board in BOARDS]
+        stats[HANDS] += 1
+        stats[CHIPS_WON] += net
+        if pot > 0:
+            stats[WINS] += 1
+            if pot > stats[BIGGEST_POT]:
+                stats[BIGGEST_POT] = pot
+        for board, before in zip(BOARDS, old):
+            after = board_score(board, stats)
+            if after != before:
+                ranked = self.boards[board]
+                if before is None:
+                    ranked.add(_key(after, player_id))
+                elif after is None:
+                    ranked.remove(_key(before, player_id))
+                else:
+                    ranked.replace(_key(before, player_id), _key(after, player_id))
+        self._dirty.add(player_id)
+
+    # ----------------------------------------------
+    # 查询
+    # ----------------------------------------------
+
+    def rank(self, board, name):
+        """玩家在排行榜上的 (名次, 分数)；并列分数名次相同，未上榜时返回None（胜率为百万分之一）"""
+        player_id = self.ids.get(name)
+        if player_id is None:
+            return None
+        score = board_score(board, self.stats[player_id])
+        if score is None:
+            return None
+        return self.boards[board].bisect_left(_key(score, 0)) + 1, score
+
+    def top(self, board, count=10, start=0):
+        """排行榜第 start+1 名起的 count 个玩家 [(名次, 玩家, 分数)]"""
+        ranked = self.boards[board]
+        entries = []
+        rank = previous = None
+        for position, key in enumerate(ranked.islice(start, start + count), start):
+            score = -(key // ID_SPACE)
+            if score != previous:
+                rank = position + 1 if previous is not None else ranked.bisect_left(_key(score, 0)) + 1
+                previous = score
+            entries.append((rank, self.names[key % ID_SPACE], score))
+        return entries
+
+    def player_stats(self, name):
+        """玩家的统计字典；没有记录时返回None"""
+        player_id = self.ids.get(name)
+        if player_id is None:
+            return None
+        hands, wins, chips_won, biggest_pot = self.stats[player_id]
+        return {"hands": hands, "wins": wins, "chips_won": chips_won, "biggest_pot": biggest_pot,
+                "win_rate": wins / hands if hands else 0.0}
+
+    # ----------------------------------------------
+    # 定时聚合与持久化
+    # ----------------------------------------------
+
+    def start(self, timers):
+        """在事件循环中定时聚合与写入（timers 为 timer_wheel.AsyncScheduler）"""
+        self._timers = timers
+        self._drain_timer = timers.call_later(AGGREGATE_INTERVAL, self._on_drain)
+        if self.path is not None:
+            self._persist_timer = timers.call_later(self.persist_interval, self._on_persist)
+
+    def _on_drain(self):
+        self.drain(AGGREGATE_BATCH)
+        self._drain_timer = self._timers.call_later(0 if self.queue else AGGREGATE_INTERVAL, self._on_drain)
+
+    def _on_persist(self):
+        self.persist()
+        self._persist_timer = self._timers.call_later(self.persist_interval, self._on_persist)
+
+    def persist(self):
+        """把有变化的玩家交给后台线程写入，返回 Future；上一次还没写完时推迟到下次，写入失败的玩家下次重写"""
+        if self._executor is None:
+            return None
+        if self._saving is not None:
+            saving, player_ids = self._saving
+            if not saving.done():
+                return None
+            if saving.exception() is not None:
+                self.errors += 1
+                self._dirty.update(player_ids)
+            self._saving = None
+        if not self._dirty:
+            return None
+        player_ids, self._dirty = self._dirty, set()
+        names, stats = self.names, self.stats
+        saving = self._executor.submit(self._write, [(names[player_id], *stats[player_id]) for player_id in player_ids])
+        self._saving = saving, player_ids
+        return saving
+
+    def _open(self):
+        """（后台线程）打开数据库，返回已保存的全部统计"""
+        self._conn = connect(self.path)
+        self._conn.executescript(_SCHEMA)
+        return self._conn.execute("SELECT player, hands, wins, chips_won, biggest_pot FROM player_stats").fetchall()
+
+    def _load(self, rows):
+        """载入已保存的统计并一次性建立排行榜"""
+        for name, *stats in rows:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.stats.append(stats)
+        for board in BOARDS:
+            keys = []
+            for player_id, stats in enumerate(self.stats):
+                score = board_score(board, stats)
+                if score is not None:
+                    keys.append(_key(score, player_id))
+            self.boards[board] = RankedList(keys)
+
+    def _write(self, rows):
+        """（后台线程）一个事务写入一批玩家"""
+        with self._conn:
+            self._conn.executemany(_UPSERT, rows)
+        self.persisted += len(rows)
+
+    def close(self):
+        """停止定时任务，聚合剩余结果并写入全部变化"""
+        if self._timers is not None:
+            for timer in (self._drain_timer, self._persist_timer):
+                if timer is not None:
+                    self._timers.cancel(timer)
+            self._timers = None
+        self.drain()
+        if self._executor is not None:
+            if self._saving is not None:
+                wait([self._saving[0]])
+            saving = self.persist()
+            if saving is not None:
+                try:
+                    saving.result()
+                except sqlite3.Error:
+                    self.errors += 1
+            self._executor.submit(self._conn.close).result()
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 负载生成器
+用 asyncio 从一台机器对本地的多桌服务器（game_server.py）打开成千上万个并发客户端连接，
+每个连接入座后按给定的思考时间分布和简单策略打牌，最后报告：
+行动往返延迟分位数（发出行动到收到该行动的牌局事件）、每秒手数、错误统计
+
+思考时间分布:
+  fixed:0.2            固定0.2秒
+  uniform:0.5,1.5      均匀分布
+  exp:0.8              指数分布（均值0.8秒）
+  lognormal:-0.5,0.6   对数正态分布（参数 mu, sigma）
+
+策略: passive（能过牌就过牌，否则跟注）、random（随机合法行动）、strength（按手牌强度加注/跟注/弃牌）
+
+用法:
+  python3 game_server.py --tables 1000 --port 8765 &
+  python3 load_generator.py --clients 2000 --per-table 2 --duration 60 --think uniform:0.5,1.5
+  python3 load_generator.py --spawn-server --clients 2000 --binary   # 自动启动本地服务器子进程
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+
+from backpressure import LatencyHistogram
+from game_server import encode_message, decode_message
+from hand_buckets import card_strength
+from wire_protocol import MAGIC, StateDecoder, pack_message, unpack_message, read_frame
+
+STRATEGIES = ("passive", "random", "strength")
+
+# 建立连接的速率（个/秒），避免瞬间打满服务器的监听队列
+RAMP_RATE = 500.0
+
+
+def parse_think_time(spec):
+    """思考时间分布描述 -> 采样函数 sample(rng)；格式错误抛出 ValueError"""
+    name, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    if name == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if name == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if name == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    if name == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"无法识别的思考时间分布: {spec}")
+
+
+def choose_action(strategy, turn, hole, board, rng):
+    """按策略从行动提示中选择 (行动, 加注到)"""
+    legal = turn["legal"]
+    passive = "check" if "check" in legal else "call" if "call" in legal else legal[-1]
+    if strategy == "random":
+        action = rng.choice(legal)
+        return action, turn["min_raise"] if action == "raise" else None
+    if strategy == "strength" and hole:
+        strength = card_strength(hole, board)
+        if strength > 0.8 and "raise" in legal:
+            return "raise", turn["min_raise"]
+        if strength < 0.35 and "check" not in legal and "fold" in legal:
+            return "fold", None
+    return passive, None
+
+
+class LoadStats:
+    """全部客户端的汇总统计"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.connected = 0
+        self.seated = 0
+        self.actions = 0
+        self.hands = set()      # 观察到结束的 (牌桌, 手数)
+        self.errors = Counter()
+
+    def report(self, elapsed):
+        """汇总结果字典"""
+        latency = self.latency
+        return {
+            "connected": self.connected,
+            "seated": self.seated,
+            "actions": self.actions,
+            "hands": len(self.hands),
+            "hands_per_sec": len(self.hands) / elapsed if elapsed > 0 else 0.0,
+            "actions_per_sec": self.actions / elapsed if elapsed > 0 else 0.0,
+            "latency_ms": {p: latency.percentile(p) * 1000 for p in (50, 90, 99, 99.9)},
+            "latency_max_ms": latency.max * 1000,
+            "errors": dict(self.errors),
+        }
+
+
+class LoadClient:
+    """一个模拟玩家连接"""
+
+    def __init__(self, stats, table, think, strategy, rng, binary=False):
+        self.stats = stats
+        self.table = table
+        self.think = think
+        self.strategy = strategy
+        self.rng = rng
+        self.binary = binary
+        self.seat = None
+        self.hole = []
+        self.board = []
+        self.pending = None     # 已发出、尚未看到执行的行动发出时刻
+        self.decoder = StateDecoder()
+        self.writer = None
+        self._acting = None
+
+    def send(self, message):
+        self.writer.write(pack_message(message) if self.binary else encode_message(message))
+
+    async def run(self, host, port):
+        """连接、入座并一直打牌，直到被取消或连接断开"""
+        try:
+            reader, self.writer = await asyncio.open_connection(host, port)
+        except OSError as e:
+            self.stats.errors[f"连接失败: {type(e).__name__}"] += 1
+            return
+        self.stats.connected += 1
+        try:
+            if self.binary:
+                self.writer.write(MAGIC)
+            self.send({"type": "join", "table": self.table, "name": f"load-{self.table}"})
+            while True:
+                if self.binary:
+                    payload = await read_frame(reader)
+                    if payload is None:
+                        break
+                    self.handle(unpack_message(payload))
+                else:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self.handle(decode_message(line))
+            self.stats.errors["服务器断开连接"] += 1
+        except ConnectionError:
+            self.stats.errors["连接中断"] += 1
+        finally:
+            if self._acting is not None:
+                self._acting.cancel()
+            self.writer.close()
+
+    def handle(self, message):
+        """处理一条服务器消息"""
+        kind = message["type"]
+        if kind == "joined":
+            self.seat = message["seat"]
+            self.stats.seated += 1
+        elif kind == "error":
+            self.stats.errors[message["message"]] += 1
+        elif kind == "hole":
+            self.hole = message["cards"]
+        elif kind == "turn":
+            self._acting = asyncio.ensure_future(self._act(message))
+        elif kind == "hand_start":
+            self.board = []
+        elif kind == "street":
+            self.board = self.board + message["cards"]
+        elif kind == "action":
+            if message["seat"] == self.seat:
+                self._acted()
+        elif kind == "hand_end":
+            self.stats.hands.add((self.table, message["hand"]))
+        elif kind in ("keyframe", "delta"):
+            state = self.decoder.apply(message)
+            if state is None:
+                return
+            self.board = state.board
+            if state.last is not None and state.last[0] == self.seat:
+                self._acted()
+            if state.to_act < 0 and state.hand:
+                self.stats.hands.add((self.table, state.hand))
+
+    def _acted(self):
+        """自己的行动已被执行：记录往返延迟"""
+        if self.pending is not None:
+            self.stats.latency.record(time.perf_counter() - self.pending)
+            self.pending = None
+
+    async def _act(self, turn):
+        await asyncio.sleep(self.think(self.rng))
+        action, raise_to = choose_action(self.strategy, turn, self.hole, self.board, self.rng)
+        self.pending = time.perf_counter()
+        self.stats.actions += 1
+        self.send({"type": "action", "action": action, "amount": raise_to, "seq": turn["seq"]})
+
+
+async def run_load(host, port, clients, duration, think="uniform:0.5,1.5", strategy="passive",
+                   per_table=1, binary=False, ramp=RAMP_RATE, seed=None):
+    """运行负载：clients 个连接，每 per_table 个坐同一张牌桌，持续 duration 秒；返回结果字典"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"未知策略: {strategy}（可选: {', '.join(STRATEGIES)}）")
+    sample = parse_think_time(think)
+    stats = LoadStats()
+    master = random.Random(seed)
+    tasks = []
+    start = time.perf_counter()
+    try:
+        for i in range(clients):
+            client = LoadClient(stats, i // per_table, sample, strategy,
+                                random.Random(master.getrandbits(64)), binary)
+            tasks.append(asyncio.ensure_future(client.run(host, port)))
+            # 按速率逐步建立连接
+            delay = start + (i + 1) / ramp - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await asyncio.sleep(max(0.0, start + duration - time.perf_counter()))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return stats.report(time.perf_counter() - start)
+
+
+def print_report(result):
+    """打印结果"""
+    latency = result["latency_ms"]
+    print(f"  连接 {result['connected']:,}，入座 {result['seated']:,}")
+    print(f"  {result['hands_per_sec']:,.1f} 手/秒，{result['actions_per_sec']:,.1f} 次行动/秒"
+          f"（共 {result['hands']:,} 手、{result['actions']:,} 次行动）")
+    print(f"  行动往返延迟: p50 {latency[50]:.1f} / p90 {latency[90]:.1f} / p99 {latency[99]:.1f} / "
+          f"p99.9 {latency[99.9]:.1f} 毫秒，最大 {result['latency_max_ms']:.1f} 毫秒")
+    if result["errors"]:
+        print("  错误:")
+        for message, count in sorted(result["errors"].items(), key=lambda item: -item[1]):
+            print(f"    {count:>8,}  {message}")
+    else:
+        print("  没有错误")
+
+
+def _raise_file_limit():
+    """把可打开的文件数调到上限（每个连接一个文件描述符）"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="德州扑克多桌服务器负载生成器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--per-table", type=int, default=1, help="每张牌桌坐几个模拟玩家（最多5）")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--think", default="uniform:0.5,1.5", help="思考时间分布")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="passive")
+    parser.add_argument("--binary", action="store_true", help="使用紧凑二进制协议")
+    parser.add_argument("--ramp", type=float, default=RAMP_RATE, help="每秒建立的连接数")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--spawn-server", action="store_true", help="启动本地服务器子进程（牌桌数按连接数计算）")
+    args = parser.parse_args()
+
+    try:
+        parse_think_time(args.think)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    _raise_file_limit()
+
+    server = None
+    if args.spawn_server:
+        tables = -(-args.clients // args.per_table)
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game_server.py")
+        server = subprocess.Popen([sys.executable, script, "--tables", str(tables),
+                                   "--host", args.host, "--port", str(args.port)], stdout=subprocess.DEVNULL)
+        time.sleep(1.0 + tables / 5000)
+
+    print(f"🃏 {args.clients} 个连接 → {args.host}:{args.port}，持续 {args.duration:.0f} 秒"
+          f"（思考 {args.think}，策略 {args.strategy}{'，二进制协议' if args.binary else ''}）")
+    try:
+        result = asyncio.run(run_load(args.host, args.port, args.clients, args.duration, args.think,
+                                      args.strategy, args.per_table, args.binary, args.ramp, args.seed))
+    except KeyboardInterrupt:
+        return True
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_report(result)
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -21,6 +21,7 @@ from kivy.uix.slider import Slider
 from kivy.uix.togglebutton import ToggleButton
 from kivy.graphics import Color, Rectangle, Ellipse, Line
 from kivy.clock import Clock
+from kivy.logger import Logger
 from kivy.core.window import Window
 from kivy.properties import (
     NumericProperty, StringProperty, ListProperty, 
@@ -41,6 +42,23 @@ from settings_screen import SettingsPopup, HelpPopup
 from ui_animations import AnimationManager, ParticleEffect
 # 导入屏幕适配器
 from screen_adapter import screen_adapter
+# 导入翻牌后牌力分桶表
+from hand_buckets import postflop_strength, hole_card_strength
+from hand_indexer import cards_to_ints
+# 导入AI启发式策略
+from ai_policy import position_factor, bet_history_factor, heuristic_weights, choose_action
+# 导入离线CFR策略表
+from cfr_solver import ACTIONS, ACTION_CODES, STREET_NAMES
+# 导入蒙特卡洛树搜索AI
+from mcts_ai import build_root_state, difficulty_budget
+# 导入短筹码推/弃图表
+from push_fold import get_push_fold_chart, preflop_push_fold
+# 导入对手建模统计
+from opponent_stats import OpponentStats
+# 导入AI后台思考
+from ai_worker import AIWorker, DecisionRequest, decide
+# 导入合法行动生成
+from betting import legal_actions, clamp_raise, next_min_raise
 
 # ==============================================
 # 游戏常量定义
@@ -150,6 +168,7 @@ class PokerTable:
         self.current_bet = 0
         self.small_blind = 100
         self.big_blind = 200
+        self.min_raise = self.big_blind  # 本街最小加注增量
         self.community_cards = []
         self.deck = self._create_deck()
     
@@ -235,6 +254,8 @@ class TexasHoldemGame:
     def __init__(self):
         self.table = PokerTable()
         self.players = self._create_players()
+        # 跨手牌的对手统计（VPIP、PFR、激进度等）
+        self.opponent_stats = OpponentStats(len(self.players))
         
         # 游戏状态
         self.game_state = "preflop"  # preflop, flop, turn, river, showdown, finished
@@ -248,6 +269,15 @@ class TexasHoldemGame:
         self.wait_until = 0
         self.hand_count = 1
         
+        # AI设置：standard 为策略表/启发式，mcts 为限时树搜索（思考时间由难度决定）
+        self.ai_mode = "standard"
+        self.ai_difficulty = 2
+        self.last_search = None
+        # AI决策在后台线程计算，主线程只负责快照和执行
+        self.ai_worker = AIWorker()
+        # 座位 -> 插件AI（见 bots.py），未设置的座位使用内置AI
+        self.seat_bots = {}
+        
         # 开始游戏
         self.start_new_hand()
     
@@ -285,6 +315,8 @@ class TexasHoldemGame:
         self.winners = []
         self.feedback = ""
         self.is_waiting = False
+        # 按街道记录的行动历史（用于查询策略表）
+        self.action_history = [""]
         
         # 重置玩家状态
         for player in self.players:
@@ -295,6 +327,12 @@ class TexasHoldemGame:
             player.hand[0].face_up = player.is_human
             player.hand[1].face_up = player.is_human
         
+        self.opponent_stats.start_hand()
+        
+        # 记录本手牌开始时的筹码（用于计算各玩家已投入的筹码）
+        self.hand_start_chips = [player.chips for player in self.players]
+        self.ai_worker.cancel()
+        
         # 下盲注
         self._post_blinds()
         
@@ -320,13 +358,14 @@ class TexasHoldemGame:
         
         self.table.pot = small_blind_amount + big_blind_amount
         self.table.current_bet = self.table.big_blind
+        self.table.min_raise = self.table.big_blind
         
         # 从大盲后开始行动
         self.current_player_idx = (big_blind_position + 1) % len(self.players)
     
     def handle_player_action(self, action):
-        """处理玩家行动"""
-        if not self.is_hand_active:
+        """处理玩家行动（只在下注轮中接受，摊牌停顿期间的点击被忽略）"""
+        if not self.is_hand_active or self.game_state not in STREET_NAMES:
             return False
         
         player = self.players[self.current_player_idx]
@@ -336,6 +375,7 @@ class TexasHoldemGame:
         if action == "fold":
             player.fold()
             self.feedback = f"{player.name} 弃牌"
+            self._record_action("fold")
             self._advance_game()
             
         elif action == "check":
@@ -344,6 +384,7 @@ class TexasHoldemGame:
                 return False
             else:
                 self.feedback = f"{player.name} 过牌"
+                self._record_action("check")
                 self._advance_game()
                 
         elif action == "call":
@@ -352,6 +393,7 @@ class TexasHoldemGame:
                 amount = player.bet(call_amount)
                 self.table.pot += amount
                 self.feedback = f"{player.name} 跟注 {amount:,}"
+                self._record_action("call")
             else:
                 self.handle_player_action("check")
                 return True
@@ -359,28 +401,12 @@ class TexasHoldemGame:
             self._advance_game()
             
         elif action == "raise":
-            # 简化加注：加注到当前下注的2倍
-            raise_to = max(self.table.current_bet * 2, self.table.big_blind * 2)
-            raise_amount = raise_to - player.current_bet
-            
-            if raise_amount > player.chips:
-                return self.handle_player_action("all_in")
-            
-            amount = player.bet(raise_amount)
-            self.table.pot += amount
-            self.table.current_bet = raise_to
-            self.feedback = f"{player.name} 加注到 {raise_to:,}"
-            
+            # 简化加注：加注到当前下注的2倍（筹码不足时全下）
+            self._raise_to(player, max(self.table.current_bet * 2, self.table.big_blind * 2))
             self._advance_game()
             
         elif action == "all_in":
-            all_in_amount = player.chips
-            amount = player.bet(all_in_amount)
-            self.table.pot += amount
-            if player.current_bet > self.table.current_bet:
-                self.table.current_bet = player.current_bet
-            
-            self.feedback = f"{player.name} 全下 {all_in_amount:,}"
+            self._all_in(player)
             self._advance_game()
         
         return True
@@ -404,8 +430,15 @@ class TexasHoldemGame:
         # 如果是AI玩家，设置等待时间
         current_player = self.players[self.current_player_idx]
         if not current_player.is_human:
+            delay = random.uniform(0.5, 1.5)
+            if self.ai_mode == "mcts":
+                # 思考延迟至少覆盖搜索预算
+                delay = max(delay, difficulty_budget(self.ai_difficulty))
             self.is_waiting = True
-            self.wait_until = Clock.get_time() + random.uniform(0.5, 1.5)
+            self.wait_until = Clock.get_time() + delay
+            # 立即开始后台思考，思考延迟即计算时间
+            self.ai_worker.submit(self._build_decision_request(current_player, delay),
+                                  self.seat_bots.get(self.current_player_idx))
     
     def _next_street(self):
         """进入下一阶段"""
@@ -439,7 +472,12 @@ class TexasHoldemGame:
             return
         
         # 重置下注轮
+        self.action_history.append("")
+        self.opponent_stats.start_street(
+            STREET_NAMES.index(self.game_state),
+            [i for i, player in enumerate(self.players) if not player.folded])
         self.table.current_bet = 0
+        self.table.min_raise = self.table.big_blind
         for player in self.players:
             player.current_bet = 0
         
@@ -453,6 +491,12 @@ class TexasHoldemGame:
         """确定赢家（简化版）"""
         active_players = [p for p in self.players if not p.folded]
         
+        # 统计摊牌（剩余两人及以上）
+        if len(active_players) > 1:
+            self.opponent_stats.end_hand([self.players.index(p) for p in active_players])
+        else:
+            self.opponent_stats.end_hand()
+        
         if len(active_players) == 1:
             winner = active_players[0]
             winner.chips += self.table.pot
@@ -480,12 +524,17 @@ class TexasHoldemGame:
         """更新游戏逻辑"""
         current_time = Clock.get_time()
         
-        # AI行动
+        # AI行动：延迟结束且后台决策已完成时在主线程执行（未完成则下一帧再取，不阻塞）
         if self.is_hand_active and self.is_waiting and current_time > self.wait_until:
             player = self.players[self.current_player_idx]
             if not player.is_human:
-                self._process_ai_action(player)
-                self.is_waiting = False
+                if not self.ai_worker.pending:
+                    self.ai_worker.submit(self._build_decision_request(player),
+                                          self.seat_bots.get(self.current_player_idx))
+                result = self.ai_worker.poll()
+                if result is not None:
+                    self._process_ai_action(player, result)
+                    self.is_waiting = False
         
         # showdown阶段处理
         if self.game_state == "showdown" and self.is_waiting and current_time > self.wait_until:
@@ -496,27 +545,33 @@ class TexasHoldemGame:
         if self.game_state == "finished" and self.is_waiting and current_time > self.wait_until:
             self.start_new_hand()
     
-    def _process_ai_action(self, player):
-        """处理AI行动（智能版）"""
+    def _process_ai_action(self, player, result=None):
+        """处理AI行动（智能版）
+
+        result 为后台线程算好的 (请求, 行动, 搜索对象)；缺省时在当前线程同步计算。
+        """
         if not player.can_act():
             return
         
-        # 计算手牌强度
-        hand_strength = self._calculate_hand_strength(player)
-        
-        # 考虑位置因素（按钮位置优势）
-        position_factor = self._get_position_factor(player)
-        
-        # 考虑下注历史
-        bet_history_factor = self._get_bet_history_factor()
+        if result is None:
+            request = self._build_decision_request(player)
+            bot = self.seat_bots.get(request.seat)
+            action, search = decide(request) if bot is None else bot.decision(request)
+        else:
+            request, action, search = result
+        hand_strength = request.hand_strength
         
-        # 智能决策
-        action = self._make_ai_decision(player, hand_strength, position_factor, bet_history_factor)
+        # 汇报搜索速度
+        if search is not None:
+            self.last_search = search
+            Logger.debug(f"AI: {player.name} 搜索 {search.playouts:,} 次模拟，"
+                         f"{search.playouts_per_second():,.0f} 次/秒")
         
         # 执行AI行动
         if action == "fold":
             player.fold()
             self.feedback = f"{player.name} 弃牌"
+            self._record_action("fold")
         elif action == "check":
             if self.table.current_bet > player.current_bet:
                 # 不能过牌则跟注
@@ -525,148 +580,185 @@ class TexasHoldemGame:
                     amount = player.bet(call_amount)
                     self.table.pot += amount
                     self.feedback = f"{player.name} 跟注 {amount:,}"
+                    self._record_action("call")
                 else:
                     self.feedback = f"{player.name} 过牌"
+                    self._record_action("check")
             else:
                 self.feedback = f"{player.name} 过牌"
+                self._record_action("check")
         elif action == "call":
             call_amount = self.table.current_bet - player.current_bet
             if call_amount > 0:
                 amount = player.bet(call_amount)
                 self.table.pot += amount
                 self.feedback = f"{player.name} 跟注 {amount:,}"
+                self._record_action("call")
             else:
                 self.feedback = f"{player.name} 过牌"
+                self._record_action("check")
         elif action == "raise":
-            # 智能加注：根据手牌强度决定加注额度
-            raise_multiplier = 1.5 + (hand_strength * 1.5)  # 1.5-3倍
-            raise_to = max(self.table.current_bet * raise_multiplier, self.table.big_blind * 2)
-            raise_amount = raise_to - player.current_bet
-            
-            if raise_amount > player.chips:
-                # 加注额度超过筹码，改为全下
-                all_in_amount = player.chips
-                amount = player.bet(all_in_amount)
-                self.table.pot += amount
-                if player.current_bet > self.table.current_bet:
-                    self.table.current_bet = player.current_bet
-                self.feedback = f"{player.name} 全下 {all_in_amount:,}"
-            else:
-                amount = player.bet(raise_amount)
-                self.table.pot += amount
-                self.table.current_bet = raise_to
-                self.feedback = f"{player.name} 加注到 {raise_to:,}"
+            # 智能加注：根据手牌强度决定加注额度（1.5-3倍，取整并收进合法区间）
+            raise_multiplier = 1.5 + (hand_strength * 1.5)
+            self._raise_to(player, max(self.table.current_bet * raise_multiplier, self.table.big_blind * 2))
         elif action == "all_in":
-            all_in_amount = player.chips
-            amount = player.bet(all_in_amount)
-            self.table.pot += amount
-            if player.current_bet > self.table.current_bet:
-                self.table.current_bet = player.current_bet
-            self.feedback = f"{player.name} 全下 {all_in_amount:,}"
+            self._all_in(player)
         
         self._advance_game()
     
+    def get_legal_actions(self, player=None):
+        """当前（或指定）玩家的 (合法行动位掩码, 最小加注到, 最大加注到)"""
+        if player is None:
+            player = self.players[self.current_player_idx]
+        return legal_actions(player.chips, player.current_bet, self.table.current_bet,
+                             self.table.min_raise, self.table.big_blind)
+    
+    def _raise_to(self, player, raise_to):
+        """加注到 raise_to（取整并收进合法区间）；达到最大加注额时改为全下"""
+        _, floor, ceiling = self.get_legal_actions(player)
+        raise_to = clamp_raise(raise_to, floor, ceiling)
+        if raise_to >= ceiling:
+            self._all_in(player)
+            return
+        
+        amount = player.bet(raise_to - player.current_bet)
+        self.table.pot += amount
+        self.table.min_raise = next_min_raise(self.table.current_bet, raise_to, self.table.min_raise)
+        self.table.current_bet = raise_to
+        self.feedback = f"{player.name} 加注到 {raise_to:,}"
+        self._record_action("raise")
+    
+    def _all_in(self, player):
+        """全下；超过当前注时视为加注（不足一次完整加注时不改变最小加注增量）"""
+        all_in_amount = player.chips
+        amount = player.bet(all_in_amount)
+        self.table.pot += amount
+        if player.current_bet > self.table.current_bet:
+            self.table.min_raise = next_min_raise(self.table.current_bet, player.current_bet,
+                                                  self.table.min_raise)
+            self.table.current_bet = player.current_bet
+        self.feedback = f"{player.name} 全下 {all_in_amount:,}"
+        self._record_action("all_in")
+    
+    def _record_action(self, action):
+        """记录当前街的行动"""
+        self.action_history[-1] += ACTION_CODES[ACTIONS.index(action)]
+        self.opponent_stats.record(self.current_player_idx, STREET_NAMES.index(self.game_state), action)
+    
+    def set_ai_difficulty(self, difficulty):
+        """设置AI难度（1-3，对应搜索模式的思考时间）"""
+        self.ai_difficulty = min(3, max(1, int(round(difficulty))))
+    
+    def set_ai_mode(self, mode):
+        """设置AI模式：standard 或 mcts"""
+        self.ai_mode = mode
+    
+    def set_seat_bot(self, seat, bot):
+        """为某个AI座位换上插件AI（bots.Bot），传入None恢复内置AI"""
+        if self.players[seat].is_human:
+            raise ValueError("不能替换人类玩家的座位")
+        old = self.seat_bots.pop(seat, None)
+        if old is not None and old is not bot:
+            old.close()
+        if bot is not None:
+            self.seat_bots[seat] = bot
+    
+    def _build_decision_request(self, player, budget=None):
+        """在主线程为当前AI拍下决策快照（后台线程只读取快照，不接触游戏对象）
+
+        budget 为可用的思考时间，搜索模式下不超过难度预算。
+        """
+        # 计算手牌强度
+        hand_strength = self._calculate_hand_strength(player)
+        
+        # 考虑位置因素（按钮位置优势）
+        position_factor = self._get_position_factor(player)
+        
+        # 考虑下注历史
+        bet_history_factor = self._get_bet_history_factor()
+        
+        # 筹码相对于10个大盲的比例
+        chip_ratio = player.chips / (self.table.big_blind * 10)
+        
+        seat = self.players.index(player)
+        legal_mask, min_raise_to, max_raise_to = self.get_legal_actions(player)
+        search_root = None
+        if self.ai_mode == "mcts":
+            budget = difficulty_budget(self.ai_difficulty) if budget is None else min(
+                budget, difficulty_budget(self.ai_difficulty))
+            search_root = build_root_state(
+                self.game_state,
+                [p.chips for p in self.players],
+                [start - p.chips for start, p in zip(self.hand_start_chips, self.players)],
+                [p.current_bet for p in self.players],
+                [p.folded for p in self.players],
+                [p.all_in for p in self.players],
+                self.table.current_bet, seat, self.action_history,
+                self.table.small_blind, self.table.big_blind,
+            )
+        
+        return DecisionRequest(
+            seat, len(self.players), cards_to_ints(player.hand),
+            cards_to_ints(self.table.community_cards), self.game_state, list(self.action_history),
+            hand_strength, position_factor, bet_history_factor, chip_ratio,
+            self.ai_mode, search_root, budget or 0.0, self._get_opponent_looseness(player),
+            self._push_fold_action(player) if chip_ratio < 0.5 else None,
+            legal_mask, min_raise_to, max_raise_to,
+        )
+    
     def _calculate_hand_strength(self, player):
         """计算手牌强度（0-1）"""
+        # 翻牌后优先查分桶表：一次索引查找即可得到期望牌力
+        if self.table.community_cards:
+            strength = postflop_strength(player.hand, self.table.community_cards)
+            if strength is not None:
+                return strength
+        
         # 简化版手牌强度计算
-        ranks = [card.rank.value_num for card in player.hand]
-        suits = [card.suit for card in player.hand]
-        
-        # 高牌
-        max_rank = max(ranks)
-        high_card_strength = (max_rank - 2) / 12.0  # 2-14映射到0-1
-        
-        # 对子
-        pair_strength = 0
-        if ranks[0] == ranks[1]:
-            pair_strength = 0.3 + (max_rank - 2) / 12.0 * 0.3
-        
-        # 同花潜力
-        flush_potential = 0
-        if suits[0] == suits[1]:
-            flush_potential = 0.2
-        
-        # 连牌潜力
-        straight_potential = 0
-        rank_diff = abs(ranks[0] - ranks[1])
-        if rank_diff <= 4:
-            straight_potential = 0.2 - (rank_diff * 0.05)
-        
-        return min(1.0, high_card_strength + pair_strength + flush_potential + straight_potential)
+        return hole_card_strength(cards_to_ints(player.hand))
     
     def _get_position_factor(self, player):
         """获取位置优势因子"""
-        # 按钮位置优势：越晚行动优势越大
-        total_players = len(self.players)
-        player_index = self.players.index(player)
-        
-        # 计算相对于按钮的位置
-        button_distance = (player_index - self.current_player_idx) % total_players
-        position_advantage = 1.0 - (button_distance / total_players)
-        
-        return position_advantage
+        return position_factor(self.players.index(player), self.current_player_idx, len(self.players))
     
     def _get_bet_history_factor(self):
         """获取下注历史因子"""
-        # 计算当前下注轮的激进程度
-        if self.table.current_bet == 0:
-            return 0.0  # 无人下注
-        
-        # 下注额相对于大盲注的比例
-        bet_aggressiveness = self.table.current_bet / self.table.big_blind
-        
-        return min(1.0, bet_aggressiveness / 5.0)  # 归一化到0-1
+        return bet_history_factor(self.table.current_bet, self.table.big_blind)
+    
+    def _get_opponent_looseness(self, player):
+        """本街最后加注者的松凶程度；无人加注或加注者是自己时返回None"""
+        seat = self.opponent_stats.last_aggressor
+        if seat < 0 or seat == self.players.index(player):
+            return None
+        return self.opponent_stats.looseness(seat)
+    
+    def _push_fold_action(self, player):
+        """短筹码翻牌前查推/弃图表；无表或局面不适用时返回None"""
+        if self.game_state != "preflop":
+            return None
+        chart = get_push_fold_chart()
+        if chart is None:
+            return None
+        return preflop_push_fold(chart, self.hand_start_chips, self.players.index(player),
+                                 cards_to_ints(player.hand), self.action_history[0],
+                                 self.table.big_blind)
     
     def _make_ai_decision(self, player, hand_strength, position_factor, bet_history_factor):
         """智能决策"""
-        # 基础决策权重
-        base_weights = {
-            "fold": 0.1,
-            "check": 0.3,
-            "call": 0.4,
-            "raise": 0.15,
-            "all_in": 0.05
-        }
-        
-        # 根据手牌强度调整权重
-        if hand_strength > 0.7:  # 强牌
-            base_weights["fold"] = 0.01
-            base_weights["raise"] = 0.4
-            base_weights["all_in"] = 0.1
-        elif hand_strength < 0.3:  # 弱牌
-            base_weights["fold"] = 0.3
-            base_weights["raise"] = 0.05
-        
-        # 根据位置调整权重
-        if position_factor > 0.7:  # 有利位置
-            base_weights["raise"] *= 1.5
-            base_weights["check"] *= 1.2
-        else:  # 不利位置
-            base_weights["fold"] *= 1.3
-            base_weights["call"] *= 0.8
-        
-        # 根据下注历史调整权重
-        if bet_history_factor > 0.5:  # 激进的下注环境
-            base_weights["fold"] *= 1.5
-            base_weights["call"] *= 0.7
-        
-        # 筹码管理
-        chip_ratio = player.chips / (self.table.big_blind * 10)  # 相对于10个大盲
-        if chip_ratio < 0.5:  # 短筹码
-            base_weights["all_in"] *= 2.0
-            base_weights["fold"] *= 0.5
-        elif chip_ratio > 3.0:  # 深筹码
-            base_weights["raise"] *= 1.3
-        
-        # 归一化权重
-        total = sum(base_weights.values())
-        normalized_weights = {k: v/total for k, v in base_weights.items()}
+        # 筹码相对于10个大盲的比例
+        chip_ratio = player.chips / (self.table.big_blind * 10)
         
-        # 选择行动
-        actions = list(normalized_weights.keys())
-        weights = list(normalized_weights.values())
+        # 短筹码：按推/弃图表行动
+        if chip_ratio < 0.5:
+            action = self._push_fold_action(player)
+            if action is not None:
+                return action
         
-        return random.choices(actions, weights=weights)[0]
+        weights = heuristic_weights(hand_strength, position_factor, bet_history_factor, chip_ratio,
+                                    self._get_opponent_looseness(player))
+        
+        # 选择行动
+        return choose_action(weights)
 
 # ==============================================
 # Kivy UI组件
@@ -834,7 +926,17 @@ class PokerGameWidget(BoxLayout):
             font_size=screen_adapter.get_font_size(14)
         )
         self.status_bar.add_widget(hand_label)
-        
+
+        # 设置按钮（音效、AI难度与搜索AI）
+        self.sound_manager = SoundManager()
+        settings_btn = Button(
+            text="设置",
+            size_hint=(0.2, 1),
+            font_size=screen_adapter.get_font_size(14)
+        )
+        settings_btn.bind(on_press=self.open_settings)
+        self.status_bar.add_widget(settings_btn)
+
         self.add_widget(self.status_bar)
         
         # 游戏区域
@@ -904,7 +1006,13 @@ class PokerGameWidget(BoxLayout):
     def on_button_press(self, action):
         """按钮点击处理"""
         self.game.handle_player_action(action)
-    
+
+    def open_settings(self, instance=None):
+        """打开设置弹窗"""
+        popup = SettingsPopup(self.sound_manager, self.game)
+        popup.open()
+        return popup
+
     def update_display(self, dt):
         """更新显示（性能优化版）"""
         current_time = Clock.get_time()
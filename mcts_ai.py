@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 蒙特卡洛树搜索AI
+在限定的时间预算内，对未知的对手手牌和公共牌做随机确定化，
+用抽象牌局状态（cfr_solver.AbstractState）的廉价复制与七张牌评估器
+完成模拟，按访问次数最多的根行动决策
+
+搜索有硬性截止时间：run() 只在给定的截止时间之前工作，
+游戏在后台线程里用AI的思考延迟运行搜索（见 ai_worker.py）
+"""
+
+import math
+import time
+import random
+
+from hand_indexer import DECK_SIZE
+from hand_evaluator import evaluate
+from cfr_solver import (
+    ACTIONS, AbstractGameConfig, AbstractState, STREET_NAMES,
+    FOLD, CHECK, CALL, RAISE, ALL_IN,
+)
+
+# 难度（设置界面的AI难度滑块 1-3）对应的思考时间预算（秒）
+MCTS_BUDGETS = {1: 0.25, 2: 0.6, 3: 1.2}
+
+# 搜索树中每条街允许的加注次数
+MCTS_RAISE_CAP = 3
+
+# UCB探索系数（以大盲为单位的收益）
+EXPLORATION = 2.0
+
+# 模拟走子时各行动的相对权重（偏向跟注/过牌，接近真实牌局的行动分布）
+ROLLOUT_WEIGHTS = {FOLD: 1.0, CHECK: 3.0, CALL: 3.0, RAISE: 1.0, ALL_IN: 0.3}
+
+
+def difficulty_budget(difficulty):
+    """把AI难度（可为滑块的小数值）换算为思考时间预算"""
+    level = min(max(int(round(difficulty)), min(MCTS_BUDGETS)), max(MCTS_BUDGETS))
+    return MCTS_BUDGETS[level]
+
+
+class _Determinization:
+    """一次确定化：补全对手手牌与剩余公共牌"""
+
+    __slots__ = ("holes", "board", "_scores")
+
+    def __init__(self, holes, board):
+        self.holes = holes
+        self.board = board
+        self._scores = None
+
+    def showdown_strengths(self):
+        """各位玩家的摊牌分值"""
+        if self._scores is None:
+            self._scores = [evaluate(hole + self.board) for hole in self.holes]
+        return self._scores
+
+
+class _Node:
+    """搜索树节点：按行动记录访问次数与行动者的累计收益"""
+
+    __slots__ = ("actions", "visits", "values", "children", "total")
+
+    def __init__(self, actions):
+        self.actions = actions
+        self.visits = dict.fromkeys(actions, 0)
+        self.values = dict.fromkeys(actions, 0.0)
+        self.children = {}
+        self.total = 0
+
+    def select(self, rng):
+        """先尝试未访问过的行动，之后按UCB1选择"""
+        untried = [a for a in self.actions if self.visits[a] == 0]
+        if untried:
+            return rng.choice(untried)
+        log_total = math.log(self.total)
+        return max(self.actions, key=lambda a: self.values[a] / self.visits[a]
+                   + EXPLORATION * math.sqrt(log_total / self.visits[a]))
+
+    def update(self, action, reward):
+        """回传一次模拟的收益"""
+        self.total += 1
+        self.visits[action] += 1
+        self.values[action] += reward
+
+
+def _rollout(state, rng):
+    """按 ROLLOUT_WEIGHTS 随机走子直到牌局结束"""
+    while not state.terminal:
+        legal = state.legal_actions()
+        action = rng.choices(legal, weights=[ROLLOUT_WEIGHTS[a] for a in legal])[0]
+        state = state.child(action)
+    return state
+
+
+def build_root_state(street, stacks, contributed, street_bets, folded, all_in,
+                     current_bet, to_act, history, small_blind, big_blind):
+    """由牌桌上的实时数据构造抽象牌局状态（5人桌、按钮在0号位，与游戏一致）
+
+    contributed 为每位玩家本手牌已投入的筹码，history 为按街道记录的行动串。
+    """
+    n = len(stacks)
+    config = AbstractGameConfig(
+        num_seats=n, stacks=[s + c for s, c in zip(stacks, contributed)],
+        small_blind=small_blind, big_blind=big_blind,
+        raise_cap=MCTS_RAISE_CAP, streets=STREET_NAMES, chance_model="cards",
+    )
+    state = AbstractState()
+    state.config = config
+    state.deal = None
+    state.street = STREET_NAMES.index(street)
+    state.stacks = list(stacks)
+    state.contributed = list(contributed)
+    state.street_bets = list(street_bets)
+    state.folded = list(folded)
+    state.all_in = list(all_in)
+    state.current_bet = current_bet
+    state.raises = history[-1].count("R") + history[-1].count("A")
+    state.to_act = to_act
+    state.history = list(history)
+    state.terminal = False
+
+    # 本街已经行动过的玩家。有人加注过（当前注额高于本街开始时）时，行动可能已绕过一圈：
+    # 最后的加注者和之后跟上的玩家本街投入都等于当前注额，其余玩家还要行动；
+    # 没有加注时行动没有绕圈，是从本街首位行动者起到当前行动者之前的玩家
+    state.acted = [False] * n
+    opening_bet = big_blind if state.street == 0 else 0
+    if current_bet > opening_bet:
+        state.acted = [not folded[i] and not all_in[i] and street_bets[i] == current_bet for i in range(n)]
+    elif history[-1]:
+        first = (1 % n + 2) % n if state.street == 0 else next(
+            i for i in range(n) if not folded[i] and not all_in[i])
+        seat = first
+        while seat != to_act:
+            state.acted[seat] = True
+            seat = (seat + 1) % n
+    return state
+
+
+class MCTSSearch:
+    """一次决策的搜索（可分多次 run() 推进）"""
+
+    def __init__(self, root, hole, board, rng=None):
+        self.root = root
+        self.seat = root.to_act
+        self.hole = list(hole)
+        self.board = list(board)
+        self.rng = rng or random.Random()
+        known = set(self.hole) | set(self.board)
+        self.unknown = [c for c in range(DECK_SIZE) if c not in known]
+        self.tree = _Node(root.legal_actions())
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def _determinize(self):
+        """随机补全未知的牌"""
+        n = self.root.config.num_seats
+        cards = self.rng.sample(self.unknown, 2 * (n - 1) + 5 - len(self.board))
+        holes = []
+        k = 0
+        for seat in range(n):
+            if seat == self.seat:
+                holes.append(self.hole)
+            else:
+                holes.append(cards[k:k + 2])
+                k += 2
+        return _Determinization(holes, self.board + cards[k:])
+
+    def _playout(self):
+        """选择-扩展-模拟-回传一次"""
+        state = self.root.copy()
+        state.deal = self._determinize()
+        node = self.tree
+        path = []
+        while not state.terminal:
+            action = node.select(self.rng)
+            path.append((node, action, state.to_act))
+            state = state.child(action)
+            if state.terminal:
+                break
+            child = node.children.get(action)
+            if child is None:
+                node.children[action] = _Node(state.legal_actions())
+                state = _rollout(state, self.rng)
+                break
+            node = child
+
+        payoffs = state.payoffs()
+        for node, action, seat in path:
+            node.update(action, payoffs[seat])
+        self.playouts += 1
+
+    def run(self, deadline):
+        """搜索到 deadline（time.perf_counter() 时刻）为止；单次模拟很短，超时不超过一次模拟"""
+        if len(self.tree.actions) < 2:
+            return
+        started = time.perf_counter()
+        while time.perf_counter() < deadline:
+            self._playout()
+        self.elapsed += time.perf_counter() - started
+
+    def best_action(self):
+        """访问次数最多的根行动名称（取自 cfr_solver.ACTIONS）"""
+        visits = self.tree.visits
+        return ACTIONS[max(self.tree.actions, key=lambda a: visits[a])]
+
+    def playouts_per_second(self):
+        """模拟速度"""
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
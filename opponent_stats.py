@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 对手建模统计
+按座位统计 VPIP、PFR、激进度（AF）、面对持续下注弃牌率、摊牌率（WTSD），
+每个行动O(1)更新；计数按手数指数衰减（惰性计算，只在读写时折算），
+全部存放在定长数组里，长时间对局内存占用不变
+"""
+
+from array import array
+
+# 计数器编号（每个座位一组）
+VPIP_HANDS = 0      # 主动入池的手数
+PFR_HANDS = 1       # 翻牌前加注的手数
+HANDS = 2           # 参与的手数
+AGGRESSIVE = 3      # 翻牌后下注/加注次数
+CALLS = 4           # 翻牌后跟注次数
+CBET_FOLDS = 5      # 面对持续下注弃牌次数
+CBET_FACED = 6      # 面对持续下注次数
+SHOWDOWNS = 7       # 看到翻牌后进入摊牌的手数
+SAW_FLOP = 8        # 看到翻牌的手数
+NUM_COUNTERS = 9
+
+# 默认半衰期（手）：约200手前的行动权重减半
+DEFAULT_HALF_LIFE = 200
+
+# 样本不足时的先验（典型牌手的数值）与先验权重（等效手数）
+PRIORS = {
+    "vpip": 0.30,
+    "pfr": 0.15,
+    "aggression": 1.0,
+    "fold_to_cbet": 0.50,
+    "wtsd": 0.30,
+}
+PRIOR_WEIGHT = 5.0
+
+_AGGRESSIVE_ACTIONS = ("raise", "all_in")
+_VOLUNTARY_ACTIONS = ("call", "raise", "all_in")
+
+
+class OpponentStats:
+    """按座位的对手统计（座位数固定，内存不随手数增长）"""
+
+    def __init__(self, num_seats, half_life=DEFAULT_HALF_LIFE):
+        self.num_seats = num_seats
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.hand = 0
+        size = num_seats * NUM_COUNTERS
+        self._values = array("d", [0.0]) * size
+        self._stamps = array("q", [0]) * size
+
+        # 本手牌的状态（每手重置）
+        self._vpip = array("b", [0]) * num_seats
+        self._pfr = array("b", [0]) * num_seats
+        self._cbet_faced = array("b", [0]) * num_seats
+        self._saw_flop = array("b", [0]) * num_seats
+        self.preflop_aggressor = -1
+        self.last_aggressor = -1
+        self._cbet_live = False
+        self._flop_aggression = False
+
+    # ----------------------------------------------
+    # 计数器读写
+    # ----------------------------------------------
+
+    def _add(self, seat, counter, amount=1.0):
+        """衰减到当前手后累加"""
+        i = seat * NUM_COUNTERS + counter
+        elapsed = self.hand - self._stamps[i]
+        if elapsed:
+            self._values[i] *= self.decay ** elapsed
+            self._stamps[i] = self.hand
+        self._values[i] += amount
+
+    def count(self, seat, counter):
+        """衰减到当前手后的计数"""
+        i = seat * NUM_COUNTERS + counter
+        return self._values[i] * self.decay ** (self.hand - self._stamps[i])
+
+    def _ratio(self, seat, hits, chances, prior):
+        """带先验平滑的比例"""
+        return (self.count(seat, hits) + prior * PRIOR_WEIGHT) / (self.count(seat, chances) + PRIOR_WEIGHT)
+
+    # ----------------------------------------------
+    # 事件
+    # ----------------------------------------------
+
+    def start_hand(self, seats=None):
+        """新的一手牌开始（seats 为发到牌的座位，默认全部）"""
+        self.hand += 1
+        for seat in range(self.num_seats) if seats is None else seats:
+            self._add(seat, HANDS)
+        for flags in (self._vpip, self._pfr, self._cbet_faced, self._saw_flop):
+            for seat in range(self.num_seats):
+                flags[seat] = 0
+        self.preflop_aggressor = -1
+        self.last_aggressor = -1
+        self._cbet_live = False
+        self._flop_aggression = False
+
+    def start_street(self, street, live_seats):
+        """进入新的一条街（street 为 0-3），live_seats 为未弃牌的座位"""
+        self.last_aggressor = -1
+        if street == 1:
+            for seat in live_seats:
+                self._saw_flop[seat] = 1
+                self._add(seat, SAW_FLOP)
+
+    def record(self, seat, street, action):
+        """记录一次行动（action 取自 fold/check/call/raise/all_in）"""
+        aggressive = action in _AGGRESSIVE_ACTIONS
+
+        if street == 0:
+            if action in _VOLUNTARY_ACTIONS and not self._vpip[seat]:
+                self._vpip[seat] = 1
+                self._add(seat, VPIP_HANDS)
+            if aggressive:
+                self.preflop_aggressor = seat
+                if not self._pfr[seat]:
+                    self._pfr[seat] = 1
+                    self._add(seat, PFR_HANDS)
+        else:
+            if aggressive:
+                self._add(seat, AGGRESSIVE)
+            elif action == "call":
+                self._add(seat, CALLS)
+
+        if street == 1:
+            # 持续下注：翻牌前最后的加注者在翻牌圈率先下注
+            if self._cbet_live and seat != self.preflop_aggressor and not self._cbet_faced[seat]:
+                self._cbet_faced[seat] = 1
+                self._add(seat, CBET_FACED)
+                if action == "fold":
+                    self._add(seat, CBET_FOLDS)
+            if aggressive:
+                self._cbet_live = not self._flop_aggression and seat == self.preflop_aggressor
+                self._flop_aggression = True
+
+        if aggressive:
+            self.last_aggressor = seat
+
+    def end_hand(self, showdown_seats=()):
+        """一手牌结束，showdown_seats 为进入摊牌的座位"""
+        for seat in showdown_seats:
+            if self._saw_flop[seat]:
+                self._add(seat, SHOWDOWNS)
+
+    # ----------------------------------------------
+    # 查询
+    # ----------------------------------------------
+
+    def vpip(self, seat):
+        """主动入池率"""
+        return self._ratio(seat, VPIP_HANDS, HANDS, PRIORS["vpip"])
+
+    def pfr(self, seat):
+        """翻牌前加注率"""
+        return self._ratio(seat, PFR_HANDS, HANDS, PRIORS["pfr"])
+
+    def aggression(self, seat):
+        """激进度 AF =（下注+加注）/ 跟注"""
+        return self._ratio(seat, AGGRESSIVE, CALLS, PRIORS["aggression"])
+
+    def fold_to_cbet(self, seat):
+        """面对持续下注的弃牌率"""
+        return self._ratio(seat, CBET_FOLDS, CBET_FACED, PRIORS["fold_to_cbet"])
+
+    def wtsd(self, seat):
+        """看到翻牌后进入摊牌的比例"""
+        return self._ratio(seat, SHOWDOWNS, SAW_FLOP, PRIORS["wtsd"])
+
+    def looseness(self, seat):
+        """0-1 的松凶程度：入池率与加注率的加权，典型牌手约0.3"""
+        return min(1.0, 0.6 * self.vpip(seat) + 0.4 * min(1.0, self.pfr(seat) * 2))
+
+    def profile(self, seat):
+        """某座位的全部统计"""
+        return {
+            "hands": self.count(seat, HANDS),
+            "vpip": self.vpip(seat),
+            "pfr": self.pfr(seat),
+            "aggression": self.aggression(seat),
+            "fold_to_cbet": self.fold_to_cbet(seat),
+            "wtsd": self.wtsd(seat),
+        }
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 短筹码推/弃纳什图表
+离线：用向量化的蒙特卡洛计算169类起手牌两两全下胜率，
+再用虚拟对局（fictitious play）求解 2-5 人、1-20 大盲筹码深度下
+首个入池全下（推）与面对全下跟注的均衡范围，打包成每种局面 169 位的小表
+运行时：短筹码AI的翻牌前决策只需一次查表
+
+模型：无前注、筹码深度相同；推的人后面最多一人跟注（其余弃牌），按筹码期望值计算
+
+用法:
+  python3 push_fold.py build --boards 20000 --processes 8
+  python3 push_fold.py show --players 5 --stack 8
+"""
+
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+from multiprocessing import Pool
+
+from hand_indexer import DECK_SIZE, RANK_SYMBOLS, get_street_indexer
+from hand_evaluator import evaluate
+from hand_buckets import TABLE_DIR
+
+# ==============================================
+# 表文件格式
+# ==============================================
+
+CHART_MAGIC = b"PFNC"
+CHART_VERSION = 1
+MIN_PLAYERS = 2
+MAX_PLAYERS = 5
+MAX_STACK_BB = 20
+NUM_CLASSES = 169
+
+# 魔数, 版本, 最少人数, 最多人数, 最大筹码深度（大盲）
+_HEADER = struct.Struct("<4sBBBB")
+# 每种局面 169 位
+_ROW_BYTES = (NUM_CLASSES + 7) // 8
+
+# 盲注（以大盲为单位）
+SMALL_BLIND_BB = 0.5
+
+
+def chart_path(table_dir=TABLE_DIR):
+    """推/弃图表文件路径"""
+    return os.path.join(table_dir, "push_fold.bin")
+
+
+def equity_path(table_dir=TABLE_DIR):
+    """起手牌胜率矩阵缓存路径"""
+    return os.path.join(table_dir, "preflop_equity.npy")
+
+
+def situations(num_players):
+    """某人数下的局面顺序：先各位置的推，再 (推的位置, 跟注位置) 的跟注
+
+    位置按翻牌前行动顺序编号，最后两个位置为小盲、大盲（单挑时为小盲、大盲）。
+    """
+    pushes = [("push", i, None) for i in range(num_players - 1)]
+    calls = [("call", i, j) for i in range(num_players - 1) for j in range(i + 1, num_players)]
+    return pushes + calls
+
+
+def position_blind(position, num_players):
+    """某位置下的盲注（大盲）"""
+    if position == num_players - 1:
+        return 1.0
+    if position == num_players - 2:
+        return SMALL_BLIND_BB
+    return 0.0
+
+
+def hand_class(hole):
+    """两张底牌（整数牌）的起手牌类别 0-168"""
+    return get_street_indexer("preflop").index(list(hole))
+
+
+_RANK_LETTERS = [symbol if len(symbol) == 1 else "T" for symbol in RANK_SYMBOLS]
+
+
+def class_name(index):
+    """起手牌类别的名称，如 AKs、T9o、77"""
+    a, b = get_street_indexer("preflop").unindex(index)
+    high, low = (_RANK_LETTERS[r] for r in sorted((a // 4, b // 4), reverse=True))
+    if high == low:
+        return high * 2
+    return high + low + ("s" if a % 4 == b % 4 else "o")
+
+
+# ==============================================
+# 运行时查表
+# ==============================================
+
+class PushFoldChart:
+    """推/弃图表（整张表只有十几KB，直接读入内存）"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, self.min_players, self.max_players, self.max_stack = \
+            _HEADER.unpack_from(data, 0)
+        if magic != CHART_MAGIC or version != CHART_VERSION:
+            raise ValueError(f"无效的推/弃图表文件: {path}")
+        self._data = data
+
+        # 每种人数的局面编号与数据起点
+        self._situations = {}
+        self._offsets = {}
+        offset = _HEADER.size
+        for n in range(self.min_players, self.max_players + 1):
+            self._situations[n] = {s: k for k, s in enumerate(situations(n))}
+            self._offsets[n] = offset
+            offset += len(self._situations[n]) * self.max_stack * _ROW_BYTES
+        if offset != len(data):
+            raise ValueError(f"推/弃图表大小不符: {path}")
+
+    def _bit(self, num_players, situation, stack_bb, hand):
+        """查一位；超出表范围返回None"""
+        if not self.min_players <= num_players <= self.max_players:
+            return None
+        stack = max(1, int(round(stack_bb)))
+        if stack > self.max_stack:
+            return None
+        index = self._situations[num_players].get(situation)
+        if index is None:
+            return None
+        rows = len(self._situations[num_players])
+        start = self._offsets[num_players] + ((stack - 1) * rows + index) * _ROW_BYTES
+        return bool(self._data[start + hand // 8] >> (hand % 8) & 1)
+
+    def should_push(self, num_players, position, stack_bb, hand):
+        """前面的人都弃牌时，该位置是否全下"""
+        return self._bit(num_players, ("push", position, None), stack_bb, hand)
+
+    def should_call(self, num_players, pusher, caller, stack_bb, hand):
+        """pusher 位置全下、中间都弃牌时，caller 位置是否跟注"""
+        return self._bit(num_players, ("call", pusher, caller), stack_bb, hand)
+
+    def range_size(self, num_players, situation, stack_bb):
+        """某局面范围内的起手牌组合比例（0-1）"""
+        combos = 0
+        for hand in range(NUM_CLASSES):
+            if self._bit(num_players, situation, stack_bb, hand):
+                combos += _class_combos(hand)
+        return combos / 1326
+
+
+def _class_combos(hand):
+    """起手牌类别的组合数：对子6，同花4，杂色12"""
+    a, b = get_street_indexer("preflop").unindex(hand)
+    if a // 4 == b // 4:
+        return 6
+    return 4 if a % 4 == b % 4 else 12
+
+
+_loaded_charts = {}
+
+
+def get_push_fold_chart(table_dir=TABLE_DIR):
+    """获取推/弃图表；文件不存在时返回None（结果会被缓存）"""
+    if table_dir not in _loaded_charts:
+        path = chart_path(table_dir)
+        _loaded_charts[table_dir] = PushFoldChart(path) if os.path.exists(path) else None
+    return _loaded_charts[table_dir]
+
+
+def preflop_push_fold(chart, start_stacks, seat, hole, preflop_history, big_blind):
+    """按图表给出翻牌前短筹码的行动（"all_in"/"call"/"fold"），不适用的局面返回None
+
+    start_stacks 为各座位本手牌开始时的筹码（与游戏一致：按钮0号位、其后小盲、大盲），
+    preflop_history 为翻牌前的行动串（字符取自 cfr_solver.ACTION_CODES）。
+    只处理两种局面：前面的人都弃牌（推或弃），以及只有一人全下、其余都弃牌（跟或弃）。
+    """
+    total = len(start_stacks)
+    small_blind_seat = 1 % total
+    big_blind_seat = (small_blind_seat + 1) % total
+    if not start_stacks[small_blind_seat] or not start_stacks[big_blind_seat]:
+        return None
+
+    # 本手牌的座位按翻牌前行动顺序排列，小盲、大盲在最后
+    first = (big_blind_seat + 1) % total
+    order = [(first + k) % total for k in range(total) if start_stacks[(first + k) % total] > 0]
+    num_players = len(order)
+    position = order.index(seat)
+    hand = hand_class(hole)
+
+    folds = len(preflop_history) - len(preflop_history.lstrip("F"))
+    rest = preflop_history[folds:]
+    if not rest:
+        if folds != position or position == num_players - 1:
+            return None
+        stack_bb = min(start_stacks[seat], max(start_stacks[s] for s in order[position + 1:])) / big_blind
+        push = chart.should_push(num_players, position, stack_bb, hand)
+        if push is None:
+            return None
+        return "all_in" if push else "fold"
+
+    if rest[0] == "A" and rest[1:] == "F" * (len(rest) - 1) and position == len(preflop_history):
+        pusher = folds
+        stack_bb = min(start_stacks[seat], start_stacks[order[pusher]]) / big_blind
+        call = chart.should_call(num_players, pusher, position, stack_bb, hand)
+        if call is None:
+            return None
+        return "call" if call else "fold"
+    return None
+
+
+# ==============================================
+# 离线：起手牌胜率矩阵（需要NumPy）
+# ==============================================
+
+def _combos():
+    """1326种底牌组合"""
+    return [(a, b) for a in range(DECK_SIZE) for b in range(a + 1, DECK_SIZE)]
+
+
+def _combo_tables(np):
+    """组合-牌成员矩阵、组合间是否无重叠、组合所属类别"""
+    combos = _combos()
+    members = np.zeros((len(combos), DECK_SIZE), dtype=bool)
+    for i, (a, b) in enumerate(combos):
+        members[i, a] = members[i, b] = True
+    overlap = members.astype(np.int32) @ members.T.astype(np.int32)
+    disjoint = overlap == 0
+    classes = np.array([hand_class(c) for c in combos])
+    return combos, members, disjoint, classes
+
+
+def _equity_worker(task):
+    """进程池任务：随机公共牌上所有组合两两比较，累计胜负"""
+    import numpy as np
+
+    boards, seed = task
+    combos, members, disjoint, _ = _combo_tables(np)
+    rng = random.Random(seed)
+    size = len(combos)
+    wins = np.zeros((size, size), dtype=np.float32)
+    counts = np.zeros((size, size), dtype=np.uint32)
+    for _ in range(boards):
+        board = rng.sample(range(DECK_SIZE), 5)
+        valid = ~members[:, board].any(axis=1)
+        scores = np.full(size, -1, dtype=np.int64)
+        for i in np.flatnonzero(valid):
+            scores[i] = evaluate(list(combos[i]) + board)
+        pair = valid[:, None] & valid[None, :] & disjoint
+        diff = scores[:, None] - scores[None, :]
+        wins += (diff > 0) & pair
+        wins += 0.5 * ((diff == 0) & pair)
+        counts += pair
+    return wins, counts
+
+
+def build_equity(boards=20000, processes=None, seed=0, report=print):
+    """169×169 起手牌全下胜率矩阵（行对列）"""
+    import numpy as np
+
+    _, _, disjoint, classes = _combo_tables(np)
+    workers = processes or os.cpu_count() or 1
+    chunk = max(1, boards // (workers * 4))
+    tasks = [(min(chunk, boards - start), seed + start) for start in range(0, boards, chunk)]
+
+    started = time.perf_counter()
+    wins = np.zeros(disjoint.shape, dtype=np.float64)
+    counts = np.zeros(disjoint.shape, dtype=np.float64)
+    done = 0
+    with Pool(processes) as pool:
+        for task, (w, c) in zip(tasks, pool.imap(_equity_worker, tasks)):
+            wins += w
+            counts += c
+            done += task[0]
+            report(f"  胜率: {done:,}/{boards:,} 组公共牌  "
+                   f"{done / max(time.perf_counter() - started, 1e-9):,.0f} 组/秒")
+
+    # 按类别汇总
+    onehot = np.zeros((len(classes), NUM_CLASSES))
+    onehot[np.arange(len(classes)), classes] = 1.0
+    class_wins = onehot.T @ wins @ onehot
+    class_counts = onehot.T @ counts @ onehot
+    return class_wins / np.maximum(class_counts, 1.0)
+
+
+def combo_matrix():
+    """C[h, k]：h 类的一个组合对应的、与之无重叠的 k 类组合数（平均）"""
+    import numpy as np
+
+    _, _, disjoint, classes = _combo_tables(np)
+    onehot = np.zeros((len(classes), NUM_CLASSES))
+    onehot[np.arange(len(classes)), classes] = 1.0
+    pairs = onehot.T @ disjoint.astype(np.float64) @ onehot
+    return pairs / onehot.sum(axis=0)[:, None]
+
+
+# ==============================================
+# 离线：虚拟对局求解
+# ==============================================
+
+def _push_values(np, equity, combos, stack, num_players, position, call_ranges):
+    """各起手牌在 position 全下相对弃牌的期望收益差（大盲）"""
+    own = position_blind(position, num_players)
+    total_blinds = 1.0 + SMALL_BLIND_BB
+    reach = np.ones(NUM_CLASSES)
+    value = np.zeros(NUM_CLASSES)
+    weight = combos.sum(axis=1)
+    for caller in range(position + 1, num_players):
+        called = combos @ call_ranges[caller]
+        p_call = called / weight
+        eq = (combos * equity) @ call_ranges[caller] / np.maximum(called, 1e-12)
+        dead = total_blinds - own - position_blind(caller, num_players)
+        value += reach * p_call * (eq * (2 * stack + dead) - stack)
+        reach *= 1.0 - p_call
+    value += reach * (total_blinds - own)
+    return value + own
+
+
+def _call_values(np, equity, combos, stack, num_players, pusher, caller, push_range):
+    """caller 面对 pusher 全下时，各起手牌跟注相对弃牌的期望收益差（大盲）"""
+    own = position_blind(caller, num_players)
+    pushed = combos @ push_range
+    eq = (combos * equity) @ push_range / np.maximum(pushed, 1e-12)
+    dead = 1.0 + SMALL_BLIND_BB - own - position_blind(pusher, num_players)
+    return eq * (2 * stack + dead) - stack + own
+
+
+def solve(equity, combos, num_players, stack, iterations=300):
+    """虚拟对局：各方反复对对方的平均策略取最佳应对并累计平均
+
+    返回 {局面: 169维的行动频率}。
+    """
+    import numpy as np
+
+    strategies = {s: np.full(NUM_CLASSES, 0.5) for s in situations(num_players)}
+    for t in range(1, iterations + 1):
+        best = {}
+        for kind, i, j in strategies:
+            if kind == "push":
+                call_ranges = {c: strategies[("call", i, c)] for c in range(i + 1, num_players)}
+                gain = _push_values(np, equity, combos, stack, num_players, i, call_ranges)
+            else:
+                gain = _call_values(np, equity, combos, stack, num_players, i, j,
+                                    strategies[("push", i, None)])
+            best[(kind, i, j)] = (gain > 0).astype(np.float64)
+        for s, response in best.items():
+            strategies[s] += (response - strategies[s]) / (t + 1)
+    return strategies
+
+
+def pack_row(frequencies):
+    """把行动频率按 0.5 为界打包成 169 位"""
+    row = bytearray(_ROW_BYTES)
+    for hand, frequency in enumerate(frequencies):
+        if frequency >= 0.5:
+            row[hand // 8] |= 1 << (hand % 8)
+    return bytes(row)
+
+
+def write_chart(path, solutions, min_players=MIN_PLAYERS, max_players=MAX_PLAYERS,
+                max_stack=MAX_STACK_BB):
+    """写图表文件；solutions[(人数, 筹码深度)] 为 solve() 的结果"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(CHART_MAGIC, CHART_VERSION, min_players, max_players, max_stack))
+        for n in range(min_players, max_players + 1):
+            for stack in range(1, max_stack + 1):
+                strategies = solutions[(n, stack)]
+                for situation in situations(n):
+                    out.write(pack_row(strategies[situation]))
+    os.replace(tmp_path, path)
+
+
+def build_chart(boards=20000, processes=None, iterations=300, table_dir=TABLE_DIR,
+                recompute=False, report=print):
+    """生成推/弃图表（胜率矩阵会缓存，换求解参数时无需重算）"""
+    import numpy as np
+
+    os.makedirs(table_dir, exist_ok=True)
+    cache = equity_path(table_dir)
+    if os.path.exists(cache) and not recompute:
+        equity = np.load(cache)
+        report(f"使用已有胜率矩阵: {cache}")
+    else:
+        equity = build_equity(boards, processes, report=report)
+        np.save(cache, equity)
+
+    combos = combo_matrix()
+    solutions = {}
+    started = time.perf_counter()
+    for n in range(MIN_PLAYERS, MAX_PLAYERS + 1):
+        for stack in range(1, MAX_STACK_BB + 1):
+            solutions[(n, stack)] = solve(equity, combos, n, stack, iterations)
+        report(f"  {n} 人桌求解完成（{time.perf_counter() - started:.1f} 秒）")
+
+    output = chart_path(table_dir)
+    write_chart(output, solutions)
+    report(f"✅ 已写入 {output}: {os.path.getsize(output):,} 字节")
+    return output
+
+
+# ==============================================
+# 命令行
+# ==============================================
+
+def _cmd_build(args):
+    """生成图表"""
+    build_chart(args.boards, args.processes, args.iterations, args.output, args.recompute)
+
+
+def _cmd_show(args):
+    """打印某人数、筹码深度下的范围"""
+    chart = PushFoldChart(chart_path(args.output))
+    print(f"{args.players} 人桌, {args.stack} 大盲")
+    for kind, i, j in situations(args.players):
+        situation = (kind, i, j)
+        hands = [class_name(h) for h in range(NUM_CLASSES)
+                 if chart._bit(args.players, situation, args.stack, h)]
+        label = f"{i}号位全下" if kind == "push" else f"{j}号位跟{i}号位"
+        size = chart.range_size(args.players, situation, args.stack)
+        print(f"  {label:10s} {size * 100:5.1f}%  {' '.join(hands)}")
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="短筹码推/弃纳什图表")
+    parser.add_argument("--output", default=TABLE_DIR, help="表目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="计算胜率矩阵并求解图表")
+    p_build.add_argument("--boards", type=int, default=20000, help="蒙特卡洛公共牌组数")
+    p_build.add_argument("--processes", type=int, default=None, help="进程数（默认CPU核数）")
+    p_build.add_argument("--iterations", type=int, default=300, help="虚拟对局迭代次数")
+    p_build.add_argument("--recompute", action="store_true", help="忽略已有胜率矩阵重新计算")
+    p_build.set_defaults(func=_cmd_build)
+
+    p_show = sub.add_parser("show", help="打印范围")
+    p_show.add_argument("--players", type=int, default=MAX_PLAYERS)
+    p_show.add_argument("--stack", type=int, default=10)
+    p_show.set_defaults(func=_cmd_show)
+
+    args = parser.parse_args()
+    args.func(args)
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
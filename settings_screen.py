@@ -16,13 +16,14 @@ from kivy.properties import BooleanProperty, NumericProperty
 class SettingsScreen(BoxLayout):
     """设置界面"""
     
-    def __init__(self, sound_manager, **kwargs):
+    def __init__(self, sound_manager, game=None, on_close=None, **kwargs):
         super().__init__(**kwargs)
         self.sound_manager = sound_manager
+        self.game = game
+        self.on_close = on_close
         self.orientation = 'vertical'
-        # 使用百分比padding和spacing
-        self.padding = ['5%', '5%']
-        self.spacing = '2%'
+        self.padding = 20
+        self.spacing = 10
         
         self._create_ui()
     
@@ -31,7 +32,7 @@ class SettingsScreen(BoxLayout):
         # 标题
         title = Label(
             text='游戏设置',
-            font_size='4%',  # 使用百分比字体
+            font_size='24sp',
             size_hint=(1, 0.1)
         )
         self.add_widget(title)
@@ -53,17 +54,17 @@ class SettingsScreen(BoxLayout):
         section = BoxLayout(orientation='vertical', size_hint=(1, 0.3))
         
         # 音效标题
-        sound_title = Label(text='音效设置', font_size='2.5%')  # 使用百分比字体
+        sound_title = Label(text='音效设置', font_size='18sp')
         section.add_widget(sound_title)
         
         # 音效开关
         sound_toggle_layout = BoxLayout(orientation='horizontal', size_hint=(1, 0.2))
-        sound_toggle_layout.add_widget(Label(text='音效:', font_size='2%'))  # 使用百分比字体
+        sound_toggle_layout.add_widget(Label(text='音效:', font_size='16sp'))
         
         self.sound_toggle = ToggleButton(
             text='开启' if self.sound_manager.sound_enabled else '关闭',
             state='down' if self.sound_manager.sound_enabled else 'normal',
-            font_size='2%'  # 使用百分比字体
+            font_size='16sp'
         )
         self.sound_toggle.bind(on_press=self._toggle_sound)
         sound_toggle_layout.add_widget(self.sound_toggle)
@@ -71,7 +72,7 @@ class SettingsScreen(BoxLayout):
         
         # 音效音量
         sound_volume_layout = BoxLayout(orientation='horizontal', size_hint=(1, 0.2))
-        sound_volume_layout.add_widget(Label(text='音效音量:', font_size='2%'))  # 使用百分比字体
+        sound_volume_layout.add_widget(Label(text='音效音量:', font_size='16sp'))
         
         self.sound_slider = Slider(
             min=0, max=100, value=self.sound_manager.sound_volume * 100,
@@ -83,12 +84,12 @@ class SettingsScreen(BoxLayout):
         
         # 音乐开关
         music_toggle_layout = BoxLayout(orientation='horizontal', size_hint=(1, 0.2))
-        music_toggle_layout.add_widget(Label(text='背景音乐:', font_size='2%'))  # 使用百分比字体
+        music_toggle_layout.add_widget(Label(text='背景音乐:', font_size='16sp'))
         
         self.music_toggle = ToggleButton(
             text='开启' if self.sound_manager.music_enabled else '关闭',
             state='down' if self.sound_manager.music_enabled else 'normal',
-            font_size='2%'  # 使用百分比字体
+            font_size='16sp'
         )
         self.music_toggle.bind(on_press=self._toggle_music)
         music_toggle_layout.add_widget(self.music_toggle)
@@ -96,7 +97,7 @@ class SettingsScreen(BoxLayout):
         
         # 音乐音量
         music_volume_layout = BoxLayout(orientation='horizontal', size_hint=(1, 0.2))
-        music_volume_layout.add_widget(Label(text='音乐音量:', font_size='2%'))  # 使用百分比字体
+        music_volume_layout.add_widget(Label(text='音乐音量:', font_size='16sp'))
         
         self.music_slider = Slider(
             min=0, max=100, value=self.sound_manager.music_volume * 100,
@@ -113,20 +114,36 @@ class SettingsScreen(BoxLayout):
         section = BoxLayout(orientation='vertical', size_hint=(1, 0.2))
         
         # 游戏设置标题
-        game_title = Label(text='游戏设置', font_size='2.5%')  # 使用百分比字体
+        game_title = Label(text='游戏设置', font_size='18sp')
         section.add_widget(game_title)
         
         # AI难度设置
         difficulty_layout = BoxLayout(orientation='horizontal', size_hint=(1, 0.5))
-        difficulty_layout.add_widget(Label(text='AI难度:', font_size='2%'))  # 使用百分比字体
+        difficulty_layout.add_widget(Label(text='AI难度:', font_size='16sp'))
         
         self.difficulty_slider = Slider(
-            min=1, max=3, value=2,
+            min=1, max=3, step=1,
+            value=self.game.ai_difficulty if self.game else 2,
             size_hint=(0.6, 1)
         )
+        self.difficulty_slider.bind(value=self._on_difficulty_change)
         difficulty_layout.add_widget(self.difficulty_slider)
         section.add_widget(difficulty_layout)
         
+        # 搜索AI开关（难度决定思考时间）
+        mcts_layout = BoxLayout(orientation='horizontal', size_hint=(1, 0.5))
+        mcts_layout.add_widget(Label(text='搜索AI:', font_size='16sp'))
+        
+        mcts_enabled = bool(self.game) and self.game.ai_mode == "mcts"
+        self.mcts_toggle = ToggleButton(
+            text='开启' if mcts_enabled else '关闭',
+            state='down' if mcts_enabled else 'normal',
+            font_size='16sp'
+        )
+        self.mcts_toggle.bind(on_press=self._toggle_mcts)
+        mcts_layout.add_widget(self.mcts_toggle)
+        section.add_widget(mcts_layout)
+        
         return section
     
     def _create_button_section(self):
@@ -134,12 +151,12 @@ class SettingsScreen(BoxLayout):
         section = BoxLayout(orientation='horizontal', size_hint=(1, 0.1))
         
         # 保存按钮
-        save_btn = Button(text='保存设置', font_size='2.5%')  # 使用百分比字体
+        save_btn = Button(text='保存设置', font_size='18sp')
         save_btn.bind(on_press=self._save_settings)
         section.add_widget(save_btn)
         
         # 取消按钮
-        cancel_btn = Button(text='取消', font_size='2.5%')  # 使用百分比字体
+        cancel_btn = Button(text='取消', font_size='18sp')
         cancel_btn.bind(on_press=self._cancel)
         section.add_widget(cancel_btn)
         
@@ -163,27 +180,44 @@ class SettingsScreen(BoxLayout):
         """音乐音量变化"""
         self.sound_manager.set_music_volume(value / 100.0)
     
+    def _on_difficulty_change(self, instance, value):
+        """AI难度变化"""
+        if self.game:
+            self.game.set_ai_difficulty(value)
+    
+    def _toggle_mcts(self, instance):
+        """切换搜索AI"""
+        enabled = instance.state == 'down'
+        if self.game:
+            self.game.set_ai_mode("mcts" if enabled else "standard")
+        instance.text = '开启' if enabled else '关闭'
+    
     def _save_settings(self, instance):
         """保存设置"""
         # 这里可以保存到配置文件
         print("设置已保存")
-        self.parent.parent.dismiss()
+        self._close()
     
     def _cancel(self, instance):
         """取消设置"""
-        self.parent.parent.dismiss()
+        self._close()
+    
+    def _close(self):
+        """关闭所在的弹窗"""
+        if self.on_close:
+            self.on_close()
 
 class SettingsPopup(Popup):
     """设置弹窗"""
     
-    def __init__(self, sound_manager, **kwargs):
+    def __init__(self, sound_manager, game=None, **kwargs):
         super().__init__(**kwargs)
         self.title = '游戏设置'
         # 使用相对尺寸，适应不同屏幕
         self.size_hint = (0.85, 0.85)
         self.auto_dismiss = False
         
-        self.content = SettingsScreen(sound_manager)
+        self.content = SettingsScreen(sound_manager, game, on_close=self.dismiss)
 
 # 游戏帮助界面
 class HelpPopup(Popup):
@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 多进程分片服务器
+单个 asyncio 进程最多用满一个核。分片模式下牌桌按哈希分到多个工作进程（每个进程一个
+game_server 事件循环，只跑自己的牌桌），前端路由进程持有全部客户端连接：
+
+  客户端 ──TCP──> 路由进程 ──Unix套接字──> 工作进程（牌桌协程）
+
+路由进程只做分帧、限速和按牌桌转发，不解码牌局；工作进程发回的字节串原样写给客户端，
+客户端协议（JSON行 / 二进制）与单进程服务器完全相同
+
+牌桌可以在两手牌之间迁移到其他工作进程（负载再平衡）：原进程打完当前这手牌后导出
+牌桌状态与座位上的连接，路由进程更新归属后转交新进程；迁移期间发到原进程的消息被退回路由重发
+
+用法:
+  python3 shard_server.py --tables 20000 --workers 4 --port 8765
+"""
+
+import os
+import sys
+import time
+import pickle
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+from backpressure import RateLimiter, MESSAGE_RATE, MESSAGE_BURST
+from fanout import Subscriber, MAX_QUEUE
+from game_server import (
+    GameServer, TableRunner, ClientSession, encode_message, decode_message,
+    THINK_DELAY, HAND_PAUSE, ACTION_TIMEOUT,
+)
+from wire_protocol import (
+    MAGIC, Reader, frame, write_varint, split_frames, pack_message, unpack_message, read_frame,
+)
+
+# 路由进程与工作进程之间的消息类型
+L_HELLO = 1       # 工作进程 → 路由: 工作进程编号
+L_MESSAGE = 2     # 路由 → 工作进程: 连接, 是否二进制, 客户端消息原文
+L_CLOSE = 3       # 路由 → 工作进程: 连接已断开（或改到其他进程）
+L_SEND = 4        # 工作进程 → 路由: 连接, 要写给客户端的字节串
+L_BOUNCE = 5      # 工作进程 → 路由: 连接, 是否二进制, 消息原文（牌桌已迁走，请重新路由）
+L_MIGRATE = 6     # 路由 → 工作进程: 牌桌, 目标进程
+L_TABLE_OUT = 7   # 工作进程 → 路由: 牌桌, 目标进程, 连接列表, 牌桌状态
+L_TABLE_IN = 8    # 路由 → 工作进程: 牌桌状态
+L_STATS = 9       # 工作进程 → 路由: 手数, 行动数, 牌桌数
+
+# 工作进程上报统计的间隔（秒）
+STATS_INTERVAL = 0.5
+
+
+def table_worker(table_id, num_workers):
+    """牌桌的默认归属进程（乘法哈希，相邻编号的牌桌分散到不同进程）"""
+    return ((table_id * 2654435761) & 0xFFFFFFFF) % num_workers
+
+
+def _link_frame(kind, *ints, data=b""):
+    out = bytearray()
+    for value in ints:
+        write_varint(out, value)
+    out.extend(data)
+    return frame(kind, out)
+
+
+class _LinkWriter:
+    """进程间连接的写端：同一轮事件循环里的消息合并成一次写入"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self._buffer = bytearray()
+        self._loop = asyncio.get_running_loop()
+
+    def write(self, data):
+        if not self._buffer:
+            self._loop.call_soon(self._flush)
+        self._buffer.extend(data)
+
+    def _flush(self):
+        if self._buffer and not self.writer.is_closing():
+            self.writer.write(bytes(self._buffer))
+        self._buffer.clear()
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+async def _link_frames(reader):
+    """按块读取进程间连接，逐个产出帧内容；连接关闭时结束"""
+    buffer = b""
+    while True:
+        try:
+            chunk = await reader.read(1 << 16)
+        except ConnectionError:
+            return
+        if not chunk:
+            return
+        frames, buffer = split_frames(buffer + chunk)
+        for payload in frames:
+            yield payload
+
+
+# ==============================================
+# 工作进程
+# ==============================================
+
+class _RemoteOutbox:
+    """工作进程里连接的发送队列：直接转给路由进程（有界队列与慢连接断开在路由进程）"""
+
+    __slots__ = ("worker", "conn")
+
+    def __init__(self, worker, conn):
+        self.worker = worker
+        self.conn = conn
+
+    def push(self, data):
+        self.worker.send_link(_link_frame(L_SEND, self.conn, data=data))
+        return True
+
+
+class RemoteSession(ClientSession):
+    """工作进程中代表一个客户端连接（连接本身在路由进程）"""
+
+    def __init__(self, server, conn, binary):
+        self.server = server
+        self.conn = conn
+        self.binary = binary
+        self.table = None
+        self.seat = None
+        self.outbox = _RemoteOutbox(server, conn)
+
+
+class ShardWorker(GameServer):
+    """工作进程：只托管分到自己的牌桌，客户端消息经路由进程转来"""
+
+    def __init__(self, worker_id, path, table_ids, **options):
+        super().__init__(0, **options)
+        self.worker_id = worker_id
+        self.path = path
+        self.table_ids = table_ids
+        self.sessions = {}      # 连接 -> RemoteSession
+        self.moved = set()      # 随牌桌迁走的连接
+        self.moved_tables = {}  # 迁走的牌桌 -> 目标进程
+        self._link = None
+
+    def send_link(self, data):
+        self._link.write(data)
+
+    def table_rng(self, table_id):
+        """每张牌桌独立的随机数（有种子时与进程划分无关）"""
+        return random.Random(f"{self.seed}:{table_id}") if self.seed is not None else random.Random()
+
+    async def run(self):
+        """连接路由进程并处理消息，直到路由进程关闭连接"""
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        self._link = _LinkWriter(writer)
+        self.send_link(_link_frame(L_HELLO, self.worker_id))
+        self.running = True
+        self.timers.start()
+        self.start_ai_service()
+        for table_id in self.table_ids:
+            self.add_table(TableRunner(self, table_id, self.table_rng(table_id)))
+        reporter = asyncio.create_task(self._report())
+        try:
+            async for payload in _link_frames(reader):
+                self.dispatch(payload)
+        finally:
+            reporter.cancel()
+            await self.stop()
+
+    async def _report(self):
+        while True:
+            self.send_link(_link_frame(L_STATS, self.hands_played, self.decisions(), len(self.tables)))
+            await asyncio.sleep(STATS_INTERVAL)
+
+    def dispatch(self, payload):
+        """处理路由进程的一条消息"""
+        kind = payload[0]
+        reader = Reader(payload, 1)
+        if kind == L_MESSAGE:
+            conn, binary = reader.varint(), reader.byte()
+            try:
+                self.on_message(conn, binary, payload[reader.pos:])
+            except Exception as e:
+                # 只丢弃出错的连接，链路循环和其他连接照常运行
+                print(f"连接 {conn} 的消息处理出错，已断开: {e!r}")
+                self.drop(conn)
+        elif kind == L_CLOSE:
+            self.drop(reader.varint())
+        elif kind == L_MIGRATE:
+            table_id, target = reader.varint(), reader.varint()
+            runner = self.tables.get(table_id)
+            if runner is not None:
+                runner.handoff = lambda runner: self._hand_off(runner, target)
+        elif kind == L_TABLE_IN:
+            self._take_over(pickle.loads(payload[reader.pos:]))
+
+    def drop(self, conn):
+        """连接断开或出错：离开牌桌并丢弃会话"""
+        self.moved.discard(conn)
+        session = self.sessions.pop(conn, None)
+        if session is not None:
+            session.leave()
+
+    def on_message(self, conn, binary, raw):
+        """客户端消息：牌桌已迁走时退回路由进程，否则交给该连接的会话处理"""
+        if conn in self.moved:
+            self.send_link(_link_frame(L_BOUNCE, conn, binary, data=raw))
+            return
+        session = self.sessions.get(conn)
+        if session is None:
+            session = self.sessions[conn] = RemoteSession(self, conn, bool(binary))
+        try:
+            message = unpack_message(raw) if binary else decode_message(raw)
+        except ValueError:
+            message = None
+        if not isinstance(message, dict):
+            session.send({"type": "error", "message": "无法解析的消息"})
+            return
+        table_id = message.get("table")
+        if (message.get("type") in ("join", "watch") and isinstance(table_id, int)
+                and table_id in self.moved_tables):
+            self.send_link(_link_frame(L_BOUNCE, conn, binary, data=raw))
+            return
+        session.handle(message)
+
+    def _hand_off(self, runner, target):
+        """一手牌结束：导出牌桌与座位上的连接，交给路由进程转给目标进程"""
+        sessions = list(runner.clients.items()) + [(None, session) for session in runner.spectators]
+        state = runner.export()
+        state["sessions"] = [(session.conn, seat, session.binary) for seat, session in sessions]
+        for _, session in sessions:
+            self.sessions.pop(session.conn, None)
+            self.moved.add(session.conn)
+        del self.tables[runner.table_id]
+        self.moved_tables[runner.table_id] = target
+        conns = [session.conn for _, session in sessions]
+        self.send_link(_link_frame(L_TABLE_OUT, runner.table_id, target, len(conns), *conns,
+                                   data=pickle.dumps(state)))
+
+    def _take_over(self, state):
+        """接收迁来的牌桌：恢复状态、重新挂上连接并继续开局"""
+        runner = TableRunner.restore(self, state)
+        self.moved_tables.pop(runner.table_id, None)
+        for conn, seat, binary in state["sessions"]:
+            session = RemoteSession(self, conn, binary)
+            session.table, session.seat = runner, seat
+            self.sessions[conn] = session
+            self.moved.discard(conn)
+            if seat is None:
+                runner.add_spectator(session)
+            else:
+                runner.clients[seat] = session
+                runner.subscribe(session)
+        self.add_table(runner)
+
+
+def _worker_main(worker_id, path, table_ids, options):
+    """工作进程入口"""
+    try:
+        asyncio.run(ShardWorker(worker_id, path, table_ids, **options).run())
+    except KeyboardInterrupt:
+        pass
+
+
+# ==============================================
+# 路由进程
+# ==============================================
+
+class RouterSession:
+    """路由进程中的一个客户端连接"""
+
+    def __init__(self, router, conn, reader, writer):
+        self.router = router
+        self.conn = conn
+        self.reader = reader
+        self.writer = writer
+        self.binary = False
+        self.worker = None   # 当前处理该连接的工作进程
+        self.outbox = None
+        self.limiter = RateLimiter(router.message_rate, router.message_burst)
+        self._throttled = False
+
+    def send(self, message):
+        self.outbox.push(pack_message(message) if self.binary else encode_message(message))
+
+    async def serve(self):
+        """分帧、限速并转发客户端消息，直到连接关闭"""
+        self.outbox = Subscriber(self.writer, self.router.max_queue)
+        try:
+            first = await self.reader.read(1)
+            self.binary = first == MAGIC
+            pending = b"" if self.binary else first
+            while True:
+                if self.binary:
+                    data = await read_frame(self.reader)
+                else:
+                    data = pending if pending == b"\n" else pending + await self.reader.readline()
+                    pending = b""
+                if not data:
+                    break
+                if not self.limiter.allow():
+                    if not self._throttled:
+                        self._throttled = True
+                        self.send({"type": "error", "message": "操作过于频繁"})
+                    continue
+                self._throttled = False
+                self.router.route(self, data)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.router.disconnected(self)
+            await self.outbox.close()
+            self.writer.close()
+
+
+class _WorkerHandle:
+    """路由进程对一个工作进程的记录"""
+
+    def __init__(self, worker_id, process):
+        self.worker_id = worker_id
+        self.process = process
+        self.writer = None
+        self.ready = asyncio.get_running_loop().create_future()
+        self.hands_played = 0
+        self.decisions = 0
+        self.num_tables = 0
+        self.rate = 0.0          # 每秒行动数（按统计上报估算）
+        self._last = None
+
+    def send(self, data):
+        if self.writer is not None:
+            self.writer.write(data)
+
+    def update(self, hands, decisions, tables):
+        now = time.perf_counter()
+        if self._last is not None and now > self._last[0]:
+            self.rate = (decisions - self._last[1]) / (now - self._last[0])
+        self._last = (now, decisions)
+        self.hands_played, self.decisions, self.num_tables = hands, decisions, tables
+
+
+class ShardRouter:
+    """前端路由：持有客户端连接，按牌桌归属转发到工作进程"""
+
+    def __init__(self, num_tables, num_workers=None, think_delay=THINK_DELAY, hand_pause=HAND_PAUSE,
+                 action_timeout=ACTION_TIMEOUT, seed=None, max_queue=MAX_QUEUE,
+                 message_rate=MESSAGE_RATE, message_burst=MESSAGE_BURST):
+        self.num_tables = num_tables
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.worker_options = {"think_delay": think_delay, "hand_pause": hand_pause,
+                               "action_timeout": action_timeout, "seed": seed}
+        self.max_queue = max_queue
+        self.message_rate = message_rate
+        self.message_burst = message_burst
+        self.placement = {}       # 迁移过的牌桌 -> 工作进程（其余按哈希）
+        self.migrations = {}      # 迁移中的牌桌 -> Future（完成时为目标进程）
+        self.sessions = {}        # 连接编号 -> RouterSession
+        self.workers = []
+        self._next_conn = 0
+        self._dir = None
+        self._link_server = None
+        self._server = None
+        self._link_tasks = []
+
+    def owner(self, table_id):
+        """牌桌当前所在的工作进程"""
+        worker = self.placement.get(table_id)
+        return table_worker(table_id, self.num_workers) if worker is None else worker
+
+    @property
+    def hands_played(self):
+        return sum(worker.hands_played for worker in self.workers)
+
+    def decisions(self):
+        return sum(worker.decisions for worker in self.workers)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """启动工作进程与监听；全部工作进程就绪后返回实际端口"""
+        self._dir = tempfile.mkdtemp(prefix="poker-shards-")
+        path = os.path.join(self._dir, "router.sock")
+        self._link_server = await asyncio.start_unix_server(self._on_worker, path)
+
+        assignment = [[] for _ in range(self.num_workers)]
+        for table_id in range(self.num_tables):
+            assignment[table_worker(table_id, self.num_workers)].append(table_id)
+        context = multiprocessing.get_context("spawn")
+        for worker_id in range(self.num_workers):
+            process = context.Process(target=_worker_main, daemon=True,
+                                      args=(worker_id, path, assignment[worker_id], self.worker_options))
+            process.start()
+            self.workers.append(_WorkerHandle(worker_id, process))
+        await asyncio.gather(*(worker.ready for worker in self.workers))
+
+        self._server = await asyncio.start_server(self._on_connect, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """关闭监听与工作进程"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for worker in self.workers:
+            if worker.writer is not None:
+                worker.writer.close()
+        for worker in self.workers:
+            await asyncio.get_running_loop().run_in_executor(None, worker.process.join, 5.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        for task in self._link_tasks:
+            task.cancel()
+        await asyncio.gather(*self._link_tasks, return_exceptions=True)
+        if self._link_server is not None:
+            self._link_server.close()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    # ----------------------------------------------
+    # 客户端 → 工作进程
+    # ----------------------------------------------
+
+    async def _on_connect(self, reader, writer):
+        self._next_conn += 1
+        session = RouterSession(self, self._next_conn, reader, writer)
+        self.sessions[session.conn] = session
+        await session.serve()
+
+    def route(self, session, raw):
+        """把一条客户端消息转给对应的工作进程（入座/观战按牌桌归属，其余按连接当前所在进程）"""
+        try:
+            message = unpack_message(raw) if session.binary else decode_message(raw)
+        except ValueError:
+            session.send({"type": "error", "message": "无法解析的消息"})
+            return
+        kind = message.get("type") if isinstance(message, dict) else None
+        if kind in ("join", "watch"):
+            table_id = message.get("table")
+            if not isinstance(table_id, int) or not 0 <= table_id < self.num_tables:
+                session.send({"type": "error", "message": "牌桌不存在或已满" if kind == "join" else "牌桌不存在"})
+                return
+            worker = self.owner(table_id)
+        else:
+            worker = session.worker if session.worker is not None else 0
+        if session.worker is not None and session.worker != worker:
+            self.workers[session.worker].send(_link_frame(L_CLOSE, session.conn))
+        session.worker = worker
+        self.workers[worker].send(_link_frame(L_MESSAGE, session.conn, session.binary, data=raw))
+
+    def disconnected(self, session):
+        """客户端断开：通知持有它的工作进程"""
+        self.sessions.pop(session.conn, None)
+        if session.worker is not None:
+            self.workers[session.worker].send(_link_frame(L_CLOSE, session.conn))
+
+    # ----------------------------------------------
+    # 工作进程 → 客户端
+    # ----------------------------------------------
+
+    async def _on_worker(self, reader, writer):
+        self._link_tasks.append(asyncio.current_task())
+        handle = None
+        async for payload in _link_frames(reader):
+            kind = payload[0]
+            body = Reader(payload, 1)
+            if kind == L_SEND:
+                session = self.sessions.get(body.varint())
+                if session is not None:
+                    session.outbox.push(payload[body.pos:])
+            elif kind == L_STATS:
+                handle.update(body.varint(), body.varint(), body.varint())
+            elif kind == L_BOUNCE:
+                session = self.sessions.get(body.varint())
+                body.byte()
+                if session is not None:
+                    self.route(session, payload[body.pos:])
+            elif kind == L_TABLE_OUT:
+                self._table_moved(body, payload)
+            elif kind == L_HELLO:
+                handle = self.workers[body.varint()]
+                handle.writer = _LinkWriter(writer)
+                handle.ready.set_result(None)
+
+    def _table_moved(self, body, payload):
+        """原进程已导出牌桌：更新归属，转交目标进程，连接改由目标进程处理"""
+        table_id, target, count = body.varint(), body.varint(), body.varint()
+        conns = [body.varint() for _ in range(count)]
+        self.placement[table_id] = target
+        worker = self.workers[target]
+        worker.send(_link_frame(L_TABLE_IN, data=payload[body.pos:]))
+        for conn in conns:
+            session = self.sessions.get(conn)
+            if session is None:
+                # 迁移途中断开的连接
+                worker.send(_link_frame(L_CLOSE, conn))
+            else:
+                session.worker = target
+        future = self.migrations.pop(table_id, None)
+        if future is not None and not future.done():
+            future.set_result(target)
+
+    # ----------------------------------------------
+    # 迁移与再平衡
+    # ----------------------------------------------
+
+    def migrate(self, table_id, target):
+        """请求把牌桌在当前这手牌结束后迁到 target 进程；返回完成时的 Future"""
+        if table_id in self.migrations:
+            return self.migrations[table_id]
+        future = asyncio.get_running_loop().create_future()
+        source = self.owner(table_id)
+        if source == target:
+            future.set_result(target)
+            return future
+        self.migrations[table_id] = future
+        self.workers[source].send(_link_frame(L_MIGRATE, table_id, target))
+        return future
+
+    def rebalance(self):
+        """按各进程的行动速率，把最忙进程的一部分牌桌迁到最闲进程；返回发起的 (牌桌, 源, 目标) 列表"""
+        if len(self.workers) < 2:
+            return []
+        busiest = max(self.workers, key=lambda worker: worker.rate)
+        idlest = min(self.workers, key=lambda worker: worker.rate)
+        if busiest.num_tables == 0 or busiest.rate <= idlest.rate * 1.1:
+            return []
+        per_table = busiest.rate / busiest.num_tables
+        count = int((busiest.rate - idlest.rate) / 2 / per_table)
+        tables = [table_id for table_id in range(self.num_tables)
+                  if self.owner(table_id) == busiest.worker_id and table_id not in self.migrations]
+        moves = []
+        for table_id in tables[:count]:
+            self.migrate(table_id, idlest.worker_id)
+            moves.append((table_id, busiest.worker_id, idlest.worker_id))
+        return moves
+
+
+async def _serve_forever(args):
+    router = ShardRouter(args.tables, args.workers, think_delay=(args.min_delay, args.max_delay),
+                         hand_pause=args.pause, seed=args.seed)
+    port = await router.start(args.host, args.port)
+    print(f"🃏 {args.tables} 张牌桌分布在 {router.num_workers} 个工作进程，监听 {args.host}:{port}")
+    try:
+        while True:
+            started, hands = time.perf_counter(), router.hands_played
+            await asyncio.sleep(10)
+            rate = (router.hands_played - hands) / (time.perf_counter() - started)
+            rates = " / ".join(f"{worker.rate:,.0f}" for worker in router.workers)
+            print(f"  {rate:,.0f} 手/秒，累计 {router.hands_played:,} 手（各进程行动/秒: {rates}）")
+            if args.rebalance:
+                moves = router.rebalance()
+                if moves:
+                    print(f"  再平衡: 迁移 {len(moves)} 张牌桌")
+    finally:
+        await router.stop()
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="德州扑克多进程分片服务器")
+    parser.add_argument("--tables", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（默认CPU核数）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--min-delay", type=float, default=THINK_DELAY[0])
+    parser.add_argument("--max-delay", type=float, default=THINK_DELAY[1])
+    parser.add_argument("--pause", type=float, default=HAND_PAUSE)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rebalance", action="store_true", help="每10秒按负载迁移牌桌")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 牌桌快照与崩溃恢复
+服务器把每一步写入牌局记录（hand_history.py），快照由独立的压缩进程在后台生成：
+快照 n 是记录段 n 开始时全部牌桌的状态（筹码、进行中牌局的牌堆/底池/公共牌/底牌/行动位置），
+压缩进程载入快照 n-1 并重放记录段 n-1 得到它。父进程只切换记录段并把编号发给压缩进程，
+暂停时间与牌桌数和进程内存大小无关（不 fork 整个进程，不复制页表）
+
+重启时载入最新的完整快照，再依次重放之后各段记录（记录尾部），恢复到进程退出前最后写出的一步；
+第一个快照在牌桌开始运行前由父进程直接写出
+
+目录内容:
+  snapshot-00000003.pkl    快照3（先写临时文件，fsync 后改名；写到一半崩溃不会留下半个快照）
+  history-00000003.log     快照3之后的牌局记录
+新快照写完后删除更早的快照与记录段（指定归档目录时记录段移入归档目录，供 hand_analytics.py 离线统计）
+"""
+
+import os
+import time
+import pickle
+import shutil
+import multiprocessing
+
+from backpressure import LatencyHistogram
+from hand_history import HandHistoryWriter, read_records, replay, HAND
+from table_engine import TableEngine
+
+# 快照间隔（秒）
+SNAPSHOT_INTERVAL = 30.0
+
+# 检查压缩进程是否写完的间隔（秒）
+POLL_INTERVAL = 0.05
+
+# 压缩进程的 nice 值（没有 SCHED_IDLE 调度策略的系统上使用）
+COMPACTOR_NICE = 19
+
+
+def _lower_priority():
+    """压缩进程只用空闲的 CPU：Linux 上改用 SCHED_IDLE（被唤醒时不会抢占服务器进程），其他系统调高 nice 值"""
+    if hasattr(os, "SCHED_IDLE"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+            return
+        except OSError:
+            pass
+    os.nice(COMPACTOR_NICE)
+
+
+def snapshot_path(directory, n):
+    return os.path.join(directory, f"snapshot-{n:08d}.pkl")
+
+
+def history_path(directory, n):
+    return os.path.join(directory, f"history-{n:08d}.log")
+
+
+def _numbered(directory, prefix):
+    """目录中某类文件的编号（升序）"""
+    numbers = []
+    for name in os.listdir(directory):
+        stem, _, suffix = name.partition(".")
+        if stem.startswith(prefix + "-") and suffix in ("pkl", "log"):
+            try:
+                numbers.append(int(stem[len(prefix) + 1:]))
+            except ValueError:
+                continue
+    return sorted(numbers)
+
+
+def write_snapshot(path, states):
+    """把 {牌桌: TableRunner.export() 的结果} 原子地写入快照文件"""
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        pickle.dump(states, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def load_snapshot(directory, before=None):
+    """最新一个可读的快照（before 不为 None 时只看编号小于 before 的），返回 (编号, 状态字典)；
+    没有快照时返回 (None, {})"""
+    for n in reversed(_numbered(directory, "snapshot")):
+        if before is not None and n >= before:
+            continue
+        try:
+            with open(snapshot_path(directory, n), "rb") as f:
+                return n, pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            continue
+    return None, {}
+
+
+def recover(directory, before=None):
+    """载入最新快照并重放之后的全部记录段，返回 (已用到的最大编号, {牌桌: 状态})；目录为空时返回 (0, {})
+    before 不为 None 时只用编号小于 before 的快照与记录段，得到记录段 before 开始时的状态（压缩进程用）
+
+    重放过记录的牌桌换一个由原状态导出的随机种子，避免接着发出记录里已经发过的牌。
+    """
+    n, states = load_snapshot(directory, before)
+    if n is None:
+        return max(_numbered(directory, "history") or [0]), {}
+    engines = {}
+    replayed = {}
+    segments = [m for m in _numbered(directory, "history") if m >= n and (before is None or m < before)]
+    for m in segments:
+        for record in read_records(history_path(directory, m)):
+            table_id = record[1]
+            if table_id not in states:
+                continue
+            engine = engines.get(table_id)
+            if engine is None:
+                engine = engines[table_id] = TableEngine.restore(states[table_id]["engine"])
+                replayed[table_id] = [0, 0]
+            try:
+                events = replay(engine, record)
+            except ValueError:
+                continue   # 与状态不符的记录（不应出现）跳过，引擎状态不变
+            counts = replayed[table_id]
+            if record[0] != HAND:
+                counts[0] += 1
+                counts[1] += events[-1]["type"] == "hand_end"
+    for table_id, engine in engines.items():
+        engine.rng.seed(engine.rng.getrandbits(64) ^ engine.hand_id)
+        state = dict(states[table_id])
+        state["engine"] = engine.snapshot(include_hand=True)
+        state["decisions"] += replayed[table_id][0]
+        state["hands_played"] += replayed[table_id][1]
+        states[table_id] = state
+    return max([n] + segments), states
+
+
+def compact(directory, n):
+    """由编号小于 n 的最新快照与之后的记录段得到快照 n；没有更早的快照时抛出 ValueError"""
+    if not any(m < n for m in _numbered(directory, "snapshot")):
+        raise ValueError(f"快照 {n} 之前没有可用的快照")
+    _, states = recover(directory, before=n)
+    write_snapshot(snapshot_path(directory, n), states)
+
+
+def _compactor(conn, directory):
+    """压缩进程：每收到一个编号就写出对应的快照，回传 (编号, 是否成功)；收到 None 时退出"""
+    _lower_priority()
+    while True:
+        try:
+            n = conn.recv()
+        except EOFError:
+            break
+        if n is None:
+            break
+        try:
+            compact(directory, n)
+            ok = True
+        except Exception as e:
+            print(f"快照 {n} 写入失败: {e}")
+            ok = False
+        conn.send((n, ok))
+
+
+class Snapshotter:
+    """定期切换记录段并让压缩进程写快照"""
+
+    def __init__(self, server, directory, interval=SNAPSHOT_INTERVAL, archive=None):
+        self.server = server
+        self.directory = directory
+        self.interval = interval
+        self.archive = archive          # 旧记录段的归档目录（None 时删除）
+        self.next = 1
+        self.latest = None              # 最近一个写完的快照编号
+        self.pauses = LatencyHistogram()  # 父进程每次快照暂停的时间（切换记录段 + 通知压缩进程）
+        self.taken = 0
+        self.failed = 0
+        self.skipped = 0
+        self.history = None
+        self.pending = None             # 压缩进程正在写的快照编号
+        self._process = None
+        self._conn = None
+        self._timer = None
+        self._poll = None
+
+    def recover(self):
+        """读取目录中的快照与记录尾部，返回 {牌桌: 状态}（交给 TableRunner.restore）"""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.archive is not None:
+            os.makedirs(self.archive, exist_ok=True)
+        last, states = recover(self.directory)
+        self.next = last + 1
+        return states
+
+    def start(self):
+        """牌桌创建完成、开始运行之前调用：直接写出第一个快照并启动压缩进程，之后每 interval 秒一次"""
+        n = self.next
+        self.history = HandHistoryWriter(history_path(self.directory, n))
+        self.server.history = self.history
+        write_snapshot(snapshot_path(self.directory, n),
+                       {table_id: runner.export(include_hand=True) for table_id, runner in self.server.tables.items()})
+        self.next = n + 1
+        self._written(n)
+        self._start_compactor()
+        self._timer = self.server.timers.call_later(self.interval, self._tick)
+
+    def _start_compactor(self):
+        """启动压缩进程（spawn：不复制服务器进程的内存）"""
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_compactor, args=(child_conn, self.directory),
+                                        name="snapshot-compactor", daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def _tick(self):
+        self._timer = None
+        self.take()
+
+    def take(self):
+        """切换记录段并通知压缩进程写快照；上一个快照还没写完时跳过，返回是否开始了新快照"""
+        if self._timer is None and self.server.running:
+            self._timer = self.server.timers.call_later(self.interval, self._tick)
+        if self.pending is not None:
+            self.skipped += 1
+            return False
+        start = time.perf_counter()
+        n = self.next
+        self.history.rotate(history_path(self.directory, n))
+        try:
+            self._conn.send(n)
+        except (OSError, EOFError):
+            pass    # 压缩进程已退出：下面第一次检查时记为失败并重启
+        self.pauses.record(time.perf_counter() - start)
+        self.next = n + 1
+        self.pending = n
+        self._poll = self.server.timers.call_later(POLL_INTERVAL, self._check_compactor)
+        return True
+
+    def _check_compactor(self, block=False):
+        self._poll = None
+        try:
+            if not self._conn.poll(None if block else 0):
+                self._poll = self.server.timers.call_later(POLL_INTERVAL, self._check_compactor)
+                return
+            n, ok = self._conn.recv()
+        except (OSError, EOFError):
+            # 压缩进程崩溃：重启，下一个快照从更早的快照连同未删除的记录段一起压缩
+            n, ok = self.pending, False
+            self._stop_compactor()
+            self._start_compactor()
+        self.pending = None
+        if not ok:
+            self.failed += 1
+            return
+        self._written(n)
+
+    def _written(self, n):
+        self.taken += 1
+        self.latest = n
+        self._prune(n)
+
+    def _prune(self, n):
+        """删除比快照 n 更早的快照与记录段（有归档目录时记录段移过去）"""
+        for prefix, path in (("snapshot", snapshot_path), ("history", history_path)):
+            for m in _numbered(self.directory, prefix):
+                if m < n:
+                    try:
+                        if prefix == "history" and self.archive is not None:
+                            shutil.move(path(self.directory, m), history_path(self.archive, m))
+                        else:
+                            os.remove(path(self.directory, m))
+                    except OSError:
+                        pass
+
+    def wait(self):
+        """等待正在写的快照完成"""
+        if self.pending is not None:
+            if self._poll is not None:
+                self.server.timers.cancel(self._poll)
+            self._check_compactor(block=True)
+
+    def _stop_compactor(self):
+        if self._process is not None:
+            try:
+                self._conn.send(None)
+            except (OSError, EOFError):
+                pass
+            self._process.join(timeout=1.0)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def stop(self):
+        """停止定期快照，等待压缩进程写完并退出，写完并关闭记录段"""
+        if self._timer is not None:
+            self.server.timers.cancel(self._timer)
+            self._timer = None
+        self.wait()
+        self._stop_compactor()
+        if self.history is not None:
+            self.history.close()
+            self.server.history = None
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 无界面牌桌引擎
+不依赖Kivy的单桌状态机，供多桌服务器（game_server.py）使用：
+整数牌、无限注最小加注（betting.py）、边池结算，每一步返回事件列表
+
+规则与游戏一致：按钮固定在0号位，其后依次为小盲、大盲；
+翻牌前从大盲下家开始行动，翻牌后从序号最小的可行动玩家开始。
+筹码不足一个大盲的座位在下一手开始时补回初始筹码（练习场规则）
+
+事件为字典，"type" 为事件类型；带 "to" 字段的事件只发给该座位（底牌）
+"""
+
+import random
+
+from ai_policy import position_factor, bet_history_factor
+from ai_worker import DecisionRequest
+from betting import (
+    legal_actions, clamp_raise, next_min_raise, ACTION_BITS,
+    FOLD_BIT, CHECK_BIT, CALL_BIT, RAISE_BIT,
+)
+from cfr_solver import ACTIONS, ACTION_CODES, DEFAULT_STACKS, STREET_NAMES
+from hand_buckets import card_strength
+from hand_evaluator import evaluate
+from push_fold import get_push_fold_chart, preflop_push_fold
+
+# 各街发出的公共牌数
+BOARD_CARDS = (0, 3, 1, 1)
+
+_ACTION_CODE = dict(zip(ACTIONS, ACTION_CODES))
+
+
+def _copy(value):
+    """复制（嵌套）列表，其余值原样返回"""
+    return [_copy(item) for item in value] if isinstance(value, list) else value
+
+
+class TableEngine:
+    """单张牌桌的状态机"""
+
+    def __init__(self, table_id, stacks=DEFAULT_STACKS, small_blind=100, big_blind=200, rng=None):
+        self.table_id = table_id
+        self.num_seats = len(stacks)
+        self.start_stacks = list(stacks)
+        self.chips = list(stacks)
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.rng = rng or random.Random()
+        self.hand_id = 0
+        self.hand_active = False
+
+        n = self.num_seats
+        self.holes = [[] for _ in range(n)]
+        self.board = []
+        self.street = 0
+        self.street_bets = [0] * n
+        self.contributed = [0] * n
+        self.folded = [False] * n
+        self.all_in = [False] * n
+        self.acted = [False] * n
+        self.current_bet = 0
+        self.min_raise = big_blind
+        self.to_act = -1
+        self.history = [""]
+        self.last_action = None   # 最近一次行动 (座位, 行动)
+        self.hand_start_chips = list(stacks)
+        self._deck = []
+        self.dealt = []           # 本手牌的发牌顺序（底牌 + 公共牌）
+
+    # ----------------------------------------------
+    # 快照（两手牌之间迁移到其他进程；崩溃恢复时含进行中的牌局）
+    # ----------------------------------------------
+
+    # 牌局进行中的状态字段（快照 include_hand=True 时一并保存）
+    _HAND_FIELDS = ("holes", "_deck", "board", "street", "street_bets", "contributed", "folded", "all_in",
+                    "acted", "current_bet", "min_raise", "to_act", "history", "last_action", "hand_start_chips",
+                    "dealt")
+
+    def snapshot(self, include_hand=False):
+        """完整状态（可 pickle 的字典）；牌局进行中默认抛出 ValueError，
+        include_hand 为 True 时连同本手牌的牌堆、底牌、下注与行动位置一起保存"""
+        if self.hand_active and not include_hand:
+            raise ValueError("牌局进行中不能快照")
+        snapshot = {
+            "table_id": self.table_id, "start_stacks": list(self.start_stacks), "chips": list(self.chips),
+            "small_blind": self.small_blind, "big_blind": self.big_blind, "hand_id": self.hand_id,
+            "rng": self.rng.getstate(),
+        }
+        if self.hand_active:
+            snapshot["hand"] = {name: _copy(getattr(self, name)) for name in self._HAND_FIELDS}
+        return snapshot
+
+    @classmethod
+    def restore(cls, snapshot):
+        """由 snapshot() 的结果恢复牌桌（下一手牌与快照前的牌桌完全相同）"""
+        rng = random.Random()
+        rng.setstate(snapshot["rng"])
+        engine = cls(snapshot["table_id"], snapshot["start_stacks"], snapshot["small_blind"],
+                     snapshot["big_blind"], rng)
+        engine.chips = list(snapshot["chips"])
+        engine.hand_start_chips = list(snapshot["chips"])
+        engine.hand_id = snapshot["hand_id"]
+        if "hand" in snapshot:
+            for name, value in snapshot["hand"].items():
+                setattr(engine, name, _copy(value))
+            engine.hand_active = True
+        return engine
+
+    # ----------------------------------------------
+    # 查询
+    # ----------------------------------------------
+
+    @property
+    def pot(self):
+        """底池（含本街下注）"""
+        return sum(self.contributed)
+
+    def legal_actions(self):
+        """当前行动者的 (位掩码, 最小加注到, 最大加注到)"""
+        p = self.to_act
+        return legal_actions(self.chips[p], self.street_bets[p], self.current_bet,
+                             self.min_raise, self.big_blind)
+
+    def decision_request(self):
+        """为当前行动者构造AI决策快照（与游戏内 _build_decision_request 相同的特征）"""
+        p = self.to_act
+        mask, floor, ceiling = self.legal_actions()
+        chip_ratio = self.chips[p] / (self.big_blind * 10)
+        push_fold_action = None
+        if chip_ratio < 0.5 and self.street == 0:
+            chart = get_push_fold_chart()
+            if chart is not None:
+                push_fold_action = preflop_push_fold(chart, self.hand_start_chips, p, self.holes[p],
+                                                     self.history[0], self.big_blind)
+        return DecisionRequest(
+            p, self.num_seats, self.holes[p], list(self.board), STREET_NAMES[self.street],
+            list(self.history), card_strength(self.holes[p], self.board),
+            position_factor(p, self.to_act, self.num_seats),
+            bet_history_factor(self.current_bet, self.big_blind), chip_ratio,
+            push_fold_action=push_fold_action, legal_mask=mask, min_raise_to=floor, max_raise_to=ceiling,
+        )
+
+    def resolve_bot_action(self, action, hand_strength=0.5):
+        """把AI给出的行动映射为合法的 (行动, 加注到)，与游戏内 _process_ai_action 的执行方式一致
+
+        面对下注的过牌即跟注，没有下注时的跟注或弃牌即过牌，筹码不足时改为全下；
+        加注额按手牌强度取当前注的1.5-3倍。
+        """
+        mask, floor, ceiling = self.legal_actions()
+        if action == "fold" and not mask & FOLD_BIT:
+            action = "check"
+        if action in ("check", "call"):
+            action = "call" if mask & CALL_BIT else "check" if mask & CHECK_BIT else "all_in"
+        if action == "raise":
+            raise_to = clamp_raise(max(self.current_bet * (1.5 + hand_strength * 1.5), self.big_blind * 2),
+                                   floor, ceiling)
+            if mask & RAISE_BIT and raise_to < ceiling:
+                return "raise", raise_to
+            action = "all_in"
+        if action not in ACTION_BITS or not mask & ACTION_BITS[action]:
+            action = "check" if mask & CHECK_BIT else "fold"
+        return action, None
+
+    # ----------------------------------------------
+    # 牌局推进
+    # ----------------------------------------------
+
+    def start_hand(self, cards=None):
+        """开始新的一手牌：补筹码、发牌、下盲注；返回事件列表
+
+        cards 为指定的发牌顺序（2*座位数+5 张，重放牌局记录时使用），缺省时随机洗牌。
+        """
+        n = self.num_seats
+        for seat in range(n):
+            if self.chips[seat] < self.big_blind:
+                self.chips[seat] = self.start_stacks[seat]
+        self.hand_id += 1
+        self.hand_active = True
+        self.hand_start_chips = list(self.chips)
+
+        if cards is None:
+            cards = self.rng.sample(range(52), 2 * n + 5)
+        self.dealt = list(cards)
+        self.holes = [cards[2 * i:2 * i + 2] for i in range(n)]
+        self._deck = cards[2 * n:]
+        self.board = []
+        self.street = 0
+        self.street_bets = [0] * n
+        self.contributed = [0] * n
+        self.folded = [False] * n
+        self.all_in = [False] * n
+        self.acted = [False] * n
+        self.history = [""]
+        self.last_action = None
+
+        events = [{"type": "hand_start", "hand": self.hand_id, "stacks": list(self.chips)}]
+        events.extend({"type": "hole", "to": seat, "seat": seat, "cards": self.holes[seat]}
+                      for seat in range(n))
+
+        small_blind_seat = 1 % n
+        big_blind_seat = (small_blind_seat + 1) % n
+        for seat, amount in ((small_blind_seat, self.small_blind), (big_blind_seat, self.big_blind)):
+            events.append({"type": "blind", "seat": seat, "amount": self._put(seat, amount)})
+        self.current_bet = self.big_blind
+        self.min_raise = self.big_blind
+        self.to_act = big_blind_seat
+        self._advance(big_blind_seat, events)
+        return events
+
+    def apply(self, action, raise_to=None):
+        """当前行动者执行行动（加注时 raise_to 为本街下注总额，缺省为最小加注）；返回事件列表
+
+        非法行动抛出 ValueError，状态不变。
+        """
+        if not self.hand_active:
+            raise ValueError("当前没有进行中的牌局")
+        mask, floor, ceiling = self.legal_actions()
+        if action not in ACTION_BITS or not mask & ACTION_BITS[action]:
+            raise ValueError(f"非法行动: {action}")
+        p = self.to_act
+        if action == "raise":
+            raise_to = floor if raise_to is None else int(raise_to)
+            if raise_to >= ceiling:
+                action = "all_in"
+            elif raise_to < floor:
+                raise ValueError(f"加注额不足: 至少 {floor}")
+
+        amount = 0
+        if action == "fold":
+            self.folded[p] = True
+        elif action == "call":
+            amount = self._put(p, self.current_bet - self.street_bets[p])
+        elif action == "raise":
+            amount = self._put(p, raise_to - self.street_bets[p])
+        elif action == "all_in":
+            amount = self._put(p, self.chips[p])
+        if self.street_bets[p] > self.current_bet:
+            self.min_raise = next_min_raise(self.current_bet, self.street_bets[p], self.min_raise)
+            self.current_bet = self.street_bets[p]
+            self.acted = [False] * self.num_seats
+        self.acted[p] = True
+        self.history[-1] += _ACTION_CODE[action]
+        self.last_action = (p, action)
+
+        events = [{"type": "action", "seat": p, "action": action, "amount": amount,
+                   "bet": self.street_bets[p], "stack": self.chips[p]}]
+        self._advance(p, events)
+        return events
+
+    def _put(self, seat, amount):
+        """下注（不足时全下），返回实际下注额"""
+        amount = min(amount, self.chips[seat])
+        self.chips[seat] -= amount
+        self.street_bets[seat] += amount
+        self.contributed[seat] += amount
+        if self.chips[seat] == 0:
+            self.all_in[seat] = True
+        return amount
+
+    def _advance(self, last, events):
+        """轮到下一位玩家，或进入下一街/结算"""
+        n = self.num_seats
+        live = [i for i in range(n) if not self.folded[i]]
+        if len(live) > 1:
+            actors = [i for i in live if not self.all_in[i]]
+            for k in range(1, n + 1):
+                i = (last + k) % n
+                if not self.folded[i] and not self.all_in[i] and (
+                        not self.acted[i] or self.street_bets[i] < self.current_bet):
+                    self.to_act = i
+                    return
+
+            # 下注轮结束；还有两人以上可行动时进入下一街
+            if len(actors) > 1 and self.street < len(STREET_NAMES) - 1:
+                self._next_street(events)
+                self.to_act = actors[0]
+                return
+
+            # 不足两人可行动：发完公共牌摊牌
+            while self.street < len(STREET_NAMES) - 1:
+                self._next_street(events)
+        self._settle(live, events)
+
+    def _next_street(self, events):
+        """进入下一街并发公共牌"""
+        n = self.num_seats
+        self.street += 1
+        dealt = self._deck[:BOARD_CARDS[self.street]]
+        self._deck = self._deck[BOARD_CARDS[self.street]:]
+        self.board.extend(dealt)
+        self.street_bets = [0] * n
+        self.acted = [False] * n
+        self.current_bet = 0
+        self.min_raise = self.big_blind
+        self.history.append("")
+        events.append({"type": "street", "street": STREET_NAMES[self.street], "cards": dealt})
+
+    def _settle(self, live, events):
+        """结算：按投入额分层计算边池，平分时零头给按钮后最先的赢家"""
+        n = self.num_seats
+        winnings = [0] * n
+        shown = {}
+        if len(live) == 1:
+            winnings[live[0]] = sum(self.contributed)
+        else:
+            scores = {seat: evaluate(self.holes[seat] + self.board) for seat in live}
+            shown = {seat: self.holes[seat] for seat in live}
+            previous = 0
+            for level in sorted(set(self.contributed)):
+                pot = sum(min(c, level) - min(c, previous) for c in self.contributed)
+                previous = level
+                if pot == 0:
+                    continue
+                eligible = [i for i in live if self.contributed[i] >= level] or live
+                best = max(scores[i] for i in eligible)
+                winners = [i for i in eligible if scores[i] == best]
+                share, odd = divmod(pot, len(winners))
+                for k, seat in enumerate(winners):
+                    winnings[seat] += share + (1 if k < odd else 0)
+
+        for seat in range(n):
+            self.chips[seat] += winnings[seat]
+        self.hand_active = False
+        self.to_act = -1
+        events.append({
+            "type": "hand_end", "hand": self.hand_id, "board": list(self.board),
+            "shown": {str(seat): cards for seat, cards in shown.items()},
+            "net": [winnings[i] - self.contributed[i] for i in range(n)],
+            "stacks": list(self.chips),
+        })
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - AI启发式策略批量接口测试
+"""
+
+import sys
+import os
+import random
+import unittest
+
+import numpy as np
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_policy import (
+    AI_ACTIONS, position_factor, bet_history_factor, heuristic_weights, choose_action,
+    position_factor_batch, bet_history_factor_batch, heuristic_weights_batch, choose_actions_batch,
+)
+
+
+def random_features(count, seed=0):
+    """覆盖各分支边界的随机特征"""
+    rng = random.Random(seed)
+    grid = [0.0, 0.29, 0.3, 0.5, 0.7, 0.71, 1.0]
+
+    def pick():
+        return rng.choice(grid) if rng.random() < 0.3 else rng.random()
+
+    rows = []
+    for _ in range(count):
+        looseness = None if rng.random() < 0.3 else pick()
+        rows.append((pick(), pick(), pick(), rng.choice([0.2, 0.5, 3.0, 3.5]) * rng.random() * 2,
+                     looseness))
+    return rows
+
+
+class TestBatchPolicy(unittest.TestCase):
+    """批量策略测试类"""
+
+    def test_features(self):
+        """测试批量特征与标量特征一致"""
+        seats = np.arange(5)
+        self.assertEqual(position_factor_batch(seats, 2, 5).tolist(),
+                         [position_factor(s, 2, 5) for s in range(5)])
+        bets = [0, 100, 200, 1000, 5000]
+        self.assertEqual(bet_history_factor_batch(bets, 200).tolist(),
+                         [bet_history_factor(b, 200) for b in bets])
+
+    def test_weights_identical(self):
+        """测试批量权重与逐个计算的结果逐位相同"""
+        rows = random_features(5000)
+        strength, position, history, chips, looseness = zip(*rows)
+        looseness = [np.nan if x is None else x for x in looseness]
+        batch = heuristic_weights_batch(strength, position, history, chips, looseness)
+        for row, weights in zip(rows, batch.tolist()):
+            expected = heuristic_weights(*row)
+            self.assertEqual(weights, [expected[a] for a in AI_ACTIONS])
+
+        # 不传对手松凶程度
+        batch = heuristic_weights_batch(strength, position, history, chips)
+        for row, weights in zip(rows, batch.tolist()):
+            expected = heuristic_weights(*row[:4])
+            self.assertEqual(weights, [expected[a] for a in AI_ACTIONS])
+
+    def test_sampling_matches_random_choices(self):
+        """测试给定相同随机数时批量抽样与 random.choices 结果相同"""
+        rows = random_features(2000, seed=1)
+        weights = [heuristic_weights(*row) for row in rows]
+        batch = heuristic_weights_batch(*[np.array([np.nan if x is None else x for x in column])
+                                          for column in zip(*rows)])
+
+        rng = random.Random(7)
+        uniforms = [rng.random() for _ in rows]
+        chosen = choose_actions_batch(batch, uniforms=uniforms)
+
+        rng = random.Random(7)
+        expected = [choose_action(w, rng) for w in weights]
+        self.assertEqual([AI_ACTIONS[i] for i in chosen], expected)
+
+    def test_sampling_distribution(self):
+        """测试批量抽样的频率接近权重"""
+        weights = heuristic_weights_batch(np.full(200000, 0.8), 0.9, 0.2, 1.0)
+        chosen = choose_actions_batch(weights, np.random.default_rng(3))
+        frequencies = np.bincount(chosen, minlength=len(AI_ACTIONS)) / len(chosen)
+        np.testing.assert_allclose(frequencies, weights[0], atol=0.005)
+
+
+if __name__ == '__main__':
+    unittest.main()
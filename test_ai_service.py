@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - AI决策服务测试
+"""
+
+import sys
+import os
+import time
+import random
+import unittest
+from collections import Counter
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_policy import heuristic_weights
+from ai_service import AIServiceClient
+from ai_worker import DecisionRequest, decide_batch
+from cfr_solver import ACTIONS
+from mcts_ai import build_root_state
+
+
+def make_request(seat=3, strength=0.9, push_fold_action=None):
+    """5人桌翻牌后的决策快照"""
+    return DecisionRequest(seat, 5, [48, 49], [0, 13, 26], "flop", ["", ""], strength, 1.0, 0.2, 3.5,
+                           push_fold_action=push_fold_action)
+
+
+def make_search_request(budget):
+    """5人桌翻牌前、搜索模式的决策快照"""
+    root = build_root_state(
+        "preflop", [5000, 7900, 5800, 7000, 10000], [0, 100, 200, 0, 0],
+        [0, 100, 200, 0, 0], [False] * 5, [False] * 5, 200, 3, [""], 100, 200,
+    )
+    return DecisionRequest(3, 5, [48, 49], [], "preflop", [""], 0.9, 1.0, 0.2, 3.5,
+                           mode="mcts", search_root=root, budget=budget)
+
+
+def wait_all(client, tickets, timeout=10.0):
+    """轮询直到全部请求都有结果"""
+    results = {}
+    deadline = time.perf_counter() + timeout
+    while len(results) < len(tickets):
+        if time.perf_counter() > deadline:
+            raise AssertionError("服务回复超时")
+        for ticket in tickets:
+            if ticket not in results:
+                action = client.poll(ticket)
+                if action is not None:
+                    results[ticket] = action
+        time.sleep(0.002)
+    return [results[t] for t in tickets]
+
+
+class TestDecideBatch(unittest.TestCase):
+    """批量决策测试类"""
+
+    def test_distribution(self):
+        """测试批量决策的行动频率与启发式权重一致"""
+        actions = decide_batch([make_request(strength=0.5)] * 50000)
+        counts = Counter(actions)
+        weights = heuristic_weights(0.5, 1.0, 0.2, 3.5)
+        for action in ACTIONS:
+            self.assertAlmostEqual(counts[action] / 50000, weights[action], delta=0.01)
+
+    def test_push_fold_passthrough(self):
+        """测试已有推/弃结论的请求直接返回"""
+        actions = decide_batch([make_request(push_fold_action="all_in"), make_request()])
+        self.assertEqual(actions[0], "all_in")
+        self.assertIn(actions[1], ACTIONS)
+
+
+class TestAIService(unittest.TestCase):
+    """决策服务测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """启动一次服务进程"""
+        cls.client = AIServiceClient(timeout=10.0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.shutdown()
+
+    def test_batched_requests(self):
+        """测试大量请求被凑批计算后全部返回"""
+        client = self.client
+        batches_before = client.stats.batches
+        requests = [make_request(seat=random.randrange(5)) for _ in range(500)]
+        tickets = client.submit_many(requests[:250]) + [client.submit(r) for r in requests[250:]]
+        actions = wait_all(client, tickets)
+        self.assertTrue(all(action in ACTIONS for action in actions))
+        self.assertLess(client.stats.batches - batches_before, 500)
+        self.assertGreater(client.stats.mean_batch(), 1.0)
+        self.assertEqual(client.stats.timeouts, 0)
+
+    def test_timeout_fallback(self):
+        """测试超时的请求在本地即时决策，迟到的结果被丢弃"""
+        client = self.client
+        ticket = client.submit(make_request(push_fold_action="fold"), timeout=0.0)
+        self.assertEqual(client.poll(ticket), "fold")
+        self.assertEqual(client.stats.timeouts, 1)
+        time.sleep(0.1)
+        with self.assertRaises(KeyError):
+            client.poll(ticket)
+        client.stats.timeouts = 0
+
+    def test_search_outside_batch(self):
+        """测试搜索请求单独计算：同时提交的普通请求不等搜索结束，搜索在截止时间前回复"""
+        client = self.client
+        started = time.perf_counter()
+        search = client.submit(make_search_request(budget=0.5), timeout=0.3)
+        tickets = client.submit_many([make_request() for _ in range(20)])
+        wait_all(client, tickets)
+        self.assertLess(time.perf_counter() - started, 0.2)
+        action = wait_all(client, [search])[0]
+        self.assertIn(action, ACTIONS)
+        self.assertLess(time.perf_counter() - started, 0.35)
+        self.assertEqual(client.stats.timeouts, 0)
+
+    def test_cancel(self):
+        """测试取消的请求没有结果"""
+        ticket = self.client.submit(make_request())
+        self.client.cancel(ticket)
+        time.sleep(0.05)
+        with self.assertRaises(KeyError):
+            self.client.poll(ticket)
+
+
+class TestServiceShutdown(unittest.TestCase):
+    """服务退出与凭据清理测试类"""
+
+    def test_dropped_tickets_expire(self):
+        """测试调用方不再取的凭据（未回复与已回复的）在截止时间加 ttl 后被清理"""
+        client = AIServiceClient(timeout=0.05, ttl=0.1)
+        try:
+            tickets = client.submit_many([make_request() for _ in range(10)])
+            time.sleep(0.05)
+            client.poll(tickets[0])
+            self.assertGreater(client.outstanding, 0)
+            time.sleep(0.2)
+            with self.assertRaises(KeyError):   # 清理后与“未就绪”区分开，调用方不会一直等下去
+                client.poll(tickets[1])
+            self.assertEqual(client.outstanding, 0)
+            self.assertEqual(client.stats.expired, 9)
+        finally:
+            client.shutdown()
+
+    def test_fallback_after_shutdown(self):
+        """测试服务不可用时立即在本地决策"""
+        client = AIServiceClient(timeout=10.0)
+        client.shutdown()
+        self.assertFalse(client.alive)
+        ticket = client.submit(make_request())
+        self.assertIn(client.poll(ticket), ACTIONS)
+        self.assertEqual(client.stats.timeouts, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
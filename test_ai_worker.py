@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - AI后台思考测试
+"""
+
+import sys
+import os
+import time
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_worker import AIWorker, DecisionRequest, decide
+from cfr_solver import ACTIONS
+from mcts_ai import build_root_state
+
+
+def make_request(mode="standard", budget=0.0):
+    """5人桌翻牌前3号位的决策快照"""
+    root = build_root_state(
+        "preflop", [5000, 7900, 5800, 7000, 10000], [0, 100, 200, 0, 0],
+        [0, 100, 200, 0, 0], [False] * 5, [False] * 5, 200, 3, [""], 100, 200,
+    ) if mode == "mcts" else None
+    return DecisionRequest(3, 5, [48, 49], [], "preflop", [""], 0.9, 1.0, 0.2, 3.5,
+                           mode, root, budget)
+
+
+def wait_for(worker, timeout=5.0):
+    """轮询直到后台结果就绪"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        result = worker.poll()
+        if result is not None:
+            return result
+        time.sleep(0.005)
+    raise AssertionError("后台决策超时")
+
+
+class TestAIWorker(unittest.TestCase):
+    """后台思考测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.worker = AIWorker()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.worker.shutdown()
+
+    def test_standard_decision(self):
+        """测试标准模式直接给出行动"""
+        action, search = decide(make_request())
+        self.assertIn(action, ACTIONS)
+        self.assertIsNone(search)
+
+    def test_background_search(self):
+        """测试搜索在后台线程运行，提交后立即返回"""
+        started = time.perf_counter()
+        self.worker.submit(make_request("mcts", budget=0.1))
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertTrue(self.worker.pending)
+
+        request, action, search = wait_for(self.worker)
+        self.assertEqual(request.seat, 3)
+        self.assertIn(action, ACTIONS)
+        self.assertGreater(search.playouts, 0)
+        self.assertFalse(self.worker.pending)
+        self.assertIsNone(self.worker.poll())
+
+    def test_stale_result_dropped(self):
+        """测试新请求取代旧请求，旧结果不会被取到"""
+        first = make_request("mcts", budget=0.05)
+        second = make_request()
+        self.worker.submit(first)
+        self.worker.submit(second)
+        request, _, _ = wait_for(self.worker)
+        self.assertIs(request, second)
+
+    def test_cancel(self):
+        """测试放弃请求后没有结果"""
+        self.worker.submit(make_request("mcts", budget=0.02))
+        self.worker.cancel()
+        time.sleep(0.05)
+        self.assertFalse(self.worker.pending)
+        self.assertIsNone(self.worker.poll())
+
+
+if __name__ == '__main__':
+    unittest.main()
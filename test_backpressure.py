@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 服务器入站背压测试
+"""
+
+import sys
+import os
+import random
+import asyncio
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backpressure import RateLimiter, LatencyHistogram, ActionInbox
+from timer_wheel import AsyncScheduler
+
+
+class TestRateLimiter(unittest.TestCase):
+    """令牌桶限速测试类"""
+
+    def test_burst_then_rate(self):
+        """测试先允许突发，之后按速率补充令牌"""
+        now = [0.0]
+        limiter = RateLimiter(rate=10.0, burst=5, clock=lambda: now[0])
+        self.assertEqual(sum(limiter.allow() for _ in range(20)), 5)
+        self.assertEqual(limiter.rejected, 15)
+        now[0] += 1.0
+        self.assertEqual(sum(limiter.allow() for _ in range(20)), 5)
+        now[0] += 0.25
+        self.assertEqual(sum(limiter.allow() for _ in range(20)), 2)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """延迟直方图测试类"""
+
+    def test_percentiles_within_bucket_error(self):
+        """测试分位数与精确值相差不超过一个桶（19%），合并后计数一致"""
+        rng = random.Random(0)
+        samples = [rng.lognormvariate(-6, 1.5) for _ in range(20000)]
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for i, sample in enumerate(samples):
+            (first if i % 2 else second).record(sample)
+        first.merge(second)
+        self.assertEqual(first.count, len(samples))
+        ordered = sorted(samples)
+        for p in (50, 90, 99, 99.9):
+            exact = ordered[int(len(ordered) * p / 100) - 1]
+            self.assertGreaterEqual(first.percentile(p), exact * 0.999)
+            self.assertLessEqual(first.percentile(p), exact * 1.19 * 1.01)
+        self.assertEqual(first.percentile(100), max(samples))
+        self.assertEqual(LatencyHistogram().percentile(99), 0.0)
+
+
+class TestActionInbox(unittest.IsolatedAsyncioTestCase):
+    """入站行动队列测试类"""
+
+    async def asyncSetUp(self):
+        self.timers = AsyncScheduler(tick=0.01)
+        self.timers.start()
+
+    async def asyncTearDown(self):
+        await self.timers.stop()
+
+    async def test_stale_duplicate_and_overflow(self):
+        """测试过期序号、重复行动与队列上限"""
+        inbox = ActionInbox(self.timers, maxsize=3)
+        self.assertFalse(inbox.put(4, "call", None, seq=7))   # 没有等待中的行动
+        inbox.open(8)
+        self.assertFalse(inbox.put(4, "call", None, seq=7))
+        self.assertTrue(inbox.put(4, "call", None, seq=8))
+        self.assertFalse(inbox.put(4, "call", None, seq=8))
+        self.assertTrue(inbox.put(4, "raise", 600))
+        self.assertTrue(inbox.put(4, "raise", 800, seq=8))
+        self.assertFalse(inbox.put(4, "fold", None, seq=8))
+        self.assertEqual((inbox.stale, inbox.duplicates, inbox.overflow), (2, 1, 1))
+        batch = await inbox.get()
+        self.assertEqual([item[1] for item in batch], ["call", "raise", "raise"])
+        inbox.close()
+        self.assertFalse(inbox.put(4, "call", None, seq=8))
+
+    async def test_invalid_actions_rejected(self):
+        """测试行动名未知或不可哈希、加注额不是整数的行动在去重前被丢弃"""
+        inbox = ActionInbox(self.timers)
+        inbox.open(3)
+        for action, raise_to in ((["call"], None), ({"a": 1}, None), ("bet-everything", None),
+                                 ("raise", [600]), ("raise", 600.5)):
+            self.assertFalse(inbox.put(4, action, raise_to, seq=3))
+        self.assertEqual((inbox.invalid, inbox.accepted), (5, 0))
+        self.assertTrue(inbox.put(4, "raise", 600, seq=3))
+
+    async def test_burst_coalesced_per_tick(self):
+        """测试一个刻度内的连续点击只唤醒一次牌桌；控制事件立即唤醒"""
+        inbox = ActionInbox(self.timers)
+        inbox.open(1)
+
+        async def clicks():
+            await asyncio.sleep(0)
+            for amount in range(10):
+                inbox.put(4, "raise", 400 + amount)
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(clicks())
+        batch = await inbox.get()
+        await task
+        self.assertEqual(len(batch), 10)
+        self.assertEqual(inbox.wakeups, 1)
+
+        waiter = asyncio.create_task(inbox.get())
+        await asyncio.sleep(0)
+        inbox.put_control(-1)
+        await asyncio.sleep(0)
+        self.assertTrue(waiter.done())
+        self.assertEqual(waiter.result()[0][0], -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
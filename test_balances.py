@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 筹码余额持久化测试
+"""
+
+import sys
+import os
+import time
+import shutil
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from balances import BalanceStore
+from game_server import GameServer, encode_message, decode_message
+
+
+class TestBalanceStore(unittest.TestCase):
+    """余额写回队列测试类"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "balances.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_updates_coalesced_and_flushed_on_close(self):
+        """测试多线程更新合并成少量事务，读取包含未写入的更新，关闭时写完队列"""
+        store = BalanceStore(self.path, flush_interval=60.0)
+
+        def play(player):
+            for i in range(1000):
+                store.add(player, 10 if i % 2 else -5)
+
+        threads = [threading.Thread(target=play, args=(f"玩家{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(store.balance("玩家0"), (2500, 1000))
+        self.assertEqual(store.commits, 0)
+        store.flush()
+        self.assertEqual(store.commits, 1)
+        self.assertEqual(store.rows_written, 4)
+        store.add("玩家0", 100)
+        store.record_session("玩家0", 3, 4, 1.0, 2.0, 1001, 2600)
+        store.close()
+        store.close()
+
+        reopened = BalanceStore(self.path)
+        self.assertEqual(reopened.balance("玩家0"), (2600, 1001))
+        self.assertEqual(reopened.balance("无名"), (0, 0))
+        self.assertEqual(reopened.sessions("玩家0"), [(3, 4, 1.0, 2.0, 1001, 2600)])
+        reopened.close()
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        conn.close()
+
+    def test_add_never_waits_for_commit(self):
+        """测试后台线程提交期间 add 不等待磁盘"""
+        store = BalanceStore(self.path, flush_interval=0.01)
+        worst = 0.0
+        deadline = time.perf_counter() + 0.3
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            store.add(f"p{i % 5000}", 1)
+            worst = max(worst, time.perf_counter() - start)
+            i += 1
+        store.close()
+        self.assertGreater(store.commits, 1)
+        self.assertLess(worst, 0.05)
+        self.assertEqual(store.updates, i)
+
+
+class TestServerBalances(unittest.IsolatedAsyncioTestCase):
+    """服务器余额记录测试类"""
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "balances.db")
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    async def test_named_player_results_persisted(self):
+        """测试带名字的玩家每手输赢写入余额，停止服务器时写入对局记录"""
+        server = GameServer(4, think_delay=(0.0, 0.0), hand_pause=0.0, seed=2, balance_db=self.path,
+                            balance_flush_interval=0.05)
+        port = await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_message({"type": "join", "table": 1, "name": "小王"}))
+        hands = 0
+        while hands < 3:
+            message = decode_message(await asyncio.wait_for(reader.readline(), 5.0))
+            if message["type"] == "turn":
+                action = "call" if "call" in message["legal"] else message["legal"][1]
+                writer.write(encode_message({"type": "action", "action": action, "seq": message["seq"]}))
+            elif message["type"] == "hand_end":
+                hands += 1
+        await server.stop()
+        writer.close()
+
+        store = BalanceStore(self.path)
+        chips, played = store.balance("小王")
+        sessions = store.sessions("小王")
+        store.close()
+        self.assertGreaterEqual(played, 3)
+        self.assertEqual(len(sessions), 1)
+        table_id, seat, joined, left, session_hands, net = sessions[0]
+        self.assertEqual((table_id, seat, session_hands, net), (1, 4, played, chips))
+        self.assertLessEqual(joined, left)
+
+    async def test_mid_hand_join_and_leave(self):
+        """测试中途入座的那手牌不计输赢；中途离座时已投入的筹码记为输掉"""
+        server = GameServer(4, think_delay=(0.0, 0.0), hand_pause=0.0, seed=5, balance_db=self.path,
+                            balance_flush_interval=0.05)
+        port = await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_message({"type": "join", "table": 2, "name": "小李"}))
+        seat = start_stack = None
+        seen = []
+        while True:
+            message = decode_message(await asyncio.wait_for(reader.readline(), 5.0))
+            seen.append(message["type"])
+            if message["type"] == "joined":
+                seat = message["seat"]
+            elif message["type"] == "hand_end" and "hand_start" not in seen:
+                # 入座时这手牌已经开始（先补发了底牌）：不计入
+                self.assertIn("hole", seen)
+                self.assertEqual(server.tables[2].clients[seat].hands, 0)
+            elif message["type"] == "hand_start":
+                start_stack = message["stacks"][seat]
+            elif message["type"] == "turn":
+                action = next(a for a in ("check", "call", "fold") if a in message["legal"])
+                writer.write(encode_message({"type": "action", "action": action, "seq": message["seq"]}))
+            elif message["type"] == "action" and message["seat"] == seat and start_stack is not None:
+                writer.write(encode_message({"type": "leave"}))
+                left_stack = message["stack"]
+                break
+        while server.tables[2].clients:
+            await asyncio.sleep(0.01)
+        await server.stop()
+        writer.close()
+
+        store = BalanceStore(self.path)
+        chips, played = store.balance("小李")
+        store.close()
+        self.assertEqual((chips, played), (left_stack - start_stack, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
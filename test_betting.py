@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 合法行动生成测试
+"""
+
+import sys
+import os
+import unittest
+
+import numpy as np
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from betting import (
+    legal_actions, action_names, is_legal, clamp_raise, next_min_raise, min_raise_to,
+    FOLD_BIT, CHECK_BIT, CALL_BIT, RAISE_BIT, ALL_IN_BIT,
+)
+
+
+class TestLegalActions(unittest.TestCase):
+    """合法行动生成测试类"""
+
+    def test_facing_big_blind(self):
+        """测试翻牌前面对大盲"""
+        mask, floor, ceiling = legal_actions(5000, 0, 200, 200, 200)
+        self.assertEqual(action_names(mask), ["fold", "call", "raise", "all_in"])
+        self.assertEqual((floor, ceiling), (400, 5000))
+
+    def test_min_raise_increment(self):
+        """测试最小加注按上一次加注的增量计算"""
+        # 200 加注到 700，增量 500，再加注至少到 1200
+        mask, floor, ceiling = legal_actions(5000, 200, 700, 500, 200)
+        self.assertEqual(floor, 1200)
+        self.assertEqual(ceiling, 5200)
+        self.assertTrue(is_legal(mask, "raise"))
+        # 翻牌后无人下注：最小下注为一个大盲
+        mask, floor, _ = legal_actions(5000, 0, 0, 200, 200)
+        self.assertEqual(action_names(mask), ["check", "raise", "all_in"])
+        self.assertEqual(floor, 200)
+
+    def test_short_stack(self):
+        """测试筹码不足加注或跟注时只能全下"""
+        mask, floor, ceiling = legal_actions(300, 200, 700, 500, 200)
+        self.assertEqual(action_names(mask), ["fold", "all_in"])
+        self.assertLess(ceiling, floor)
+        # 筹码恰好够最小加注：只有全下
+        mask, _, _ = legal_actions(1000, 200, 700, 500, 200)
+        self.assertFalse(mask & RAISE_BIT)
+        self.assertTrue(mask & ALL_IN_BIT)
+        mask, _, _ = legal_actions(0, 500, 700, 500, 200)
+        self.assertEqual(mask, FOLD_BIT)
+
+    def test_short_all_in_keeps_increment(self):
+        """测试不足一次完整加注的全下不改变最小加注增量"""
+        self.assertEqual(next_min_raise(700, 900, 500), 500)
+        self.assertEqual(next_min_raise(700, 1500, 500), 800)
+        self.assertEqual(min_raise_to(0, 0, 200), 200)
+
+    def test_clamp_raise(self):
+        """测试加注额取整并收进合法区间"""
+        self.assertEqual(clamp_raise(1234.6, 400, 5000), 1235)
+        self.assertIsInstance(clamp_raise(1234.6, 400, 5000), int)
+        self.assertEqual(clamp_raise(300, 400, 5000), 400)
+        self.assertEqual(clamp_raise(9000, 400, 5000), 5000)
+
+    def test_arrays_match_scalars(self):
+        """测试数组参数与逐个标量计算结果一致"""
+        rng = np.random.default_rng(0)
+        stacks = rng.integers(0, 3000, 500)
+        street_bets = rng.integers(0, 1500, 500)
+        current_bets = street_bets + rng.integers(0, 1500, 500) * rng.integers(0, 2, 500)
+        min_raises = rng.integers(0, 1000, 500)
+        masks, floors, ceilings = legal_actions(stacks, street_bets, current_bets, min_raises, 200)
+        for i in range(500):
+            expected = legal_actions(int(stacks[i]), int(street_bets[i]), int(current_bets[i]),
+                                     int(min_raises[i]), 200)
+            self.assertEqual((int(masks[i]), int(floors[i]), int(ceilings[i])), expected)
+        # 每种局面有且只有过牌或弃牌之一
+        self.assertTrue((((masks & CHECK_BIT) > 0) != ((masks & FOLD_BIT) > 0)).all())
+        self.assertFalse(((masks & CALL_BIT) > 0)[(masks & FOLD_BIT) == 0].any())
+
+
+class TestGameRaises(unittest.TestCase):
+    """游戏加注规则测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from main import TexasHoldemGame
+        self.game = TexasHoldemGame()
+        self.game.ai_worker.cancel()
+
+    def tearDown(self):
+        self.game.ai_worker.shutdown()
+
+    def test_ai_raise_is_integer_and_min_raise_tracked(self):
+        """测试按倍数加注得到整数筹码，并更新最小加注增量"""
+        game = self.game
+        first = game.players[game.current_player_idx]
+        game._raise_to(first, 200 * 2.37)
+        self.assertEqual(game.table.current_bet, 474)
+        self.assertIsInstance(first.current_bet, int)
+        self.assertEqual(game.table.min_raise, 274)
+
+        # 下一位的加注目标低于最小加注时提高到最小加注
+        second = game.players[(game.current_player_idx + 1) % len(game.players)]
+        game._raise_to(second, 500)
+        self.assertEqual(game.table.current_bet, 748)
+        self.assertEqual(game.get_legal_actions(second)[1], 748 + 274)
+
+    def test_raise_beyond_stack_goes_all_in(self):
+        """测试加注额超过筹码时改为全下"""
+        game = self.game
+        player = game.players[game.current_player_idx]
+        chips = player.chips
+        game._raise_to(player, chips * 10)
+        self.assertTrue(player.all_in)
+        self.assertEqual(player.current_bet, chips)
+        self.assertEqual(game.table.current_bet, chips)
+        self.assertTrue(game.action_history[-1].endswith("A"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 插件AI接口测试
+"""
+
+import sys
+import os
+import time
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_worker import DecisionRequest
+from betting import legal_actions, action_names
+from bots import (
+    Bot, ProcessBot, RandomBot, CallingStationBot, HeuristicBot,
+    create_bot, checked_action, default_action,
+)
+
+
+class SlowBot(Bot):
+    """第一次决策后睡眠很久（测试截止时间）"""
+
+    def __init__(self, delay=5.0):
+        self.delay = delay
+
+    def decide(self, request):
+        if request.seat == 0:
+            time.sleep(self.delay)
+        return "call"
+
+
+class SlowStartBot(SlowBot):
+    """创建时要花一段时间（模拟导入大模块）"""
+
+    def __init__(self, delay=5.0, startup=0.5):
+        super().__init__(delay)
+        time.sleep(startup)
+
+
+class CrashBot(Bot):
+    """决策时抛出异常"""
+
+    def decide(self, request):
+        raise RuntimeError("boom")
+
+
+def make_request(seat=3, facing_bet=True):
+    """5人桌翻牌前的决策快照"""
+    current_bet = 200 if facing_bet else 0
+    mask, floor, ceiling = legal_actions(5000, 0, current_bet, 200, 200)
+    return DecisionRequest(seat, 5, [48, 49], [], "preflop", [""], 0.9, 1.0, 0.2, 2.5,
+                           legal_mask=mask, min_raise_to=floor, max_raise_to=ceiling)
+
+
+class TestBots(unittest.TestCase):
+    """插件AI测试类"""
+
+    def test_builtin_bots(self):
+        """测试内置AI只给出合法行动"""
+        request = make_request()
+        legal = action_names(request.legal_mask)
+        for bot in (RandomBot(seed=1), CallingStationBot(), HeuristicBot(), create_bot("random")):
+            for action in bot.decide_batch([request] * 50):
+                self.assertIn(checked_action(request, action), legal)
+        self.assertEqual(CallingStationBot().decide(request), "call")
+        self.assertEqual(CallingStationBot().decide(make_request(facing_bet=False)), "check")
+
+    def test_default_and_checked_action(self):
+        """测试非法行动改为默认行动"""
+        facing = make_request()
+        self.assertEqual(default_action(facing), "fold")
+        self.assertEqual(default_action(make_request(facing_bet=False)), "check")
+        self.assertEqual(checked_action(facing, "check"), "fold")
+        self.assertEqual(checked_action(facing, "bet-everything"), "fold")
+        self.assertEqual(checked_action(facing, "raise"), "raise")
+
+    def test_create_bot_by_path(self):
+        """测试按 模块:类名 创建插件AI"""
+        bot = create_bot("test_bots:SlowBot", delay=0.0)
+        self.assertIsInstance(bot, SlowBot)
+        with self.assertRaises(ValueError):
+            create_bot("no_such_bot")
+
+
+class TestProcessBot(unittest.TestCase):
+    """工作进程隔离测试类"""
+
+    def test_batch_in_worker(self):
+        """测试批量请求在工作进程中完成"""
+        bot = ProcessBot("calling_station", timeout=10.0)
+        try:
+            actions = bot.decide_batch([make_request(), make_request(facing_bet=False)])
+            self.assertEqual(actions, ["call", "check"])
+        finally:
+            bot.close()
+
+    def test_startup_not_charged_to_deadline(self):
+        """测试进程启动的时间不计入决策截止时间：短截止时间的第一次调用和超时重启后的调用都能按时完成"""
+        bot = ProcessBot("test_bots:SlowStartBot", timeout=0.3)
+        try:
+            self.assertEqual(bot.decide(make_request(seat=3)), "call")
+            self.assertEqual(bot.decide(make_request(seat=0)), "fold")
+            self.assertEqual(bot.decide(make_request(seat=3)), "call")
+            self.assertEqual(bot.timeouts, 1)
+            self.assertEqual(bot.errors, 0)
+        finally:
+            bot.close()
+
+    def test_timeout_restarts_worker(self):
+        """测试超时返回默认行动，之后工作进程重启继续服务"""
+        bot = ProcessBot("test_bots:SlowBot", timeout=10.0)
+        try:
+            # 先完成一次调用，确保进程已启动
+            self.assertEqual(bot.decide(make_request(seat=3)), "call")
+            started = time.perf_counter()
+            action = bot.decide_batch([make_request(seat=0)], timeout=0.2)[0]
+            self.assertLess(time.perf_counter() - started, 2.0)
+            self.assertEqual(action, "fold")
+            self.assertEqual(bot.timeouts, 1)
+            self.assertEqual(bot.decide(make_request(seat=3)), "call")
+        finally:
+            bot.close()
+
+    def test_crash_returns_default(self):
+        """测试AI出错时返回默认行动"""
+        bot = ProcessBot("test_bots:CrashBot", timeout=10.0)
+        try:
+            self.assertEqual(bot.decide(make_request(facing_bet=False)), "check")
+            self.assertEqual(bot.errors, 1)
+        finally:
+            bot.close()
+
+
+class TestGameSeatBot(unittest.TestCase):
+    """游戏座位插件测试类"""
+
+    def test_seat_bot_acts(self):
+        """测试座位上的插件AI决定该座位的行动"""
+        from main import TexasHoldemGame
+
+        game = TexasHoldemGame()
+        game.ai_worker.cancel()
+        seat = game.current_player_idx
+        game.set_seat_bot(seat, CallingStationBot())
+        game._process_ai_action(game.players[seat])
+        self.assertEqual(game.action_history[-1], "C")
+        with self.assertRaises(ValueError):
+            game.set_seat_bot(4, RandomBot())
+        game.ai_worker.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - CFR策略求解器测试
+"""
+
+import sys
+import os
+import copy
+import random
+import tempfile
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cfr_solver import (
+    AbstractGameConfig, AbstractState, BucketDeal, CFRTrainer, StrategyTable,
+    subgame_config, export_strategy, quantize_probabilities,
+    load_checkpoint, train, split_iterations,
+    FOLD, CHECK, CALL, RAISE, ALL_IN, NUM_ACTIONS,
+)
+from exploitability import exploitability
+
+
+def uniform(key, legal):
+    """均匀随机策略"""
+    return [1.0 / len(legal)] * len(legal)
+
+
+class TestAbstractState(unittest.TestCase):
+    """抽象牌局规则测试类"""
+
+    def test_blinds_and_first_actor(self):
+        """测试盲注位置与翻牌前首位行动者与游戏一致"""
+        config = AbstractGameConfig()
+        state = AbstractState.initial(config, BucketDeal([0] * 5))
+        self.assertEqual(state.contributed, [0, 100, 200, 0, 0])
+        self.assertEqual(state.to_act, 3)
+        self.assertEqual(state.legal_actions(), [FOLD, CALL, RAISE, ALL_IN])
+
+    def test_heads_up_street_transition(self):
+        """测试单挑跟注、过牌后进入下一街"""
+        config = AbstractGameConfig(num_seats=2, stacks=(2000, 2000), chance_model="buckets")
+        state = AbstractState.initial(config, BucketDeal([1, 0]))
+        self.assertEqual(state.to_act, 1)  # 小盲先行动
+        state = state.child(CALL)
+        self.assertEqual(state.to_act, 0)  # 大盲仍可选择
+        self.assertIn(CHECK, state.legal_actions())
+        state = state.child(CHECK)
+        self.assertEqual(state.street, 1)
+        self.assertEqual(state.history, ["CK", ""])
+        self.assertEqual(state.infoset_key(), "0:flop:1:CK/")
+
+    def test_fold_payoff(self):
+        """测试弃牌后底池归剩余玩家"""
+        config = AbstractGameConfig(num_seats=2, stacks=(2000, 2000), chance_model="buckets")
+        state = AbstractState.initial(config, BucketDeal([0, 1])).child(FOLD)
+        self.assertTrue(state.terminal)
+        self.assertEqual(state.payoffs(), [0.5, -0.5])
+
+    def test_side_pot(self):
+        """测试筹码不等时的边池分配"""
+        config = AbstractGameConfig(num_seats=3, stacks=(1000, 400, 1000),
+                                    streets=("preflop",), chance_model="buckets")
+        # 1号位（短筹码）牌最大，0号位次之
+        state = AbstractState.initial(config, BucketDeal([1, 2, 0]))
+        state = state.child(ALL_IN)   # 0号位全下1000
+        state = state.child(ALL_IN)   # 1号位全下400
+        state = state.child(ALL_IN)   # 2号位跟注（筹码不足以再加注，跟注即全下）
+        self.assertTrue(state.terminal)
+        # 主池1200归1号位，边池1200归0号位
+        self.assertEqual(state.payoffs(), [1.0, 4.0, -5.0])
+
+    def test_raise_cap(self):
+        """测试达到加注上限后不能再加注"""
+        config = subgame_config(raise_cap=1)
+        state = AbstractState.initial(config, BucketDeal([0, 0])).child(RAISE)
+        self.assertNotIn(RAISE, state.legal_actions())
+
+
+class TestCFRTrainer(unittest.TestCase):
+    """CFR训练器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+
+    def test_exploitability_decreases(self):
+        """测试训练后可被利用度低于均匀策略"""
+        config = subgame_config(num_buckets=3)
+        baseline = exploitability(config, uniform)
+        trainer = CFRTrainer(config, seed=1)
+        trainer.iterate(3000)
+        trained = exploitability(config, trainer.average_strategy)
+        self.assertGreater(baseline, 0)
+        self.assertLess(trained, baseline * 0.5)
+
+    def test_deltas_reproduce_training(self):
+        """测试增量回传与直接训练结果一致"""
+        config = subgame_config(num_buckets=3)
+        direct = CFRTrainer(config, seed=5)
+        direct.iterate(200)
+
+        worker = CFRTrainer(config, {}, {}, seed=5)
+        worker.track_changes()
+        worker.iterate(200)
+        regret_delta, strategy_delta = worker.deltas()
+        self.assertEqual(set(regret_delta), set(direct.regrets))
+        for key, row in direct.strategy_sum.items():
+            for a in range(NUM_ACTIONS):
+                self.assertAlmostEqual(strategy_delta[key][a], row[a])
+
+    def test_parallel_training_exact(self):
+        """测试多进程训练的迭代数恰好为目标值，结果与每批从主进程的表出发分别训练再合并相同"""
+        self.assertEqual(split_iterations(3, 8), [1, 1, 1, 0, 0, 0, 0, 0])
+        self.assertEqual(split_iterations(10, 3), [4, 3, 3])
+        config = subgame_config(num_buckets=3)
+        trainer = CFRTrainer(config, seed=7)
+        train(trainer, 7, processes=2, batch=2, report=lambda message: None)
+        self.assertEqual(trainer.iterations, 7)
+
+        expected = CFRTrainer(config)
+        rng = random.Random(7)
+        for done in (4, 3):
+            seed = rng.randrange(1 << 30)
+            results = []
+            for i, count in enumerate(split_iterations(done, 2)):
+                worker = CFRTrainer(config, copy.deepcopy(expected.regrets),
+                                    copy.deepcopy(expected.strategy_sum), seed + i)
+                worker.track_changes()
+                worker.iterate(count)
+                results.append(worker.deltas())
+            for regret_delta, strategy_delta in results:
+                for table, delta in ((expected.regrets, regret_delta), (expected.strategy_sum, strategy_delta)):
+                    for key, values in delta.items():
+                        row = table.setdefault(key, [0.0] * NUM_ACTIONS)
+                        for a in range(NUM_ACTIONS):
+                            row[a] += values[a]
+        self.assertEqual(trainer.regrets, expected.regrets)
+        self.assertEqual(trainer.strategy_sum, expected.strategy_sum)
+
+    def test_checkpoint_round_trip(self):
+        """测试存档后继续训练"""
+        path = os.path.join(self.tmpdir.name, "ckpt.pkl")
+        trainer = CFRTrainer(subgame_config(num_buckets=3), seed=2)
+        train(trainer, 100, batch=50, checkpoint=path, report=lambda message: None)
+        restored = load_checkpoint(path)
+        self.assertEqual(restored.iterations, 100)
+        self.assertEqual(restored.regrets, trainer.regrets)
+        self.assertEqual(restored.config.num_buckets, 3)
+
+    def test_export_and_lookup(self):
+        """测试导出策略表并通过mmap查表"""
+        trainer = CFRTrainer(subgame_config(num_buckets=3), seed=3)
+        trainer.iterate(500)
+        path = os.path.join(self.tmpdir.name, "strategy.bin")
+        entries = export_strategy(path, trainer)
+        self.assertGreater(entries, 0)
+
+        table = StrategyTable(path)
+        try:
+            self.assertEqual(table.num_seats, 2)
+            self.assertEqual(table.num_buckets, 3)
+            key = next(iter(trainer.strategy_sum))
+            probabilities = table.lookup(key)
+            self.assertEqual(len(probabilities), NUM_ACTIONS)
+            self.assertAlmostEqual(sum(probabilities), 1.0)
+            self.assertIsNone(table.lookup("不存在的信息集"))
+        finally:
+            table.close()
+
+    def test_quantize_probabilities(self):
+        """测试概率量化后和为255"""
+        self.assertEqual(sum(quantize_probabilities([1, 1, 1, 0, 0])), 255)
+        self.assertEqual(quantize_probabilities([0, 0, 3, 0, 0]), bytes([0, 0, 255, 0, 0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
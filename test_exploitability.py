@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 可被利用度评估测试
+"""
+
+import sys
+import os
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cfr_solver import AbstractState, BucketDeal, CFRTrainer, subgame_config, CALL, RAISE
+from exploitability import (
+    HeuristicPolicy, UniformPolicy, best_response_values, exploitability, heads_up_config,
+)
+
+
+class TestExploitability(unittest.TestCase):
+    """最佳应对计算测试类"""
+
+    def test_uniform_reference_value(self):
+        """测试均匀策略的可被利用度与逐分桶遍历的结果一致"""
+        self.assertAlmostEqual(exploitability(subgame_config(num_buckets=2), UniformPolicy()), 1.25)
+        self.assertAlmostEqual(exploitability(subgame_config(num_buckets=3), UniformPolicy()),
+                               1.3321759259259258)
+
+    def test_strategy_fn_matches_policy(self):
+        """测试 strategy_fn 包装与策略对象结果相同"""
+        config = subgame_config(num_buckets=3)
+        uniform = lambda key, legal: [1.0 / len(legal)] * len(legal)
+        self.assertAlmostEqual(exploitability(config, uniform),
+                               exploitability(config, UniformPolicy()))
+
+    def test_trained_strategy_less_exploitable(self):
+        """测试CFR训练后的策略更难被利用且可被利用度非负"""
+        config = subgame_config(num_buckets=3)
+        trainer = CFRTrainer(config, seed=1)
+        trainer.iterate(2000)
+        value = exploitability(config, trainer.average_strategy)
+        self.assertGreaterEqual(value, 0)
+        self.assertLess(value, exploitability(config, UniformPolicy()))
+
+    def test_heuristic_full_game(self):
+        """测试启发式AI在四条街的单挑抽象牌局上可以评估"""
+        values = best_response_values(heads_up_config(num_buckets=4, stack_bb=20), HeuristicPolicy())
+        self.assertEqual(len(values), 2)
+        self.assertGreater(sum(values), 0)
+
+    def test_heuristic_rows_are_distributions(self):
+        """测试启发式策略映射到合法行动后每行概率和为1"""
+        config = subgame_config(num_buckets=4, raise_cap=1)
+        state = AbstractState.initial(config, BucketDeal([0, 0])).child(RAISE)
+        self.assertNotIn(RAISE, state.legal_actions())
+        matrix = HeuristicPolicy().matrix(state, state.to_act)
+        self.assertEqual(matrix.shape, (4, len(state.legal_actions())))
+        for row in matrix:
+            self.assertAlmostEqual(row.sum(), 1.0)
+        # 达到加注上限后加注被映射为跟注
+        self.assertIn(CALL, state.legal_actions())
+
+
+if __name__ == '__main__':
+    unittest.main()
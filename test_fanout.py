@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 广播扇出测试
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fanout import Channel, Subscriber
+
+
+class _MemoryWriter:
+    """内存中的写端；blocked 时 drain 一直等待（模拟读得很慢的客户端）"""
+
+    def __init__(self, blocked=False):
+        self.data = bytearray()
+        self.writes = 0
+        self.closed = False
+        self.transport = None
+        self._unblocked = asyncio.Event()
+        if not blocked:
+            self._unblocked.set()
+
+    def write(self, data):
+        self.data.extend(data)
+        self.writes += 1
+
+    async def drain(self):
+        await self._unblocked.wait()
+
+    def is_closing(self):
+        return self.closed
+
+
+class TestFanout(unittest.IsolatedAsyncioTestCase):
+    """广播扇出测试类"""
+
+    async def test_same_buffer_to_every_subscriber(self):
+        """测试每条消息原样、按序送达全部订阅者，积压的消息合并写入"""
+        channel = Channel()
+        writers = [_MemoryWriter() for _ in range(50)]
+        subscribers = [Subscriber(writer) for writer in writers]
+        for subscriber in subscribers:
+            channel.add(subscriber)
+        messages = [f"update {i}\n".encode() for i in range(20)]
+        for message in messages:
+            channel.publish(message)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        for writer in writers:
+            self.assertEqual(bytes(writer.data), b"".join(messages))
+            self.assertEqual(writer.writes, 1)
+        for subscriber in subscribers:
+            await subscriber.close()
+
+    async def test_slow_subscriber_dropped(self):
+        """测试队列满的订阅者被移出频道并通知，其他订阅者不受影响"""
+        channel = Channel()
+        dropped = []
+        fast = Subscriber(_MemoryWriter(), max_queue=8)
+        slow = Subscriber(_MemoryWriter(blocked=True), max_queue=8, on_drop=dropped.append)
+        channel.add(fast)
+        channel.add(slow)
+        for i in range(30):
+            channel.publish(b"x")
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertTrue(slow.dropped)
+        self.assertFalse(fast.dropped)
+        self.assertEqual(dropped, [slow])
+        self.assertEqual(len(channel), 1)
+        self.assertEqual(channel.dropped, 1)
+        self.assertEqual(fast.bytes_sent, 30)
+        self.assertFalse(slow.push(b"x"))
+        await fast.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
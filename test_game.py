@@ -85,6 +85,14 @@ class TestTexasHoldemGame(unittest.TestCase):
         self.assertTrue(result)
         self.assertLess(human_player.chips, initial_chips)
         
+    def test_action_during_showdown_ignored(self):
+        """测试摊牌停顿期间的点击被忽略，不记录统计"""
+        human_index = next(i for i, p in enumerate(self.game.players) if p.is_human)
+        self.game.game_state = "showdown"
+        self.game.current_player_idx = human_index
+        self.assertFalse(self.game.handle_player_action("fold"))
+        self.assertFalse(self.game.players[human_index].folded)
+
     def test_game_advancement(self):
         """测试游戏推进"""
         initial_state = self.game.game_state
@@ -154,6 +162,28 @@ class TestSoundManager(unittest.TestCase):
         self.sound_manager.set_sound_volume(-0.5)  # 低于0.0
         self.assertEqual(self.sound_manager.sound_volume, 0.0)
 
+class TestSettingsPopup(unittest.TestCase):
+    """设置弹窗测试类"""
+
+    def test_difficulty_and_search_ai(self):
+        """测试设置弹窗可以创建，AI难度滑块与搜索AI开关作用到游戏"""
+        from main import TexasHoldemGame
+        from sound_manager import SoundManager
+        from settings_screen import SettingsPopup
+
+        game = TexasHoldemGame()
+        screen = SettingsPopup(SoundManager(), game).content
+
+        screen.difficulty_slider.value = 3
+        self.assertEqual(game.ai_difficulty, 3)
+
+        screen.mcts_toggle.state = 'down'
+        screen._toggle_mcts(screen.mcts_toggle)
+        self.assertEqual(game.ai_mode, "mcts")
+        screen.mcts_toggle.state = 'normal'
+        screen._toggle_mcts(screen.mcts_toggle)
+        self.assertEqual(game.ai_mode, "standard")
+
 class TestResourceManager(unittest.TestCase):
     """资源管理器测试类"""
     
@@ -176,6 +206,7 @@ def run_all_tests():
     # 添加测试类
     test_suite.addTest(unittest.makeSuite(TestTexasHoldemGame))
     test_suite.addTest(unittest.makeSuite(TestSoundManager))
+    test_suite.addTest(unittest.makeSuite(TestSettingsPopup))
     test_suite.addTest(unittest.makeSuite(TestResourceManager))
     
     # 运行测试
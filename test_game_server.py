@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 无界面牌桌引擎与多桌服务器测试
+"""
+
+import sys
+import os
+import time
+import random
+import asyncio
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from betting import action_names
+from bots import Bot, CallingStationBot
+from cfr_solver import AbstractGameConfig, AbstractState, ACTIONS, STREET_NAMES
+from game_server import GameServer, encode_message, decode_message
+from hand_evaluator import evaluate
+from table_engine import TableEngine
+from wire_protocol import MAGIC, RESUME_WINDOW, StateDecoder, pack_message, unpack_message, read_frame
+
+
+class _FixedDeal:
+    """给抽象牌局状态使用的固定发牌"""
+
+    def __init__(self, holes, board):
+        self.holes = holes
+        self.board = board
+
+    def showdown_strengths(self):
+        return [evaluate(hole + self.board) for hole in self.holes]
+
+
+def play_random_hand(engine, rng, allow_raise=True):
+    """用随机合法行动打完一手牌，返回全部事件与行动序列"""
+    events = engine.start_hand()
+    actions = []
+    while engine.hand_active:
+        mask, floor, ceiling = engine.legal_actions()
+        legal = action_names(mask)
+        if not allow_raise and len(legal) > 1:
+            legal = [a for a in legal if a != "raise"]
+        action = rng.choice(legal)
+        raise_to = rng.randint(floor, ceiling - 1) if action == "raise" else None
+        actions.append(action)
+        events.extend(engine.apply(action, raise_to))
+    return events, actions
+
+
+class TestTableEngine(unittest.TestCase):
+    """牌桌引擎测试类"""
+
+    def test_chips_conserved(self):
+        """测试随机对局中筹码守恒、盲注与事件完整"""
+        rng = random.Random(1)
+        engine = TableEngine(0, rng=random.Random(2))
+        for _ in range(300):
+            events, _ = play_random_hand(engine, rng)
+            start = events[0]["stacks"]
+            end = events[-1]
+            self.assertEqual(end["type"], "hand_end")
+            self.assertEqual(sum(end["net"]), 0)
+            self.assertEqual(sum(end["stacks"]), sum(start))
+            self.assertEqual([s + n for s, n in zip(start, end["net"])], end["stacks"])
+            if end["shown"]:
+                self.assertEqual(len(engine.board), 5)
+            self.assertEqual(sum(1 for e in events if e["type"] == "hole"), engine.num_seats)
+
+    def test_matches_abstract_state(self):
+        """测试不加注时与抽象牌局状态的行动顺序和收益一致（平分零头相差不超过1）"""
+        rng = random.Random(3)
+        engine = TableEngine(0, rng=random.Random(4))
+        for _ in range(200):
+            events, actions = play_random_hand(engine, rng, allow_raise=False)
+            config = AbstractGameConfig(
+                num_seats=5, stacks=events[0]["stacks"], small_blind=100, big_blind=200,
+                raise_cap=100, streets=STREET_NAMES, chance_model="cards")
+            board = engine.board + engine._deck
+            state = AbstractState.initial(config, _FixedDeal(engine.holes, board[:5]))
+            for action in actions:
+                state = state.child(ACTIONS.index(action))
+            self.assertTrue(state.terminal)
+            for net, payoff in zip(events[-1]["net"], state.payoffs()):
+                self.assertAlmostEqual(net, payoff * 200, delta=1.0)
+
+    def test_min_raise_and_illegal_actions(self):
+        """测试最小加注与非法行动检查"""
+        engine = TableEngine(0, rng=random.Random(5))
+        engine.start_hand()
+        self.assertEqual(engine.to_act, 3)
+        with self.assertRaises(ValueError):
+            engine.apply("check")
+        with self.assertRaises(ValueError):
+            engine.apply("raise", 300)
+        engine.apply("raise", 700)
+        self.assertEqual(engine.legal_actions()[1], 1200)
+        engine.apply("raise")
+        self.assertEqual(engine.current_bet, 1200)
+
+    def test_bot_actions_resolved(self):
+        """测试AI的任何行动都被映射为合法行动"""
+        rng = random.Random(6)
+        engine = TableEngine(0, rng=random.Random(7))
+        for _ in range(100):
+            engine.start_hand()
+            while engine.hand_active:
+                action, raise_to = engine.resolve_bot_action(rng.choice(ACTIONS), rng.random())
+                engine.apply(action, raise_to)
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    """多桌服务器测试类（本地回环客户端）"""
+
+    async def asyncSetUp(self):
+        self.server = GameServer(20, think_delay=(0.0, 0.0), hand_pause=0.0, action_timeout=5.0, seed=1)
+        self.port = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        return reader, writer
+
+    async def _receive(self, reader):
+        line = await asyncio.wait_for(reader.readline(), 5.0)
+        self.assertTrue(line, "连接被关闭")
+        return decode_message(line)
+
+    async def test_human_plays_hands(self):
+        """测试真人客户端入座并打完几手牌，筹码守恒"""
+        reader, writer = await self._connect()
+        writer.write(encode_message({"type": "join", "table": 0, "name": "玩家"}))
+        joined = await self._receive(reader)
+        self.assertEqual(joined, {"type": "joined", "table": 0, "seat": 4})
+
+        hands = turns = 0
+        start = None
+        while hands < 3:
+            message = await self._receive(reader)
+            if message["type"] == "hand_start":
+                start = message["stacks"]
+            elif message["type"] == "hole":
+                self.assertEqual(message["seat"], 4)
+            elif message["type"] == "turn":
+                turns += 1
+                action = "call" if "call" in message["legal"] else "check"
+                if action not in message["legal"]:
+                    action = message["legal"][-1]
+                writer.write(encode_message({"type": "action", "action": action}))
+            elif message["type"] == "hand_end" and start is not None:
+                hands += 1
+                self.assertEqual(sum(message["stacks"]), sum(start))
+        self.assertGreater(turns, 0)
+        writer.close()
+
+    async def test_illegal_action_and_errors(self):
+        """测试非法消息返回错误"""
+        reader, writer = await self._connect()
+        writer.write(encode_message({"type": "action", "action": "call"}))
+        self.assertEqual((await self._receive(reader))["type"], "error")
+        writer.write(b"not json\n")
+        self.assertEqual((await self._receive(reader))["type"], "error")
+        writer.write(encode_message({"type": "join", "table": 999}))
+        self.assertEqual((await self._receive(reader))["type"], "error")
+        writer.close()
+
+    async def test_malformed_messages(self):
+        """测试不是对象的消息与类型不对的字段返回错误，连接继续可用"""
+        reader, writer = await self._connect()
+        for line in (b"[1]\n", b"\"join\"\n", b"null\n"):
+            writer.write(line)
+            self.assertEqual((await self._receive(reader))["type"], "error")
+        for message in ({"type": "join", "table": [1]}, {"type": "watch", "table": {"id": 0}},
+                        {"type": ["join"]}, {"type": "leaderboard", "board": ["chips_won"]}):
+            writer.write(encode_message(message))
+            self.assertEqual((await self._receive(reader))["type"], "error")
+        writer.write(encode_message({"type": "join", "table": 0}))
+        self.assertEqual((await self._receive(reader))["type"], "joined")
+        for message in ({"type": "action", "action": ["call"]}, {"type": "action", "action": "raise", "amount": [1]},
+                        {"type": "action", "action": {"call": 1}}):
+            writer.write(encode_message(message))
+            while (reply := await self._receive(reader))["type"] != "error":
+                pass
+            self.assertIn(reply["message"], ("未知的行动", "加注额必须是整数"))
+        writer.write(encode_message({"type": "watch", "table": 1}))
+        while (await self._receive(reader))["type"] != "watching":
+            pass
+        writer.close()
+
+    async def test_tables_run_without_clients(self):
+        """测试没有客户端时全部AI牌桌持续开局"""
+        await asyncio.sleep(0.3)
+        self.assertTrue(all(runner.hands_played > 0 for runner in self.server.tables.values()))
+
+    async def test_human_timeout(self):
+        """测试真人不行动时按超时默认行动处理，牌局继续"""
+        self.server.action_timeout = 0.05
+        reader, writer = await self._connect()
+        writer.write(encode_message({"type": "join", "table": 1}))
+        ended = 0
+        while ended < 2:
+            message = await self._receive(reader)
+            ended += message["type"] == "hand_end"
+        writer.close()
+
+    async def test_binary_client(self):
+        """测试二进制客户端：关键帧同步后按差量跟上牌局，筹码守恒"""
+        reader, writer = await self._connect()
+        writer.write(MAGIC + pack_message({"type": "join", "table": 2, "name": "手机"}))
+        decoder = StateDecoder()
+        hands = 0
+        joined = False
+        totals = {}
+        while hands < 3:
+            payload = await asyncio.wait_for(read_frame(reader), 5.0)
+            self.assertIsNotNone(payload, "连接被关闭")
+            message = unpack_message(payload)
+            if message["type"] == "joined":
+                joined = True
+                self.assertEqual(message["seat"], 4)
+            elif message["type"] in ("keyframe", "delta"):
+                state = decoder.apply(message)
+                self.assertIsNotNone(state)
+                total = totals.setdefault(state.hand, sum(state.stacks) + state.pot)
+                self.assertEqual(sum(state.stacks) + state.pot, total)
+                if state.to_act < 0:
+                    hands += 1
+            elif message["type"] == "turn":
+                action = "call" if "call" in message["legal"] else "check"
+                if action not in message["legal"]:
+                    action = message["legal"][-1]
+                writer.write(pack_message({"type": "action", "action": action, "amount": None}))
+        self.assertTrue(joined)
+        self.assertEqual(decoder.gaps, 0)
+        writer.close()
+
+    async def test_spectators(self):
+        """测试JSON与二进制观战者收到同一桌的公开消息，看不到底牌，不能行动"""
+        reader, writer = await self._connect()
+        writer.write(encode_message({"type": "watch", "table": 5}))
+        self.assertEqual(await self._receive(reader), {"type": "watching", "table": 5})
+        binary_reader, binary_writer = await self._connect()
+        binary_writer.write(MAGIC + pack_message({"type": "watch", "table": 5}))
+        self.assertEqual(unpack_message(await read_frame(binary_reader))["type"], "watching")
+
+        kinds = set()
+        while "hand_end" not in kinds:
+            message = await self._receive(reader)
+            kinds.add(message["type"])
+        self.assertNotIn("hole", kinds)
+        self.assertNotIn("turn", kinds)
+
+        decoder = StateDecoder()
+        for _ in range(5):
+            state = decoder.apply(unpack_message(await asyncio.wait_for(read_frame(binary_reader), 5.0)))
+            self.assertIsNotNone(state)
+        channels = self.server.tables[5].channels
+        self.assertEqual((len(channels[False]), len(channels[True])), (1, 1))
+
+        writer.write(encode_message({"type": "action", "action": "fold"}))
+        while (await self._receive(reader))["type"] != "error":
+            pass
+        writer.close()
+        binary_writer.close()
+
+    async def test_binary_resume(self):
+        """测试二进制观战者断线重连只补发错过的差量，落后太多时改发关键帧"""
+        self.server.think_range = (0.2, 0.2)
+        watcher_reader, watcher_writer = await self._connect()   # 保持在线，让牌桌持续产生状态帧
+        watcher_writer.write(MAGIC + pack_message({"type": "watch", "table": 6}))
+
+        async def watch(seq=None):
+            reader, writer = await self._connect()
+            writer.write(MAGIC + pack_message({"type": "watch", "table": 6, "seq": seq}))
+            self.assertEqual(unpack_message(await read_frame(reader))["type"], "watching")
+            return reader, writer
+
+        async def next_state(reader):
+            return unpack_message(await asyncio.wait_for(read_frame(reader), 5.0))
+
+        reader, writer = await watch()
+        decoder = StateDecoder()
+        for _ in range(2):
+            self.assertIsNotNone(decoder.apply(await next_state(reader)))
+        writer.close()
+
+        # 很快重连：最多错过一两帧，补发差量而不是关键帧
+        reader, writer = await watch(decoder.seq)
+        for _ in range(2):
+            message = await next_state(reader)
+            self.assertEqual((message["type"], message["seq"]), ("delta", decoder.seq + 1))
+            self.assertIsNotNone(decoder.apply(message))
+        self.assertEqual(decoder.gaps, 0)
+        writer.close()
+
+        # 落后超过缓冲：改发关键帧
+        self.server.think_range = (0.0, 0.0)
+        sync = self.server.tables[6].sync
+        while sync.seq <= RESUME_WINDOW + 1:
+            await asyncio.sleep(0.05)
+        reader, writer = await watch(1)
+        message = await next_state(reader)
+        self.assertEqual(message["type"], "keyframe")
+        self.assertGreater(message["seq"], RESUME_WINDOW + 1)
+        writer.close()
+        watcher_writer.close()
+
+    async def test_flooding_client_throttled(self):
+        """测试刷屏的连接被限速、重复点击被去重，牌局照常进行并记录行动延迟"""
+        reader, writer = await self._connect()
+        writer.write(encode_message({"type": "join", "table": 3}))
+        throttled = hands = 0
+        while hands < 2:
+            message = await self._receive(reader)
+            if message["type"] == "turn":
+                action = "call" if "call" in message["legal"] else message["legal"][-1]
+                if action == "raise":
+                    action = "all_in"
+                click = encode_message({"type": "action", "action": action, "seq": message["seq"]})
+                writer.write(click * 100)
+            elif message["type"] == "error":
+                throttled += message["message"] == "操作过于频繁"
+            elif message["type"] == "hand_end":
+                hands += 1
+        runner = self.server.tables[3]
+        self.assertGreaterEqual(throttled, 1)
+        self.assertGreater(runner.latency.count, 0)
+        self.assertEqual(self.server.action_latency().count, runner.latency.count)
+        writer.close()
+
+
+class BlockingBot(Bot):
+    """每次决策阻塞很久的插件AI"""
+
+    def decide(self, request):
+        time.sleep(0.3)
+        return "call"
+
+
+class TestPluginBotServer(unittest.IsolatedAsyncioTestCase):
+    """插件AI接入服务器测试类"""
+
+    async def test_blocking_bot_does_not_stall_loop(self):
+        """测试阻塞的插件AI不卡住事件循环：没赶上思考延迟时用默认行动，其他协程照常运行"""
+        server = GameServer(4, think_delay=(0.02, 0.02), hand_pause=0.0, seed=4, bot=BlockingBot())
+        await server.start()
+        try:
+            worst = 0.0
+            for _ in range(20):
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                worst = max(worst, time.perf_counter() - started)
+            self.assertLess(worst, 0.1)
+            self.assertGreater(server.bot_timeouts, 0)
+            self.assertGreater(server.decisions(), 4)
+        finally:
+            await server.stop()
+
+    async def test_fast_bot_decides(self):
+        """测试来得及的插件AI的行动被采用"""
+        server = GameServer(2, think_delay=(0.05, 0.05), hand_pause=0.0, seed=5, bot=CallingStationBot())
+        await server.start()
+        try:
+            await asyncio.sleep(0.5)
+            self.assertGreater(server.decisions(), 0)
+            self.assertEqual(server.bot_timeouts, 0)
+        finally:
+            await server.stop()
+
+
+class TestAIServiceServer(unittest.IsolatedAsyncioTestCase):
+    """决策服务接入服务器测试类"""
+
+    async def test_bots_decide_through_service(self):
+        """测试内置AI在思考延迟内由决策服务凑批决策，服务停止后一起关闭"""
+        server = GameServer(10, think_delay=(0.05, 0.1), hand_pause=0.0, seed=2, ai_service=True)
+        await server.start()
+        service = server.ai_service
+        try:
+            await asyncio.sleep(1.5)
+            self.assertGreater(server.hands_played, 0)
+            self.assertGreater(service.stats.served, 0)
+            self.assertEqual(service.stats.requests, server.decisions() + service.outstanding)
+        finally:
+            await server.stop()
+        self.assertIsNone(server.ai_service)
+        self.assertFalse(service.alive)
+
+    async def test_stalled_loop_falls_back(self):
+        """测试事件循环卡住超过截止时间加 ttl、凭据已被清理时，牌桌回退到本地决策继续打牌"""
+        server = GameServer(4, think_delay=(0.05, 0.05), hand_pause=0.0, seed=3, ai_service=True)
+        await server.start()
+        server.ai_service.ttl = 0.05
+        try:
+            await asyncio.sleep(0.3)
+            time.sleep(0.3)     # 卡住事件循环：等待中的凭据全部过期
+            decisions = server.decisions()
+            await asyncio.sleep(0.5)
+            self.assertGreater(server.decisions(), decisions + len(server.tables))
+            self.assertGreater(server.ai_service.stats.expired, 0)
+        finally:
+            await server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
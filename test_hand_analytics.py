@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 牌局记录批量统计测试
+"""
+
+import sys
+import os
+import random
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import hand_history
+from game_server import GameServer
+from hand_analytics import analyze, archive_files, format_report, position_name, HANDS, VPIP, NET
+from hand_history import HandHistoryWriter, read_records
+from snapshots import history_path
+from table_engine import TableEngine
+from wire_protocol import frame
+
+
+def write_archive(directory, steps=6000):
+    """几张牌桌交错写入两个记录段（切换时有进行中的牌局），返回 (每个玩家的 [手数, VPIP, 输赢], 记录条数, 未结束的牌局数)"""
+    rng = random.Random(0)
+    engines = [TableEngine(t, rng=random.Random(t)) for t in range(5)]
+    engines.append(TableEngine(5, stacks=(3000, 3000), small_blind=50, big_blind=100, rng=random.Random(5)))
+    expected = {}
+    vpip = {}
+    writer = HandHistoryWriter(history_path(directory, 1))
+    for step in range(steps):
+        if step == steps // 2:
+            writer.rotate(history_path(directory, 2))
+        engine = rng.choice(engines)
+        if not engine.hand_active:
+            engine.start_hand()
+            writer.hand(engine)
+            vpip[engine.table_id] = set()
+            continue
+        seat, street = engine.to_act, engine.street
+        events = engine.apply(*engine.resolve_bot_action(rng.choice(["fold", "call", "call", "raise"]), rng.random()))
+        writer.action(engine.table_id, events[0])
+        if street == 0 and events[0]["action"] != "fold" and events[0]["action"] != "check":
+            vpip[engine.table_id].add(seat)
+        if events[-1]["type"] == "hand_end":
+            for seat, net in enumerate(events[-1]["net"]):
+                counters = expected.setdefault((engine.table_id, seat), [0, 0, 0.0])
+                counters[0] += 1
+                counters[1] += seat in vpip[engine.table_id]
+                counters[2] += net / engine.big_blind
+    writer.close()
+    return expected, writer.records, sum(engine.hand_active for engine in engines)
+
+
+class TestHandAnalytics(unittest.TestCase):
+    """牌局记录批量统计测试类"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.interval = hand_history.SYNC_INTERVAL
+        hand_history.SYNC_INTERVAL = 256
+        self.expected, self.records, self.unfinished = write_archive(self.directory)
+
+    def tearDown(self):
+        hand_history.SYNC_INTERVAL = self.interval
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _summary(self, stats):
+        players = {key: (counters[HANDS], counters[VPIP], round(counters[NET], 6))
+                   for key, counters in stats.players.items()}
+        return stats.hands, stats.incomplete, stats.showdowns, stats.pots, players, {
+            key: (entry[0], round(entry[1], 6)) for key, entry in stats.actions.items()}
+
+    def test_chunks_count_every_hand_once(self):
+        """测试切成很多小分块（含跨记录段的牌局）与不分块的结果相同，且与写入时的统计一致"""
+        segments = [history_path(self.directory, n) for n in (1, 2)]
+        self.assertEqual(sum(1 for path in segments for _ in read_records(path)), self.records)
+
+        whole = analyze([self.directory], processes=1, chunk_size=1 << 30)
+        chunked = analyze([self.directory], processes=1, chunk_size=700)
+        self.assertEqual(self._summary(chunked), self._summary(whole))
+        self.assertEqual(whole.hands, sum(self.expected[(table_id, 0)][0] for table_id in range(6)))
+        self.assertEqual(whole.incomplete, self.unfinished)
+        for key, (hands, vpip, net) in self.expected.items():
+            counters = whole.players[key]
+            self.assertEqual((counters[HANDS], counters[VPIP]), (hands, vpip))
+            self.assertAlmostEqual(counters[NET], net, places=6)
+        self.assertEqual(sum(whole.pots), whole.hands)
+        self.assertIn("BTN", format_report(whole))
+
+    def test_process_pool_matches_single_process(self):
+        """测试进程池并行统计后合并的结果与单进程相同"""
+        single = analyze([self.directory], processes=1, chunk_size=1500)
+        pooled = analyze([self.directory], processes=2, chunk_size=1500)
+        self.assertEqual(self._summary(pooled), self._summary(single))
+
+    def test_corrupt_records_skipped(self):
+        """测试无法解码的记录计入未完成的牌局，不中断统计"""
+        with open(history_path(self.directory, 2), "ab") as f:
+            f.write(frame(99) + frame(hand_history.ACTION, b"\xff"))
+        stats = analyze([self.directory], processes=1, chunk_size=1 << 30)
+        self.assertEqual(stats.incomplete, self.unfinished + 2)
+        self.assertEqual(stats.hands, sum(self.expected[(table_id, 0)][0] for table_id in range(6)))
+
+    def test_position_names(self):
+        """测试座位与位置名的对应"""
+        self.assertEqual([position_name(seat, 9) for seat in range(9)],
+                         ["BTN", "SB", "BB", "UTG", "UTG+1", "UTG+2", "UTG+3", "UTG+4", "CO"])
+        self.assertEqual([position_name(seat, 2) for seat in range(2)], ["BB", "SB"])
+
+
+class TestServerArchive(unittest.IsolatedAsyncioTestCase):
+    """服务器记录段归档测试类"""
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshots = os.path.join(self.directory, "snapshots")
+        self.archive = os.path.join(self.directory, "archive")
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    async def test_pruned_segments_archived(self):
+        """测试快照后旧记录段移入归档目录，归档加上当前记录段能统计服务器打过的全部牌局"""
+        server = GameServer(10, think_delay=(0.0, 0.0), hand_pause=0.0, seed=4,
+                            snapshot_dir=self.snapshots, snapshot_interval=0.1, history_archive=self.archive)
+        await server.start()
+        await asyncio.sleep(0.6)
+        await server.stop()
+
+        archived = archive_files([self.archive])
+        self.assertGreaterEqual(len(archived), 1)
+        stats = analyze([self.archive, self.snapshots], processes=1, chunk_size=4096)
+        self.assertEqual(stats.hands, server.hands_played)
+        self.assertLessEqual(stats.incomplete, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
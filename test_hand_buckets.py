@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 翻牌后分桶表测试
+"""
+
+import sys
+import os
+import random
+import tempfile
+import unittest
+from itertools import combinations
+from types import SimpleNamespace
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hand_indexer import SUIT_SYMBOLS, get_street_indexer
+from hand_evaluator import evaluate
+from hand_buckets import (
+    HandBucketTable, hand_features, quantize_features, dequantize_features,
+    weighted_kmeans, fit_buckets, write_bucket_table, postflop_strength,
+    table_path, features_path, build_features, river_features_batch, TABLE_DIR,
+)
+
+
+def make_card(code):
+    """构造与main.Card接口一致的轻量对象"""
+    rank = SimpleNamespace(value_num=(code >> 2) + 2)
+    suit = SimpleNamespace(value=SUIT_SYMBOLS[code & 3])
+    return SimpleNamespace(rank=rank, suit=suit)
+
+
+class TestHandBuckets(unittest.TestCase):
+    """分桶流水线测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.table_dir = self.tmpdir.name
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+
+    def _write_features(self, street, features):
+        """写入量化特征文件"""
+        path = features_path(street, self.table_dir)
+        with open(path, "wb") as f:
+            for ehs, potential in features:
+                f.write(bytes(quantize_features(ehs, potential)))
+        return path
+
+    def test_quantize_round_trip(self):
+        """测试特征量化误差在一个格子以内"""
+        for ehs, potential in [(0.0, -1.0), (0.37, 0.12), (1.0, 1.0)]:
+            q_ehs, q_pot = dequantize_features(*quantize_features(ehs, potential))
+            self.assertAlmostEqual(q_ehs, ehs, delta=1.0 / 256)
+            self.assertAlmostEqual(q_pot, potential, delta=2.0 / 256)
+
+    def test_hand_features(self):
+        """测试强牌期望牌力高于弱牌"""
+        rng = random.Random(3)
+        # A♥A♦ 在 A♣ 7♠ 2♥ 上
+        strong, _ = hand_features([48, 49], [50, 23, 0], 300, rng)
+        # 7♥2♦ 在 A♣ K♠ Q♥ 上
+        weak, _ = hand_features([20, 1], [50, 47, 40], 300, rng)
+        self.assertGreater(strong, 0.9)
+        self.assertLess(weak, 0.3)
+
+    def test_river_features_exact(self):
+        """测试河牌批量特征等于枚举全部对手底牌的胜率"""
+        rng = random.Random(4)
+        cards, ehs = river_features_batch([rng.sample(range(52), 5) for _ in range(2)])
+        self.assertEqual(len(cards), 2 * 1081)
+        for i in rng.sample(range(len(cards)), 5):
+            hole, board = cards[i, :2].tolist(), cards[i, 2:].tolist()
+            mine = evaluate(hole + board)
+            deck = [card for card in range(52) if card not in hole + board]
+            total = 0.0
+            for opponent in combinations(deck, 2):
+                theirs = evaluate(list(opponent) + board)
+                total += 1.0 if mine > theirs else 0.5 if mine == theirs else 0.0
+            self.assertAlmostEqual(ehs[i], total / 990, places=12)
+
+    def test_river_features_file(self):
+        """测试河牌特征文件（只算前若干个局面）与逐个计算的结果一致"""
+        path = features_path("river", self.table_dir, limit=200)
+        self.assertEqual(build_features("river", path, processes=1, limit=200), 200)
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertEqual(len(data), 400)
+        indexer = get_street_indexer("river")
+        for index in (0, 57, 199):
+            cards = indexer.unindex(index)
+            rows, ehs = river_features_batch([cards[2:]])
+            expected = ehs[rows.tolist().index(cards)]
+            self.assertEqual(tuple(data[2 * index:2 * index + 2]), quantize_features(expected, 0.0))
+
+    def test_kmeans_sorted_by_strength(self):
+        """测试聚类中心按期望牌力升序"""
+        points = [(0.1, 0.0), (0.12, 0.0), (0.9, 0.0), (0.88, 0.0), (0.5, 0.3)]
+        centroids = weighted_kmeans(points, [1, 1, 1, 1, 1], 3)
+        self.assertEqual(len(centroids), 3)
+        self.assertEqual(centroids, sorted(centroids))
+        self.assertAlmostEqual(centroids[0][0], 0.11, places=2)
+
+    def test_table_round_trip(self):
+        """测试写表与内存映射查表"""
+        rng = random.Random(5)
+        features = [(rng.random(), rng.uniform(-0.2, 0.2)) for _ in range(500)]
+        feature_file = self._write_features("flop", features)
+
+        centroids, cell_map = fit_buckets(feature_file, 4)
+        path = table_path("flop", self.table_dir)
+        write_bucket_table(path, "flop", centroids, cell_map, feature_file)
+
+        table = HandBucketTable(path)
+        try:
+            self.assertEqual(table.street, "flop")
+            self.assertEqual(table.num_buckets, 4)
+            self.assertEqual(table.entries, 500)
+            self.assertIsNone(table.bucket(500))
+
+            # 期望牌力越高的局面分桶编号不会越小（潜力差异很小时）
+            weakest = min(range(500), key=lambda i: features[i][0])
+            strongest = max(range(500), key=lambda i: features[i][0])
+            self.assertEqual(table.bucket(weakest), 0)
+            self.assertEqual(table.bucket(strongest), 3)
+
+            cards = get_street_indexer("flop").unindex(strongest)
+            self.assertEqual(table.lookup(cards), 3)
+        finally:
+            table.close()
+
+    def test_postflop_strength(self):
+        """测试运行时接口：翻牌前与缺表时返回None"""
+        hand = [make_card(48), make_card(49)]
+        board = [make_card(c) for c in (0, 5, 10)]
+        self.assertIsNone(postflop_strength(hand, [], self.table_dir))
+        self.assertIsNone(postflop_strength(hand, board, self.table_dir))
+
+    def test_paths(self):
+        """测试表目录不依赖当前工作目录，特征文件按计算参数区分"""
+        self.assertTrue(os.path.isabs(TABLE_DIR))
+        self.assertEqual(os.path.dirname(os.path.dirname(TABLE_DIR)),
+                         os.path.dirname(os.path.abspath(__file__)))
+        self.assertNotEqual(features_path("flop", self.table_dir, limit=1000),
+                            features_path("flop", self.table_dir))
+        self.assertNotEqual(features_path("flop", self.table_dir, samples=100),
+                            features_path("flop", self.table_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
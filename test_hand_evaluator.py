@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 牌型评估器测试
+"""
+
+import sys
+import os
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hand_evaluator import (
+    evaluate, hand_category, hand_type_value,
+    HIGH_CARD, ONE_PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT,
+    FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH,
+)
+
+RANKS = {"2": 0, "3": 1, "4": 2, "5": 3, "6": 4, "7": 5, "8": 6, "9": 7,
+         "T": 8, "J": 9, "Q": 10, "K": 11, "A": 12}
+SUITS = {"h": 0, "d": 1, "c": 2, "s": 3}
+
+
+def parse(text):
+    """把 "Ah Kd" 形式的文本解析为整数牌"""
+    return [RANKS[token[0]] * 4 + SUITS[token[1]] for token in text.split()]
+
+
+class TestHandEvaluator(unittest.TestCase):
+    """牌型评估器测试类"""
+
+    def test_categories(self):
+        """测试牌型识别"""
+        cases = [
+            ("Ah Kd 9c 7s 4h 3d 2c", HIGH_CARD),
+            ("Ah Ad 9c 7s 4h 3d 2c", ONE_PAIR),
+            ("Ah Ad 9c 9s 4h 4d 2c", TWO_PAIR),
+            ("Ah Ad Ac 7s 4h 3d 2c", THREE_OF_A_KIND),
+            ("Ah 2d 3c 4s 5h 9d Kc", STRAIGHT),
+            ("Ah 9h 7h 4h 2h 3d 2c", FLUSH),
+            ("Ah Ad Ac 7s 7h 7d 2c", FULL_HOUSE),
+            ("Ah Ad Ac As 7h 3d 2c", FOUR_OF_A_KIND),
+            ("9h Th Jh Qh Kh 3d 2c", STRAIGHT_FLUSH),
+        ]
+        for text, category in cases:
+            self.assertEqual(hand_category(evaluate(parse(text))), category, text)
+
+    def test_ordering(self):
+        """测试同牌型内的大小比较"""
+        self.assertGreater(evaluate(parse("Ah Ad Kc 7s 4h")), evaluate(parse("Ah Ad Qc 7s 4h")))
+        self.assertGreater(evaluate(parse("2h 3d 4c 5s 6h")), evaluate(parse("Ah 2d 3c 4s 5h")))
+        self.assertGreater(evaluate(parse("Kh Kd 2c 2s 3h")), evaluate(parse("Qh Qd Jc Js Ah")))
+        self.assertEqual(evaluate(parse("Ah Kd 9c 7s 4h 3d 2c")), evaluate(parse("As Kc 9d 7h 4s 2d 3c")))
+
+    def test_best_five_of_seven(self):
+        """测试七张牌只取最好的五张"""
+        # 第六、七张小牌不影响结果
+        self.assertEqual(evaluate(parse("Ah Ad Kc Qs Jh 3d 2c")), evaluate(parse("Ah Ad Kc Qs Jh")))
+        # 两个三条组成葫芦
+        self.assertEqual(hand_category(evaluate(parse("Ah Ad Ac Ks Kh Kd 2c"))), FULL_HOUSE)
+
+    def test_hand_type_value(self):
+        """测试与HandType取值的对应"""
+        self.assertEqual(hand_type_value(evaluate(parse("Th Jh Qh Kh Ah"))), 10)
+        self.assertEqual(hand_type_value(evaluate(parse("9h Th Jh Qh Kh"))), 9)
+        self.assertEqual(hand_type_value(evaluate(parse("Ah Kd 9c 7s 4h"))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 手牌同构索引器测试
+"""
+
+import sys
+import os
+import random
+import unittest
+import numpy as np
+from itertools import combinations
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hand_indexer import HandIndexer, get_street_indexer, index_hand, int_to_str
+
+
+def _permute_suits(cards, permutation):
+    """对整数牌做花色置换"""
+    return [(card & ~3) | permutation[card & 3] for card in cards]
+
+
+class TestHandIndexer(unittest.TestCase):
+    """手牌同构索引器测试类"""
+
+    def test_street_sizes(self):
+        """测试各街同构类数量"""
+        expected = {
+            "preflop": 169,
+            "flop": 1286792,
+            "turn": 13960050,
+            "river": 123156254,
+        }
+        for street, size in expected.items():
+            self.assertEqual(get_street_indexer(street).size, size)
+
+    def test_preflop_dense(self):
+        """测试翻牌前索引稠密覆盖 0-168"""
+        indexer = get_street_indexer("preflop")
+        indices = {indexer.index(list(cards)) for cards in combinations(range(52), 2)}
+        self.assertEqual(indices, set(range(169)))
+
+    def test_round_trip(self):
+        """测试索引与还原互逆"""
+        rng = random.Random(7)
+        for street in ("flop", "turn", "river"):
+            indexer = get_street_indexer(street)
+            for _ in range(500):
+                index = rng.randrange(indexer.size)
+                cards = indexer.unindex(index)
+                self.assertEqual(len(set(cards)), indexer.total_cards)
+                self.assertEqual(indexer.index(cards), index)
+
+    def test_suit_isomorphism(self):
+        """测试花色置换与轮内顺序不改变索引"""
+        rng = random.Random(11)
+        indexer = get_street_indexer("river")
+        for _ in range(500):
+            cards = rng.sample(range(52), 7)
+            permutation = rng.sample(range(4), 4)
+            shuffled = _permute_suits(cards, permutation)
+            hole, board = shuffled[:2], shuffled[2:]
+            rng.shuffle(hole)
+            rng.shuffle(board)
+            self.assertEqual(indexer.index(hole + board), indexer.index(cards))
+
+    def test_round_order_matters(self):
+        """测试底牌与公共牌交换后索引不同"""
+        indexer = HandIndexer((2, 3))
+        # A♥A♦ + 2♣3♣4♣ 与 2♣3♣ + A♥A♦4♣ 不是同一手牌
+        self.assertNotEqual(
+            indexer.index([48, 49, 2, 6, 10]),
+            indexer.index([2, 6, 48, 49, 10]),
+        )
+
+    def test_duplicate_cards_rejected(self):
+        """测试重复牌报错"""
+        indexer = get_street_indexer("flop")
+        with self.assertRaises(ValueError):
+            indexer.index([0, 0, 4, 8, 12])
+
+    def test_batch_matches_scalar(self):
+        """测试批量索引/还原与逐个计算的结果相同"""
+        rng = random.Random(13)
+        for rounds in ((2,), (2, 3), (2, 4), (2, 5), (1, 1, 1)):
+            indexer = HandIndexer(rounds)
+            hands = [rng.sample(range(52), indexer.total_cards) for _ in range(2000)]
+            indices = indexer.index_batch(np.array(hands))
+            self.assertEqual(indices.tolist(), [indexer.index(cards) for cards in hands])
+            self.assertEqual(indexer.unindex_batch(indices).tolist(), [indexer.unindex(i) for i in indices.tolist()])
+        self.assertEqual(get_street_indexer("preflop").index_batch(np.zeros((0, 2), dtype=np.int64)).shape, (0,))
+
+    def test_batch_rejects_bad_input(self):
+        """测试批量索引对重复牌、越界牌值与越界索引报错"""
+        indexer = get_street_indexer("river")
+        for cards in ([0, 0, 1, 2, 3, 4, 5], [0, 1, 2, 3, 4, 5, 1], [0, 1, 8, 8, 8, 8, 8], [0, 1, 2, 3, 4, 5, 52]):
+            with self.assertRaises(ValueError):
+                indexer.index_batch(np.array([[48, 49, 10, 11, 12, 13, 14], cards]))
+        with self.assertRaises(IndexError):
+            indexer.unindex_batch(np.array([0, indexer.size]))
+
+    def test_index_hand(self):
+        """测试按公共牌数量选择街道"""
+        street, index = index_hand([48, 49], [0, 5, 10, 15])
+        self.assertEqual(street, "turn")
+        self.assertEqual(index, get_street_indexer("turn").index([48, 49, 0, 5, 10, 15]))
+        self.assertEqual(int_to_str(48), "A♥")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 统计与排行榜测试
+"""
+
+import sys
+import os
+import random
+import asyncio
+import shutil
+import tempfile
+import unittest
+from bisect import bisect_left
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from game_server import GameServer, encode_message, decode_message
+from leaderboard import RankedList, LeaderboardAggregator, BOARDS, MIN_HANDS, WIN_RATE_SCALE
+from table_engine import TableEngine
+from wire_protocol import pack_message, unpack_message
+
+
+class TestRankedList(unittest.TestCase):
+    """有序整数集合测试类"""
+
+    def test_matches_sorted_list(self):
+        """测试随机插入删除后排名、按名次取值与切片都和排好序的列表一致"""
+        RankedList.LOAD = 8
+        try:
+            rng = random.Random(0)
+            initial = [rng.randrange(-500, 500) for _ in range(300)]
+            ranked, model = RankedList(initial), sorted(initial)
+            for step in range(5000):
+                if model and rng.random() < 0.45:
+                    value = model[rng.randrange(len(model))]
+                    ranked.remove(value)
+                    model.remove(value)
+                else:
+                    value = rng.randrange(-600, 600)
+                    ranked.add(value)
+                    model.insert(bisect_left(model, value), value)
+                if step % 50 == 0:
+                    self.assertEqual(len(ranked), len(model))
+                    self.assertEqual(list(ranked.islice(0, len(model))), model)
+                    probe = rng.randrange(-700, 700)
+                    self.assertEqual(ranked.bisect_left(probe), bisect_left(model, probe))
+                    if model:
+                        position = rng.randrange(len(model))
+                        self.assertEqual(ranked[position], model[position])
+                        self.assertEqual(list(ranked.islice(position, position + 7)), model[position:position + 7])
+            with self.assertRaises(ValueError):
+                ranked.remove(10000)
+        finally:
+            RankedList.LOAD = 512
+
+
+class TestLeaderboardAggregator(unittest.TestCase):
+    """排行榜聚合测试类"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _play(self, aggregator, rng, hands):
+        for _ in range(hands):
+            players = rng.sample(range(60), 6)
+            pot = rng.randrange(10, 5000)
+            winner = players[0]
+            aggregator.submit([(f"p{player}", pot if player == winner else -rng.randrange(0, pot),
+                                pot if player == winner else 0) for player in players])
+
+    def _expected(self, aggregator, board):
+        scores = {}
+        for name in aggregator.ids:
+            stats = aggregator.player_stats(name)
+            if board == "chips_won":
+                scores[name] = stats["chips_won"]
+            elif board == "hands_played":
+                scores[name] = stats["hands"]
+            elif board == "biggest_pot" and stats["biggest_pot"] > 0:
+                scores[name] = stats["biggest_pot"]
+            elif board == "win_rate" and stats["hands"] >= MIN_HANDS:
+                scores[name] = stats["wins"] * WIN_RATE_SCALE // stats["hands"]
+        return scores
+
+    def test_incremental_boards_match_full_sort(self):
+        """测试增量更新的名次与按全部统计重新排序的结果一致，并列分数名次相同"""
+        aggregator = LeaderboardAggregator()
+        rng = random.Random(1)
+        self._play(aggregator, rng, 400)
+        self.assertEqual(len(aggregator.queue), 2400)
+        self.assertIsNone(aggregator.player_stats("p0"))   # 聚合前只在队列中
+        self.assertEqual(aggregator.drain(), 2400)
+        for board in BOARDS:
+            scores = self._expected(aggregator, board)
+            for name, score in scores.items():
+                better = sum(1 for other in scores.values() if other > score)
+                self.assertEqual(aggregator.rank(board, name), (better + 1, score))
+            top = aggregator.top(board, 10)
+            self.assertEqual([score for _, _, score in top], sorted(scores.values(), reverse=True)[:10])
+            for rank, name, score in top:
+                self.assertEqual(aggregator.rank(board, name), (rank, score))
+            self.assertEqual(aggregator.top(board, 5, start=5), top[5:10])
+        self.assertIsNone(aggregator.rank("chips_won", "无名"))
+
+    def test_persisted_and_reloaded(self):
+        """测试关闭时写入有变化的玩家，重新载入后排行榜相同"""
+        path = os.path.join(self.directory, "stats.db")
+        aggregator = LeaderboardAggregator(path)
+        rng = random.Random(2)
+        self._play(aggregator, rng, 200)
+        aggregator.drain()
+        aggregator.persist().result()
+        self._play(aggregator, rng, 100)
+        aggregator.close()
+        self.assertGreater(aggregator.persisted, len(aggregator.ids))
+
+        reloaded = LeaderboardAggregator(path)
+        try:
+            for board in BOARDS:
+                self.assertEqual(reloaded.top(board, 100), aggregator.top(board, 100))
+            self.assertEqual(reloaded.player_stats("p7"), aggregator.player_stats("p7"))
+        finally:
+            reloaded.close()
+
+    def test_split_pot_credits_share(self):
+        """测试平分底池时每个赢家的最大底池记为自己收回的那一份，而不是整个底池"""
+        engine = TableEngine(0, (5000, 5000, 5000))
+        # 公共牌是 A-K-Q-J-T 顺子，三人都用公共牌
+        engine.start_hand([0, 5, 10, 15, 17, 22, 48, 45, 42, 39, 32])
+        while engine.hand_active:
+            seat = engine.to_act
+            facing = engine.current_bet > engine.street_bets[seat]
+            if engine.board and seat == 0 and facing:
+                engine.apply("fold")
+            elif engine.board and seat == 1 and not facing:
+                engine.apply("raise", 600)
+            else:
+                engine.apply("call" if facing else "check")
+        aggregator = LeaderboardAggregator()
+        aggregator.record_hand(engine, {0: "甲", 1: "乙", 2: "丙"})
+        aggregator.drain()
+        share = engine.pot // 2
+        self.assertEqual([aggregator.player_stats(name)["biggest_pot"] for name in "甲乙丙"], [0, share, share])
+        self.assertEqual([aggregator.player_stats(name)["chips_won"] for name in "甲乙丙"],
+                         [-200, share - engine.contributed[1], share - engine.contributed[2]])
+
+
+class TestServerLeaderboard(unittest.IsolatedAsyncioTestCase):
+    """服务器排行榜测试类"""
+
+    def test_binary_messages(self):
+        """测试排行榜查询与回复的二进制编码"""
+        query = {"type": "leaderboard", "board": "win_rate", "count": 10, "start": 20}
+        self.assertEqual(unpack_message(pack_message(query)[1:]), query)
+        for rank in ([3, -250], None):
+            reply = {"type": "ranking", "board": "chips_won", "start": 0,
+                     "top": [[1, "小王", 900], [2, "小李", -15]], "rank": rank}
+            self.assertEqual(unpack_message(pack_message(reply)[1:]), reply)
+
+    async def test_named_player_ranked(self):
+        """测试带名字入座的玩家打完几手后出现在排行榜上，可以查询自己的名次"""
+        server = GameServer(4, think_delay=(0.0, 0.0), hand_pause=0.0, seed=5)
+        port = await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_message({"type": "join", "table": 2, "name": "小王"}))
+        hands = 0
+        started = False     # 入座时已经开始的那手牌不计入
+        while hands < 3:
+            message = decode_message(await asyncio.wait_for(reader.readline(), 5.0))
+            if message["type"] == "turn":
+                writer.write(encode_message({"type": "action", "action": message["legal"][1], "seq": message["seq"]}))
+            elif message["type"] == "hand_start":
+                started = True
+            elif message["type"] == "hand_end":
+                hands += started
+        await asyncio.sleep(0.2)
+        writer.write(encode_message({"type": "leaderboard", "board": "hands_played", "count": 5}))
+        while message["type"] != "ranking":
+            message = decode_message(await asyncio.wait_for(reader.readline(), 5.0))
+        ranking = message
+        writer.write(encode_message({"type": "leaderboard", "board": "无此榜"}))
+        while message["type"] != "error":
+            message = decode_message(await asyncio.wait_for(reader.readline(), 5.0))
+        await server.stop()
+        writer.close()
+
+        self.assertEqual(ranking["top"][0][:2], [1, "小王"])
+        self.assertEqual(ranking["rank"], [1, ranking["top"][0][2]])
+        self.assertGreaterEqual(ranking["top"][0][2], 3)
+        self.assertGreaterEqual(server.leaderboards.player_stats("小王")["hands"], ranking["top"][0][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 负载生成器测试
+"""
+
+import sys
+import os
+import random
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from game_server import GameServer
+from load_generator import parse_think_time, choose_action, run_load
+
+
+class TestThinkTime(unittest.TestCase):
+    """思考时间分布测试类"""
+
+    def test_distributions(self):
+        """测试各分布的取值范围与格式检查"""
+        rng = random.Random(0)
+        self.assertEqual(parse_think_time("fixed:0.2")(rng), 0.2)
+        samples = [parse_think_time("uniform:0.5,1.5")(rng) for _ in range(1000)]
+        self.assertTrue(all(0.5 <= s <= 1.5 for s in samples))
+        mean = sum(parse_think_time("exp:0.8")(rng) for _ in range(20000)) / 20000
+        self.assertAlmostEqual(mean, 0.8, delta=0.05)
+        self.assertGreater(parse_think_time("lognormal:-0.5,0.6")(rng), 0)
+        for spec in ("uniform:1", "gamma:1,2", "fixed"):
+            with self.assertRaises(ValueError):
+                parse_think_time(spec)
+
+    def test_strategies_choose_legal(self):
+        """测试各策略只选择合法行动"""
+        rng = random.Random(1)
+        turn = {"legal": ["fold", "call", "raise", "all_in"], "min_raise": 400, "seq": 1}
+        for strategy in ("passive", "random", "strength"):
+            for _ in range(50):
+                action, raise_to = choose_action(strategy, turn, [48, 49], [], rng)
+                self.assertIn(action, turn["legal"])
+                self.assertEqual(raise_to is not None, action == "raise")
+        self.assertEqual(choose_action("strength", turn, [48, 49], [], rng), ("raise", 400))
+        self.assertEqual(choose_action("passive", turn, [0, 21], [], rng), ("call", None))
+
+
+class TestLoadRun(unittest.IsolatedAsyncioTestCase):
+    """对本地服务器的短时负载测试类"""
+
+    async def _run(self, binary):
+        server = GameServer(10, think_delay=(0.0, 0.01), hand_pause=0.0, seed=2)
+        port = await server.start()
+        try:
+            result = await run_load("127.0.0.1", port, clients=20, duration=1.5, think="fixed:0",
+                                    strategy="strength", per_table=2, binary=binary, ramp=1000, seed=3)
+        finally:
+            await server.stop()
+        self.assertEqual(result["connected"], 20)
+        self.assertEqual(result["seated"], 20)
+        self.assertGreater(result["hands"], 10)
+        self.assertGreater(result["actions"], 20)
+        self.assertEqual(result["errors"], {})
+        self.assertGreater(result["latency_ms"][50], 0)
+
+    async def test_json_clients(self):
+        """测试JSON协议客户端打牌并统计延迟"""
+        await self._run(binary=False)
+
+    async def test_binary_clients(self):
+        """测试二进制协议客户端打牌并统计延迟"""
+        await self._run(binary=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
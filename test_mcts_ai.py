@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 蒙特卡洛树搜索AI测试
+"""
+
+import sys
+import os
+import time
+import random
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cfr_solver import CALL
+from mcts_ai import MCTSSearch, MCTS_BUDGETS, build_root_state, difficulty_budget
+
+
+def preflop_root(to_act=3):
+    """5人桌翻牌前、盲注已下、无人行动的局面"""
+    return build_root_state(
+        "preflop", [5000, 7900, 5800, 7000, 10000], [0, 100, 200, 0, 0],
+        [0, 100, 200, 0, 0], [False] * 5, [False] * 5, 200, to_act, [""], 100, 200,
+    )
+
+
+class TestMCTS(unittest.TestCase):
+    """树搜索测试类"""
+
+    def test_difficulty_budget(self):
+        """测试难度滑块取值映射到思考时间"""
+        self.assertEqual(difficulty_budget(1), MCTS_BUDGETS[1])
+        self.assertEqual(difficulty_budget(2.4), MCTS_BUDGETS[2])
+        self.assertEqual(difficulty_budget(9), MCTS_BUDGETS[3])
+        self.assertLess(MCTS_BUDGETS[1], MCTS_BUDGETS[2])
+        self.assertLess(MCTS_BUDGETS[2], MCTS_BUDGETS[3])
+
+    def test_root_state(self):
+        """测试由牌桌数据构造的状态与游戏规则一致"""
+        root = preflop_root()
+        self.assertEqual(list(root.config.stacks), [5000, 8000, 6000, 7000, 10000])
+        self.assertEqual(root.acted, [False] * 5)
+
+        # 3号位跟注后轮到4号位：3号位已行动
+        root = build_root_state(
+            "preflop", [5000, 7900, 5800, 6800, 10000], [0, 100, 200, 200, 0],
+            [0, 100, 200, 200, 0], [False] * 5, [False] * 5, 200, 4, ["C"], 100, 200,
+        )
+        self.assertEqual(root.acted, [False, False, False, True, False])
+
+    def test_root_state_after_raise_wraps(self):
+        """测试加注后行动绕圈：已跟上加注的玩家算作已行动，当前玩家跟注后本街结束"""
+        # 3号位跟注，4号位加注到600，0-2号位跟注，又轮到3号位
+        root = build_root_state(
+            "preflop", [4400, 7400, 5400, 6800, 9400], [600, 600, 600, 200, 600],
+            [600, 600, 600, 200, 600], [False] * 5, [False] * 5, 600, 3, ["CRCCC"], 100, 200,
+        )
+        self.assertEqual(root.acted, [True, True, True, False, True])
+        self.assertEqual(root.child(CALL).street, 1)
+
+    def test_hard_deadline(self):
+        """测试搜索不超过截止时间太多"""
+        search = MCTSSearch(preflop_root(), [48, 49], [], random.Random(0))
+        started = time.perf_counter()
+        search.run(started + 0.05)
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertGreater(search.playouts, 0)
+        self.assertGreater(search.playouts_per_second(), 0)
+
+    def test_sliced_search_accumulates(self):
+        """测试分片搜索累计模拟次数"""
+        search = MCTSSearch(preflop_root(), [0, 5], [], random.Random(1))
+        search.run(time.perf_counter() + 0.01)
+        first = search.playouts
+        search.run(time.perf_counter() + 0.01)
+        self.assertGreater(search.playouts, first)
+
+    def test_nuts_do_not_fold(self):
+        """测试河牌拿到皇家同花顺时不会弃牌"""
+        # 红桃 A K + 公共牌 红桃 Q J 10
+        hole = [12 * 4, 11 * 4]
+        board = [10 * 4, 9 * 4, 8 * 4, 0 * 4 + 1, 1 * 4 + 2]
+        root = build_root_state(
+            "river", [4000, 7000, 5000, 6000, 9000], [1000, 1000, 1000, 1000, 1000],
+            [0, 0, 0, 0, 0], [False] * 5, [False] * 5, 0, 0, ["CCCCK", "", "", ""], 100, 200,
+        )
+        search = MCTSSearch(root, hole, board, random.Random(2))
+        search.run(time.perf_counter() + 0.2)
+        self.assertNotEqual(search.best_action(), "fold")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 对手建模统计测试
+"""
+
+import sys
+import os
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from opponent_stats import (
+    OpponentStats, PRIORS, HANDS, VPIP_HANDS, PFR_HANDS, AGGRESSIVE, CALLS,
+    CBET_FACED, CBET_FOLDS, SAW_FLOP, SHOWDOWNS,
+)
+
+
+class TestOpponentStats(unittest.TestCase):
+    """对手统计测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.stats = OpponentStats(3, half_life=10)
+
+    def test_priors_without_samples(self):
+        """测试没有样本时返回先验值"""
+        self.assertAlmostEqual(self.stats.vpip(0), PRIORS["vpip"])
+        self.assertAlmostEqual(self.stats.wtsd(2), PRIORS["wtsd"])
+
+    def test_preflop_counted_once_per_hand(self):
+        """测试VPIP/PFR每手牌最多计一次，大盲过牌不算入池"""
+        stats = self.stats
+        stats.start_hand()
+        stats.record(0, 0, "raise")
+        stats.record(1, 0, "call")
+        stats.record(2, 0, "check")
+        stats.record(0, 0, "raise")
+        self.assertEqual(stats.count(0, VPIP_HANDS), 1)
+        self.assertEqual(stats.count(0, PFR_HANDS), 1)
+        self.assertEqual(stats.count(1, VPIP_HANDS), 1)
+        self.assertEqual(stats.count(1, PFR_HANDS), 0)
+        self.assertEqual(stats.count(2, VPIP_HANDS), 0)
+        self.assertEqual(stats.count(2, HANDS), 1)
+        self.assertEqual(stats.preflop_aggressor, 0)
+
+    def test_cbet_and_showdown(self):
+        """测试面对持续下注的弃牌与摊牌统计"""
+        stats = self.stats
+        stats.start_hand()
+        stats.record(0, 0, "raise")
+        stats.record(1, 0, "call")
+        stats.record(2, 0, "call")
+        stats.start_street(1, [0, 1, 2])
+        stats.record(0, 1, "raise")   # 持续下注
+        stats.record(1, 1, "fold")
+        stats.record(2, 1, "call")
+        stats.start_street(2, [0, 2])
+        stats.record(0, 2, "raise")
+        stats.record(2, 2, "call")
+        stats.end_hand([0, 2])
+
+        self.assertEqual(stats.count(1, CBET_FACED), 1)
+        self.assertEqual(stats.count(1, CBET_FOLDS), 1)
+        self.assertEqual(stats.count(2, CBET_FACED), 1)
+        self.assertEqual(stats.count(2, CBET_FOLDS), 0)
+        self.assertEqual(stats.count(0, CBET_FACED), 0)
+        self.assertEqual(stats.count(0, AGGRESSIVE), 2)
+        self.assertEqual(stats.count(2, CALLS), 2)
+        self.assertEqual(stats.count(1, SAW_FLOP), 1)
+        self.assertEqual(stats.count(1, SHOWDOWNS), 0)
+        self.assertEqual(stats.count(2, SHOWDOWNS), 1)
+        self.assertGreater(stats.fold_to_cbet(1), stats.fold_to_cbet(2))
+
+    def test_donk_bet_is_not_cbet(self):
+        """测试翻牌前加注者之外的人先下注不算持续下注"""
+        stats = self.stats
+        stats.start_hand()
+        stats.record(0, 0, "raise")
+        stats.record(1, 0, "call")
+        stats.start_street(1, [0, 1])
+        stats.record(1, 1, "raise")
+        stats.record(0, 1, "raise")
+        stats.record(1, 1, "fold")
+        self.assertEqual(stats.count(1, CBET_FACED), 0)
+
+    def test_exponential_decay(self):
+        """测试计数按半衰期衰减"""
+        stats = self.stats
+        stats.start_hand()
+        stats.record(0, 0, "call")
+        for _ in range(10):
+            stats.start_hand()
+        self.assertAlmostEqual(stats.count(0, VPIP_HANDS), 0.5)
+
+    def test_loose_player_detected(self):
+        """测试频繁加注的玩家松凶程度高于保守玩家"""
+        stats = self.stats
+        for _ in range(50):
+            stats.start_hand()
+            stats.record(0, 0, "raise")
+            stats.record(1, 0, "fold")
+        self.assertGreater(stats.looseness(0), 0.5)
+        self.assertLess(stats.looseness(1), 0.3)
+
+    def test_constant_memory(self):
+        """测试长时间对局的存储大小不变"""
+        stats = OpponentStats(5)
+        sizes = (len(stats._values), len(stats._stamps))
+        for _ in range(100000):
+            stats.start_hand()
+            stats.record(3, 0, "call")
+        self.assertEqual((len(stats._values), len(stats._stamps)), sizes)
+        self.assertLess(stats.count(3, HANDS), 300)  # 衰减后收敛到约 1/(1-decay)
+
+
+if __name__ == '__main__':
+    unittest.main()
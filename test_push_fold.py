@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 短筹码推/弃图表测试
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from push_fold import (
+    PushFoldChart, build_equity, class_name, combo_matrix, hand_class, preflop_push_fold,
+    situations, solve, write_chart,
+)
+
+# 红桃A、方块A；红桃7、方块2；红桃3、方块2
+ACES = [48, 49]
+SEVEN_DEUCE = [20, 1]
+TREY_DEUCE = [4, 1]
+
+
+class TestPushFold(unittest.TestCase):
+    """推/弃求解与查表测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        """少量公共牌的胜率矩阵（足够区分强弱牌）"""
+        cls.equity = build_equity(boards=60, processes=1, report=lambda message: None)
+        cls.combos = combo_matrix()
+
+    def test_hand_class(self):
+        """测试起手牌类别与名称"""
+        self.assertEqual(class_name(hand_class(ACES)), "AA")
+        self.assertEqual(class_name(hand_class(SEVEN_DEUCE)), "72o")
+        self.assertEqual(hand_class([20, 1]), hand_class([21, 2]))
+
+    def test_equity_matrix(self):
+        """测试胜率矩阵互补且AA对差牌优势明显"""
+        aa, td = hand_class(ACES), hand_class(TREY_DEUCE)
+        self.assertAlmostEqual(self.equity[aa, td] + self.equity[td, aa], 1.0, places=6)
+        self.assertGreater(self.equity[aa, td], 0.75)
+
+    def test_ranges_widen_when_short(self):
+        """测试筹码越短全下范围越宽，AA总是全下和跟注"""
+        aa = hand_class(ACES)
+        deep = solve(self.equity, self.combos, 5, 15, iterations=100)
+        short = solve(self.equity, self.combos, 5, 2, iterations=100)
+        self.assertGreater(short[("push", 0, None)].sum(), deep[("push", 0, None)].sum())
+        self.assertGreater(deep[("push", 0, None)][aa], 0.5)
+        self.assertGreater(deep[("call", 0, 4)][aa], 0.5)
+        self.assertLess(deep[("push", 0, None)][hand_class(TREY_DEUCE)], 0.5)
+
+    def test_chart_lookup(self):
+        """测试写表后按游戏座位查询推与跟"""
+        solutions = {(2, stack): solve(self.equity, self.combos, 2, stack, iterations=100)
+                     for stack in (1, 2, 3)}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "push_fold.bin")
+            write_chart(path, solutions, min_players=2, max_players=2, max_stack=3)
+            chart = PushFoldChart(path)
+
+        self.assertEqual(len(situations(2)), 2)
+        self.assertTrue(chart.should_push(2, 0, 2, hand_class(ACES)))
+        self.assertIsNone(chart.should_push(3, 0, 2, hand_class(ACES)))
+        self.assertIsNone(chart.should_push(2, 0, 10, hand_class(ACES)))
+
+        # 单挑时1号位是小盲、先行动；0号位是大盲
+        stacks = [400, 300]
+        self.assertEqual(preflop_push_fold(chart, stacks, 1, ACES, "", 200), "all_in")
+        self.assertEqual(preflop_push_fold(chart, stacks, 0, ACES, "A", 200), "call")
+        # 大盲在无人全下时不适用；有人跟注（平跟）的局面不适用
+        self.assertIsNone(preflop_push_fold(chart, stacks, 0, ACES, "F", 200))
+        self.assertIsNone(preflop_push_fold(chart, stacks, 0, ACES, "C", 200))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 多进程分片服务器测试
+"""
+
+import sys
+import os
+import random
+import asyncio
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from game_server import encode_message, decode_message
+from shard_server import ShardRouter, table_worker
+from table_engine import TableEngine
+from wire_protocol import MAGIC, StateDecoder, pack_message, unpack_message, read_frame
+
+
+class TestTableSnapshot(unittest.TestCase):
+    """牌桌快照测试类"""
+
+    def test_restore_continues_identically(self):
+        """测试两手牌之间快照恢复后，后续牌局与原牌桌完全相同"""
+        rng = random.Random(0)
+        engine = TableEngine(7, rng=random.Random(1))
+        for _ in range(5):
+            engine.start_hand()
+            while engine.hand_active:
+                engine.apply(*engine.resolve_bot_action(rng.choice(["call", "raise", "fold"]), 0.5))
+        copy = TableEngine.restore(engine.snapshot())
+        for table in (engine, copy):
+            table.start_hand()
+        self.assertEqual(copy.holes, engine.holes)
+        self.assertEqual(copy.chips, engine.chips)
+        self.assertEqual(copy.hand_id, engine.hand_id)
+        with self.assertRaises(ValueError):
+            engine.snapshot()
+
+    def test_hash_spreads_tables(self):
+        """测试哈希分片大致均匀"""
+        counts = [0] * 4
+        for table_id in range(4000):
+            counts[table_worker(table_id, 4)] += 1
+        self.assertLess(max(counts) - min(counts), 100)
+
+
+class TestShardRouter(unittest.IsolatedAsyncioTestCase):
+    """路由 + 工作进程测试类"""
+
+    async def asyncSetUp(self):
+        self.router = ShardRouter(8, num_workers=2, think_delay=(0.0, 0.0), hand_pause=0.0,
+                                  action_timeout=5.0, seed=1)
+        self.port = await self.router.start()
+
+    async def asyncTearDown(self):
+        await self.router.stop()
+
+    async def test_play_across_migration(self):
+        """测试真人入座打牌，牌桌迁到另一个进程后座位保留、筹码守恒"""
+        table_id = 3
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(encode_message({"type": "join", "table": table_id}))
+        source = self.router.owner(table_id)
+        target = 1 - source
+        hands = 0
+        migration = None
+        totals = []
+        while hands < 4:
+            message = decode_message(await asyncio.wait_for(reader.readline(), 10.0))
+            if message["type"] == "joined":
+                self.assertEqual(message["seat"], 4)
+            elif message["type"] == "turn":
+                action = "call" if "call" in message["legal"] else message["legal"][0]
+                writer.write(encode_message({"type": "action", "action": action, "seq": message["seq"]}))
+            elif message["type"] == "hand_start":
+                totals.append(sum(message["stacks"]))
+            elif message["type"] == "hand_end":
+                hands += 1
+                self.assertEqual(sum(message["stacks"]), totals[-1] if totals else sum(message["stacks"]))
+                if migration is None:
+                    migration = self.router.migrate(table_id, target)
+        self.assertEqual(await asyncio.wait_for(migration, 10.0), target)
+        self.assertEqual(self.router.owner(table_id), target)
+        writer.close()
+
+    async def test_binary_spectator_and_stats(self):
+        """测试二进制观战者在迁移后收到新关键帧继续同步；工作进程上报手数"""
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(MAGIC + pack_message({"type": "watch", "table": 5}))
+        self.assertEqual(unpack_message(await read_frame(reader))["type"], "watching")
+        decoder = StateDecoder()
+        target = 1 - self.router.owner(5)
+        migration = self.router.migrate(5, target)
+        keyframes = states = 0
+        while states < 40 or not migration.done():
+            message = unpack_message(await asyncio.wait_for(read_frame(reader), 10.0))
+            keyframes += message["type"] == "keyframe"
+            states += decoder.apply(message) is not None
+        self.assertGreaterEqual(keyframes, 1)
+        self.assertEqual(decoder.gaps, 0)
+
+        writer.write(pack_message({"type": "join", "table": 99}))
+        while unpack_message(await asyncio.wait_for(read_frame(reader), 10.0))["type"] != "error":
+            pass
+        await asyncio.sleep(0.6)
+        self.assertGreater(self.router.hands_played, 0)
+        self.assertTrue(all(worker.num_tables > 0 for worker in self.router.workers))
+        writer.close()
+
+    async def test_garbage_keeps_workers_alive(self):
+        """测试发往工作进程的畸形消息只返回错误，工作进程不退出、其他连接照常"""
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        garbage = [b"[1]\n", b"\"x\"\n", b"null\n",
+                   encode_message({"type": "action", "action": [1]}),
+                   encode_message({"type": "action", "action": "raise", "amount": [1]}),
+                   encode_message({"type": "leaderboard", "board": {"a": 1}})]
+        # 未入座时发往默认进程，入座后发往牌桌所在进程
+        for joined in (False, True):
+            if joined:
+                writer.write(encode_message({"type": "join", "table": 2}))
+            for line in garbage:
+                writer.write(line)
+            errors = 0
+            while errors < len(garbage):
+                message = decode_message(await asyncio.wait_for(reader.readline(), 10.0))
+                errors += message["type"] == "error"
+        self.assertTrue(all(worker.process.is_alive() for worker in self.router.workers))
+
+        other_reader, other_writer = await asyncio.open_connection("127.0.0.1", self.port)
+        other_writer.write(encode_message({"type": "watch", "table": 6}))
+        self.assertEqual(decode_message(await asyncio.wait_for(other_reader.readline(), 10.0))["type"],
+                         "watching")
+        writer.close()
+        other_writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 牌桌快照与崩溃恢复测试
+"""
+
+import sys
+import os
+import random
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from game_server import GameServer
+from hand_history import HandHistoryWriter, read_records, replay
+from snapshots import recover, history_path, snapshot_path
+from table_engine import TableEngine
+
+
+def play_steps(engine, rng, steps):
+    """随机行动若干步（牌局结束时开新的一手）"""
+    for _ in range(steps):
+        if not engine.hand_active:
+            engine.start_hand()
+            continue
+        engine.apply(*engine.resolve_bot_action(rng.choice(["fold", "call", "call", "raise"]), rng.random()))
+
+
+def table_state(engine):
+    """用于比较的牌桌状态；本手牌的字段只在牌局进行中比较（两手之间的快照不保存上一手留下的下注）"""
+    hand = (engine.to_act, engine.street_bets, engine.current_bet, engine.holes) if engine.hand_active else None
+    return engine.hand_id, engine.hand_active, engine.chips, hand
+
+
+class TestHandHistory(unittest.TestCase):
+    """牌局记录测试类"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_mid_hand_snapshot_continues(self):
+        """测试牌局进行中的快照恢复后，相同行动得到相同结果"""
+        engine = TableEngine(2, rng=random.Random(0))
+        play_steps(engine, random.Random(1), 40)
+        while not engine.hand_active:
+            play_steps(engine, random.Random(2), 1)
+        copy = TableEngine.restore(engine.snapshot(include_hand=True))
+        self.assertEqual(table_state(copy), table_state(engine))
+        play_steps(engine, random.Random(3), 60)
+        play_steps(copy, random.Random(3), 60)
+        self.assertEqual(table_state(copy), table_state(engine))
+
+    def test_replay_records(self):
+        """测试从快照重放记录得到相同状态，末尾写到一半的记录被忽略"""
+        engine = TableEngine(9, rng=random.Random(4))
+        play_steps(engine, random.Random(5), 7)
+        base = engine.snapshot(include_hand=True)
+        path = os.path.join(self.directory, "history.log")
+        writer = HandHistoryWriter(path)
+        rng = random.Random(6)
+        for _ in range(300):
+            if not engine.hand_active:
+                engine.start_hand()
+                writer.hand(engine)
+            else:
+                events = engine.apply(*engine.resolve_bot_action(rng.choice(["fold", "call", "raise"]), 0.5))
+                writer.action(engine.table_id, events[0])
+        writer.close()
+        with open(path, "ab") as f:
+            f.write(b"\x09\x01\x09")   # 崩溃时写了一半的记录
+
+        copy = TableEngine.restore(base)
+        for record in read_records(path, chunk_size=64):
+            self.assertEqual(record[1], 9)
+            replay(copy, record)
+        self.assertEqual(table_state(copy), table_state(engine))
+        self.assertEqual(writer.records, 300)
+
+
+class TestCrashRecovery(unittest.IsolatedAsyncioTestCase):
+    """快照与崩溃恢复测试类"""
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _server(self):
+        return GameServer(20, think_delay=(0.0, 0.0), hand_pause=0.0, seed=3,
+                          snapshot_dir=self.directory, snapshot_interval=0.1)
+
+    async def test_restore_from_snapshot_and_tail(self):
+        """测试定期快照不阻塞牌桌，重启后从最新快照与记录尾部恢复到退出前的最后一步"""
+        server = self._server()
+        await server.start()
+        await asyncio.sleep(0.6)
+        snapshots = server.snapshots
+        await server.stop()   # 不写最后一个快照，之后的行动只在记录尾部
+        self.assertGreaterEqual(snapshots.taken, 2)
+        self.assertEqual(snapshots.failed, 0)
+        self.assertFalse(os.path.exists(snapshot_path(self.directory, 1)))
+        self.assertTrue(os.path.exists(history_path(self.directory, snapshots.latest)))
+        self.assertLess(snapshots.pauses.max, 0.1)
+
+        _, states = recover(self.directory)
+        self.assertEqual(sorted(states), sorted(server.tables))
+        for table_id, runner in server.tables.items():
+            restored = TableEngine.restore(states[table_id]["engine"])
+            self.assertEqual(table_state(restored), table_state(runner.engine))
+            self.assertEqual(states[table_id]["decisions"], runner.decisions)
+
+        restarted = self._server()
+        await restarted.start()
+        try:
+            for table_id, runner in server.tables.items():
+                self.assertGreaterEqual(restarted.tables[table_id].engine.hand_id, runner.engine.hand_id)
+            hands = restarted.hands_played
+            await asyncio.sleep(0.1)
+            self.assertGreater(restarted.hands_played, hands)
+        finally:
+            await restarted.stop()
+
+    async def test_compactor_crash_restarts(self):
+        """测试压缩进程崩溃时本次快照记为失败，重启后下一个快照连同未删除的记录段一起压缩"""
+        server = GameServer(20, think_delay=(0.0, 0.0), hand_pause=0.0, seed=4,
+                            snapshot_dir=self.directory, snapshot_interval=3600.0)
+        await server.start()
+        snapshots = server.snapshots
+        try:
+            await asyncio.sleep(0.1)
+            snapshots._process.kill()
+            snapshots._process.join()
+            self.assertTrue(snapshots.take())
+            snapshots.wait()
+            self.assertEqual((snapshots.failed, snapshots.latest), (1, 1))
+            await asyncio.sleep(0.1)
+            self.assertTrue(snapshots.take())
+            snapshots.wait()
+            self.assertEqual((snapshots.failed, snapshots.latest), (1, 3))
+            self.assertFalse(os.path.exists(history_path(self.directory, 2)))
+        finally:
+            await server.stop()
+        _, states = recover(self.directory)
+        for table_id, runner in server.tables.items():
+            restored = TableEngine.restore(states[table_id]["engine"])
+            self.assertEqual(table_state(restored), table_state(runner.engine))
+
+
+if __name__ == '__main__':
+    unittest.main()
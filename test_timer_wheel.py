@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 分层时间轮测试
+"""
+
+import sys
+import os
+import random
+import asyncio
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from timer_wheel import TimerWheel, AsyncScheduler, SLOTS
+
+
+class TestTimerWheel(unittest.TestCase):
+    """时间轮测试类"""
+
+    def test_fires_on_exact_tick(self):
+        """测试跨越各层的定时器都在到期刻度触发，取消的不触发"""
+        rng = random.Random(0)
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        timers = []
+        for i in range(5000):
+            delay = rng.choice([0.3, 30.0, 300.0, 5000.0]) * rng.random()
+            timers.append(wheel.schedule(delay, 0.0, lambda i: fired.append((i, wheel.current)), i))
+        cancelled = set(rng.sample(range(5000), 1000))
+        for i in cancelled:
+            wheel.cancel(timers[i])
+        self.assertEqual(wheel.count, 4000)
+
+        now = 0.0
+        while wheel.count:
+            now += rng.random() * 20
+            wheel.advance(now)
+        self.assertEqual(len(fired), 4000)
+        for i, tick in fired:
+            self.assertNotIn(i, cancelled)
+            self.assertEqual(tick, timers[i].expires)
+            self.assertFalse(timers[i].active)
+
+    def test_never_early(self):
+        """测试定时器不会早于延迟触发，且最多晚一个刻度"""
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        wheel.schedule(0.125, 0.0, fired.append, "a")
+        wheel.advance(0.129)
+        self.assertEqual(fired, [])
+        wheel.advance(0.131)
+        self.assertEqual(fired, ["a"])
+
+    def test_idle_jump_and_order(self):
+        """测试空闲后直接跳到当前时刻，同一刻度按加入顺序触发"""
+        wheel = TimerWheel(tick=0.125)
+        wheel.advance(1000.0)
+        self.assertEqual(wheel.current, 8000)
+        fired = []
+        for name in "abc":
+            wheel.schedule(0.25, 1000.0, fired.append, name)
+        self.assertLessEqual(wheel.next_expiry(), SLOTS)
+        wheel.advance(1000.3)
+        self.assertEqual(fired, ["a", "b", "c"])
+        self.assertIsNone(wheel.next_expiry())
+
+
+class TestAsyncScheduler(unittest.IsolatedAsyncioTestCase):
+    """事件循环驱动测试类"""
+
+    async def test_sleep_and_cancel(self):
+        """测试协程休眠、回调触发与取消；没有定时器时不唤醒"""
+        scheduler = AsyncScheduler(tick=0.005)
+        scheduler.start()
+        loop = asyncio.get_running_loop()
+        fired = []
+        scheduler.call_later(0.03, fired.append, "late")
+        cancelled = scheduler.call_later(0.02, fired.append, "cancelled")
+        scheduler.cancel(cancelled)
+
+        started = loop.time()
+        await scheduler.sleep(0.05)
+        self.assertGreaterEqual(loop.time() - started, 0.05)
+        self.assertEqual(fired, ["late"])
+
+        # 空闲时没有任何唤醒
+        wakeups = scheduler.wakeups
+        await asyncio.sleep(0.1)
+        self.assertEqual(scheduler.wakeups, wakeups)
+        await scheduler.stop()
+
+    async def test_earlier_timer_rearms(self):
+        """测试后加入但更早到期的定时器按时触发"""
+        scheduler = AsyncScheduler(tick=0.005)
+        scheduler.start()
+        loop = asyncio.get_running_loop()
+        fired = []
+        scheduler.call_later(10.0, fired.append, "far")
+        started = loop.time()
+        await scheduler.sleep(0.02)
+        self.assertLess(loop.time() - started, 0.5)
+        self.assertEqual(fired, [])
+        await scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
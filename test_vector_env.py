@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 向量化训练环境测试
+"""
+
+import sys
+import os
+import unittest
+
+import numpy as np
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cfr_solver import ACTIONS, AbstractGameConfig, AbstractState, STREET_NAMES, FOLD, CHECK, RAISE
+from hand_evaluator import evaluate, evaluate_batch
+from vector_env import VectorPokerEnv, observation_size
+
+
+class _FixedDeal:
+    """给抽象牌局状态使用的固定发牌"""
+
+    def __init__(self, holes, board):
+        self.holes = holes
+        self.board = board
+
+    def showdown_strengths(self):
+        return [evaluate(hole + self.board) for hole in self.holes]
+
+
+def reference_state(env, table):
+    """按向量环境中某张牌桌的发牌构造抽象牌局初始状态"""
+    config = AbstractGameConfig(
+        num_seats=env.num_players, stacks=env.start_stacks.tolist(),
+        small_blind=env.small_blind, big_blind=env.big_blind,
+        raise_cap=100, streets=STREET_NAMES, chance_model="cards",
+    )
+    deal = _FixedDeal([env.hole[table, p].tolist() for p in range(env.num_players)],
+                      env.board[table].tolist())
+    return AbstractState.initial(config, deal)
+
+
+class TestEvaluateBatch(unittest.TestCase):
+    """批量牌力评估测试类"""
+
+    def test_matches_scalar(self):
+        """测试批量评估与逐手评估结果一致"""
+        rng = np.random.default_rng(1)
+        cards = rng.random((20000, 52)).argsort(axis=1)[:, :7]
+        scores = evaluate_batch(cards)
+        for row, score in zip(cards.tolist(), scores.tolist()):
+            self.assertEqual(score, evaluate(row))
+
+    def test_special_hands(self):
+        """测试同花顺、A最小的顺子、两个三条等特殊牌型"""
+        hands = [
+            [48, 44, 40, 36, 32, 0, 5],     # 红桃同花顺 A-K-Q-J-10
+            [48, 1, 6, 11, 12, 30, 40],     # A-2-3-4-5 顺子
+            [0, 1, 2, 4, 5, 6, 40],         # 两个三条
+            [0, 1, 2, 3, 4, 5, 8],          # 四条
+            [0, 4, 8, 12, 16, 20, 24],      # 红桃 2-8（同花顺）
+        ]
+        scores = evaluate_batch(np.array(hands))
+        self.assertEqual(scores.tolist(), [evaluate(h) for h in hands])
+
+
+class TestVectorEnv(unittest.TestCase):
+    """向量化环境测试类"""
+
+    def test_shapes(self):
+        """测试观测与掩码的形状"""
+        env = VectorPokerEnv(8, seed=0)
+        obs, mask = env.reset()
+        self.assertEqual(obs.shape, (8, observation_size(5)))
+        self.assertEqual(obs.dtype, np.float32)
+        self.assertEqual(mask.shape, (8, len(ACTIONS)))
+        # 翻牌前轮到大盲下家，可以弃牌但不能过牌
+        self.assertTrue((env.to_act == 3).all())
+        self.assertTrue(mask[:, FOLD].all())
+        self.assertFalse(mask[:, CHECK].any())
+        # 底牌各占两个独热位
+        self.assertTrue((obs[:, :52].sum(axis=1) == 2).all())
+        self.assertTrue((obs[:, 52:104].sum(axis=1) == 0).all())
+
+    def test_matches_abstract_state(self):
+        """测试随机合法行动下与抽象牌局状态的规则和收益完全一致"""
+        env = VectorPokerEnv(64, seed=3)
+        env.reset()
+        states = [reference_state(env, t) for t in range(env.num_envs)]
+        finished = 0
+        for _ in range(200):
+            mask = env.legal_mask()
+            for t, state in enumerate(states):
+                self.assertEqual(state.to_act, env.to_act[t])
+                self.assertEqual(np.flatnonzero(mask[t]).tolist(), state.legal_actions())
+            actions = env.sample_actions(mask)
+            expected = [s.child(a) for s, a in zip(states, actions.tolist())]
+            _, rewards, dones, _ = env.step(actions)
+            for t, state in enumerate(expected):
+                self.assertEqual(state.terminal, bool(dones[t]))
+                if state.terminal:
+                    np.testing.assert_allclose(rewards[t], state.payoffs(), rtol=1e-5, atol=1e-4)
+                    finished += 1
+                    state = reference_state(env, t)
+                else:
+                    self.assertFalse(rewards[t].any())
+                states[t] = state
+        self.assertGreater(finished, 100)
+
+    def test_rewards_zero_sum(self):
+        """测试每手牌的收益总和为零且自动重开"""
+        env = VectorPokerEnv(128, num_players=3, stacks=[4000, 2000, 6000], raise_cap=4, seed=5)
+        _, mask = env.reset()
+        total_done = 0
+        for _ in range(100):
+            _, rewards, dones, info = env.step(env.sample_actions(mask))
+            mask = info["legal_mask"]
+            np.testing.assert_allclose(rewards.sum(axis=1), 0.0, atol=1e-4)
+            total_done += int(dones.sum())
+            # 重开的牌桌回到翻牌前、筹码复位（除盲注）
+            self.assertTrue((env.street[dones] == 0).all())
+            self.assertTrue((env.stacks[dones] + env.contributed[dones]
+                             == env.start_stacks).all())
+        self.assertGreater(total_done, 0)
+        self.assertEqual(env.hands_played, env.num_envs + total_done)
+
+    def test_raise_cap_and_illegal_action(self):
+        """测试加注上限与非法行动检查"""
+        env = VectorPokerEnv(4, num_players=2, raise_cap=1, seed=7)
+        env.reset()
+        env.step(np.full(4, RAISE))
+        self.assertFalse(env.legal_mask()[:, RAISE].any())
+        with self.assertRaises(ValueError):
+            env.step(np.full(4, CHECK))
+
+    def test_random_play_is_reproducible(self):
+        """测试相同种子得到相同的牌局"""
+        results = []
+        for _ in range(2):
+            env = VectorPokerEnv(16, seed=11)
+            _, mask = env.reset()
+            total = np.zeros((16, 5))
+            for _ in range(50):
+                _, rewards, _, info = env.step(env.sample_actions(mask))
+                mask = info["legal_mask"]
+                total += rewards
+            results.append(total)
+        np.testing.assert_array_equal(results[0], results[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
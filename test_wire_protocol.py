@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 紧凑二进制协议测试
+"""
+
+import sys
+import os
+import random
+import asyncio
+import unittest
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from table_engine import TableEngine
+from wire_protocol import (
+    Reader, StateEncoder, StateDecoder, TableState, write_varint, zigzag, pack_cards,
+    pack_message, unpack_message, split_frames, read_frame, KEYFRAME_INTERVAL, RESUME_WINDOW, MAX_FRAME,
+)
+
+
+def play_states(engine, rng, hands):
+    """随机打若干手牌，依次产出每一步之后的公开状态"""
+    for _ in range(hands):
+        engine.start_hand()
+        yield TableState.from_engine(engine)
+        while engine.hand_active:
+            action, raise_to = engine.resolve_bot_action(
+                rng.choice(["fold", "call", "call", "raise", "all_in"]), rng.random())
+            engine.apply(action, raise_to)
+            yield TableState.from_engine(engine)
+
+
+class TestEncoding(unittest.TestCase):
+    """基本编码测试类"""
+
+    def test_varint_and_zigzag(self):
+        """测试变长整数与 zigzag 往返"""
+        values = [0, 1, 127, 128, 300, 20000, 2 ** 40]
+        out = bytearray()
+        for value in values:
+            write_varint(out, value)
+            write_varint(out, zigzag(-value))
+        reader = Reader(bytes(out))
+        for value in values:
+            self.assertEqual(reader.varint(), value)
+            self.assertEqual(reader.signed(), -value)
+        with self.assertRaises(ValueError):
+            reader.varint()
+        with self.assertRaises(ValueError):
+            Reader(b"\xff" * 11 + b"\x01").varint()
+        self.assertEqual(Reader(b"\xff" * 9 + b"\x01").varint(), 2 ** 64 - 1)
+
+    def test_cards_six_bits(self):
+        """测试牌按6位打包：5张牌占1+4字节"""
+        rng = random.Random(0)
+        for count in range(8):
+            cards = rng.sample(range(52), count)
+            out = bytearray()
+            pack_cards(out, cards)
+            self.assertEqual(len(out), 1 + (6 * count + 7) // 8)
+            self.assertEqual(Reader(bytes(out)).cards(), cards)
+
+    def test_control_messages(self):
+        """测试控制消息往返"""
+        messages = [
+            {"type": "join", "table": 4321, "name": "玩家"},
+            {"type": "action", "action": "raise", "amount": 600, "seq": 17},
+            {"type": "action", "action": "fold", "amount": None, "seq": None},
+            {"type": "watch", "table": 12},
+            {"type": "join", "table": 3, "name": "", "seq": 300},
+            {"type": "watch", "table": 12, "seq": 0},
+            {"type": "leave"},
+            {"type": "watching", "table": 12},
+            {"type": "joined", "table": 7, "seat": 4},
+            {"type": "error", "message": "非法行动: check"},
+            {"type": "turn", "seq": 17, "seat": 4, "legal": ["fold", "call", "raise", "all_in"],
+             "min_raise": 400, "max_raise": 20000, "to_call": 200},
+            {"type": "hole", "to": 4, "seat": 4, "cards": [51, 0]},
+        ]
+        stream = b"".join(pack_message(message) for message in messages)
+        frames, rest = split_frames(stream + stream[:3])
+        self.assertEqual(rest, stream[:3])
+        self.assertEqual([unpack_message(payload) for payload in frames], messages)
+        with self.assertRaises(ValueError):
+            unpack_message(b"\x63")
+
+    def test_frame_size_limit(self):
+        """测试声明长度超过 MAX_FRAME 的帧被拒绝，不等待对方发完"""
+        async def read(data):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            return await asyncio.wait_for(read_frame(reader), 1.0)
+
+        message = pack_message({"type": "join", "table": 1, "name": "玩家"})
+        self.assertEqual(asyncio.run(read(message)), message[1:])
+        header = bytearray()
+        write_varint(header, MAX_FRAME + 1)
+        with self.assertRaises(ValueError):
+            asyncio.run(read(bytes(header) + b"\x03"))
+
+
+class TestStateSync(unittest.TestCase):
+    """状态差量同步测试类"""
+
+    def test_deltas_reconstruct_states(self):
+        """测试按序应用差量后与服务器状态完全一致，关键帧按间隔出现"""
+        engine = TableEngine(3, rng=random.Random(1))
+        encoder = StateEncoder(3)
+        decoder = StateDecoder()
+        keyframes = frames = 0
+        for state in play_states(engine, random.Random(2), 200):
+            message = unpack_message(split_frames(encoder.encode(state))[0][0])
+            self.assertEqual(message["table"], 3)
+            keyframes += message["type"] == "keyframe"
+            frames += 1
+            self.assertEqual(decoder.apply(message), state)
+        self.assertEqual(keyframes, 1 + frames // KEYFRAME_INTERVAL)
+
+    def test_gap_waits_for_keyframe(self):
+        """测试丢帧后丢弃差量，直到下一个关键帧恢复同步"""
+        engine = TableEngine(0, rng=random.Random(3))
+        encoder = StateEncoder(0, keyframe_interval=8)
+        decoder = StateDecoder()
+        recovered = False
+        for i, state in enumerate(play_states(engine, random.Random(4), 20)):
+            message = unpack_message(split_frames(encoder.encode(state))[0][0])
+            if i == 3:
+                continue   # 丢掉一帧
+            result = decoder.apply(message)
+            if 3 < i < 7:
+                self.assertIsNone(result)
+            elif i >= 7:
+                recovered = True
+                self.assertEqual(result, state)
+        self.assertTrue(recovered)
+        self.assertEqual(decoder.gaps, 1)
+
+    def test_resume_replays_missed_frames(self):
+        """测试断线重连只补发确认序号之后的帧，落后超过缓冲或序号不合法时返回None（改发关键帧）"""
+        engine = TableEngine(0, rng=random.Random(6))
+        encoder = StateEncoder(0)
+        decoder = StateDecoder()
+        self.assertIsNone(encoder.since(0))
+        states = play_states(engine, random.Random(7), 50)
+        for _ in range(100):
+            decoder.apply(unpack_message(split_frames(encoder.encode(next(states)))[0][0]))
+        for _ in range(10):
+            state = next(states)
+            encoder.encode(state)
+        frames = encoder.since(decoder.seq)
+        self.assertEqual(len(frames), 10)
+        for data in frames:
+            result = decoder.apply(unpack_message(split_frames(data)[0][0]))
+        self.assertEqual(result, state)
+        self.assertEqual(decoder.gaps, 0)
+        self.assertEqual(encoder.since(encoder.seq), [])
+        self.assertIsNone(encoder.since(encoder.seq - RESUME_WINDOW - 1))
+        self.assertEqual(len(encoder.since(encoder.seq - RESUME_WINDOW)), RESUME_WINDOW)
+        self.assertIsNone(encoder.since(encoder.seq + 1))
+
+    def test_delta_smaller_than_keyframe(self):
+        """测试一次跟注的差量与整桌关键帧都只有几十字节以内"""
+        engine = TableEngine(0, rng=random.Random(5))
+        engine.start_hand()
+        encoder = StateEncoder(0)
+        keyframe = encoder.keyframe(TableState.from_engine(engine))
+        engine.apply("call")
+        delta = encoder.encode(TableState.from_engine(engine))
+        self.assertLessEqual(len(delta), 16)
+        self.assertLess(len(delta), len(keyframe))
+        self.assertLessEqual(len(keyframe), 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
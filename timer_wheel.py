@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 分层时间轮
+统一管理所有牌桌的AI思考延迟、两手牌之间的停顿与真人行动超时：
+新增、取消、触发都是O(1)，每个刻度只处理到期的那一格；
+事件循环只在下一个非空刻度被唤醒一次，没有定时器时完全不唤醒，空闲牌桌不占用CPU
+
+结构与Linux内核定时器相同：第0层每格一个刻度，第 i 层每格覆盖 64^i 个刻度，
+高层的格子转到时把其中的定时器重新放入低层
+"""
+
+import asyncio
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+LEVELS = 4
+
+# 默认刻度（秒）；四层可覆盖 64^4 个刻度（约19天）
+DEFAULT_TICK = 0.01
+
+
+class Timer:
+    """一个定时器（由 TimerWheel.schedule 返回，用于取消）"""
+
+    __slots__ = ("expires", "callback", "args", "slot")
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+    @property
+    def active(self):
+        """尚未触发也未取消"""
+        return self.slot is not None
+
+
+class TimerWheel:
+    """分层时间轮（不依赖事件循环，由 advance() 推进）"""
+
+    def __init__(self, tick=DEFAULT_TICK, now=0.0):
+        self.tick = tick
+        self.origin = now
+        self.current = 0   # 已处理到的刻度
+        self.count = 0     # 待触发的定时器数
+        self._levels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+
+    def _place(self, timer):
+        """按到期刻度把定时器放进对应层的格子"""
+        delta = timer.expires - self.current
+        for level in range(LEVELS):
+            if delta < SLOTS << (SLOT_BITS * level) or level == LEVELS - 1:
+                break
+        shift = SLOT_BITS * level
+        if delta >= SLOTS << shift:
+            # 超出最大范围：先放在最高层最远的格子，转到时再重新安排
+            expires = self.current + (SLOTS << shift) - 1
+        else:
+            expires = timer.expires
+        slot = self._levels[level][(expires >> shift) & SLOT_MASK]
+        slot[timer] = None
+        timer.slot = slot
+
+    def schedule(self, delay, now, callback, *args):
+        """delay 秒后（不早于）调用 callback(*args)，返回 Timer"""
+        if self.count == 0:
+            # 空闲期间没有推进过，先对齐到当前时刻
+            self.current = max(self.current, int((now - self.origin) // self.tick))
+        expires = -int(-(now + delay - self.origin) // self.tick)
+        timer = Timer(max(expires, self.current + 1), callback, args)
+        self._place(timer)
+        self.count += 1
+        return timer
+
+    def cancel(self, timer):
+        """取消定时器（已触发或已取消时无操作）"""
+        if timer.slot is not None:
+            del timer.slot[timer]
+            timer.slot = None
+            self.count -= 1
+
+    def _cascade(self, level):
+        """把第 level 层当前格子的定时器重新放入低层，返回该层的格子序号"""
+        index = (self.current >> (SLOT_BITS * level)) & SLOT_MASK
+        slot = self._levels[level][index]
+        if slot:
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._place(timer)
+        return index
+
+    def advance(self, now):
+        """推进到 now，按到期顺序触发定时器；返回触发的数量"""
+        target = int((now - self.origin) // self.tick)
+        if self.count == 0:
+            # 没有定时器时直接跳到目标刻度
+            self.current = max(self.current, target)
+            return 0
+
+        fired = 0
+        while self.current < target and self.count:
+            self.current += 1
+            if self.current & SLOT_MASK == 0:
+                level = 1
+                while level < LEVELS and self._cascade(level) == 0:
+                    level += 1
+            slot = self._levels[0][self.current & SLOT_MASK]
+            while slot:
+                timer = next(iter(slot))
+                del slot[timer]
+                timer.slot = None
+                self.count -= 1
+                fired += 1
+                timer.callback(*timer.args)
+        self.current = max(self.current, target)
+        return fired
+
+    def next_expiry(self):
+        """下一个非空刻度之前可以安全休眠的时长（刻度数，粗略值；没有定时器时为None）"""
+        if self.count == 0:
+            return None
+        level0 = self._levels[0]
+        for k in range(1, SLOTS):
+            if level0[(self.current + k) & SLOT_MASK]:
+                return k
+            if (self.current + k) & SLOT_MASK == 0:
+                # 到下一次转层之前都是空的
+                return k
+        return SLOTS
+
+
+class AsyncScheduler:
+    """在 asyncio 事件循环里驱动时间轮：只在下一个非空刻度安排一次回调，没有定时器时不安排"""
+
+    def __init__(self, tick=DEFAULT_TICK):
+        self.tick = tick
+        self.wheel = None
+        self.wakeups = 0
+        self._loop = None
+        self._handle = None
+        self._armed = None   # 已安排回调的刻度
+
+    def start(self):
+        """绑定当前事件循环"""
+        self._loop = asyncio.get_running_loop()
+        self.wheel = TimerWheel(self.tick, self._loop.time())
+
+    async def stop(self):
+        """停止驱动（未触发的定时器不再触发）"""
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = None
+        self._armed = None
+
+    def _arm(self):
+        """按下一个非空刻度安排（或取消）事件循环回调"""
+        steps = self.wheel.next_expiry()
+        at = None if steps is None else self.wheel.current + steps
+        if at == self._armed:
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._armed = at
+        if at is not None:
+            self._handle = self._loop.call_at(self.wheel.origin + at * self.tick, self._on_tick)
+
+    def _on_tick(self):
+        armed = self._armed
+        self._handle = None
+        self._armed = None
+        self.wakeups += 1
+        # 事件循环的时钟可能比安排的时刻略早，至少推进到安排的刻度
+        self.wheel.advance(max(self._loop.time(), self.wheel.origin + (armed + 0.5) * self.tick))
+        self._arm()
+
+    def call_later(self, delay, callback, *args):
+        """delay 秒后调用 callback(*args)，返回可取消的 Timer"""
+        timer = self.wheel.schedule(delay, self._loop.time(), callback, *args)
+        if self._armed is None or timer.expires < self._armed:
+            self._arm()
+        return timer
+
+    def cancel(self, timer):
+        """取消定时器（已安排的回调在到点时发现无事可做，不需要重排）"""
+        self.wheel.cancel(timer)
+
+    async def sleep(self, delay):
+        """协程休眠 delay 秒；delay 不大于0时只让出一次"""
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+        future = self._loop.create_future()
+        timer = self.call_later(delay, _wake, future)
+        try:
+            await future
+        finally:
+            self.wheel.cancel(timer)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 向量化训练环境
+同时推进 N 张互相独立的牌桌（gym 风格的 reset/step），
+状态按字段存放在 NumPy 数组中（筹码、下注、弃牌/全下标记、整数牌），
+输出批量观测张量与合法行动掩码，打完的牌局自动重开
+
+规则与 TexasHoldemGame / cfr_solver.AbstractState 一致：按钮固定在0号位，
+翻牌前从大盲下家开始行动，翻牌后从序号最小的可行动玩家开始，加注到 max(当前注*2, 大盲*2)
+
+用法:
+  env = VectorPokerEnv(1024, seed=0)
+  obs, mask = env.reset()
+  obs, rewards, dones, info = env.step(env.sample_actions())
+"""
+
+import numpy as np
+
+from betting import action_mask, RAISE_BIT
+from cfr_solver import ACTIONS, DEFAULT_STACKS, FOLD, CALL, RAISE, ALL_IN
+from hand_evaluator import evaluate_batch
+from hand_indexer import DECK_SIZE
+
+NUM_ACTIONS = len(ACTIONS)
+NUM_STREETS = 4
+BOARD_VISIBLE = np.array([0, 3, 4, 5])
+
+
+def observation_size(num_players):
+    """观测向量长度"""
+    # 底牌、可见公共牌（各52维独热）、街道、座位、各家筹码/本街下注/弃牌/全下、底池、需跟注额
+    return 2 * DECK_SIZE + NUM_STREETS + num_players + 4 * num_players + 2
+
+
+class VectorPokerEnv:
+    """N 张独立牌桌的向量化环境
+
+    每手牌开始时各座位筹码恢复为 stacks；奖励为一手牌结束时各座位的净收益（大盲）。
+    raise_cap 为每条街的加注次数上限（None 表示不限，与游戏一致）。
+    """
+
+    def __init__(self, num_envs, num_players=5, stacks=None, small_blind=100, big_blind=200,
+                 raise_cap=None, seed=None):
+        if num_players < 2:
+            raise ValueError("至少需要两名玩家")
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.start_stacks = np.array(stacks if stacks is not None else DEFAULT_STACKS[:num_players],
+                                     dtype=np.int64)
+        if len(self.start_stacks) != num_players:
+            raise ValueError("stacks 的长度必须等于玩家数")
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.raise_cap = raise_cap
+        self.rng = np.random.default_rng(seed)
+        self.obs_size = observation_size(num_players)
+
+        n, p = num_envs, num_players
+        self._rows = np.arange(n)
+        # 每桌每座位
+        self.stacks = np.zeros((n, p), dtype=np.int64)
+        self.street_bets = np.zeros((n, p), dtype=np.int64)
+        self.contributed = np.zeros((n, p), dtype=np.int64)
+        self.folded = np.zeros((n, p), dtype=bool)
+        self.all_in = np.zeros((n, p), dtype=bool)
+        self.acted = np.zeros((n, p), dtype=bool)
+        self.hole = np.zeros((n, p, 2), dtype=np.int64)
+        # 每桌
+        self.board = np.zeros((n, 5), dtype=np.int64)
+        self.street = np.zeros(n, dtype=np.int64)
+        self.current_bet = np.zeros(n, dtype=np.int64)
+        self.raises = np.zeros(n, dtype=np.int64)
+        self.to_act = np.zeros(n, dtype=np.int64)
+        self.hands_played = 0
+
+    # ----------------------------------------------
+    # 公开接口
+    # ----------------------------------------------
+
+    def reset(self):
+        """重开所有牌桌，返回 (观测, 合法行动掩码)"""
+        self._reset_tables(self._rows)
+        return self.observations(), self.legal_mask()
+
+    def step(self, actions):
+        """每桌当前行动者执行一个行动（编号取自 cfr_solver.ACTIONS）
+
+        返回 (观测, 奖励(N, 玩家数), 本步结束的牌桌(N,), 信息)；
+        结束的牌桌已自动重开，观测与 info["legal_mask"] 属于新的一手牌。
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        mask = self.legal_mask()
+        if not mask[self._rows, actions].all():
+            bad = np.flatnonzero(~mask[self._rows, actions])
+            raise ValueError(f"非法行动: 牌桌 {bad[:5].tolist()} 行动 {actions[bad[:5]].tolist()}")
+
+        self._apply(actions)
+        terminal, showdown = self._advance(self._rows, self.to_act.copy())
+
+        rewards = np.zeros((self.num_envs, self.num_players), dtype=np.float32)
+        done = np.flatnonzero(terminal)
+        if len(done):
+            rewards[done] = self._payoffs(done, showdown[done])
+            self._reset_tables(done)
+        obs = self.observations()
+        mask = self.legal_mask()
+        return obs, rewards, terminal, {"legal_mask": mask, "to_act": self.to_act.copy()}
+
+    def legal_mask(self):
+        """(N, 5) 的合法行动掩码，列顺序同 cfr_solver.ACTIONS"""
+        p = self.to_act
+        stack = self.stacks[self._rows, p]
+        bet = self.street_bets[self._rows, p]
+        raise_to = np.maximum(self.current_bet * 2, self.big_blind * 2)
+
+        bits = action_mask(stack, bet, self.current_bet, raise_to)
+        if self.raise_cap is not None:
+            bits &= ~((self.raises >= self.raise_cap) * RAISE_BIT)
+        return ((bits[:, None] >> np.arange(NUM_ACTIONS)) & 1).astype(bool)
+
+    def sample_actions(self, mask=None):
+        """在合法行动中均匀随机选择（用于基线与测试）"""
+        if mask is None:
+            mask = self.legal_mask()
+        noise = self.rng.random(mask.shape)
+        return np.where(mask, noise, -1.0).argmax(axis=1)
+
+    def observations(self):
+        """(N, obs_size) 的观测张量（当前行动者视角）"""
+        n, p = self.num_envs, self.num_players
+        rows = self._rows
+        seat = self.to_act
+        bb = float(self.big_blind)
+        obs = np.zeros((n, self.obs_size), dtype=np.float32)
+
+        # 底牌与可见公共牌
+        hole = self.hole[rows, seat]
+        obs[rows, hole[:, 0]] = 1.0
+        obs[rows, hole[:, 1]] = 1.0
+        visible = np.arange(5)[None, :] < BOARD_VISIBLE[self.street][:, None]
+        board_rows, board_slots = np.nonzero(visible)
+        obs[board_rows, DECK_SIZE + self.board[board_rows, board_slots]] = 1.0
+
+        offset = 2 * DECK_SIZE
+        obs[rows, offset + self.street] = 1.0
+        offset += NUM_STREETS
+        obs[rows, offset + seat] = 1.0
+        offset += p
+        obs[:, offset:offset + p] = self.stacks / bb
+        offset += p
+        obs[:, offset:offset + p] = self.street_bets / bb
+        offset += p
+        obs[:, offset:offset + p] = self.folded
+        offset += p
+        obs[:, offset:offset + p] = self.all_in
+        offset += p
+        obs[:, offset] = self.contributed.sum(axis=1) / bb
+        obs[:, offset + 1] = (self.current_bet - self.street_bets[rows, seat]) / bb
+        return obs
+
+    # ----------------------------------------------
+    # 规则（全部按牌桌向量化）
+    # ----------------------------------------------
+
+    def _reset_tables(self, tables):
+        """为指定牌桌洗牌、发牌并下盲注"""
+        k, p = len(tables), self.num_players
+        decks = self.rng.random((k, DECK_SIZE)).argsort(axis=1)
+        self.hole[tables] = decks[:, :2 * p].reshape(k, p, 2)
+        self.board[tables] = decks[:, 2 * p:2 * p + 5]
+
+        self.stacks[tables] = self.start_stacks
+        self.street_bets[tables] = 0
+        self.contributed[tables] = 0
+        self.folded[tables] = False
+        self.all_in[tables] = False
+        self.acted[tables] = False
+        self.street[tables] = 0
+        self.raises[tables] = 0
+
+        small_blind_seat = 1 % p
+        big_blind_seat = (small_blind_seat + 1) % p
+        self._put(tables, np.full(k, small_blind_seat), np.full(k, self.small_blind))
+        self._put(tables, np.full(k, big_blind_seat), np.full(k, self.big_blind))
+        self.current_bet[tables] = self.big_blind
+        self.to_act[tables] = big_blind_seat
+        self.hands_played += k
+
+        # 极短筹码时盲注即全下，可能开局就只剩一人能行动
+        terminal, showdown = self._advance(tables, np.full(k, big_blind_seat))
+        if terminal.any():
+            done = tables[terminal]
+            self._payoffs(done, showdown[terminal])
+            self._reset_tables(done)
+
+    def _put(self, tables, seats, amounts):
+        """下注（不足时全下）"""
+        amounts = np.minimum(amounts, self.stacks[tables, seats])
+        self.stacks[tables, seats] -= amounts
+        self.street_bets[tables, seats] += amounts
+        self.contributed[tables, seats] += amounts
+        self.all_in[tables, seats] |= self.stacks[tables, seats] == 0
+
+    def _apply(self, actions):
+        """当前行动者执行行动"""
+        rows, p = self._rows, self.to_act
+        stack = self.stacks[rows, p]
+        bet = self.street_bets[rows, p]
+        raise_to = np.maximum(self.current_bet * 2, self.big_blind * 2)
+
+        amounts = np.zeros(self.num_envs, dtype=np.int64)
+        amounts = np.where(actions == CALL, self.current_bet - bet, amounts)
+        amounts = np.where(actions == RAISE, raise_to - bet, amounts)
+        amounts = np.where(actions == ALL_IN, stack, amounts)
+        self.folded[rows, p] |= actions == FOLD
+        self._put(rows, p, amounts)
+
+        # 加注（包括超过当前注的全下）后其他人需要重新行动
+        raised = self.street_bets[rows, p] > self.current_bet
+        self.current_bet = np.where(raised, self.street_bets[rows, p], self.current_bet)
+        self.raises += raised
+        self.acted[raised] = False
+        self.acted[rows, p] = True
+
+    def _advance(self, tables, last):
+        """轮到下一位玩家，或进入下一街；返回 (是否结束, 是否摊牌)（按 tables 排列）"""
+        p = self.num_players
+        live = ~self.folded[tables]
+        actors = live & ~self.all_in[tables]
+        needs = actors & (~self.acted[tables] | (self.street_bets[tables] < self.current_bet[tables, None]))
+
+        # 从 last 的下家起找第一个需要行动的玩家
+        next_actor = np.full(len(tables), -1)
+        for k in range(p, 0, -1):
+            seat = (last + k) % p
+            next_actor = np.where(needs[np.arange(len(tables)), seat], seat, next_actor)
+        self.to_act[tables] = np.where(next_actor >= 0, next_actor, self.to_act[tables])
+
+        fold_win = live.sum(axis=1) == 1
+        round_over = (next_actor < 0) & ~fold_win
+        showdown = round_over & ((actors.sum(axis=1) <= 1) | (self.street[tables] == NUM_STREETS - 1))
+        terminal = fold_win | showdown
+
+        # 下注轮结束且仍有两人以上可行动：进入下一街
+        moving = tables[round_over & ~showdown]
+        if len(moving):
+            self.street[moving] += 1
+            self.street_bets[moving] = 0
+            self.acted[moving] = False
+            self.current_bet[moving] = 0
+            self.raises[moving] = 0
+            self.to_act[moving] = (~self.folded[moving] & ~self.all_in[moving]).argmax(axis=1)
+        return terminal, showdown
+
+    def _payoffs(self, tables, showdown):
+        """结束的牌桌上各座位的净收益（大盲），按投入额分层计算边池"""
+        p = self.num_players
+        contributed = self.contributed[tables]
+        live = ~self.folded[tables]
+
+        # 摊牌分值（弃牌者为-1）；未摊牌的牌桌只剩一人，分值不影响结果
+        scores = np.full((len(tables), p), -1, dtype=np.int64)
+        rows, seats = np.nonzero(live & showdown[:, None])
+        if len(rows):
+            cards = np.concatenate([self.hole[tables[rows], seats], self.board[tables[rows]]], axis=1)
+            scores[rows, seats] = evaluate_batch(cards)
+
+        winnings = np.zeros((len(tables), p))
+        levels = np.sort(contributed, axis=1)
+        previous = np.zeros(len(tables), dtype=np.int64)
+        for i in range(p):
+            level = levels[:, i]
+            pot = (np.minimum(contributed, level[:, None])
+                   - np.minimum(contributed, previous[:, None])).sum(axis=1)
+            previous = level
+            eligible = live & (contributed >= level[:, None])
+            eligible = np.where(eligible.any(axis=1)[:, None], eligible, live)
+            best = np.where(eligible, scores, -2).max(axis=1)
+            winners = eligible & (scores == best[:, None])
+            share = pot / winners.sum(axis=1)
+            winnings += winners * share[:, None]
+
+        return ((winnings - contributed) / self.big_blind).astype(np.float32)
@@ -0,0 +1,605 @@
+# -*- coding: utf-8 -*-
+"""
+德州扑克3 - 紧凑二进制协议
+给移动网络下的远程客户端使用：不再每次变化都发送整桌状态的JSON，
+而是发送相邻两个牌桌状态之间的差量，并定期插入完整的关键帧用于重新同步
+
+编码:
+  整数    无符号 LEB128 变长整数（varint）；有符号值先做 zigzag 映射
+  牌      6位一张（牌值 0-51），前置1字节张数，按位紧密排列
+  帧      varint 长度 + 1字节类型 + 内容
+
+状态帧（服务器 → 客户端，按牌桌编号）:
+  KEYFRAME  牌桌 | 序号 | 座位数 | 相对空白状态的差量
+  DELTA     牌桌 | 序号 | 相对上一序号状态的差量
+  差量 = varint 字段位图 + 变化的字段；逐座位字段再带一个座位位图，
+  筹码、下注、底池写差值（zigzag），公共牌与亮牌写完整牌组
+
+客户端收到的 DELTA 序号不连续时丢弃差量，等待下一个关键帧（至多 KEYFRAME_INTERVAL 帧）
+
+断线重连: JOIN / WATCH 可带上客户端最后应用的状态帧序号，服务器从每桌最近 RESUME_WINDOW 帧的
+环形缓冲中只补发之后的帧；落后太多、补发比关键帧还大（或牌桌已迁移）时改发一个关键帧
+
+控制消息（与 game_server.py 的JSON消息一一对应）:
+  JOIN / WATCH / ACTION / LEAVE / LEADERBOARD（客户端 → 服务器），
+  JOINED / WATCHING / ERROR / TURN / HOLE / RANKING（服务器 → 客户端）
+
+连接建立后客户端先发送1字节 MAGIC，服务器据此切换到二进制协议
+"""
+
+import asyncio
+from collections import deque
+
+from betting import ACTION_BITS, action_names
+from cfr_solver import ACTIONS
+
+# 二进制连接的握手字节（UTF-8 续字节，不可能是JSON行的开头）
+MAGIC = b"\xa9"
+
+# 每隔多少帧发送一次关键帧
+KEYFRAME_INTERVAL = 64
+
+# 一帧的最大长度（字节），与 asyncio.StreamReader 默认的行长度上限相同；
+# 超过时视为非法连接，不会按对方声明的长度缓冲
+MAX_FRAME = 1 << 16
+
+# 每张牌桌保留最近多少帧供断线重连补发（差量平均约20字节，再多就不如直接发关键帧）
+RESUME_WINDOW = 16
+
+# 帧类型
+KEYFRAME = 1
+DELTA = 2
+JOIN = 3
+ACTION = 4
+LEAVE = 5
+JOINED = 6
+ERROR = 7
+TURN = 8
+HOLE = 9
+WATCH = 10
+WATCHING = 11
+LEADERBOARD = 12
+RANKING = 13
+
+# 座位状态
+IN_HAND = 0
+FOLDED = 1
+ALL_IN = 2
+
+# 差量字段位
+F_HAND = 1 << 0
+F_STREET = 1 << 1
+F_TO_ACT = 1 << 2
+F_CURRENT_BET = 1 << 3
+F_POT = 1 << 4
+F_BOARD = 1 << 5
+F_LAST = 1 << 6
+F_STACKS = 1 << 7
+F_BETS = 1 << 8
+F_STATUS = 1 << 9
+F_SHOWN = 1 << 10
+
+_ACTION_INDEX = {name: i for i, name in enumerate(ACTIONS)}
+
+
+# ==============================================
+# 基本编码
+# ==============================================
+
+def write_varint(out, value):
+    """把非负整数以 varint 追加到 bytearray"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def zigzag(value):
+    """有符号 -> 无符号（0, -1, 1, -2 ... -> 0, 1, 2, 3 ...）"""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    """zigzag 的逆映射"""
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def pack_cards(out, cards):
+    """把牌组（每张6位）追加到 bytearray"""
+    out.append(len(cards))
+    bits = nbits = 0
+    for card in cards:
+        bits |= card << nbits
+        nbits += 6
+        while nbits >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            nbits -= 8
+    if nbits:
+        out.append(bits)
+
+
+def write_string(out, text):
+    """varint 长度 + UTF-8"""
+    data = text.encode("utf-8")
+    write_varint(out, len(data))
+    out.extend(data)
+
+
+class Reader:
+    """顺序读取一帧内容；越界时抛出 ValueError"""
+
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def byte(self):
+        if self.pos >= len(self.data):
+            raise ValueError("帧数据不完整")
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def varint(self):
+        value = shift = 0
+        while True:
+            byte = self.byte()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+            if shift > 63:   # 64位整数最多10字节
+                raise ValueError("变长整数过长")
+
+    def signed(self):
+        return unzigzag(self.varint())
+
+    def cards(self):
+        count = self.byte()
+        cards = []
+        bits = nbits = 0
+        for _ in range(count):
+            if nbits < 6:
+                bits |= self.byte() << nbits
+                nbits += 8
+            card = bits & 0x3F
+            if card >= 52:
+                raise ValueError(f"非法牌值: {card}")
+            cards.append(card)
+            bits >>= 6
+            nbits -= 6
+        return cards
+
+    def string(self):
+        length = self.varint()
+        if self.pos + length > len(self.data):
+            raise ValueError("帧数据不完整")
+        text = bytes(self.data[self.pos:self.pos + length]).decode("utf-8")
+        self.pos += length
+        return text
+
+
+def frame(kind, body=b""):
+    """帧 = varint 长度 + 类型 + 内容"""
+    out = bytearray()
+    write_varint(out, len(body) + 1)
+    out.append(kind)
+    out.extend(body)
+    return bytes(out)
+
+
+def split_frames(buffer):
+    """从字节缓冲中切出完整的帧内容（类型 + 内容），返回 (帧列表, 剩余字节)"""
+    frames = []
+    pos = 0
+    while pos < len(buffer):
+        reader = Reader(buffer, pos)
+        try:
+            length = reader.varint()
+        except ValueError:
+            break
+        if reader.pos + length > len(buffer):
+            break
+        frames.append(bytes(buffer[reader.pos:reader.pos + length]))
+        pos = reader.pos + length
+    return frames, buffer[pos:]
+
+
+async def read_frame(reader, max_size=MAX_FRAME):
+    """从 asyncio.StreamReader 读取一帧内容；连接关闭时返回None，长度超过 max_size 时抛出 ValueError"""
+    length = shift = 0
+    while True:
+        byte = await reader.read(1)
+        if not byte:
+            return None
+        length |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            break
+        shift += 7
+        if shift > 28:
+            raise ValueError("帧长度非法")
+    if length > max_size:
+        raise ValueError(f"帧过长: {length} 字节")
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+
+
+# ==============================================
+# 牌桌状态与差量
+# ==============================================
+
+class TableState:
+    """一张牌桌对所有人公开的状态（不含未亮出的底牌）"""
+
+    __slots__ = ("hand", "street", "to_act", "current_bet", "pot", "board",
+                 "last", "stacks", "bets", "status", "shown")
+
+    def __init__(self, num_seats):
+        self.hand = 0
+        self.street = 0
+        self.to_act = -1
+        self.current_bet = 0
+        self.pot = 0
+        self.board = []
+        self.last = None   # 最近一次行动 (座位, 行动)
+        self.stacks = [0] * num_seats
+        self.bets = [0] * num_seats
+        self.status = [IN_HAND] * num_seats
+        self.shown = [[] for _ in range(num_seats)]
+
+    @classmethod
+    def from_engine(cls, engine):
+        """从 table_engine.TableEngine 取当前状态（牌局结束后下注清零、亮出摊牌玩家的底牌）"""
+        n = engine.num_seats
+        state = cls(n)
+        state.hand = engine.hand_id
+        state.street = engine.street
+        state.to_act = engine.to_act
+        state.board = list(engine.board)
+        state.last = engine.last_action
+        state.stacks = list(engine.chips)
+        state.status = [FOLDED if engine.folded[i] else ALL_IN if engine.all_in[i] else IN_HAND
+                        for i in range(n)]
+        if engine.hand_active:
+            state.current_bet = engine.current_bet
+            state.pot = engine.pot
+            state.bets = list(engine.street_bets)
+        elif engine.hand_id and n - sum(engine.folded) > 1:
+            state.shown = [[] if engine.folded[i] else list(engine.holes[i]) for i in range(n)]
+        return state
+
+    @property
+    def num_seats(self):
+        return len(self.stacks)
+
+    def __eq__(self, other):
+        return isinstance(other, TableState) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"TableState(hand={self.hand}, street={self.street}, to_act={self.to_act}, pot={self.pot})"
+
+
+def _seat_mask(old, new):
+    mask = 0
+    for i, (a, b) in enumerate(zip(old, new)):
+        if a != b:
+            mask |= 1 << i
+    return mask
+
+
+def encode_delta(out, old, new):
+    """把 old -> new 的差量追加到 bytearray（两者座位数相同）"""
+    fields = 0
+    if new.hand != old.hand:
+        fields |= F_HAND
+    if new.street != old.street:
+        fields |= F_STREET
+    if new.to_act != old.to_act:
+        fields |= F_TO_ACT
+    if new.current_bet != old.current_bet:
+        fields |= F_CURRENT_BET
+    if new.pot != old.pot:
+        fields |= F_POT
+    if new.board != old.board:
+        fields |= F_BOARD
+    if new.last != old.last:
+        fields |= F_LAST
+    stacks = _seat_mask(old.stacks, new.stacks)
+    bets = _seat_mask(old.bets, new.bets)
+    status = _seat_mask(old.status, new.status)
+    shown = _seat_mask(old.shown, new.shown)
+    for bit, mask in ((F_STACKS, stacks), (F_BETS, bets), (F_STATUS, status), (F_SHOWN, shown)):
+        if mask:
+            fields |= bit
+
+    write_varint(out, fields)
+    if fields & F_HAND:
+        write_varint(out, zigzag(new.hand - old.hand))
+    if fields & F_STREET:
+        out.append(new.street)
+    if fields & F_TO_ACT:
+        write_varint(out, new.to_act + 1)
+    if fields & F_CURRENT_BET:
+        write_varint(out, zigzag(new.current_bet - old.current_bet))
+    if fields & F_POT:
+        write_varint(out, zigzag(new.pot - old.pot))
+    if fields & F_BOARD:
+        pack_cards(out, new.board)
+    if fields & F_LAST:
+        write_varint(out, 0 if new.last is None else (new.last[0] + 1) * 8 + _ACTION_INDEX[new.last[1]])
+    for mask, old_values, new_values in ((stacks, old.stacks, new.stacks), (bets, old.bets, new.bets)):
+        if mask:
+            write_varint(out, mask)
+            for i in range(len(new_values)):
+                if mask >> i & 1:
+                    write_varint(out, zigzag(new_values[i] - old_values[i]))
+    if status:
+        write_varint(out, status)
+        for i in range(len(new.status)):
+            if status >> i & 1:
+                out.append(new.status[i])
+    if shown:
+        write_varint(out, shown)
+        for i in range(len(new.shown)):
+            if shown >> i & 1:
+                pack_cards(out, new.shown[i])
+
+
+def apply_delta(reader, state):
+    """读取一段差量并原地应用到 state"""
+    fields = reader.varint()
+    if fields & F_HAND:
+        state.hand += reader.signed()
+    if fields & F_STREET:
+        state.street = reader.byte()
+    if fields & F_TO_ACT:
+        state.to_act = reader.varint() - 1
+    if fields & F_CURRENT_BET:
+        state.current_bet += reader.signed()
+    if fields & F_POT:
+        state.pot += reader.signed()
+    if fields & F_BOARD:
+        state.board = reader.cards()
+    if fields & F_LAST:
+        last = reader.varint()
+        state.last = None if last == 0 else (last // 8 - 1, ACTIONS[last % 8])
+    n = state.num_seats
+    for bit, values in ((F_STACKS, state.stacks), (F_BETS, state.bets)):
+        if fields & bit:
+            mask = reader.varint()
+            for i in range(n):
+                if mask >> i & 1:
+                    values[i] += reader.signed()
+    if fields & F_STATUS:
+        mask = reader.varint()
+        for i in range(n):
+            if mask >> i & 1:
+                state.status[i] = reader.byte()
+    if fields & F_SHOWN:
+        mask = reader.varint()
+        for i in range(n):
+            if mask >> i & 1:
+                state.shown[i] = reader.cards()
+    return state
+
+
+class StateEncoder:
+    """服务器端：一张牌桌的状态帧序列（序号递增，每 keyframe_interval 帧一个关键帧）"""
+
+    def __init__(self, table_id, keyframe_interval=KEYFRAME_INTERVAL, window=RESUME_WINDOW):
+        self.table_id = table_id
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.previous = None
+        self.bytes_sent = 0
+        self.history = deque(maxlen=window)   # 最近的帧，最后一个的序号为 seq
+        self._current_keyframe = None
+
+    def encode(self, state, keyframe=False):
+        """编码下一帧（状态会被保存为下一帧的基准，调用方之后不应再修改它）"""
+        self.seq += 1
+        if (keyframe or self.previous is None or self.seq % self.keyframe_interval == 0
+                or self.previous.num_seats != state.num_seats):
+            data = self._encode(self.seq, None, state)
+        else:
+            data = self._encode(self.seq, self.previous, state)
+        self.previous = state
+        self._current_keyframe = data if data[_kind_offset(data)] == KEYFRAME else None
+        self.history.append(data)
+        self.bytes_sent += len(data)
+        return data
+
+    def keyframe(self, state):
+        """立即编码一个关键帧（序号前进，发给全部客户端）"""
+        return self.encode(state, keyframe=True)
+
+    def current_keyframe(self):
+        """最近一帧状态的关键帧，序号不变（发给新加入的客户端，下一帧之前重复使用）；还没有帧时返回None"""
+        if self.previous is None:
+            return None
+        if self._current_keyframe is None:
+            self._current_keyframe = self._encode(self.seq, None, self.previous)
+        return self._current_keyframe
+
+    def since(self, acked):
+        """客户端已应用到序号 acked：缓冲里还有之后的全部帧时按序返回（已是最新则为空列表），否则返回None"""
+        if acked is None or self.previous is None or acked > self.seq:
+            return None
+        missing = self.seq - acked
+        if missing > len(self.history):
+            return None
+        return [self.history[i] for i in range(-missing, 0)]
+
+    def _encode(self, seq, old, new):
+        out = bytearray()
+        write_varint(out, self.table_id)
+        write_varint(out, seq)
+        if old is None:
+            write_varint(out, new.num_seats)
+            encode_delta(out, TableState(new.num_seats), new)
+            return frame(KEYFRAME, out)
+        encode_delta(out, old, new)
+        return frame(DELTA, out)
+
+
+def _kind_offset(data):
+    """帧中类型字节的位置（跳过 varint 长度）"""
+    pos = 0
+    while data[pos] >= 0x80:
+        pos += 1
+    return pos + 1
+
+
+class StateDecoder:
+    """客户端：按序应用状态帧；序号断开时等待下一个关键帧"""
+
+    def __init__(self):
+        self.state = None
+        self.seq = 0
+        self.gaps = 0
+
+    def apply(self, message):
+        """应用一条 keyframe/delta 消息（unpack_message 的结果），返回最新状态；无法应用时返回None"""
+        reader = Reader(message["body"])
+        if message["type"] == "keyframe":
+            state = TableState(reader.varint())
+            self.state = apply_delta(reader, state)
+        elif self.state is not None and message["seq"] == self.seq + 1:
+            apply_delta(reader, self.state)
+        else:
+            if self.state is not None:
+                self.gaps += 1
+            self.state = None
+            return None
+        self.seq = message["seq"]
+        return self.state
+
+
+# ==============================================
+# 控制消息
+# ==============================================
+
+def pack_message(message):
+    """JSON风格的消息字典 -> 一帧字节串（字段与 game_server.py 的JSON协议相同）"""
+    kind = message["type"]
+    out = bytearray()
+    if kind == "join":
+        write_varint(out, message.get("table", 0))
+        write_string(out, message.get("name") or "")
+        _pack_resume(out, message)
+        return frame(JOIN, out)
+    if kind in ("watch", "watching"):
+        write_varint(out, message.get("table", 0))
+        if kind == "watch":
+            _pack_resume(out, message)
+        return frame(WATCH if kind == "watch" else WATCHING, out)
+    if kind == "action":
+        out.append(_ACTION_INDEX[message["action"]])
+        for key in ("amount", "seq"):
+            value = message.get(key)
+            write_varint(out, 0 if value is None else int(value) + 1)
+        return frame(ACTION, out)
+    if kind == "leave":
+        return frame(LEAVE)
+    if kind == "joined":
+        write_varint(out, message["table"])
+        write_varint(out, message["seat"])
+        return frame(JOINED, out)
+    if kind == "error":
+        write_string(out, message["message"])
+        return frame(ERROR, out)
+    if kind == "turn":
+        write_varint(out, message["seq"])
+        write_varint(out, message["seat"])
+        out.append(sum(ACTION_BITS[name] for name in message["legal"]))
+        for key in ("min_raise", "max_raise", "to_call"):
+            write_varint(out, message[key])
+        return frame(TURN, out)
+    if kind == "hole":
+        write_varint(out, message["seat"])
+        pack_cards(out, message["cards"])
+        return frame(HOLE, out)
+    if kind == "leaderboard":
+        write_string(out, message.get("board") or "")
+        write_varint(out, message.get("count", 0))
+        write_varint(out, message.get("start", 0))
+        return frame(LEADERBOARD, out)
+    if kind == "ranking":
+        write_string(out, message["board"])
+        write_varint(out, message["start"])
+        write_varint(out, len(message["top"]))
+        for rank, name, score in message["top"]:
+            write_varint(out, rank)
+            write_string(out, name)
+            write_varint(out, zigzag(score))
+        if message.get("rank") is not None:
+            rank, score = message["rank"]
+            write_varint(out, rank)
+            write_varint(out, zigzag(score))
+        return frame(RANKING, out)
+    raise ValueError(f"无法编码的消息类型: {kind}")
+
+
+def _pack_resume(out, message):
+    """JOIN / WATCH 末尾可选的重连序号（客户端最后应用的状态帧）"""
+    if message.get("seq") is not None:
+        write_varint(out, message["seq"])
+
+
+def _unpack_resume(reader, message):
+    if reader.pos < len(reader.data):
+        message["seq"] = reader.varint()
+    return message
+
+
+def unpack_message(payload):
+    """一帧内容（类型 + 内容）-> 消息字典；非法内容抛出 ValueError"""
+    if not payload:
+        raise ValueError("空帧")
+    kind = payload[0]
+    reader = Reader(payload, 1)
+    if kind in (KEYFRAME, DELTA):
+        table = reader.varint()
+        seq = reader.varint()
+        return {"type": "keyframe" if kind == KEYFRAME else "delta", "table": table, "seq": seq,
+                "body": payload[reader.pos:]}
+    if kind == JOIN:
+        return _unpack_resume(reader, {"type": "join", "table": reader.varint(), "name": reader.string()})
+    if kind == WATCH:
+        return _unpack_resume(reader, {"type": "watch", "table": reader.varint()})
+    if kind == WATCHING:
+        return {"type": "watching", "table": reader.varint()}
+    if kind == ACTION:
+        index = reader.byte()
+        if index >= len(ACTIONS):
+            raise ValueError(f"非法行动编号: {index}")
+        amount, seq = reader.varint(), reader.varint()
+        return {"type": "action", "action": ACTIONS[index], "amount": amount - 1 if amount else None,
+                "seq": seq - 1 if seq else None}
+    if kind == LEAVE:
+        return {"type": "leave"}
+    if kind == JOINED:
+        return {"type": "joined", "table": reader.varint(), "seat": reader.varint()}
+    if kind == ERROR:
+        return {"type": "error", "message": reader.string()}
+    if kind == TURN:
+        seq, seat = reader.varint(), reader.varint()
+        legal = action_names(reader.byte())
+        return {"type": "turn", "seq": seq, "seat": seat, "legal": legal, "min_raise": reader.varint(),
+                "max_raise": reader.varint(), "to_call": reader.varint()}
+    if kind == HOLE:
+        seat = reader.varint()
+        return {"type": "hole", "to": seat, "seat": seat, "cards": reader.cards()}
+    if kind == LEADERBOARD:
+        return {"type": "leaderboard", "board": reader.string(), "count": reader.varint(), "start": reader.varint()}
+    if kind == RANKING:
+        board, start = reader.string(), reader.varint()
+        top = [[reader.varint(), reader.string(), reader.signed()] for _ in range(reader.varint())]
+        rank = [reader.varint(), reader.signed()] if reader.pos < len(reader.data) else None
+        return {"type": "ranking", "board": board, "start": start, "top": top, "rank": rank}
+    raise ValueError(f"未知的帧类型: {kind}")